@@ -49,6 +49,11 @@ class Settings(BaseSettings):
     # Performance Settings
     max_file_size: int = Field(default=25 * 1024 * 1024, env="MAX_FILE_SIZE")  # 25MB
     embedding_dimension: int = Field(default=384, env="EMBEDDING_DIMENSION")
+    embedding_index_path: Optional[str] = Field(default=None, env="EMBEDDING_INDEX_PATH")
+    embedding_index_lists: int = Field(default=1024, env="EMBEDDING_INDEX_LISTS")
+    embedding_index_probe: int = Field(default=16, env="EMBEDDING_INDEX_PROBE")
+    embedding_batch_size: int = Field(default=64, env="EMBEDDING_BATCH_SIZE")
+    embedding_batch_wait_ms: float = Field(default=5.0, env="EMBEDDING_BATCH_WAIT_MS")
     
     # External Services
     weather_api_key: Optional[str] = Field(default=None, env="WEATHER_API_KEY")
@@ -1,19 +1,29 @@
 """
 AI service package initialization.
+
+Services are imported on first access so that modules with light
+dependencies (the vector index and embedding helpers) can be imported
+without loading the configuration and the model clients.
 """
-from .conversation_service import conversation_manager, user_context_manager
-from .function_service import function_registry
-from .gemini_service import gemini_service
-from .voice_service import voice_service, wake_word_detector
-from .websocket_service import connection_manager, websocket_handler
+from importlib import import_module
+
+_EXPORTS = {
+    "conversation_manager": ".conversation_service",
+    "user_context_manager": ".conversation_service",
+    "function_registry": ".function_service",
+    "gemini_service": ".gemini_service",
+    "voice_service": ".voice_service",
+    "wake_word_detector": ".voice_service",
+    "connection_manager": ".websocket_service",
+    "websocket_handler": ".websocket_service",
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    "conversation_manager",
-    "user_context_manager", 
-    "function_registry",
-    "gemini_service",
-    "voice_service",
-    "wake_word_detector",
-    "connection_manager",
-    "websocket_handler",
-]
\ No newline at end of file
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
\ No newline at end of file
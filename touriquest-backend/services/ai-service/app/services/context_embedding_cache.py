@@ -0,0 +1,151 @@
+"""
+Per-conversation embedding cache for context retrieval.
+
+Each conversation keeps its turn embeddings as one unit-normalised float32
+matrix that grows by appending rows, so a new query only embeds the turns
+added since the last one and relevance scoring is a single matrix-vector
+product. Conversations are evicted least-recently-used first and after a
+TTL without access.
+"""
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.services.vector_index import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+EmbedBatch = Callable[[List[str]], Awaitable[Sequence[Sequence[float]]]]
+
+
+def turn_key(message: Dict) -> str:
+    """Stable identity of a conversation turn: its id, else a content hash."""
+    if message.get("id"):
+        return str(message["id"])
+    return hashlib.sha1(message.get("content", "").encode("utf-8")).hexdigest()
+
+
+class _ConversationVectors:
+    """Append-only float32 rows for one conversation."""
+
+    __slots__ = ("vectors", "count", "rows", "keys", "expires_at")
+
+    def __init__(self, dimension: int, expires_at: float):
+        self.vectors = np.empty((16, dimension), dtype=np.float32)
+        self.count = 0
+        self.rows: Dict[str, int] = {}
+        self.keys: List[str] = []
+        self.expires_at = expires_at
+
+    def append(self, keys: List[str], vectors: np.ndarray) -> None:
+        needed = self.count + len(keys)
+        if needed > len(self.vectors):
+            grown = np.empty((max(needed, 2 * len(self.vectors)), self.vectors.shape[1]), dtype=np.float32)
+            grown[:self.count] = self.vectors[:self.count]
+            self.vectors = grown
+        self.vectors[self.count:needed] = vectors
+        for offset, key in enumerate(keys):
+            self.rows[key] = self.count + offset
+        self.keys.extend(keys)
+        self.count = needed
+
+    def matrix_for(self, keys: List[str]) -> np.ndarray:
+        # The usual case is the cached turns in order, which needs no copy
+        if keys == self.keys[:len(keys)]:
+            return self.vectors[:len(keys)]
+        return self.vectors[[self.rows[key] for key in keys]]
+
+
+class ConversationEmbeddingStore:
+    """LRU/TTL cache of conversation turn embeddings."""
+
+    def __init__(
+        self,
+        dimension: int,
+        max_conversations: int = 1000,
+        ttl_seconds: float = 1800,
+        max_turns: int = 2000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize an empty store."""
+        self.dimension = dimension
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self._clock = clock
+        self._conversations: "OrderedDict[str, _ConversationVectors]" = OrderedDict()
+        self.turns_embedded = 0
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return conversation_id in self._conversations
+
+    async def embeddings_for(
+        self,
+        conversation_id: str,
+        turns: List[Tuple[str, str]],
+        embed_batch: EmbedBatch,
+    ) -> np.ndarray:
+        """
+        Return normalised embeddings for (key, text) turns, one row per turn.
+
+        Only turns not seen before in this conversation are passed to
+        embed_batch, in one call.
+        """
+        now = self._clock()
+        self._evict_expired(now)
+
+        entry = self._conversations.get(conversation_id)
+        if entry is None:
+            entry = _ConversationVectors(self.dimension, now + self.ttl_seconds)
+            self._conversations[conversation_id] = entry
+        self._conversations.move_to_end(conversation_id)
+        entry.expires_at = now + self.ttl_seconds
+
+        keys = [key for key, _ in turns]
+        missing = self._missing_turns(entry, turns)
+        if entry.count + len(missing) > self.max_turns:
+            # Turns that left the history window pile up; start over
+            entry = _ConversationVectors(self.dimension, now + self.ttl_seconds)
+            self._conversations[conversation_id] = entry
+            missing = self._missing_turns(entry, turns)
+
+        if missing:
+            vectors = normalize_rows(await embed_batch(list(missing.values())))
+            self.turns_embedded += len(missing)
+            # A concurrent query may have appended some of them meanwhile
+            missing_keys = list(missing)
+            fresh = [row for row, key in enumerate(missing_keys) if key not in entry.rows]
+            entry.append([missing_keys[row] for row in fresh], vectors[fresh])
+
+        while len(self._conversations) > self.max_conversations:
+            evicted, _ = self._conversations.popitem(last=False)
+            logger.debug(f"Evicted context embeddings for conversation {evicted}")
+
+        return entry.matrix_for(keys)
+
+    def invalidate(self, conversation_id: str) -> None:
+        """Drop a conversation, e.g. when it is deleted or its messages edited."""
+        self._conversations.pop(conversation_id, None)
+
+    @staticmethod
+    def _missing_turns(entry: _ConversationVectors, turns: List[Tuple[str, str]]) -> Dict[str, str]:
+        missing: Dict[str, str] = {}
+        for key, text in turns:
+            if key not in entry.rows:
+                missing.setdefault(key, text)
+        return missing
+
+    def _evict_expired(self, now: float) -> None:
+        # Access order is expiry order, so expired entries sit at the front
+        while self._conversations:
+            conversation_id, entry = next(iter(self._conversations.items()))
+            if entry.expires_at > now:
+                break
+            self._conversations.popitem(last=False)
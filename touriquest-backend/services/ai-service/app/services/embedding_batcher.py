@@ -0,0 +1,161 @@
+"""
+Micro-batched embedding inference and binary embedding cache.
+
+MicroBatchEncoder encodes the texts of concurrent embed requests with one
+model call in a worker thread, so the event loop is never blocked by
+inference and the model sees batches instead of single sentences. Requests
+arriving while a batch runs form the next one, and once requests overlap the
+encoder also holds a batch open for a few milliseconds to gather more, so
+batches grow with load while a lone request is encoded straight away.
+
+RedisEmbeddingCache stores vectors as raw float32 bytes and reads many keys
+with one MGET round trip.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EncodeFn = Callable[[List[str]], np.ndarray]
+
+
+class MicroBatchEncoder:
+    """Coalesces concurrent encode requests into batched model calls."""
+
+    def __init__(
+        self,
+        encode_fn: EncodeFn,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None,
+    ):
+        """Initialize the encoder; the batching task starts on first use."""
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # One thread: the model call releases the GIL and is not re-entrant
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.texts_encoded = 0
+
+    async def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a float32 (len(texts), dimension) array of embeddings."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((list(texts), future))
+        return await future
+
+    async def close(self) -> None:
+        """Stop the batching task; queued requests are cancelled."""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                future.cancel()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        concurrent = False
+        while True:
+            requests = [await self._queue.get()]
+            pending = len(requests[0][0])
+            # A lone request under light load is not held back waiting for company
+            deadline = loop.time() + (self.max_wait if concurrent else 0)
+
+            while pending < self.max_batch_size:
+                # Past the deadline, only take what is already queued
+                timeout = deadline - loop.time()
+                try:
+                    if timeout > 0:
+                        request = await asyncio.wait_for(self._queue.get(), timeout)
+                    else:
+                        request = self._queue.get_nowait()
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                requests.append(request)
+                pending += len(request[0])
+
+            concurrent = len(requests) > 1 or not self._queue.empty()
+            await self._encode_batch(loop, requests)
+
+    async def _encode_batch(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        requests: List[Tuple[List[str], asyncio.Future]],
+    ) -> None:
+        # Identical texts in the batch are encoded once
+        unique: Dict[str, int] = {}
+        for texts, _ in requests:
+            for text in texts:
+                unique.setdefault(text, len(unique))
+
+        started = time.perf_counter()
+        try:
+            vectors = await loop.run_in_executor(self._executor, self.encode_fn, list(unique))
+            vectors = np.asarray(vectors, dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Error encoding embedding batch: {str(e)}")
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.texts_encoded += len(unique)
+        logger.debug(
+            f"Encoded batch of {len(unique)} texts for {len(requests)} requests "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        for texts, future in requests:
+            if not future.done():
+                future.set_result(vectors[[unique[text] for text in texts]])
+
+
+class RedisEmbeddingCache:
+    """Embedding cache keeping raw float32 bytes in Redis."""
+
+    def __init__(self, redis_client, ttl_seconds: int = 86400, prefix: str = "embedding:v2:"):
+        """Initialize with a Redis client that returns bytes (decode_responses=False)."""
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Fetch cached vectors with one MGET; misses are None."""
+        if not keys:
+            return []
+        values = await self.redis_client.mget([self.prefix + key for key in keys])
+        return [np.frombuffer(value, dtype=np.float32) if value else None for value in values]
+
+    async def set_many(self, items: Sequence[Tuple[str, np.ndarray]]) -> None:
+        """Store vectors with one pipelined round trip."""
+        if not items:
+            return
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key, vector in items:
+                pipe.set(
+                    self.prefix + key,
+                    np.asarray(vector, dtype=np.float32).tobytes(),
+                    ex=self.ttl_seconds
+                )
+            await pipe.execute()
@@ -9,10 +9,13 @@ from uuid import UUID
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import redis.asyncio as redis
-import json
+from pathlib import Path
 
 from app.core.config import settings
 from app.models.schemas import Language
+from app.services.context_embedding_cache import ConversationEmbeddingStore, turn_key
+from app.services.embedding_batcher import MicroBatchEncoder, RedisEmbeddingCache
+from app.services.vector_index import IVFVectorIndex, normalize_rows, top_k_indices
 
 logger = logging.getLogger(__name__)
 
@@ -24,9 +27,17 @@ class EmbeddingService:
         """Initialize embedding service."""
         self.model = None
         self.redis_client = None
+        self.embedding_cache = None
         self.model_name = "all-MiniLM-L6-v2"  # Lightweight multilingual model
+        self.vector_index = None
         self._setup_model()
         self._setup_redis()
+        self._setup_vector_index()
+        self.encoder = MicroBatchEncoder(
+            self._encode_texts,
+            max_batch_size=settings.embedding_batch_size,
+            max_wait_ms=settings.embedding_batch_wait_ms
+        )
     
     def _setup_model(self):
         """Load the sentence transformer model."""
@@ -37,94 +48,104 @@ class EmbeddingService:
             logger.error(f"Failed to load embedding model: {str(e)}")
             self.model = None
     
-    async def _setup_redis(self):
-        """Setup Redis connection for caching embeddings."""
+    def _setup_redis(self):
+        """Setup Redis connection for caching embeddings (binary values, connects lazily)."""
         try:
-            self.redis_client = redis.from_url(
-                settings.redis_url,
-                encoding="utf-8",
-                decode_responses=True
-            )
-            await self.redis_client.ping()
-            logger.info("Redis connection established for embeddings")
+            self.redis_client = redis.from_url(settings.redis_url, decode_responses=False)
+            self.embedding_cache = RedisEmbeddingCache(self.redis_client)
         except Exception as e:
-            logger.error(f"Failed to connect to Redis for embeddings: {str(e)}")
+            logger.error(f"Failed to set up Redis for embeddings: {str(e)}")
             self.redis_client = None
+            self.embedding_cache = None
     
-    async def generate_embedding(self, text: str, cache_key: Optional[str] = None) -> List[float]:
-        """Generate embedding for text."""
-        if not self.model:
-            raise RuntimeError("Embedding model not loaded")
-        
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Run the model on a batch; called in the encoder's worker thread."""
+        return self.model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+    
+    def _setup_vector_index(self):
+        """Open the persisted similarity index (memory-mapped) or start an empty one."""
+        index_path = settings.embedding_index_path
         try:
-            # Check cache first
-            if cache_key and self.redis_client:
-                cached_embedding = await self._get_cached_embedding(cache_key)
-                if cached_embedding:
-                    return cached_embedding
-            
-            # Clean and prepare text
-            cleaned_text = self._preprocess_text(text)
-            
-            # Generate embedding
-            embedding = self.model.encode(cleaned_text, convert_to_tensor=False)
-            embedding_list = embedding.tolist()
-            
-            # Cache embedding
-            if cache_key and self.redis_client:
-                await self._cache_embedding(cache_key, embedding_list)
-            
-            logger.debug(f"Generated embedding for text: {len(cleaned_text)} chars -> {len(embedding_list)} dimensions")
-            return embedding_list
-            
+            if index_path and (Path(index_path) / "meta.json").exists():
+                self.vector_index = IVFVectorIndex.load(index_path, mmap=True)
+                self.vector_index.n_probe = settings.embedding_index_probe
+            else:
+                self.vector_index = IVFVectorIndex(
+                    settings.embedding_dimension,
+                    n_lists=settings.embedding_index_lists,
+                    n_probe=settings.embedding_index_probe
+                )
         except Exception as e:
-            logger.error(f"Error generating embedding: {str(e)}")
-            raise
+            logger.error(f"Failed to load embedding index: {str(e)}")
+            self.vector_index = IVFVectorIndex(
+                settings.embedding_dimension,
+                n_lists=settings.embedding_index_lists,
+                n_probe=settings.embedding_index_probe
+            )
+    
+    async def generate_embedding(self, text: str, cache_key: Optional[str] = None) -> List[float]:
+        """Generate embedding for text."""
+        embeddings = await self.generate_batch_embeddings(
+            [text], [cache_key] if cache_key else None
+        )
+        return embeddings[0]
     
     async def generate_batch_embeddings(
         self, 
         texts: List[str], 
         cache_keys: Optional[List[str]] = None
     ) -> List[List[float]]:
-        """Generate embeddings for multiple texts efficiently."""
+        """
+        Generate embeddings for multiple texts efficiently.
+        
+        Cached vectors are fetched with one MGET; the rest are encoded by the
+        micro-batching encoder together with other concurrent requests.
+        """
         if not self.model:
             raise RuntimeError("Embedding model not loaded")
         
         try:
-            embeddings = []
-            texts_to_process = []
-            indices_to_process = []
-            
-            # Check cache for each text
-            for i, text in enumerate(texts):
-                cache_key = cache_keys[i] if cache_keys and i < len(cache_keys) else None
-                
-                if cache_key and self.redis_client:
-                    cached_embedding = await self._get_cached_embedding(cache_key)
-                    if cached_embedding:
-                        embeddings.append(cached_embedding)
-                        continue
-                
-                # Text needs processing
-                embeddings.append(None)
-                texts_to_process.append(self._preprocess_text(text))
-                indices_to_process.append(i)
+            embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+            keys = [
+                cache_keys[i] if cache_keys and i < len(cache_keys) else None
+                for i in range(len(texts))
+            ]
             
-            # Process uncached texts in batch
-            if texts_to_process:
-                batch_embeddings = self.model.encode(texts_to_process, convert_to_tensor=False)
+            # Check cache for all keyed texts at once
+            keyed = [i for i, key in enumerate(keys) if key]
+            if keyed and self.embedding_cache:
+                try:
+                    cached = await self.embedding_cache.get_many([keys[i] for i in keyed])
+                    for i, vector in zip(keyed, cached):
+                        embeddings[i] = vector
+                except Exception as e:
+                    logger.warning(f"Error getting cached embeddings: {str(e)}")
+            
+            # Encode the rest off the event loop
+            indices_to_process = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if indices_to_process:
+                vectors = await self.encoder.encode(
+                    [self._preprocess_text(texts[i]) for i in indices_to_process]
+                )
+                to_cache = []
+                for i, vector in zip(indices_to_process, vectors):
+                    embeddings[i] = vector
+                    if keys[i]:
+                        to_cache.append((keys[i], vector))
                 
-                # Fill in the results and cache
-                for j, i in enumerate(indices_to_process):
-                    embedding_list = batch_embeddings[j].tolist()
-                    embeddings[i] = embedding_list
-                    
-                    # Cache if key provided
-                    if cache_keys and i < len(cache_keys) and cache_keys[i]:
-                        await self._cache_embedding(cache_keys[i], embedding_list)
+                if to_cache and self.embedding_cache:
+                    try:
+                        await self.embedding_cache.set_many(to_cache)
+                    except Exception as e:
+                        logger.warning(f"Error caching embeddings: {str(e)}")
             
-            logger.info(f"Generated batch embeddings: {len(texts)} texts")
-            return embeddings
+            logger.debug(f"Generated batch embeddings: {len(texts)} texts, {len(indices_to_process)} encoded")
+            return [embedding.tolist() for embedding in embeddings]
             
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {str(e)}")
@@ -158,14 +179,14 @@ class EmbeddingService:
             if not candidate_embeddings:
                 return []
             
-            query_emb = np.array(query_embedding).reshape(1, -1)
-            candidate_embs = np.array(candidate_embeddings)
+            query_emb = normalize_rows(query_embedding)[0]
+            candidate_embs = normalize_rows(candidate_embeddings)
             
             # Calculate similarities
-            similarities = cosine_similarity(query_emb, candidate_embs)[0]
+            similarities = candidate_embs @ query_emb
             
             # Get top k most similar
-            top_indices = np.argsort(similarities)[::-1][:top_k]
+            top_indices = top_k_indices(similarities, top_k)
             
             results = [
                 (int(idx), float(similarities[idx]))
@@ -179,6 +200,34 @@ class EmbeddingService:
             logger.error(f"Error finding similar embeddings: {str(e)}")
             return []
     
+    def index_embeddings(self, ids: List[int], embeddings: List[List[float]]):
+        """Add embeddings to the similarity index under integer ids."""
+        self.vector_index.add(np.asarray(embeddings, dtype=np.float32), ids)
+    
+    def search_index(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        min_similarity: float = 0.1
+    ) -> List[Tuple[int, float]]:
+        """Find the ids of the indexed embeddings most similar to query."""
+        try:
+            return [
+                (item_id, similarity)
+                for item_id, similarity in self.vector_index.search(
+                    np.asarray(query_embedding, dtype=np.float32), top_k
+                )
+                if similarity > min_similarity
+            ]
+        except Exception as e:
+            logger.error(f"Error searching embedding index: {str(e)}")
+            return []
+    
+    def save_vector_index(self):
+        """Persist the similarity index so the next start can memory-map it."""
+        if settings.embedding_index_path:
+            self.vector_index.save(settings.embedding_index_path)
+    
     def _preprocess_text(self, text: str) -> str:
         """Preprocess text for embedding generation."""
         # Basic text cleaning
@@ -193,78 +242,76 @@ class EmbeddingService:
             cleaned = cleaned[:max_chars] + "..."
         
         return cleaned
-    
-    async def _get_cached_embedding(self, cache_key: str) -> Optional[List[float]]:
-        """Get embedding from cache."""
-        try:
-            cached_data = await self.redis_client.get(f"embedding:{cache_key}")
-            if cached_data:
-                return json.loads(cached_data)
-        except Exception as e:
-            logger.warning(f"Error getting cached embedding: {str(e)}")
-        return None
-    
-    async def _cache_embedding(self, cache_key: str, embedding: List[float]):
-        """Cache embedding."""
-        try:
-            await self.redis_client.setex(
-                f"embedding:{cache_key}",
-                86400,  # 24 hours TTL
-                json.dumps(embedding)
-            )
-        except Exception as e:
-            logger.warning(f"Error caching embedding: {str(e)}")
 
 
 class ConversationContextRetriever:
     """Retrieves relevant conversation context using embeddings."""
     
-    def __init__(self, embedding_service: EmbeddingService):
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        embedding_store: Optional[ConversationEmbeddingStore] = None
+    ):
         """Initialize context retriever."""
         self.embedding_service = embedding_service
+        self.embedding_store = embedding_store or ConversationEmbeddingStore(
+            settings.embedding_dimension,
+            ttl_seconds=settings.context_cache_ttl
+        )
     
     async def find_relevant_context(
         self,
         query: str,
         conversation_history: List[Dict[str, Any]],
-        max_context_items: int = 5
+        max_context_items: int = 5,
+        conversation_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Find relevant context from conversation history."""
+        """
+        Find relevant context from conversation history.
+        
+        With a conversation_id, turn embeddings are cached per conversation
+        and only turns added since the previous call are embedded.
+        """
         try:
             if not conversation_history:
                 return []
             
-            # Generate query embedding
-            query_embedding = await self.embedding_service.generate_embedding(query)
-            
-            # Extract texts and generate embeddings for history
-            history_texts = []
-            for msg in conversation_history:
+            # Keep the position of each usable message in the history
+            positions = []
+            turns = []
+            for position, msg in enumerate(conversation_history):
                 content = msg.get("content", "")
                 if content and len(content.strip()) > 10:  # Skip very short messages
-                    history_texts.append(content)
+                    positions.append(position)
+                    turns.append((turn_key(msg), content))
             
-            if not history_texts:
+            if not turns:
                 return []
             
-            # Generate embeddings for history
-            history_embeddings = await self.embedding_service.generate_batch_embeddings(
-                history_texts
-            )
+            # Generate query embedding
+            query_embedding = normalize_rows(
+                await self.embedding_service.generate_embedding(query)
+            )[0]
+            
+            # Embeddings for history, one normalised row per turn
+            if conversation_id:
+                history_matrix = await self.embedding_store.embeddings_for(
+                    str(conversation_id), turns, self.embedding_service.generate_batch_embeddings
+                )
+            else:
+                history_matrix = normalize_rows(
+                    await self.embedding_service.generate_batch_embeddings([text for _, text in turns])
+                )
             
-            # Find most similar messages
-            similar_indices = self.embedding_service.find_most_similar(
-                query_embedding,
-                history_embeddings,
-                top_k=max_context_items
-            )
+            # Score every turn with one matrix-vector product
+            similarities = history_matrix @ query_embedding
             
             # Return relevant context
             relevant_context = []
-            for idx, similarity in similar_indices:
-                if idx < len(conversation_history):
-                    context_item = conversation_history[idx].copy()
-                    context_item["relevance_score"] = similarity
+            for idx in top_k_indices(similarities, max_context_items):
+                if similarities[idx] > 0.1:  # Minimum similarity threshold
+                    context_item = conversation_history[positions[idx]].copy()
+                    context_item["relevance_score"] = float(similarities[idx])
                     relevant_context.append(context_item)
             
             return relevant_context
@@ -0,0 +1,264 @@
+"""
+Approximate nearest-neighbour index for embedding similarity search.
+
+An inverted-file (IVF) index over unit-normalised float32 vectors. Spherical
+k-means centroids partition the corpus into lists and a query only scores
+the n_probe lists whose centroids are closest to it, so search cost follows
+n_probe / n_lists of the corpus rather than all of it. Each list is stored
+contiguously, which makes scoring a probed list one matrix-vector product.
+
+Vectors added to a built or loaded index go to per-list append buffers that
+compact() folds into the contiguous storage. Until enough vectors exist to
+train the centroids the index is a flat, exact one. save() writes plain .npy
+files and load() memory-maps them, so a large index is usable at startup
+without reading it into memory first.
+"""
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Vectors per list needed before centroids are trained
+TRAINING_POINTS_PER_LIST = 39
+# Upper bound on the k-means training sample, per list
+MAX_TRAINING_POINTS_PER_LIST = 256
+# Rows scored against the centroids at a time while assigning
+ASSIGN_CHUNK_ROWS = 16384
+INDEX_FORMAT_VERSION = 1
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Return float32 copies of the rows scaled to unit length."""
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores, best first."""
+    if top_k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class IVFVectorIndex:
+    """Inverted-file cosine similarity index with incremental inserts."""
+
+    def __init__(
+        self,
+        dimension: int,
+        n_lists: int = 1024,
+        n_probe: int = 16,
+        seed: int = 0,
+    ):
+        """Initialize an empty index."""
+        self.dimension = dimension
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self._rng = np.random.default_rng(seed)
+
+        # Trained state; an untrained index keeps everything in list 0
+        self._centroids: Optional[np.ndarray] = None
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._offsets = np.zeros(2, dtype=np.int64)
+
+        # Per-list append buffers for vectors added since the last compact()
+        self._pending: Dict[int, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        self._pending_count = 0
+
+    def __len__(self) -> int:
+        return len(self._ids) + self._pending_count
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def pending_count(self) -> int:
+        return self._pending_count
+
+    @property
+    def min_training_size(self) -> int:
+        return self.n_lists * TRAINING_POINTS_PER_LIST
+
+    def add(self, vectors: np.ndarray, ids: Sequence[int]) -> None:
+        """Insert vectors with integer ids, training the index once it is large enough."""
+        vectors = normalize_rows(vectors)
+        ids = np.asarray(ids, dtype=np.int64)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {vectors.shape[1]}")
+        if len(vectors) != len(ids):
+            raise ValueError("vectors and ids must have the same length")
+        if not len(ids):
+            return
+
+        if self.is_trained:
+            assignments = self._assign(vectors)
+            order = np.argsort(assignments, kind="stable")
+            lists, starts = np.unique(assignments[order], return_index=True)
+            for list_no, rows in zip(lists, np.split(order, starts[1:])):
+                self._pending.setdefault(int(list_no), []).append((vectors[rows], ids[rows]))
+        else:
+            self._pending.setdefault(0, []).append((vectors, ids))
+        self._pending_count += len(ids)
+
+        if not self.is_trained and len(self) >= self.min_training_size:
+            self.train()
+        elif self._pending_count > max(10_000, len(self._ids) // 4):
+            self.compact()
+
+    def train(self, iterations: int = 10) -> None:
+        """Fit the list centroids on (a sample of) the stored vectors and re-bucket them."""
+        self.compact()
+        if len(self._ids) < self.n_lists:
+            raise ValueError(f"Need at least {self.n_lists} vectors to train {self.n_lists} lists")
+
+        sample_size = min(len(self._ids), self.n_lists * MAX_TRAINING_POINTS_PER_LIST)
+        sample_rows = np.sort(self._rng.choice(len(self._ids), sample_size, replace=False))
+        sample = np.asarray(self._vectors[sample_rows])
+
+        centroids = sample[self._rng.choice(sample_size, self.n_lists, replace=False)]
+        for _ in range(iterations):
+            assignments = self._assign(sample, centroids)
+            order = np.argsort(assignments, kind="stable")
+            lists, starts = np.unique(assignments[order], return_index=True)
+            sums = np.zeros_like(centroids)
+            sums[lists] = np.add.reduceat(sample[order], starts, axis=0)
+
+            # Re-seed lists that lost all their points
+            empty = np.setdiff1d(np.arange(self.n_lists), lists)
+            if len(empty):
+                sums[empty] = sample[self._rng.choice(sample_size, len(empty), replace=False)]
+            centroids = normalize_rows(sums)
+
+        self._centroids = centroids
+        assignments = self._assign(self._vectors)
+        order = np.argsort(assignments, kind="stable")
+        self._vectors = np.asarray(self._vectors)[order]
+        self._ids = self._ids[order]
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=self.n_lists))])
+        logger.info(f"Trained vector index: {len(self)} vectors in {self.n_lists} lists")
+
+    def compact(self) -> None:
+        """Fold the append buffers into the contiguous per-list storage."""
+        if not self._pending_count:
+            return
+
+        list_count = len(self._offsets) - 1
+        vector_parts: List[np.ndarray] = []
+        id_parts: List[np.ndarray] = []
+        sizes = np.zeros(list_count, dtype=np.int64)
+        for list_no in range(list_count):
+            start, end = self._offsets[list_no], self._offsets[list_no + 1]
+            pieces = [(self._vectors[start:end], self._ids[start:end])] + self._pending.get(list_no, [])
+            for vectors, ids in pieces:
+                if len(ids):
+                    vector_parts.append(vectors)
+                    id_parts.append(ids)
+                    sizes[list_no] += len(ids)
+
+        self._vectors = np.concatenate(vector_parts).astype(np.float32, copy=False)
+        self._ids = np.concatenate(id_parts)
+        self._offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self._pending = {}
+        self._pending_count = 0
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 10,
+        n_probe: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return (id, cosine similarity) pairs for the top_k nearest vectors."""
+        query = normalize_rows(query)[0]
+        scores_parts: List[np.ndarray] = []
+        id_parts: List[np.ndarray] = []
+
+        for list_no in self._probe(query, n_probe):
+            start, end = self._offsets[list_no], self._offsets[list_no + 1]
+            if end > start:
+                scores_parts.append(self._vectors[start:end] @ query)
+                id_parts.append(self._ids[start:end])
+            for vectors, ids in self._pending.get(list_no, ()):
+                scores_parts.append(vectors @ query)
+                id_parts.append(ids)
+
+        if not scores_parts:
+            return []
+        scores = np.concatenate(scores_parts)
+        ids = np.concatenate(id_parts)
+        best = top_k_indices(scores, top_k)
+        return [(int(ids[i]), float(scores[i])) for i in best]
+
+    def search_exact(self, query: np.ndarray, top_k: int = 10) -> List[Tuple[int, float]]:
+        """Brute-force search over every vector, for small corpora and recall checks."""
+        return self.search(query, top_k, n_probe=len(self._offsets) - 1)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the index as .npy files, replacing any index already at path."""
+        self.compact()
+        path = Path(path)
+        staging = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+
+        np.save(staging / "vectors.npy", np.ascontiguousarray(self._vectors))
+        np.save(staging / "ids.npy", self._ids)
+        np.save(staging / "offsets.npy", self._offsets)
+        if self._centroids is not None:
+            np.save(staging / "centroids.npy", self._centroids)
+        (staging / "meta.json").write_text(json.dumps({
+            "version": INDEX_FORMAT_VERSION,
+            "dimension": self.dimension,
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "count": len(self._ids),
+        }))
+
+        previous = path.with_name(f"{path.name}.old-{os.getpid()}")
+        if path.exists():
+            path.rename(previous)
+        staging.rename(path)
+        shutil.rmtree(previous, ignore_errors=True)
+        logger.info(f"Saved vector index with {len(self._ids)} vectors to {path}")
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True) -> "IVFVectorIndex":
+        """Open a saved index; with mmap the stored vectors stay on disk until touched."""
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text())
+        if meta["version"] != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector index format {meta['version']}")
+
+        index = cls(meta["dimension"], n_lists=meta["n_lists"], n_probe=meta["n_probe"])
+        mmap_mode = "r" if mmap else None
+        index._vectors = np.load(path / "vectors.npy", mmap_mode=mmap_mode)
+        index._ids = np.load(path / "ids.npy")
+        index._offsets = np.load(path / "offsets.npy")
+        if (path / "centroids.npy").exists():
+            index._centroids = np.load(path / "centroids.npy")
+        logger.info(f"Loaded vector index with {len(index)} vectors from {path}")
+        return index
+
+    def _probe(self, query: np.ndarray, n_probe: Optional[int]) -> np.ndarray:
+        if self._centroids is None:
+            return np.zeros(1, dtype=np.int64)
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        return np.sort(top_k_indices(self._centroids @ query, n_probe))
+
+    def _assign(self, vectors: np.ndarray, centroids: Optional[np.ndarray] = None) -> np.ndarray:
+        centroids = self._centroids if centroids is None else centroids
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), ASSIGN_CHUNK_ROWS):
+            chunk = vectors[start:start + ASSIGN_CHUNK_ROWS]
+            assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        return assignments
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Conversation Context Retrieval Benchmark
+
+Replays conversations of 500 turns through
+ConversationContextRetriever.find_relevant_context, once re-embedding the
+whole history per query (no conversation id) and once with the
+per-conversation embedding cache, and reports texts encoded and per-query
+latency. The model is simulated with deterministic vectors and a fixed
+per-text encode cost so the comparison does not depend on the hardware.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.embedding_service import ConversationContextRetriever  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+TOPICS = ["hotel", "beach", "museum", "restaurant", "flight", "hiking", "visa", "budget"]
+
+
+class SimulatedEmbeddingService:
+    """Stands in for EmbeddingService: hash-seeded vectors, blocking encode cost."""
+
+    def __init__(self, dimension: int, encode_ms: float):
+        self.dimension = dimension
+        self.encode_ms = encode_ms
+        self.texts_encoded = 0
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.encode_ms * len(texts) / 1000)
+        self.texts_encoded += len(texts)
+        vectors = []
+        for text in texts:
+            seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+            vectors.append(np.random.default_rng(seed).standard_normal(self.dimension).tolist())
+        return vectors
+
+    async def generate_embedding(self, text: str) -> List[float]:
+        return self._encode([text])[0]
+
+    async def generate_batch_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts)
+
+
+def make_turn(n: int, rng: np.random.Generator) -> Dict[str, Any]:
+    topic = TOPICS[rng.integers(len(TOPICS))]
+    return {
+        "id": f"msg-{n}",
+        "content": f"Turn {n}: question about the {topic} options for day {rng.integers(1, 15)}",
+        "is_from_ai": bool(n % 2),
+    }
+
+
+async def replay(retriever: ConversationContextRetriever, turns: int, cached: bool, seed: int) -> List[float]:
+    rng = np.random.default_rng(seed)
+    conversation: List[Dict[str, Any]] = []
+    timings = []
+    for n in range(turns):
+        message = make_turn(n, rng)
+        t0 = time.perf_counter()
+        await retriever.find_relevant_context(
+            message["content"], conversation, max_context_items=5,
+            conversation_id="benchmark" if cached else None
+        )
+        timings.append((time.perf_counter() - t0) * 1000)
+        conversation.append(message)
+    return timings
+
+
+async def run_benchmark(turns: int, dimension: int, encode_ms: float, seed: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {'turns': turns, 'dimension': dimension, 'encode_ms': encode_ms}
+    for label, cached in (('full_history', False), ('cached', True)):
+        service = SimulatedEmbeddingService(dimension, encode_ms)
+        retriever = ConversationContextRetriever(service)
+        timings = await replay(retriever, turns, cached, seed)
+        results[label] = {
+            'texts_encoded': service.texts_encoded,
+            'p50_ms': statistics.median(timings),
+            'last_turn_ms': timings[-1],
+            'total_seconds': sum(timings) / 1000,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--encode-ms", type=float, default=0.2, help="Simulated model cost per text")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.turns, args.dimension, args.encode_ms, args.seed))
+
+    logger.info(
+        f"{results['turns']}-turn conversation, {results['dimension']} dimensions, "
+        f"{results['encode_ms']} ms per encoded text"
+    )
+    for label in ('full_history', 'cached'):
+        stats = results[label]
+        logger.info(
+            f"{label}: {stats['texts_encoded']} texts encoded, p50 {stats['p50_ms']:.2f} ms, "
+            f"last turn {stats['last_turn_ms']:.2f} ms, total {stats['total_seconds']:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
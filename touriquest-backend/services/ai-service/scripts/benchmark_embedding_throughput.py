@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Embedding Inference Throughput Benchmark
+
+Runs concurrent clients, each embedding one sentence per request, against:
+
+- inline: the model called directly inside the coroutine (the previous
+  behaviour, which blocks the event loop for every request)
+- batched: MicroBatchEncoder coalescing concurrent requests into batches
+  encoded in a worker thread
+
+and reports requests per second, p50 / p95 latency and the longest event
+loop stall (inline latency looks low only because waiting clients cannot
+even start their timer while the loop is blocked). With
+sentence-transformers installed the real model is used (--model); otherwise
+--simulate uses a fixed cost per model call plus a cost per text.
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.embedding_batcher import MicroBatchEncoder  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def simulated_model(call_ms: float, text_ms: float, dimension: int = 384) -> Callable[[List[str]], np.ndarray]:
+    def encode(texts: List[str]) -> np.ndarray:
+        time.sleep((call_ms + text_ms * len(texts)) / 1000)
+        return np.zeros((len(texts), dimension), dtype=np.float32)
+    return encode
+
+
+def sentence_transformer_model(name: str) -> Callable[[List[str]], np.ndarray]:
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(name, device="cpu")
+
+    def encode(texts: List[str]) -> np.ndarray:
+        return model.encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False)
+    return encode
+
+
+async def run_clients(embed: Callable, clients: int, requests_per_client: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    stall_ms = 0.0
+    done = asyncio.Event()
+
+    async def watch_loop() -> None:
+        nonlocal stall_ms
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall_ms = max(stall_ms, (time.perf_counter() - t0) * 1000 - 1)
+
+    watcher = asyncio.create_task(watch_loop())
+
+    async def client(client_no: int) -> None:
+        for n in range(requests_per_client):
+            t0 = time.perf_counter()
+            await embed(f"Client {client_no} asks about hotels near the old town, request {n}")
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await watcher
+    latencies.sort()
+    return {
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1],
+        'max_loop_stall_ms': stall_ms,
+    }
+
+
+async def run_benchmark(encode_fn: Callable, clients: int, requests: int, batch_size: int, wait_ms: float) -> Dict[str, Any]:
+    async def inline(text: str) -> np.ndarray:
+        return encode_fn([text])[0]
+
+    encoder = MicroBatchEncoder(encode_fn, max_batch_size=batch_size, max_wait_ms=wait_ms)
+
+    async def batched(text: str) -> np.ndarray:
+        return (await encoder.encode([text]))[0]
+
+    results = {
+        'inline': await run_clients(inline, clients, requests),
+        'batched': await run_clients(batched, clients, requests),
+    }
+    results['batched']['mean_batch_size'] = encoder.texts_encoded / max(encoder.batches, 1)
+    await encoder.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--simulate", action="store_true", help="Use the cost model instead of a real model")
+    parser.add_argument("--call-ms", type=float, default=8.0, help="Simulated fixed cost per model call")
+    parser.add_argument("--text-ms", type=float, default=0.6, help="Simulated cost per text")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    encode_fn = (
+        simulated_model(args.call_ms, args.text_ms) if args.simulate
+        else sentence_transformer_model(args.model)
+    )
+    encode_fn(["warm up"])
+
+    for clients in args.clients:
+        results = asyncio.run(run_benchmark(encode_fn, clients, args.requests, args.batch_size, args.wait_ms))
+        for label, stats in results.items():
+            extra = f", mean batch {stats['mean_batch_size']:.1f}" if 'mean_batch_size' in stats else ""
+            logger.info(
+                f"{clients} clients, {label}: {stats['requests_per_second']:.0f} req/s, "
+                f"p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, "
+                f"loop stall {stats['max_loop_stall_ms']:.0f} ms{extra}"
+            )
+
+
+if __name__ == "__main__":
+    main()
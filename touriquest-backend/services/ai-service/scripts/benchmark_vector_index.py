@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Embedding Vector Index Benchmark
+
+Streams synthetic clustered embeddings (1M x 384 by default) into the IVF
+index, saves it, memory-maps it back as the service does at startup, and
+reports recall@k and per-query latency for several n_probe settings against
+brute-force cosine search over the same vectors.
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.vector_index import IVFVectorIndex, normalize_rows, top_k_indices  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def clustered_batch(rng: np.random.Generator, centers: np.ndarray, count: int, noise: float) -> np.ndarray:
+    labels = rng.integers(0, len(centers), count)
+    return centers[labels] + noise * rng.standard_normal((count, centers.shape[1]), dtype=np.float32)
+
+
+def brute_force(vectors: np.ndarray, ids: np.ndarray, query: np.ndarray, top_k: int) -> List[int]:
+    scores = vectors @ query
+    return ids[top_k_indices(scores, top_k)].tolist()
+
+
+def run_benchmark(
+    vectors: int,
+    dimension: int,
+    n_lists: int,
+    probes: List[int],
+    queries: int,
+    top_k: int,
+    noise: float,
+    seed: int,
+    path: str,
+) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n_lists * 2, 64), dimension), dtype=np.float32)
+    results: Dict[str, Any] = {'vectors': vectors, 'dimension': dimension, 'n_lists': n_lists}
+
+    index = IVFVectorIndex(dimension, n_lists=n_lists)
+    t0 = time.perf_counter()
+    for start in range(0, vectors, 100_000):
+        count = min(100_000, vectors - start)
+        index.add(clustered_batch(rng, centers, count, noise), np.arange(start, start + count))
+    index.save(path)
+    results['build_seconds'] = time.perf_counter() - t0
+    del index
+
+    t0 = time.perf_counter()
+    index = IVFVectorIndex.load(path, mmap=True)
+    results['load_ms'] = (time.perf_counter() - t0) * 1000
+
+    query_vectors = normalize_rows(clustered_batch(rng, centers, queries, noise))
+    stored, stored_ids = np.asarray(index._vectors), index._ids
+
+    timings: List[float] = []
+    truth = []
+    for query in query_vectors:
+        t0 = time.perf_counter()
+        truth.append(set(brute_force(stored, stored_ids, query, top_k)))
+        timings.append((time.perf_counter() - t0) * 1000)
+    results['brute_force'] = {'p50_ms': statistics.median(timings), 'recall': 1.0}
+
+    for n_probe in probes:
+        timings, recall = [], []
+        for query, expected in zip(query_vectors, truth):
+            t0 = time.perf_counter()
+            found = index.search(query, top_k, n_probe=n_probe)
+            timings.append((time.perf_counter() - t0) * 1000)
+            recall.append(len(expected & {item_id for item_id, _ in found}) / top_k)
+        results[f'ivf_probe_{n_probe}'] = {
+            'p50_ms': statistics.median(timings),
+            'recall': float(np.mean(recall)),
+        }
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--lists", type=int, default=1024)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=2.0, help="Within-cluster spread relative to cluster separation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--index-path", default=None, help="Index directory (defaults to a temporary one)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.index_path or str(Path(tmp) / "index")
+        results = run_benchmark(
+            args.vectors, args.dimension, args.lists, args.probes,
+            args.queries, args.top_k, args.noise, args.seed, path
+        )
+
+    logger.info(
+        f"{results['vectors']} x {results['dimension']} vectors, {results['n_lists']} lists; "
+        f"built and saved in {results['build_seconds']:.1f}s, memory-mapped in {results['load_ms']:.1f} ms"
+    )
+    for label, stats in results.items():
+        if isinstance(stats, dict):
+            logger.info(f"{label}: p50 {stats['p50_ms']:.2f} ms, recall@{args.top_k} {stats['recall']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
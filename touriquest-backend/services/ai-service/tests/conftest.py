@@ -0,0 +1,21 @@
+"""
+Test configuration and shared helpers for AI service tests
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+SERVICE_ROOT = Path(__file__).resolve().parent.parent
+
+
+def app_modules_loaded_by(module: str) -> list:
+    """app.* modules a fresh interpreter loads when importing module"""
+    script = (
+        f"import sys, {module}; "
+        "print(' '.join(name for name in sys.modules if name.startswith('app.')))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=SERVICE_ROOT, capture_output=True, text=True, check=True
+    )
+    return result.stdout.split()
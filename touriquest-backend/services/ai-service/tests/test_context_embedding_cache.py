@@ -0,0 +1,107 @@
+"""
+Test Suite for the Conversation Embedding Cache
+
+Checks that only new turns are embedded, that cached rows line up with the
+history they were requested for, and LRU / TTL eviction.
+"""
+
+import hashlib
+
+import numpy as np
+
+from app.services.context_embedding_cache import ConversationEmbeddingStore, turn_key
+from conftest import app_modules_loaded_by
+
+DIMENSION = 32
+
+
+class CountingEmbedder:
+    """Deterministic stand-in for the sentence-transformer model"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [self.vector(text) for text in texts]
+
+    @staticmethod
+    def vector(text):
+        seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(DIMENSION)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def history(count, start=0):
+    return [{"id": f"m{n}", "content": f"message number {n} about travel"} for n in range(start, start + count)]
+
+
+def turns(messages):
+    return [(turn_key(msg), msg["content"]) for msg in messages]
+
+
+class TestConversationEmbeddingStore:
+    """Test cases for incremental per-conversation embeddings"""
+
+    async def test_only_new_turns_are_embedded(self):
+        store = ConversationEmbeddingStore(DIMENSION)
+        embed = CountingEmbedder()
+
+        messages = history(50)
+        first = await store.embeddings_for("c1", turns(messages), embed)
+        messages += history(1, start=50)
+        second = await store.embeddings_for("c1", turns(messages), embed)
+
+        assert [len(call) for call in embed.calls] == [50, 1]
+        assert store.turns_embedded == 51
+        assert second.dtype == np.float32 and second.shape == (51, DIMENSION)
+        np.testing.assert_allclose(second[:50], first)
+        np.testing.assert_allclose(np.linalg.norm(second, axis=1), 1.0, rtol=1e-5)
+
+    async def test_rows_follow_a_shifted_history_window(self):
+        store = ConversationEmbeddingStore(DIMENSION)
+        embed = CountingEmbedder()
+        await store.embeddings_for("c1", turns(history(50)), embed)
+
+        window = history(50, start=10)
+        matrix = await store.embeddings_for("c1", turns(window), embed)
+
+        assert [len(call) for call in embed.calls] == [50, 10]
+        expected = np.array([CountingEmbedder.vector(msg["content"]) for msg in window])
+        expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+        np.testing.assert_allclose(matrix, expected, rtol=1e-5, atol=1e-6)
+
+    async def test_least_recently_used_conversation_is_evicted(self):
+        store = ConversationEmbeddingStore(DIMENSION, max_conversations=2)
+        embed = CountingEmbedder()
+
+        await store.embeddings_for("c1", turns(history(3)), embed)
+        await store.embeddings_for("c2", turns(history(3)), embed)
+        await store.embeddings_for("c1", turns(history(3)), embed)
+        await store.embeddings_for("c3", turns(history(3)), embed)
+
+        assert "c1" in store and "c3" in store and "c2" not in store
+
+    async def test_idle_conversations_expire(self):
+        clock = FakeClock()
+        store = ConversationEmbeddingStore(DIMENSION, ttl_seconds=60, clock=clock)
+        embed = CountingEmbedder()
+
+        await store.embeddings_for("c1", turns(history(3)), embed)
+        clock.now = 30
+        await store.embeddings_for("c2", turns(history(3)), embed)
+        clock.now = 75
+        await store.embeddings_for("c2", turns(history(4)), embed)
+
+        assert "c1" not in store and "c2" in store
+        assert len(store) == 1
+
+    def test_module_imports_without_the_service_configuration(self):
+        assert "app.core.config" not in app_modules_loaded_by("app.services.context_embedding_cache")
@@ -0,0 +1,121 @@
+"""
+Test Suite for Micro-Batched Embedding Inference
+
+Checks that concurrent requests are coalesced into few model calls that run
+off the event loop, that every caller gets its own rows back, and the
+binary Redis embedding cache on fakeredis.
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+from fakeredis import aioredis as fake_aioredis
+
+from app.services.embedding_batcher import MicroBatchEncoder, RedisEmbeddingCache
+from conftest import app_modules_loaded_by
+
+
+class SlowModel:
+    """Blocking encode with a fixed cost per call, like a real model"""
+
+    def __init__(self, call_seconds=0.02):
+        self.call_seconds = call_seconds
+        self.batch_sizes = []
+
+    def __call__(self, texts):
+        time.sleep(self.call_seconds)
+        self.batch_sizes.append(len(texts))
+        return self.vectors(texts)
+
+    @staticmethod
+    def vectors(texts):
+        return np.array([[len(text), hash(text) % 997] for text in texts], dtype=np.float32)
+
+
+class TestMicroBatchEncoder:
+    """Test cases for coalescing concurrent encode requests"""
+
+    async def test_concurrent_requests_share_batches(self):
+        model = SlowModel()
+        encoder = MicroBatchEncoder(model, max_batch_size=64, max_wait_ms=5)
+
+        texts = [f"question {n}" for n in range(200)]
+        results = await asyncio.gather(*(encoder.encode([text]) for text in texts))
+
+        for text, result in zip(texts, results):
+            np.testing.assert_array_equal(result, SlowModel.vectors([text]))
+        assert sum(model.batch_sizes) == 200
+        assert encoder.batches <= 8
+        await encoder.close()
+
+    async def test_event_loop_keeps_running_during_inference(self):
+        encoder = MicroBatchEncoder(SlowModel(call_seconds=0.2), max_wait_ms=1)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await encoder.encode(["a long sentence"])
+        task.cancel()
+
+        assert ticks >= 10
+        await encoder.close()
+
+    async def test_duplicate_texts_are_encoded_once(self):
+        model = SlowModel()
+        encoder = MicroBatchEncoder(model)
+
+        first, second = await asyncio.gather(
+            encoder.encode(["same", "other"]), encoder.encode(["same"])
+        )
+
+        assert model.batch_sizes == [2]
+        np.testing.assert_array_equal(first[0], second[0])
+        await encoder.close()
+
+    async def test_model_errors_reach_every_caller(self):
+        def broken(texts):
+            raise RuntimeError("model unavailable")
+
+        encoder = MicroBatchEncoder(broken)
+        results = await asyncio.gather(
+            encoder.encode(["a"]), encoder.encode(["b"]), return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        # The encoder keeps serving after a failed batch
+        encoder.encode_fn = SlowModel(call_seconds=0)
+        assert (await encoder.encode(["c"])).shape == (1, 2)
+        await encoder.close()
+
+
+class TestRedisEmbeddingCache:
+    """Test cases for binary vectors in Redis"""
+
+    @pytest.fixture
+    async def redis_client(self):
+        client = fake_aioredis.FakeRedis()
+        yield client
+        await client.aclose()
+
+    async def test_round_trip_as_float32_bytes(self, redis_client):
+        cache = RedisEmbeddingCache(redis_client, ttl_seconds=60)
+        vectors = np.random.default_rng(1).standard_normal((3, 384)).astype(np.float32)
+
+        await cache.set_many([(f"k{n}", vector) for n, vector in enumerate(vectors)])
+        cached = await cache.get_many(["k0", "missing", "k2"])
+
+        np.testing.assert_array_equal(cached[0], vectors[0])
+        assert cached[1] is None
+        np.testing.assert_array_equal(cached[2], vectors[2])
+        assert len(await redis_client.get(cache.prefix + "k1")) == 384 * 4
+        assert 0 < await redis_client.ttl(cache.prefix + "k1") <= 60
+
+    def test_module_imports_without_the_service_configuration(self):
+        assert "app.core.config" not in app_modules_loaded_by("app.services.embedding_batcher")
@@ -0,0 +1,96 @@
+"""
+Test Suite for the Embedding Vector Index
+
+Checks the IVF index against brute-force cosine search on clustered
+synthetic embeddings, incremental inserts, and the save / memory-mapped
+load round trip.
+"""
+
+import numpy as np
+import pytest
+
+from app.services.vector_index import IVFVectorIndex, normalize_rows
+from conftest import app_modules_loaded_by
+
+DIMENSION = 64
+
+
+def clustered_vectors(rng, count, centers):
+    labels = rng.integers(0, len(centers), count)
+    noise = rng.standard_normal((count, DIMENSION)).astype(np.float32)
+    return centers[labels] + 0.6 * noise
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(7)
+    centers = rng.standard_normal((300, DIMENSION)).astype(np.float32)
+    return rng, centers, clustered_vectors(rng, 30_000, centers)
+
+
+def brute_force_top_k(vectors, query, top_k):
+    scores = normalize_rows(vectors) @ normalize_rows(query)[0]
+    return set(np.argsort(-scores)[:top_k].tolist())
+
+
+class TestVectorIndex:
+    """Test cases for approximate nearest-neighbour search"""
+
+    def test_small_index_is_exact_until_trained(self, corpus):
+        rng, centers, vectors = corpus
+        index = IVFVectorIndex(DIMENSION, n_lists=64, n_probe=4)
+        index.add(vectors[:500], np.arange(500))
+
+        assert not index.is_trained
+        query = vectors[3]
+        assert {i for i, _ in index.search(query, 10)} == brute_force_top_k(vectors[:500], query, 10)
+
+    def test_recall_against_brute_force(self, corpus):
+        rng, centers, vectors = corpus
+        index = IVFVectorIndex(DIMENSION, n_lists=64, n_probe=8)
+        for start in range(0, len(vectors), 3000):
+            index.add(vectors[start:start + 3000], np.arange(start, start + 3000))
+
+        assert index.is_trained and len(index) == len(vectors)
+
+        queries = clustered_vectors(rng, 100, centers)
+        recall = np.mean([
+            len({i for i, _ in index.search(query, 10)} & brute_force_top_k(vectors, query, 10)) / 10
+            for query in queries
+        ])
+        assert recall >= 0.9
+
+    def test_incremental_inserts_are_searchable_immediately(self, corpus):
+        rng, centers, vectors = corpus
+        index = IVFVectorIndex(DIMENSION, n_lists=64, n_probe=8)
+        index.add(vectors, np.arange(len(vectors)))
+
+        fresh = clustered_vectors(rng, 20, centers)
+        index.add(fresh, np.arange(10**6, 10**6 + 20))
+        assert index.pending_count == 20
+
+        for offset, vector in enumerate(fresh):
+            best_id, similarity = index.search(vector, 1)[0]
+            assert best_id == 10**6 + offset
+            assert similarity == pytest.approx(1.0, abs=1e-5)
+
+    def test_save_and_memory_mapped_load_round_trip(self, corpus, tmp_path):
+        rng, centers, vectors = corpus
+        index = IVFVectorIndex(DIMENSION, n_lists=64, n_probe=8)
+        index.add(vectors, np.arange(len(vectors)))
+        index.save(tmp_path / "index")
+
+        loaded = IVFVectorIndex.load(tmp_path / "index", mmap=True)
+        assert isinstance(loaded._vectors, np.memmap)
+        assert len(loaded) == len(index)
+
+        for query in clustered_vectors(rng, 20, centers):
+            assert loaded.search(query, 5) == index.search(query, 5)
+
+        # A loaded index keeps taking inserts and can be saved over itself
+        loaded.add(vectors[:5] * 2, np.arange(-5, 0))
+        loaded.save(tmp_path / "index")
+        assert len(IVFVectorIndex.load(tmp_path / "index")) == len(vectors) + 5
+
+    def test_module_imports_without_the_service_configuration(self):
+        assert "app.core.config" not in app_modules_loaded_by("app.services.vector_index")
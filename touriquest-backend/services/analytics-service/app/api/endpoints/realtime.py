@@ -14,10 +14,11 @@ from sqlalchemy import select, func, and_, desc, case, extract, text
 import logging
 import json
 import asyncio
-import redis
 from decimal import Decimal
 import uuid
 
+from app.core.broadcast import BroadcastEngine, RedisFanIn, subscribed_to
+from app.core.config import settings
 from app.core.database import get_analytics_db, get_warehouse_db
 from app.services.analytics_service import AnalyticsService
 from app.models.analytics_models import DataGranularity
@@ -29,63 +30,70 @@ router = APIRouter(prefix="/analytics", tags=["realtime-analytics"])
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.connection_info: Dict[WebSocket, Dict[str, Any]] = {}
+        self.engine = BroadcastEngine(
+            queue_size=settings.realtime_queue_size,
+            slow_consumer_timeout=settings.realtime_slow_consumer_timeout,
+            on_drop=self._close_dropped
+        )
+        self.fan_in = RedisFanIn(self.engine, settings.redis_url, settings.realtime_channel)
+        self._closing: Set[asyncio.Task] = set()
+    
+    @property
+    def active_connections(self):
+        return self.engine.subscribers.keys()
+    
+    @property
+    def connection_info(self) -> Dict[WebSocket, Dict[str, Any]]:
+        return {connection: subscriber.info for connection, subscriber in self.engine.subscribers.items()}
+    
+    async def start(self):
+        """Start relaying messages published by other replicas"""
+        await self.fan_in.start()
+    
+    async def stop(self):
+        await self.fan_in.stop()
+        await self.engine.close()
     
     async def connect(self, websocket: WebSocket, client_info: Dict[str, Any]):
         await websocket.accept()
-        self.active_connections.append(websocket)
-        self.connection_info[websocket] = client_info
+        self.engine.add(websocket, client_info)
         logger.info(f"WebSocket connected: {client_info}")
     
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            self.connection_info.pop(websocket, None)
+        if self.engine.remove(websocket):
             logger.info("WebSocket disconnected")
     
+    def _close_dropped(self, websocket: WebSocket, reason: str):
+        # 1013: try again later
+        task = asyncio.create_task(websocket.close(code=1013, reason=reason))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
     async def send_personal_message(self, message: Dict[str, Any], websocket: WebSocket):
-        try:
-            await websocket.send_text(json.dumps(message))
-        except Exception as e:
-            logger.error(f"Failed to send message to WebSocket: {e}")
-            self.disconnect(websocket)
+        self.engine.send(websocket, message)
     
-    async def broadcast(self, message: Dict[str, Any], filter_func=None):
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                # Apply filter if provided
-                if filter_func and not filter_func(self.connection_info.get(connection, {})):
-                    continue
-                    
-                await connection.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Failed to broadcast to WebSocket: {e}")
-                disconnected.append(connection)
-        
-        # Clean up disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
+    async def broadcast(self, message: Dict[str, Any], filter_func=None) -> int:
+        """Serialize once and queue for every matching connection; never waits on a send"""
+        return self.engine.publish(message, filter_func)
+    
+    async def broadcast_all_replicas(self, message: Dict[str, Any], subscriptions: Optional[List[str]] = None) -> int:
+        """Broadcast through Redis so every replica delivers the message; local only if Redis is down
+
+        Returns the replica count, or the local recipient count when delivered locally.
+        """
+        return await self.fan_in.broadcast(message, subscriptions)
     
     def get_connection_count(self) -> int:
-        return len(self.active_connections)
+        return len(self.engine.subscribers)
     
     def get_connections_by_type(self, connection_type: str) -> List[WebSocket]:
         return [
-            conn for conn, info in self.connection_info.items()
-            if info.get('type') == connection_type
+            conn for conn, subscriber in self.engine.subscribers.items()
+            if subscriber.info.get('type') == connection_type
         ]
 
 manager = ConnectionManager()
 
-# Redis client for real-time data caching (optional)
-try:
-    redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-except:
-    redis_client = None
-    logger.warning("Redis not available, using in-memory caching")
-
 
 @router.websocket("/realtime/events")
 async def websocket_endpoint(
@@ -141,7 +149,6 @@ async def websocket_endpoint(
                 elif message.get("type") == "update_subscriptions":
                     new_subscriptions = message.get("subscriptions", [])
                     client_info["subscriptions"] = new_subscriptions
-                    manager.connection_info[websocket] = client_info
                     
                     await manager.send_personal_message({
                         "type": "subscription_updated",
@@ -288,7 +295,7 @@ async def get_active_users(
         await manager.broadcast({
             "type": "active_users_update",
             "data": response_data["data"]
-        }, lambda info: "active_users" in info.get("subscriptions", []) or "all" in info.get("subscriptions", []))
+        }, subscribed_to(["active_users"]))
         
         return response_data
     
@@ -463,7 +470,7 @@ async def get_live_bookings(
         await manager.broadcast({
             "type": "live_bookings_update",
             "data": response_data["data"]
-        }, lambda info: "bookings" in info.get("subscriptions", []) or "all" in info.get("subscriptions", []))
+        }, subscribed_to(["bookings"]))
         
         return response_data
     
@@ -612,7 +619,7 @@ async def get_system_events(
                     "events": critical_events,
                     "overall_health": overall_health
                 }
-            }, lambda info: "errors" in info.get("subscriptions", []) or "all" in info.get("subscriptions", []))
+            }, subscribed_to(["errors"]))
         
         return response_data
     
@@ -647,16 +654,9 @@ async def broadcast_message(
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        # Determine filter function
-        filter_func = None
-        if target_subscriptions:
-            target_list = target_subscriptions.split(',')
-            filter_func = lambda info: any(
-                sub in info.get("subscriptions", []) for sub in target_list
-            ) or "all" in info.get("subscriptions", [])
-        
-        # Broadcast message
-        await manager.broadcast(broadcast_msg, filter_func)
+        # Broadcast message to the connections of every replica
+        target_list = target_subscriptions.split(',') if target_subscriptions else None
+        await manager.broadcast_all_replicas(broadcast_msg, target_list)
         
         return {
             "success": True,
@@ -693,7 +693,7 @@ async def get_connection_info() -> Dict[str, Any]:
                 "connection_type": info.get("type"),
                 "subscriptions": info.get("subscriptions", []),
                 "connected_at": info.get("connected_at"),
-                "connection_active": connection in manager.active_connections
+                "connection_active": True
             })
         
         # Group by subscription types
@@ -708,6 +708,7 @@ async def get_connection_info() -> Dict[str, Any]:
             "success": True,
             "data": {
                 "total_connections": manager.get_connection_count(),
+                "broadcast_stats": manager.engine.get_stats(),
                 "active_connections": connections_info,
                 "subscription_statistics": subscription_stats,
                 "connection_types": {
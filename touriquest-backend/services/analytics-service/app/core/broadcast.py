@@ -0,0 +1,293 @@
+"""
+WebSocket Broadcast Engine
+
+Fans real-time analytics messages out to many WebSocket connections. Each
+message is serialized once, then appended to a bounded queue per connection
+and written by that connection's own sender task, so sends run concurrently
+and one slow client never delays the others.
+
+When a connection's queue is full, a message of the same type already queued
+is replaced by the newer one (coalescing state updates); otherwise, or when a
+send has been stuck for longer than the slow-consumer timeout, the connection
+is dropped. Messages published on a Redis channel are relayed to the local
+connections through the async Redis client, so every replica delivers them.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+InfoFilter = Callable[[Dict[str, Any]], bool]
+
+
+def subscribed_to(subscriptions: Iterable[str]) -> InfoFilter:
+    """Filter matching connections subscribed to any of the given types or to "all" """
+    wanted = set(subscriptions) | {"all"}
+    return lambda info: not wanted.isdisjoint(info.get("subscriptions", ()))
+
+
+class Subscriber:
+    """One connection with its bounded send queue and sender task"""
+
+    __slots__ = (
+        "connection", "info", "queue", "wakeup", "task",
+        "sending_since", "sent", "coalesced", "closed"
+    )
+
+    def __init__(self, connection: Any, info: Dict[str, Any]):
+        self.connection = connection
+        self.info = info
+        self.queue: Deque[Tuple[Optional[str], str]] = deque()
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.sending_since: Optional[float] = None
+        self.sent = 0
+        self.coalesced = 0
+        self.closed = False
+
+
+class BroadcastEngine:
+    """Serializes each message once and sends it to every matching connection concurrently"""
+
+    def __init__(
+        self,
+        queue_size: int = 64,
+        slow_consumer_timeout: float = 10.0,
+        on_drop: Optional[Callable[[Any, str], None]] = None
+    ):
+        self.queue_size = queue_size
+        self.slow_consumer_timeout = slow_consumer_timeout
+        self.on_drop = on_drop
+        self.subscribers: Dict[Any, Subscriber] = {}
+
+        self.published = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def add(self, connection: Any, info: Dict[str, Any]) -> Subscriber:
+        """Register an accepted connection and start its sender task"""
+        subscriber = Subscriber(connection, info)
+        subscriber.task = asyncio.create_task(self._sender(subscriber))
+        self.subscribers[connection] = subscriber
+        return subscriber
+
+    def remove(self, connection: Any) -> bool:
+        """Unregister a connection and stop its sender task"""
+        subscriber = self.subscribers.pop(connection, None)
+        if subscriber is None:
+            return False
+        subscriber.closed = True
+        subscriber.queue.clear()
+        if subscriber.task is not None and subscriber.task is not asyncio.current_task():
+            subscriber.task.cancel()
+        return True
+
+    async def close(self) -> None:
+        """Stop every sender task"""
+        tasks = [subscriber.task for subscriber in self.subscribers.values() if subscriber.task]
+        for connection in list(self.subscribers):
+            self.remove(connection)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def publish(self, message: Dict[str, Any], filter_func: Optional[InfoFilter] = None) -> int:
+        """Queue a message for every connection accepted by filter_func; returns the recipient count"""
+        return self.publish_text(json.dumps(message, default=str), message.get("type"), filter_func)
+
+    def publish_text(self, text: str, key: Optional[str] = None, filter_func: Optional[InfoFilter] = None) -> int:
+        """
+        Queue an already serialized message.
+
+        Queued messages with the same key may be coalesced for slow consumers;
+        a key of None is never coalesced.
+        """
+        self.published += 1
+        recipients = 0
+        slow = []
+        for subscriber in self.subscribers.values():
+            if filter_func is not None and not filter_func(subscriber.info):
+                continue
+            if self._offer(subscriber, key, text):
+                recipients += 1
+            else:
+                slow.append(subscriber)
+
+        for subscriber in slow:
+            self._drop(subscriber, "slow consumer")
+        return recipients
+
+    def send(self, connection: Any, message: Dict[str, Any]) -> bool:
+        """Queue a message for one connection, in order with its broadcasts"""
+        subscriber = self.subscribers.get(connection)
+        if subscriber is None:
+            return False
+        if self._offer(subscriber, None, json.dumps(message, default=str)):
+            return True
+        self._drop(subscriber, "slow consumer")
+        return False
+
+    def _offer(self, subscriber: Subscriber, key: Optional[str], text: str) -> bool:
+        queue = subscriber.queue
+        if len(queue) < self.queue_size:
+            queue.append((key, text))
+            subscriber.wakeup.set()
+            return True
+
+        stuck_since = subscriber.sending_since
+        if stuck_since is not None and time.monotonic() - stuck_since > self.slow_consumer_timeout:
+            return False
+        if key is not None:
+            for position, (queued_key, _) in enumerate(queue):
+                if queued_key == key:
+                    queue[position] = (key, text)
+                    subscriber.coalesced += 1
+                    self.coalesced += 1
+                    return True
+        return False
+
+    def _drop(self, subscriber: Subscriber, reason: str) -> None:
+        if not self.remove(subscriber.connection):
+            return
+        self.dropped += 1
+        logger.warning(f"Dropping WebSocket connection ({reason}): {subscriber.info.get('client_id')}")
+        if self.on_drop is not None:
+            self.on_drop(subscriber.connection, reason)
+
+    async def _sender(self, subscriber: Subscriber) -> None:
+        queue = subscriber.queue
+        send_text = subscriber.connection.send_text
+        try:
+            while not subscriber.closed:
+                if not queue:
+                    subscriber.wakeup.clear()
+                    await subscriber.wakeup.wait()
+                    continue
+                _, text = queue.popleft()
+                subscriber.sending_since = time.monotonic()
+                await send_text(text)
+                subscriber.sending_since = None
+                subscriber.sent += 1
+                self.delivered += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to send to WebSocket: {e}")
+            self._drop(subscriber, "send failed")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Broadcast counters and current queue depth"""
+        queued = [len(subscriber.queue) for subscriber in self.subscribers.values()]
+        return {
+            "connections": len(self.subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "queued": sum(queued),
+            "max_queue_depth": max(queued, default=0),
+            "queue_size": self.queue_size
+        }
+
+
+class RedisFanIn:
+    """
+    Relays messages published on a Redis channel to the local broadcast engine.
+
+    A published message is a JSON header line (type and target subscriptions)
+    followed by the serialized payload, so relaying it never re-serializes
+    the payload.
+    """
+
+    def __init__(
+        self,
+        engine: BroadcastEngine,
+        url: str,
+        channel: str,
+        max_reconnect_delay: float = 30.0
+    ):
+        self.engine = engine
+        self.channel = channel
+        self.max_reconnect_delay = max_reconnect_delay
+        self.client = redis.from_url(url, decode_responses=True)
+        self.relayed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        """Start relaying in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop relaying and close the Redis connection"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.client.aclose()
+
+    async def publish(self, message: Dict[str, Any], subscriptions: Optional[Iterable[str]] = None) -> int:
+        """Publish a message to every replica; returns the number of Redis subscribers"""
+        header = json.dumps({
+            "type": message.get("type"),
+            "subscriptions": list(subscriptions) if subscriptions is not None else None
+        })
+        return await self.client.publish(self.channel, f"{header}\n{json.dumps(message, default=str)}")
+
+    async def broadcast(self, message: Dict[str, Any], subscriptions: Optional[Iterable[str]] = None) -> int:
+        """
+        Deliver a message on every replica through Redis.
+
+        Falls back to the local connections when relaying is not running or
+        the publish fails. Returns the number of replicas the message was
+        published to, or the number of local recipients when it was
+        delivered locally; recipients on other replicas are not known here.
+        """
+        if self.running:
+            try:
+                return await self.publish(message, subscriptions)
+            except Exception as e:
+                logger.warning(f"Redis publish failed, broadcasting locally: {e}")
+        return self.engine.publish(message, subscribed_to(subscriptions) if subscriptions is not None else None)
+
+    def relay(self, data: str) -> int:
+        """Broadcast one published message to the local connections"""
+        header, _, payload = data.partition("\n")
+        header = json.loads(header)
+        subscriptions = header.get("subscriptions")
+        filter_func = subscribed_to(subscriptions) if subscriptions is not None else None
+        self.relayed += 1
+        return self.engine.publish_text(payload, header.get("type"), filter_func)
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                delay = 1.0
+                async for item in pubsub.listen():
+                    if item.get("type") != "message":
+                        continue
+                    try:
+                        self.relay(item["data"])
+                    except (ValueError, AttributeError, TypeError) as e:
+                        logger.error(f"Ignoring malformed realtime message: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Realtime Redis fan-in unavailable, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+            finally:
+                await pubsub.aclose()
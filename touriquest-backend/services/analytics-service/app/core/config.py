@@ -67,6 +67,9 @@ class Settings(BaseSettings):
         default=["localhost:9092"], env="KAFKA_BOOTSTRAP_SERVERS"
     )
     kafka_topic_prefix: str = Field(default="touriquest_analytics", env="KAFKA_TOPIC_PREFIX")
+    realtime_channel: str = Field(default="analytics:realtime", env="REALTIME_CHANNEL")
+    realtime_queue_size: int = Field(default=64, env="REALTIME_QUEUE_SIZE")  # messages per WebSocket
+    realtime_slow_consumer_timeout: float = Field(default=10.0, env="REALTIME_SLOW_CONSUMER_TIMEOUT")  # seconds
     
     # Export Configuration
     export_max_rows: int = Field(default=100000, env="EXPORT_MAX_ROWS")
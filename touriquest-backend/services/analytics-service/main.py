@@ -38,10 +38,14 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database connections initialized")
     
+    # Relay real-time messages published by other replicas
+    await realtime.manager.start()
+    
     yield
     
     # Cleanup
     logger.info("Shutting down Analytics Service...")
+    await realtime.manager.stop()
     await close_db()
     logger.info("Database connections closed")
 
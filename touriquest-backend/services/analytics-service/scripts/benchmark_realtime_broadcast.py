@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Real-time Broadcast Benchmarking Script
+
+Broadcasts analytics updates to simulated WebSocket connections (10k by
+default), a share of which are slow clients, and compares:
+
+- sequential: the previous ConnectionManager.broadcast, which serialized the
+  message for every connection and awaited each send in turn
+- engine: BroadcastEngine, which serializes once and queues the message for
+  per-connection sender tasks
+
+For each it reports the time until every fast client has the message, and
+the CPU time spent per message.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.broadcast import BroadcastEngine, subscribed_to  # noqa: E402
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class SimulatedWebSocket:
+    """Connection whose send yields to the loop once, or waits `delay` seconds for slow clients"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = 0
+        self.bytes = 0
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        self.bytes += len(text)
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+def make_message(rng: random.Random, n: int) -> Dict[str, Any]:
+    """An active users update shaped like the one sent by the realtime endpoints"""
+    return {
+        "type": "active_users_update",
+        "data": {
+            "current_metrics": {
+                "active_users": rng.randint(1000, 5000),
+                "active_sessions": rng.randint(1000, 6000),
+                "user_trend": "increasing",
+                "trend_percentage": round(rng.uniform(-10, 10), 2)
+            },
+            "device_breakdown": [
+                {"device_type": device, "active_users": rng.randint(100, 2000)}
+                for device in ("desktop", "mobile", "tablet")
+            ],
+            "geographic_distribution": [
+                {"country": f"Country {i}", "city": f"City {i}", "active_users": rng.randint(10, 500)}
+                for i in range(20)
+            ],
+            "popular_pages": [
+                {"page_path": f"/properties/{i}", "unique_visitors": rng.randint(10, 900)}
+                for i in range(10)
+            ],
+            "sequence": n
+        }
+    }
+
+
+def make_connections(args, rng: random.Random) -> List[SimulatedWebSocket]:
+    slow = set(rng.sample(range(args.connections), int(args.connections * args.slow_fraction)))
+    return [SimulatedWebSocket(args.slow_delay if n in slow else 0.0) for n in range(args.connections)]
+
+
+def client_info(rng: random.Random) -> Dict[str, Any]:
+    return {"subscriptions": rng.choice([["all"], ["active_users"], ["active_users", "bookings"], ["bookings"]])}
+
+
+async def wait_for_fast_clients(sockets: List[Tuple[SimulatedWebSocket, bool]], expected: int):
+    fast = [socket for socket, subscribed in sockets if socket.delay == 0.0 and subscribed]
+    while any(socket.received < expected for socket in fast):
+        await asyncio.sleep(0.001)
+
+
+async def benchmark_sequential(args, messages) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    connections = make_connections(args, rng)
+    info = {socket: client_info(rng) for socket in connections}
+
+    def filter_func(client):
+        return "active_users" in client.get("subscriptions", []) or "all" in client.get("subscriptions", [])
+
+    latencies = []
+    cpu_started = time.process_time()
+    for message in messages:
+        started = time.perf_counter()
+        for connection in connections:
+            if not filter_func(info[connection]):
+                continue
+            await connection.send_text(json.dumps(message))
+        latencies.append(time.perf_counter() - started)
+    cpu = time.process_time() - cpu_started
+    return {"latency": latencies, "cpu_per_message": cpu / len(messages)}
+
+
+async def benchmark_engine(args, messages) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    connections = make_connections(args, rng)
+    engine = BroadcastEngine(queue_size=args.queue_size)
+    subscribed = []
+    for connection in connections:
+        info = client_info(rng)
+        engine.add(connection, info)
+        subscribed.append((connection, "active_users" in info["subscriptions"] or "all" in info["subscriptions"]))
+    await asyncio.sleep(0)
+
+    filter_func = subscribed_to(["active_users"])
+    latencies = []
+    publish_times = []
+    cpu_started = time.process_time()
+    for expected, message in enumerate(messages, start=1):
+        started = time.perf_counter()
+        engine.publish(message, filter_func)
+        publish_times.append(time.perf_counter() - started)
+        await wait_for_fast_clients(subscribed, expected)
+        latencies.append(time.perf_counter() - started)
+    cpu = time.process_time() - cpu_started
+
+    stats = engine.get_stats()
+    await engine.close()
+    return {
+        "latency": latencies,
+        "publish": publish_times,
+        "cpu_per_message": cpu / len(messages),
+        "stats": stats
+    }
+
+
+def summarize(name: str, results: Dict[str, Any]):
+    latencies = sorted(results["latency"])
+    logger.info(
+        f"{name:>10}: fast clients served in {latencies[len(latencies) // 2] * 1000:.1f} ms median, "
+        f"{latencies[-1] * 1000:.1f} ms max; {results['cpu_per_message'] * 1000:.1f} ms CPU per message"
+    )
+
+
+async def main():
+    """Main benchmark function"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--slow-fraction", type=float, default=0.01, help="Share of slow clients")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="Seconds per send for slow clients")
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    messages = [make_message(rng, n) for n in range(args.messages)]
+    logger.info(
+        f"Broadcasting {args.messages} messages of {len(json.dumps(messages[0]))} bytes to "
+        f"{args.connections} connections ({args.slow_fraction:.0%} slow at {args.slow_delay * 1000:.0f} ms/send)"
+    )
+
+    summarize("sequential", await benchmark_sequential(args, messages))
+
+    engine = await benchmark_engine(args, messages)
+    summarize("engine", engine)
+    publish = sorted(engine["publish"])
+    logger.info(f"    engine: publish call {publish[len(publish) // 2] * 1000:.2f} ms median")
+    logger.info(f"    engine: {engine['stats']}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main())
+    sys.exit(exit_code)
@@ -0,0 +1,298 @@
+"""
+Test Suite for the Real-time Broadcast Engine
+
+Tests WebSocket fan-out against fake connections: single serialization per
+message, concurrent sends, subscription filtering, coalescing and dropping of
+slow consumers, failed sends, and relaying of messages published via Redis.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.core.broadcast import BroadcastEngine, RedisFanIn, subscribed_to
+
+
+class FakeWebSocket:
+    """WebSocket stand-in recording sent frames; can block or fail on send"""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.blocked = asyncio.Event()
+        self.blocked.set()
+        self.sent = []
+
+    async def send_text(self, text: str):
+        await self.blocked.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionResetError("client went away")
+        self.sent.append(text)
+
+
+async def drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+async def make_engine():
+    """BroadcastEngine factory; the engines and their sender tasks are closed after the test"""
+    engines = []
+
+    def make(**kwargs):
+        engine = BroadcastEngine(**kwargs)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        await engine.close()
+
+
+class TestBroadcastEngine:
+    """Test cases for fan-out to WebSocket connections"""
+
+    async def test_message_is_serialized_once_for_all_connections(self):
+        engine = BroadcastEngine()
+        sockets = [FakeWebSocket() for _ in range(50)]
+        for n, socket in enumerate(sockets):
+            engine.add(socket, {"client_id": n, "subscriptions": ["all"]})
+
+        with patch("app.core.broadcast.json.dumps", wraps=json.dumps) as dumps:
+            recipients = engine.publish({"type": "active_users_update", "data": {"active_users": 12}})
+        await drain()
+
+        assert dumps.call_count == 1
+        assert recipients == 50
+        assert all(json.loads(socket.sent[0])["data"]["active_users"] == 12 for socket in sockets)
+        await engine.close()
+
+    async def test_sends_run_concurrently(self):
+        engine = BroadcastEngine()
+        sockets = [FakeWebSocket(delay=0.05) for _ in range(100)]
+        for socket in sockets:
+            engine.add(socket, {"subscriptions": ["all"]})
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        engine.publish({"type": "tick"})
+        while engine.delivered < len(sockets):
+            await asyncio.sleep(0.01)
+
+        # Sequential sends would take 5 seconds
+        assert loop.time() - started < 1.0
+        await engine.close()
+
+    async def test_filter_selects_subscribed_connections(self):
+        engine = BroadcastEngine()
+        bookings, errors, everything = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        engine.add(bookings, {"subscriptions": ["bookings"]})
+        engine.add(errors, {"subscriptions": ["errors", "performance"]})
+        engine.add(everything, {"subscriptions": ["all"]})
+
+        recipients = engine.publish({"type": "live_bookings_update"}, subscribed_to(["bookings"]))
+        await drain()
+
+        assert recipients == 2
+        assert len(bookings.sent) == 1 and len(everything.sent) == 1
+        assert errors.sent == []
+        await engine.close()
+
+    async def test_slow_consumer_is_coalesced_then_dropped(self, make_engine):
+        dropped = []
+        engine = make_engine(queue_size=2, on_drop=lambda connection, reason: dropped.append(reason))
+        fast, slow = FakeWebSocket(), FakeWebSocket()
+        slow.blocked.clear()
+        engine.add(fast, {"subscriptions": ["all"]})
+        engine.add(slow, {"subscriptions": ["all"]})
+
+        # The slow sender holds the first message; two more fill its queue
+        engine.publish({"type": "active_users_update", "n": 0})
+        await drain()
+        engine.publish({"type": "live_bookings_update"})
+        await drain()
+        engine.publish({"type": "active_users_update", "n": 1})
+        await drain()
+
+        # Queue full: same-type updates replace the queued one
+        for n in range(2, 10):
+            engine.publish({"type": "active_users_update", "n": n})
+            await drain()
+
+        assert len(fast.sent) == 11
+        assert engine.coalesced == 8 and dropped == []
+        assert json.loads(engine.subscribers[slow].queue[-1][1])["n"] == 9
+
+        # A message type with nothing to replace drops the connection
+        engine.publish({"type": "critical_system_events"})
+        await drain()
+
+        assert dropped == ["slow consumer"]
+        assert slow not in engine.subscribers and fast in engine.subscribers
+        assert len(fast.sent) == 12
+
+    async def test_stuck_send_drops_the_connection(self, make_engine):
+        engine = make_engine(queue_size=1, slow_consumer_timeout=0.05)
+        stuck = FakeWebSocket()
+        stuck.blocked.clear()
+        engine.add(stuck, {"subscriptions": ["all"]})
+
+        engine.publish({"type": "active_users_update"})
+        await drain()
+        engine.publish({"type": "active_users_update"})
+        engine.publish({"type": "active_users_update"})
+        assert engine.coalesced == 1
+
+        await asyncio.sleep(0.06)
+        engine.publish({"type": "active_users_update"})
+
+        assert engine.dropped == 1
+        assert not engine.subscribers
+
+    async def test_failed_send_removes_only_that_connection(self):
+        engine = BroadcastEngine()
+        healthy, broken = FakeWebSocket(), FakeWebSocket(fail=True)
+        engine.add(healthy, {"subscriptions": ["all"]})
+        engine.add(broken, {"subscriptions": ["all"]})
+
+        engine.publish({"type": "tick"})
+        await drain()
+        engine.publish({"type": "tick"})
+        await drain()
+
+        assert list(engine.subscribers) == [healthy]
+        assert len(healthy.sent) == 2
+        assert engine.get_stats()["dropped"] == 1
+        await engine.close()
+
+    async def test_personal_messages_keep_their_order(self):
+        engine = BroadcastEngine()
+        socket = FakeWebSocket()
+        engine.add(socket, {"subscriptions": ["all"]})
+
+        engine.send(socket, {"type": "connection_status"})
+        engine.publish({"type": "tick"})
+        engine.send(socket, {"type": "heartbeat_response"})
+        await drain()
+
+        assert [json.loads(text)["type"] for text in socket.sent] == [
+            "connection_status", "tick", "heartbeat_response"
+        ]
+        assert engine.send(FakeWebSocket(), {"type": "tick"}) is False
+        await engine.close()
+
+
+class TestRedisFanIn:
+    """Test cases for relaying messages published by other replicas"""
+
+    async def test_relay_delivers_the_published_payload(self):
+        engine = BroadcastEngine()
+        bookings, errors = FakeWebSocket(), FakeWebSocket()
+        engine.add(bookings, {"subscriptions": ["bookings"]})
+        engine.add(errors, {"subscriptions": ["errors"]})
+        fan_in = RedisFanIn(engine, "redis://localhost:6379/7", "analytics:realtime")
+
+        published = []
+
+        async def publish(channel, data):
+            published.append((channel, data))
+            return 1
+
+        with patch.object(fan_in.client, "publish", publish):
+            await fan_in.publish({"type": "announcement", "data": {"text": "hi"}}, ["errors"])
+
+        channel, data = published[0]
+        assert channel == "analytics:realtime"
+        assert fan_in.relay(data) == 1
+        await drain()
+
+        assert bookings.sent == []
+        assert json.loads(errors.sent[0]) == {"type": "announcement", "data": {"text": "hi"}}
+        await engine.close()
+        await fan_in.client.aclose()
+
+    async def test_broadcast_returns_the_replica_count_when_published(self):
+        engine = BroadcastEngine()
+        engine.add(FakeWebSocket(), {"subscriptions": ["bookings"]})
+        engine.add(FakeWebSocket(), {"subscriptions": ["errors"]})
+        fan_in = RedisFanIn(engine, "redis://localhost:6379/7", "analytics:realtime")
+
+        async def publish(channel, data):
+            return 3
+
+        with patch.object(fan_in.client, "publish", publish), \
+                patch.object(RedisFanIn, "running", True):
+            assert await fan_in.broadcast({"type": "announcement"}, ["errors"]) == 3
+        await engine.close()
+        await fan_in.client.aclose()
+
+    async def test_malformed_messages_do_not_stop_relaying(self):
+        engine = BroadcastEngine()
+        socket = FakeWebSocket()
+        engine.add(socket, {"subscriptions": ["all"]})
+        fan_in = RedisFanIn(engine, "redis://localhost:6379/7", "analytics:realtime")
+        messages = ["not json\n{}", "[1, 2]\n{}", '{"type": "tick"}\n{"type": "tick"}']
+
+        class FakePubSub:
+            async def subscribe(self, channel):
+                pass
+
+            async def listen(self):
+                for data in messages:
+                    yield {"type": "message", "data": data}
+                await asyncio.Event().wait()
+
+            async def aclose(self):
+                pass
+
+        with patch.object(fan_in.client, "pubsub", lambda **kwargs: FakePubSub()):
+            await fan_in.start()
+            await drain()
+            await drain()
+            await fan_in.stop()
+
+        assert [json.loads(text) for text in socket.sent] == [{"type": "tick"}]
+        await engine.close()
+
+    async def test_broadcast_is_local_when_relaying_is_not_running(self):
+        engine = BroadcastEngine()
+        socket = FakeWebSocket()
+        engine.add(socket, {"subscriptions": ["errors"]})
+        fan_in = RedisFanIn(engine, "redis://localhost:6379/7", "analytics:realtime")
+
+        async def publish(channel, data):
+            raise AssertionError("published while not running")
+
+        with patch.object(fan_in.client, "publish", publish):
+            recipients = await fan_in.broadcast({"type": "announcement"}, ["errors"])
+        await drain()
+
+        assert recipients == 1
+        assert json.loads(socket.sent[0]) == {"type": "announcement"}
+        await engine.close()
+        await fan_in.client.aclose()
+
+    async def test_broadcast_is_local_when_publish_fails(self):
+        engine = BroadcastEngine()
+        errors, bookings = FakeWebSocket(), FakeWebSocket()
+        engine.add(errors, {"subscriptions": ["errors"]})
+        engine.add(bookings, {"subscriptions": ["bookings"]})
+        fan_in = RedisFanIn(engine, "redis://localhost:6379/7", "analytics:realtime")
+
+        async def publish(channel, data):
+            raise ConnectionError("redis is down")
+
+        with patch.object(fan_in.client, "publish", publish), \
+                patch.object(RedisFanIn, "running", True):
+            recipients = await fan_in.broadcast({"type": "announcement"}, ["errors"])
+        await drain()
+
+        assert recipients == 1
+        assert len(errors.sent) == 1 and bookings.sent == []
+        await engine.close()
+        await fan_in.client.aclose()
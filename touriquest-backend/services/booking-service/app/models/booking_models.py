@@ -6,7 +6,7 @@ from typing import Optional, Dict, List, Any
 from decimal import Decimal
 from enum import Enum
 import sqlalchemy as sa
-from sqlalchemy import Column, String, DateTime, Boolean, Integer, Text, JSON, Numeric, Date, ForeignKey, Index
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, Text, JSON, Numeric, Date, ForeignKey, Index, Sequence
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -14,10 +14,24 @@ from sqlalchemy.ext.hybrid import hybrid_property
 
 Base = declarative_base()
 
+# Booking numbers are allocated from blocks of this sequence (see
+# app.services.booking_number_allocator)
+BOOKING_NUMBER_BLOCK_SIZE = 1000
+booking_number_block_seq = Sequence(
+    'booking_number_block_seq',
+    start=0,
+    minvalue=0,
+    increment=BOOKING_NUMBER_BLOCK_SIZE,
+    metadata=Base.metadata
+)
+
 
 class BookingStatus(str, Enum):
     PENDING = "pending"
     CONFIRMED = "confirmed"
+    DECLINED = "declined"
+    CHECKED_IN = "checked_in"
+    CHECKED_OUT = "checked_out"
     CANCELLED = "cancelled"
     COMPLETED = "completed"
     NO_SHOW = "no_show"
@@ -32,6 +46,8 @@ class BookingType(str, Enum):
 class PaymentStatus(str, Enum):
     PENDING = "pending"
     AUTHORIZED = "authorized"
+    REQUIRES_ACTION = "requires_action"
+    SUCCEEDED = "succeeded"
     CAPTURED = "captured"
     FAILED = "failed"
     REFUNDED = "refunded"
@@ -64,6 +80,15 @@ class AvailabilityLockStatus(str, Enum):
     ACTIVE = "active"
     EXPIRED = "expired"
     RELEASED = "released"
+    FAILED = "failed"
+    CONFLICT = "conflict"
+
+
+class WebhookEventStatus(str, Enum):
+    RECEIVED = "received"
+    PROCESSING = "processing"
+    PROCESSED = "processed"
+    FAILED = "failed"
 
 
 class Booking(Base):
@@ -125,6 +150,9 @@ class Booking(Base):
     confirmed_at = Column(DateTime)
     cancelled_at = Column(DateTime)
     completed_at = Column(DateTime)
+    declined_at = Column(DateTime)
+    decline_reason = Column(Text)
+    checkin_reminder_sent_at = Column(DateTime)
     
     # Additional metadata
     booking_source = Column(String(50), default="web")  # web, mobile, api
@@ -142,9 +170,25 @@ class Booking(Base):
     # Indexes
     __table_args__ = (
         Index('idx_booking_dates', 'property_id', 'check_in_date', 'check_out_date'),
-        Index('idx_booking_guest_status', 'guest_id', 'status'),
-        Index('idx_booking_host_status', 'host_id', 'status'),
+        # Covering indexes for host/guest dashboards: keyset-paginate on
+        # (created_at, id) and filter status without touching the heap
+        Index(
+            'idx_booking_guest_created', 'guest_id', 'created_at', 'id',
+            postgresql_include=['status', 'property_id', 'check_in_date', 'check_out_date', 'total_amount']
+        ),
+        Index(
+            'idx_booking_host_created', 'host_id', 'created_at', 'id',
+            postgresql_include=['status', 'property_id', 'check_in_date', 'check_out_date', 'total_amount']
+        ),
+        Index(
+            'idx_booking_host_checkin', 'host_id', 'check_in_date', 'id',
+            postgresql_include=['status', 'total_amount']
+        ),
         Index('idx_booking_created', 'created_at'),
+        # Lifecycle batch job scans
+        Index('idx_booking_status_deadline', 'status', 'host_response_deadline'),
+        Index('idx_booking_status_checkin', 'status', 'check_in_date'),
+        Index('idx_booking_status_checkout', 'status', 'check_out_date'),
     )
 
     @hybrid_property
@@ -212,11 +256,20 @@ class BookingPayment(Base):
     retry_count = Column(Integer, default=0)
     last_retry_at = Column(DateTime)
     
+    # Host payout
+    payout_processed = Column(Boolean, default=False, nullable=False)
+    payout_date = Column(DateTime)
+    
+    # Creation time (Stripe epoch seconds) of the newest webhook event applied,
+    # so late or redelivered events cannot roll the status back
+    stripe_event_created = Column(Integer)
+    
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     authorized_at = Column(DateTime)
     captured_at = Column(DateTime)
+    processed_at = Column(DateTime)
     
     # Relationships
     booking = relationship("Booking", back_populates="payments")
@@ -227,6 +280,7 @@ class BookingPayment(Base):
         Index('idx_payment_booking_status', 'booking_id', 'status'),
         Index('idx_payment_stripe_intent', 'stripe_payment_intent_id'),
         Index('idx_payment_created', 'created_at'),
+        Index('idx_payment_payout_pending', 'status', 'payout_processed'),
     )
 
     def __repr__(self):
@@ -571,6 +625,69 @@ class GroupBooking(Base):
         return f"<GroupBooking {self.group_name} - {self.status}>"
 
 
+class BookingDailySummary(Base):
+    """Per-property daily booking aggregates, maintained incrementally"""
+    __tablename__ = "booking_daily_summaries"
+
+    property_id = Column(UUID(as_uuid=True), primary_key=True)
+    summary_date = Column(Date, primary_key=True)
+    host_id = Column(UUID(as_uuid=True), nullable=False)
+    
+    # Bookings created on summary_date
+    bookings_created = Column(Integer, nullable=False, default=0)
+    confirmed_bookings = Column(Integer, nullable=False, default=0)
+    cancelled_bookings = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+    lead_time_days_total = Column(Integer, nullable=False, default=0)
+    lead_time_samples = Column(Integer, nullable=False, default=0)
+    
+    # 1 if the night of summary_date is occupied
+    nights_occupied = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_booking_summary_host_date', 'host_id', 'summary_date'),
+    )
+
+    def __repr__(self):
+        return f"<BookingDailySummary {self.property_id} {self.summary_date}>"
+
+
+class StripeWebhookEventRecord(Base):
+    """Durable inbox of Stripe webhook deliveries, deduplicated by event id"""
+    __tablename__ = "stripe_webhook_events"
+
+    event_id = Column(String(255), primary_key=True)
+    event_type = Column(String(100), nullable=False)
+    
+    # Events sharing an ordering key (the payment intent) are applied in
+    # creation order; the partition pins each key to a single worker
+    ordering_key = Column(String(255), nullable=False)
+    partition = Column(Integer, nullable=False)
+    stripe_created = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=False)
+    
+    # Processing state
+    status = Column(sa.Enum(WebhookEventStatus), nullable=False, default=WebhookEventStatus.RECEIVED)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String(500))
+    
+    # Timestamps
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claimed_at = Column(DateTime)
+    next_attempt_at = Column(DateTime)  # retry backoff after a failed attempt
+    processed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('idx_webhook_event_claim', 'status', 'partition', 'stripe_created'),
+        Index('idx_webhook_event_key', 'ordering_key', 'stripe_created'),
+    )
+
+    def __repr__(self):
+        return f"<StripeWebhookEventRecord {self.event_id} - {self.event_type} - {self.status}>"
+
+
 class BookingCalendarSync(Base):
     """Calendar synchronization tracking"""
     __tablename__ = "booking_calendar_sync"
@@ -593,11 +710,34 @@ class BookingCalendarSync(Base):
     next_sync_at = Column(DateTime)
     sync_status = Column(String(50), default="active")  # active, paused, error
     sync_error_message = Column(Text)
+    last_sync_result = Column(JSON)
+    last_error = Column(Text)
+    consecutive_failures = Column(Integer, default=0)
+    
+    # Feed validators from the last successful fetch (conditional requests)
+    feed_etag = Column(String(255))
+    feed_last_modified = Column(String(64))
+    feed_content_hash = Column(String(64))
+    
+    # Imported blocks and rules (child rows of a calendar sync)
+    calendar_sync_id = Column(UUID(as_uuid=True), ForeignKey("booking_calendar_sync.id"), index=True)
+    external_booking_id = Column(String(255))
+    external_check_in = Column(Date)
+    external_check_out = Column(Date)  # exclusive
+    external_guest_name = Column(String(255))
+    is_blocking = Column(Boolean, default=True)
+    notes = Column(JSON)  # pricing / minimum stay rule payload
     
     # Timestamps
+    created_by = Column(UUID(as_uuid=True))
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Indexes
+    __table_args__ = (
+        Index('idx_calendar_sync_property_range', 'property_id', 'calendar_type', 'external_check_in', 'external_check_out'),
+    )
+
     def __repr__(self):
         return f"<BookingCalendarSync {self.calendar_type} for {self.property_id}>"
 
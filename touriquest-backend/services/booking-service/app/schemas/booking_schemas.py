@@ -224,6 +224,7 @@ class BookingListResponse(BookingBaseModel):
     per_page: int
     has_next: bool
     has_previous: bool
+    next_cursor: Optional[str] = None
 
 
 # Booking Status Update Schema
@@ -516,6 +517,7 @@ class BookingSearchRequest(BookingBaseModel):
     sort_order: str = Field("desc", regex=r'^(asc|desc)$', description="Sort order")
     page: conint(ge=1) = Field(1, description="Page number")
     per_page: conint(ge=1, le=100) = Field(20, description="Items per page")
+    cursor: Optional[str] = Field(None, description="Keyset cursor from a previous page (overrides page)")
 
 
 # Webhook Schemas
@@ -0,0 +1,283 @@
+"""Consolidated availability evaluation
+
+Everything that can make a stay unavailable (occupying bookings, blocking
+calendar entries, active checkout locks and minimum-stay restrictions) is
+fetched with a single CTE query, and unavailable nights are derived by
+merging the returned intervals rather than expanding each row day by day.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import JSON, DateTime, String, and_, cast, literal, null, select, union_all
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking_models import (
+    AvailabilityLock, AvailabilityLockStatus, Booking, BookingCalendarSync, BookingStatus
+)
+
+logger = logging.getLogger(__name__)
+
+
+OCCUPYING_STATUSES = (
+    BookingStatus.CONFIRMED,
+    BookingStatus.CHECKED_IN,
+    BookingStatus.CHECKED_OUT,
+)
+
+Interval = Tuple[date, date]  # half-open [start, end)
+
+
+@dataclass
+class ConflictRow:
+    """One booking, block, lock or restriction overlapping the stay"""
+    kind: str  # booking, block, lock, minimum_stay
+    ref_id: UUID
+    label: Optional[str]
+    start_date: date
+    end_date: date
+    owner_id: Optional[UUID] = None
+    expires_at: Optional[datetime] = None
+    notes: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class AvailabilityConflicts:
+    """Rows overlapping a stay, grouped by kind"""
+    bookings: List[ConflictRow] = field(default_factory=list)
+    blocks: List[ConflictRow] = field(default_factory=list)
+    locks: List[ConflictRow] = field(default_factory=list)
+    stay_rules: List[ConflictRow] = field(default_factory=list)
+
+    def foreign_lock(self, user_id: UUID) -> Optional[ConflictRow]:
+        """First active lock on the stay held by someone else"""
+        return next((lock for lock in self.locks if lock.owner_id != user_id), None)
+
+    def own_lock(self, user_id: UUID) -> Optional[ConflictRow]:
+        return next((lock for lock in self.locks if lock.owner_id == user_id), None)
+
+
+@dataclass
+class AvailabilityDecision:
+    """Outcome of evaluating a stay against conflicts and property rules"""
+    dates_available: bool
+    capacity_ok: bool
+    stay_requirements_met: bool
+    minimum_stay_nights: int
+    maximum_stay_nights: Optional[int]
+    unavailable_dates: List[date]
+    restrictions: List[str]
+
+    @property
+    def is_available(self) -> bool:
+        return self.dates_available and self.capacity_ok and self.stay_requirements_met
+
+
+def merge_intervals(intervals: List[Interval], start: date, end: date) -> List[Interval]:
+    """Clip half-open intervals to [start, end) and merge overlapping ones"""
+    clipped = sorted(
+        (max(s, start), min(e, end)) for s, e in intervals if s < end and e > start
+    )
+
+    merged: List[Interval] = []
+    for s, e in clipped:
+        if merged and s <= merged[-1][1]:
+            if e > merged[-1][1]:
+                merged[-1] = (merged[-1][0], e)
+        else:
+            merged.append((s, e))
+
+    return merged
+
+
+def interval_dates(intervals: List[Interval]) -> List[date]:
+    """Nights covered by already-merged intervals"""
+    return [
+        s + timedelta(days=offset)
+        for s, e in intervals
+        for offset in range((e - s).days)
+    ]
+
+
+def build_conflict_query(
+    property_id: UUID,
+    check_in_date: date,
+    check_out_date: date,
+    exclude_booking_id: Optional[UUID] = None,
+    now: Optional[datetime] = None
+):
+    """
+    CTE selecting every row that overlaps [check_in_date, check_out_date)
+
+    Each branch is an index range scan on (property_id, start, end).
+    """
+    now = now or datetime.utcnow()
+    no_owner = cast(null(), PG_UUID(as_uuid=True))
+    no_expiry = cast(null(), DateTime)
+    no_notes = cast(null(), JSON)
+
+    bookings = select(
+        literal('booking', String).label('kind'),
+        Booking.id.label('ref_id'),
+        Booking.booking_number.label('label'),
+        Booking.check_in_date.label('start_date'),
+        Booking.check_out_date.label('end_date'),
+        no_owner.label('owner_id'),
+        no_expiry.label('expires_at'),
+        no_notes.label('notes')
+    ).where(
+        and_(
+            Booking.property_id == property_id,
+            Booking.status.in_(OCCUPYING_STATUSES),
+            Booking.check_in_date < check_out_date,
+            Booking.check_out_date > check_in_date
+        )
+    )
+    if exclude_booking_id:
+        bookings = bookings.where(Booking.id != exclude_booking_id)
+
+    blocks = select(
+        literal('block', String),
+        BookingCalendarSync.id,
+        BookingCalendarSync.external_guest_name,
+        BookingCalendarSync.external_check_in,
+        BookingCalendarSync.external_check_out,
+        no_owner,
+        no_expiry,
+        no_notes
+    ).where(
+        and_(
+            BookingCalendarSync.property_id == property_id,
+            BookingCalendarSync.is_blocking == True,
+            BookingCalendarSync.sync_status == 'active',
+            BookingCalendarSync.external_check_in < check_out_date,
+            BookingCalendarSync.external_check_out > check_in_date
+        )
+    )
+
+    locks = select(
+        literal('lock', String),
+        AvailabilityLock.id,
+        AvailabilityLock.session_id,
+        AvailabilityLock.check_in_date,
+        AvailabilityLock.check_out_date,
+        AvailabilityLock.user_id,
+        AvailabilityLock.expires_at,
+        no_notes
+    ).where(
+        and_(
+            AvailabilityLock.property_id == property_id,
+            AvailabilityLock.status == AvailabilityLockStatus.ACTIVE,
+            AvailabilityLock.expires_at > now,
+            AvailabilityLock.check_in_date < check_out_date,
+            AvailabilityLock.check_out_date > check_in_date
+        )
+    )
+
+    restrictions = select(
+        literal('minimum_stay', String),
+        BookingCalendarSync.id,
+        BookingCalendarSync.external_guest_name,
+        BookingCalendarSync.external_check_in,
+        BookingCalendarSync.external_check_out,
+        no_owner,
+        no_expiry,
+        BookingCalendarSync.notes
+    ).where(
+        and_(
+            BookingCalendarSync.property_id == property_id,
+            BookingCalendarSync.calendar_type == 'minimum_stay_rule',
+            BookingCalendarSync.sync_status == 'active',
+            BookingCalendarSync.external_check_in < check_out_date,
+            BookingCalendarSync.external_check_out > check_in_date
+        )
+    )
+
+    conflicts = union_all(bookings, blocks, locks, restrictions).cte('availability_conflicts')
+    return select(conflicts).order_by(conflicts.c.start_date)
+
+
+class AvailabilityEvaluator:
+    """Loads stay conflicts in one round trip and evaluates them"""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db = db_session
+
+    async def load_conflicts(
+        self,
+        property_id: UUID,
+        check_in_date: date,
+        check_out_date: date,
+        exclude_booking_id: Optional[UUID] = None
+    ) -> AvailabilityConflicts:
+        """Fetch bookings, blocks, locks and restrictions for the stay"""
+        stmt = build_conflict_query(
+            property_id, check_in_date, check_out_date, exclude_booking_id
+        )
+        result = await self.db.execute(stmt)
+
+        conflicts = AvailabilityConflicts()
+        groups = {
+            'booking': conflicts.bookings,
+            'block': conflicts.blocks,
+            'lock': conflicts.locks,
+            'minimum_stay': conflicts.stay_rules,
+        }
+        for row in result:
+            groups[row.kind].append(ConflictRow(**row._mapping))
+
+        return conflicts
+
+    @staticmethod
+    def evaluate(
+        conflicts: AvailabilityConflicts,
+        property_details: Dict[str, Any],
+        check_in_date: date,
+        check_out_date: date,
+        number_of_guests: int
+    ) -> AvailabilityDecision:
+        """Decide availability from preloaded conflicts and property rules"""
+        nights = (check_out_date - check_in_date).days
+
+        occupied = merge_intervals(
+            [(row.start_date, row.end_date) for row in conflicts.bookings + conflicts.blocks],
+            check_in_date,
+            check_out_date
+        )
+
+        min_nights = property_details.get('minimum_stay_nights', 1)
+        max_nights = property_details.get('maximum_stay_nights')
+        restrictions: List[str] = []
+
+        rule_min_nights = max(
+            (rule.notes.get('minimum_stay', 0) for rule in conflicts.stay_rules if rule.notes),
+            default=0
+        )
+        if rule_min_nights > min_nights:
+            min_nights = rule_min_nights
+            restrictions.append(f"Minimum stay is {min_nights} nights for the selected dates")
+
+        # Check advance booking requirements
+        advance_days = property_details.get('advance_booking_days', 0)
+        if (check_in_date - date.today()).days < advance_days:
+            restrictions.append(f"Requires {advance_days} days advance booking")
+
+        # Check same-day booking cutoff
+        if check_in_date == date.today():
+            cutoff_hour = property_details.get('same_day_cutoff_hour', 15)
+            if datetime.now().hour >= cutoff_hour:
+                restrictions.append(f"Same-day bookings close at {cutoff_hour}:00")
+
+        return AvailabilityDecision(
+            dates_available=not occupied,
+            capacity_ok=number_of_guests <= property_details.get('max_guests', 1),
+            stay_requirements_met=nights >= min_nights and not (max_nights and nights > max_nights),
+            minimum_stay_nights=min_nights,
+            maximum_stay_nights=max_nights,
+            unavailable_dates=interval_dates(occupied),
+            restrictions=restrictions
+        )
@@ -0,0 +1,311 @@
+"""Redis-backed availability locks for the checkout hold
+
+Each property keeps its active holds in two Redis structures that share a
+hash tag (so they live in one cluster slot):
+
+- ``{prefix}:{<property>}:intervals``: sorted set of lock ids scored by
+  expiry time in milliseconds
+- ``{prefix}:{<property>}:ranges``: hash of lock id to
+  ``check_in|check_out|user_id|session_id`` (dates as ordinals)
+
+plus one ``SET NX PX`` key per lock carrying its native TTL. Acquire is a
+single Lua script call that drops expired members, checks the requested
+stay against the remaining intervals and either grants, extends (same
+user) or refuses the hold atomically. Expiry needs no background task:
+expired members are purged lazily by score and every key carries a TTL.
+
+The database copy of the locks is brought in line periodically by
+``reconcile_availability_locks`` in bulk statements.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking_models import AvailabilityLock, AvailabilityLockStatus
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_KEY_PREFIX = "booking:lock"
+
+ACQUIRE_SCRIPT = """
+local intervals, ranges = KEYS[1], KEYS[2]
+local now, ttl = tonumber(ARGV[1]), tonumber(ARGV[2])
+local check_in, check_out = tonumber(ARGV[3]), tonumber(ARGV[4])
+local user_id, new_id, lock_prefix, session_id = ARGV[5], ARGV[6], ARGV[7], ARGV[8]
+
+local expired = redis.call('ZRANGEBYSCORE', intervals, '-inf', now)
+if #expired > 0 then
+    redis.call('ZREMRANGEBYSCORE', intervals, '-inf', now)
+    -- In slices, unpack of a long list would overflow the Lua stack
+    for i = 1, #expired, 500 do
+        redis.call('HDEL', ranges, unpack(expired, i, math.min(i + 499, #expired)))
+    end
+end
+
+local own_id = nil
+local held = redis.call('HGETALL', ranges)
+for i = 1, #held, 2 do
+    local lock_in, lock_out, owner = string.match(held[i + 1], '^(%d+)|(%d+)|([^|]*)')
+    if tonumber(lock_in) < check_out and tonumber(lock_out) > check_in then
+        if owner ~= user_id then
+            return {'conflict', held[i], redis.call('ZSCORE', intervals, held[i])}
+        end
+        own_id = held[i]
+    end
+end
+
+local expires_at = now + ttl
+local lock_id = own_id or new_id
+redis.call('ZADD', intervals, expires_at, lock_id)
+
+if own_id then
+    redis.call('SET', lock_prefix .. lock_id, user_id, 'PX', ttl)
+else
+    redis.call('HSET', ranges, lock_id, ARGV[3] .. '|' .. ARGV[4] .. '|' .. user_id .. '|' .. session_id)
+    redis.call('SET', lock_prefix .. lock_id, user_id, 'NX', 'PX', ttl)
+end
+
+local latest = tonumber(redis.call('ZRANGE', intervals, -1, -1, 'WITHSCORES')[2])
+redis.call('PEXPIREAT', intervals, latest)
+redis.call('PEXPIREAT', ranges, latest)
+
+return {own_id and 'extended' or 'acquired', lock_id, tostring(expires_at)}
+"""
+
+RELEASE_SCRIPT = """
+local intervals, ranges, lock_key = KEYS[1], KEYS[2], KEYS[3]
+local held = redis.call('HGET', ranges, ARGV[1])
+if not held then
+    return 0
+end
+local _, _, owner = string.match(held, '^(%d+)|(%d+)|([^|]*)')
+if owner ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', intervals, ARGV[1])
+redis.call('HDEL', ranges, ARGV[1])
+redis.call('DEL', lock_key)
+return 1
+"""
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+@dataclass
+class LockGrant:
+    """Outcome of an acquire attempt"""
+    lock_id: UUID
+    status: AvailabilityLockStatus  # ACTIVE or CONFLICT
+    expires_at: datetime
+    extended: bool = False
+
+    @property
+    def acquired(self) -> bool:
+        return self.status == AvailabilityLockStatus.ACTIVE
+
+
+@dataclass
+class HeldLock:
+    """Active hold as stored in Redis"""
+    lock_id: UUID
+    property_id: UUID
+    user_id: UUID
+    check_in_date: date
+    check_out_date: date
+    expires_at: datetime
+    session_id: Optional[str] = None
+
+
+class AvailabilityLockManager:
+    """Checkout holds kept in Redis with native expiry"""
+
+    def __init__(self, redis_client: Any, key_prefix: str = DEFAULT_KEY_PREFIX, clock=_now_ms):
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self.clock = clock
+        self._acquire = redis_client.register_script(ACQUIRE_SCRIPT)
+        self._release = redis_client.register_script(RELEASE_SCRIPT)
+
+    def _property_keys(self, property_id: UUID) -> List[str]:
+        tag = f"{self.key_prefix}:{{{property_id}}}"
+        return [f"{tag}:intervals", f"{tag}:ranges"]
+
+    def _lock_key_prefix(self, property_id: UUID) -> str:
+        return f"{self.key_prefix}:{{{property_id}}}:held:"
+
+    async def acquire(
+        self,
+        property_id: UUID,
+        check_in_date: date,
+        check_out_date: date,
+        user_id: UUID,
+        ttl_seconds: int,
+        session_id: Optional[str] = None
+    ) -> LockGrant:
+        """Grant, extend or refuse a hold on [check_in_date, check_out_date) in one round trip"""
+        status, lock_id, expires_ms = await self._acquire(
+            keys=self._property_keys(property_id),
+            args=[
+                self.clock(),
+                ttl_seconds * 1000,
+                check_in_date.toordinal(),
+                check_out_date.toordinal(),
+                str(user_id),
+                str(uuid4()),
+                self._lock_key_prefix(property_id),
+                session_id or "",
+            ]
+        )
+
+        status = _text(status)
+        return LockGrant(
+            lock_id=UUID(_text(lock_id)),
+            status=AvailabilityLockStatus.CONFLICT if status == "conflict" else AvailabilityLockStatus.ACTIVE,
+            expires_at=datetime.utcfromtimestamp(int(float(_text(expires_ms))) / 1000),
+            extended=status == "extended"
+        )
+
+    async def release(self, property_id: UUID, lock_id: UUID, user_id: UUID) -> bool:
+        """Release a hold owned by user_id"""
+        keys = self._property_keys(property_id)
+        keys.append(self._lock_key_prefix(property_id) + str(lock_id))
+        return bool(await self._release(keys=keys, args=[str(lock_id), str(user_id)]))
+
+    async def held_locks(self, property_ids: Optional[List[UUID]] = None) -> List[HeldLock]:
+        """
+        Active holds for the given properties (all properties if omitted),
+        read with one pipelined round trip per batch of properties
+        """
+        if property_ids is None:
+            property_ids = []
+            async for key in self.redis.scan_iter(match=f"{self.key_prefix}:{{*}}:ranges", count=1000):
+                tag = _text(key)
+                property_ids.append(UUID(tag[tag.index("{") + 1:tag.index("}")]))
+
+        now = self.clock()
+        held: List[HeldLock] = []
+
+        for start in range(0, len(property_ids), 500):
+            batch = property_ids[start:start + 500]
+            pipe = self.redis.pipeline(transaction=False)
+            for property_id in batch:
+                intervals, ranges = self._property_keys(property_id)
+                pipe.zrangebyscore(intervals, now + 1, "+inf", withscores=True)
+                pipe.hgetall(ranges)
+            replies = await pipe.execute()
+
+            for index, property_id in enumerate(batch):
+                expiries, ranges = replies[2 * index], replies[2 * index + 1]
+                ranges = {_text(k): _text(v) for k, v in ranges.items()}
+                for lock_id, expires_ms in expiries:
+                    lock_id = _text(lock_id)
+                    if lock_id not in ranges:
+                        continue
+                    check_in, check_out, user_id, session_id = ranges[lock_id].split("|", 3)
+                    held.append(HeldLock(
+                        lock_id=UUID(lock_id),
+                        property_id=property_id,
+                        user_id=UUID(user_id),
+                        check_in_date=date.fromordinal(int(check_in)),
+                        check_out_date=date.fromordinal(int(check_out)),
+                        expires_at=datetime.utcfromtimestamp(expires_ms / 1000),
+                        session_id=session_id or None
+                    ))
+
+        return held
+
+
+async def reconcile_availability_locks(
+    db_session: AsyncSession,
+    lock_manager: AvailabilityLockManager
+) -> Dict[str, int]:
+    """
+    Bring the availability_locks table in line with Redis
+
+    Holds present in Redis are inserted or have their expiry refreshed in
+    bulk, and every other ACTIVE row is expired by id in chunked UPDATEs.
+    """
+    try:
+        held = await lock_manager.held_locks()
+        held_ids = [lock.lock_id for lock in held]
+
+        existing_ids = set()
+        for start in range(0, len(held_ids), 1000):
+            result = await db_session.execute(
+                select(AvailabilityLock.id).where(AvailabilityLock.id.in_(held_ids[start:start + 1000]))
+            )
+            existing_ids.update(result.scalars().all())
+
+        new_rows = [
+            {
+                'id': lock.lock_id,
+                'property_id': lock.property_id,
+                'user_id': lock.user_id,
+                'check_in_date': lock.check_in_date,
+                'check_out_date': lock.check_out_date,
+                'session_id': lock.session_id,
+                'status': AvailabilityLockStatus.ACTIVE,
+                'expires_at': lock.expires_at,
+            }
+            for lock in held if lock.lock_id not in existing_ids
+        ]
+        refreshed_rows = [
+            {'id': lock.lock_id, 'expires_at': lock.expires_at, 'status': AvailabilityLockStatus.ACTIVE}
+            for lock in held if lock.lock_id in existing_ids
+        ]
+
+        if new_rows:
+            db_session.add_all([AvailabilityLock(**row) for row in new_rows])
+            await db_session.flush()
+        if refreshed_rows:
+            await db_session.execute(update(AvailabilityLock), refreshed_rows)
+
+        # The set difference is taken here so no statement binds every held id
+        result = await db_session.execute(
+            select(AvailabilityLock.id).where(AvailabilityLock.status == AvailabilityLockStatus.ACTIVE)
+        )
+        held_id_set = set(held_ids)
+        stale_ids = [lock_id for lock_id in result.scalars().all() if lock_id not in held_id_set]
+
+        expired = 0
+        for start in range(0, len(stale_ids), 1000):
+            result = await db_session.execute(
+                update(AvailabilityLock)
+                .where(
+                    AvailabilityLock.id.in_(stale_ids[start:start + 1000]),
+                    AvailabilityLock.status == AvailabilityLockStatus.ACTIVE
+                )
+                .values(status=AvailabilityLockStatus.EXPIRED)
+                .execution_options(synchronize_session=False)
+            )
+            expired += result.rowcount or 0
+
+        await db_session.commit()
+
+        summary = {
+            'held': len(held),
+            'inserted': len(new_rows),
+            'refreshed': len(refreshed_rows),
+            'expired': expired,
+        }
+        logger.info(f"Reconciled availability locks: {summary}")
+        return summary
+
+    except Exception as e:
+        logger.error(f"Error reconciling availability locks: {str(e)}")
+        await db_session.rollback()
+        raise
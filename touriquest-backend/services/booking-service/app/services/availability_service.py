@@ -8,7 +8,7 @@ from uuid import UUID, uuid4
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, text
+from sqlalchemy import select, and_, or_, text, update
 from sqlalchemy.orm import selectinload
 
 from app.models.booking_models import (
@@ -19,6 +19,11 @@ from app.schemas.booking_schemas import (
     AvailabilityCheckRequest, AvailabilityCheckResponse,
     AvailabilityLockRequest, AvailabilityLockResponse
 )
+from app.services.availability_evaluator import (
+    AvailabilityEvaluator, interval_dates, merge_intervals
+)
+from app.services.availability_lock_manager import AvailabilityLockManager, LockGrant
+from app.services.booking_analytics_engine import BookingAnalyticsEngine
 
 logger = logging.getLogger(__name__)
 
@@ -33,9 +38,15 @@ class AvailabilityConflictError(Exception):
 class AvailabilityService:
     """Service for managing property availability and booking conflicts"""
     
-    def __init__(self, db_session: AsyncSession):
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        lock_manager: Optional[AvailabilityLockManager] = None
+    ):
         self.db = db_session
-        self._redis_client = None  # Will be injected for production
+        self.evaluator = AvailabilityEvaluator(db_session)
+        # Redis-backed holds in production; database rows otherwise
+        self.lock_manager = lock_manager
         
     async def check_availability(
         self,
@@ -55,66 +66,39 @@ class AvailabilityService:
             logger.info(f"Checking availability for property {request.property_id} "
                        f"from {request.check_in_date} to {request.check_out_date}")
             
-            # Get property details (would come from property service in real implementation)
-            property_details = await self._get_property_details(request.property_id)
-            
-            # Check basic availability
-            is_available = await self._check_date_availability(
-                request.property_id,
-                request.check_in_date,
-                request.check_out_date
-            )
-            
-            # Check guest capacity
-            guest_capacity_ok = await self._check_guest_capacity(
-                request.property_id,
-                request.number_of_guests
-            )
-            
-            # Check stay length requirements
-            stay_requirements_met = await self._check_stay_requirements(
-                request.property_id,
-                request.check_in_date,
-                request.check_out_date
+            # Property details and pricing come from other services; fetch them
+            # while the single conflict query runs
+            property_details, pricing_info, conflicts = await asyncio.gather(
+                self._get_property_details(request.property_id),
+                self._calculate_pricing(
+                    request.property_id,
+                    request.check_in_date,
+                    request.check_out_date,
+                    request.number_of_guests
+                ),
+                self.evaluator.load_conflicts(
+                    request.property_id,
+                    request.check_in_date,
+                    request.check_out_date
+                )
             )
             
-            # Get pricing information
-            pricing_info = await self._calculate_pricing(
-                request.property_id,
+            decision = self.evaluator.evaluate(
+                conflicts,
+                property_details,
                 request.check_in_date,
                 request.check_out_date,
                 request.number_of_guests
             )
             
-            # Get restrictions and policies
-            restrictions = await self._get_booking_restrictions(
-                request.property_id,
-                request.check_in_date,
-                request.check_out_date
-            )
-            
-            # Get unavailable dates in range
-            unavailable_dates = await self._get_unavailable_dates(
-                request.property_id,
-                request.check_in_date,
-                request.check_out_date
-            )
-            
             # Determine booking type availability
             instant_book_available = (
-                is_available and 
-                guest_capacity_ok and 
-                stay_requirements_met and
+                decision.is_available and
                 property_details.get('instant_book_enabled', False)
             )
             
             # Overall availability
-            overall_available = (
-                is_available and 
-                guest_capacity_ok and 
-                stay_requirements_met and
-                len(unavailable_dates) == 0
-            )
+            overall_available = decision.is_available
             
             return AvailabilityCheckResponse(
                 property_id=request.property_id,
@@ -127,10 +111,10 @@ class AvailabilityService:
                 currency=pricing_info['currency'],
                 available_for_instant_book=instant_book_available,
                 requires_approval=not instant_book_available and overall_available,
-                minimum_stay_nights=property_details.get('minimum_stay_nights', 1),
-                maximum_stay_nights=property_details.get('maximum_stay_nights'),
-                restrictions=restrictions,
-                unavailable_dates=unavailable_dates,
+                minimum_stay_nights=decision.minimum_stay_nights,
+                maximum_stay_nights=decision.maximum_stay_nights,
+                restrictions=decision.restrictions,
+                unavailable_dates=decision.unavailable_dates,
                 cancellation_policy=property_details.get('cancellation_policy', 'moderate'),
                 house_rules=property_details.get('house_rules', [])
             )
@@ -150,53 +134,62 @@ class AvailabilityService:
         Prevents double-booking while guest completes their reservation
         """
         try:
-            # Check if dates are still available
-            availability_check = AvailabilityCheckRequest(
-                property_id=request.property_id,
-                check_in_date=request.check_in_date,
-                check_out_date=request.check_out_date,
-                number_of_guests=1  # Minimal check for lock
-            )
-            
-            availability = await self.check_availability(availability_check)
-            
-            if not availability.is_available:
-                return AvailabilityLockResponse(
-                    lock_id=uuid4(),
-                    property_id=request.property_id,
-                    check_in_date=request.check_in_date,
-                    check_out_date=request.check_out_date,
-                    expires_at=datetime.utcnow(),
-                    status=AvailabilityLockStatus.FAILED,
-                    can_proceed=False
+            if self.lock_manager is not None:
+                return await self._create_redis_lock(request, user_id)
+            
+            # Bookings, blocks, restrictions and existing locks in one query
+            property_details, conflicts = await asyncio.gather(
+                self._get_property_details(request.property_id),
+                self.evaluator.load_conflicts(
+                    request.property_id,
+                    request.check_in_date,
+                    request.check_out_date
                 )
+            )
             
-            # Check for existing locks that might conflict
-            existing_lock = await self._get_conflicting_lock(
-                request.property_id,
+            decision = self.evaluator.evaluate(
+                conflicts,
+                property_details,
                 request.check_in_date,
-                request.check_out_date
+                request.check_out_date,
+                number_of_guests=1  # Minimal check for lock
             )
             
-            if existing_lock and existing_lock.user_id != user_id:
+            if not decision.is_available:
+                return self._failed_lock_response(request)
+            
+            # Check for existing locks that might conflict
+            foreign_lock = conflicts.foreign_lock(user_id)
+            if foreign_lock:
                 return AvailabilityLockResponse(
-                    lock_id=existing_lock.id,
+                    lock_id=foreign_lock.ref_id,
                     property_id=request.property_id,
                     check_in_date=request.check_in_date,
                     check_out_date=request.check_out_date,
-                    expires_at=existing_lock.expires_at,
+                    expires_at=foreign_lock.expires_at,
                     status=AvailabilityLockStatus.CONFLICT,
                     can_proceed=False
                 )
             
+            expires_at = datetime.utcnow() + timedelta(minutes=request.lock_duration_minutes)
+            own_lock = conflicts.own_lock(user_id)
+            
             # Create new lock or extend existing one
-            if existing_lock and existing_lock.user_id == user_id:
-                # Extend existing lock
-                existing_lock.expires_at = datetime.utcnow() + timedelta(
-                    minutes=request.lock_duration_minutes
+            if own_lock:
+                # Extend existing lock without reloading it
+                await self.db.execute(
+                    update(AvailabilityLock)
+                    .where(AvailabilityLock.id == own_lock.ref_id)
+                    .values(expires_at=expires_at, status=AvailabilityLockStatus.ACTIVE)
+                )
+                lock = AvailabilityLock(
+                    id=own_lock.ref_id,
+                    property_id=request.property_id,
+                    check_in_date=own_lock.start_date,
+                    check_out_date=own_lock.end_date,
+                    status=AvailabilityLockStatus.ACTIVE,
+                    expires_at=expires_at
                 )
-                existing_lock.status = AvailabilityLockStatus.ACTIVE
-                lock = existing_lock
             else:
                 # Create new lock
                 lock = AvailabilityLock(
@@ -207,17 +200,14 @@ class AvailabilityService:
                     check_out_date=request.check_out_date,
                     session_id=request.session_id,
                     status=AvailabilityLockStatus.ACTIVE,
-                    expires_at=datetime.utcnow() + timedelta(
-                        minutes=request.lock_duration_minutes
-                    )
+                    expires_at=expires_at
                 )
                 self.db.add(lock)
             
             await self.db.commit()
             
-            # Schedule lock cleanup
-            asyncio.create_task(self._schedule_lock_cleanup(lock.id))
-            
+            # Expired locks are excluded by expires_at and swept in bulk by
+            # cleanup_expired_locks, so no per-lock cleanup task is needed
             return AvailabilityLockResponse(
                 lock_id=lock.id,
                 property_id=lock.property_id,
@@ -233,26 +223,123 @@ class AvailabilityService:
             await self.db.rollback()
             raise
     
-    async def release_availability_lock(self, lock_id: UUID, user_id: UUID) -> bool:
+    async def _create_redis_lock(
+        self,
+        request: AvailabilityLockRequest,
+        user_id: UUID
+    ) -> AvailabilityLockResponse:
+        """
+        Take the hold in Redis while the stay is checked against bookings
+        
+        The Redis acquire is a single script call that runs concurrently with
+        the conflict query; a hold taken by this call is dropped again if the
+        dates turn out to be unavailable or the lookups fail. A hold the user
+        already had is kept. The database copy is written by
+        reconcile_availability_locks.
+        """
+        results = await asyncio.gather(
+            self._get_property_details(request.property_id),
+            self.evaluator.load_conflicts(
+                request.property_id,
+                request.check_in_date,
+                request.check_out_date
+            ),
+            self.lock_manager.acquire(
+                request.property_id,
+                request.check_in_date,
+                request.check_out_date,
+                user_id,
+                ttl_seconds=request.lock_duration_minutes * 60,
+                session_id=request.session_id
+            ),
+            return_exceptions=True
+        )
+        property_details, conflicts, grant = results
+        
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            if isinstance(grant, LockGrant):
+                await self._release_new_hold(request, grant, user_id)
+            raise errors[0]
+        
+        if not grant.acquired:
+            return AvailabilityLockResponse(
+                lock_id=grant.lock_id,
+                property_id=request.property_id,
+                check_in_date=request.check_in_date,
+                check_out_date=request.check_out_date,
+                expires_at=grant.expires_at,
+                status=AvailabilityLockStatus.CONFLICT,
+                can_proceed=False
+            )
+        
+        decision = self.evaluator.evaluate(
+            conflicts,
+            property_details,
+            request.check_in_date,
+            request.check_out_date,
+            number_of_guests=1  # Minimal check for lock
+        )
+        
+        if not decision.is_available:
+            await self._release_new_hold(request, grant, user_id)
+            return self._failed_lock_response(request)
+        
+        return AvailabilityLockResponse(
+            lock_id=grant.lock_id,
+            property_id=request.property_id,
+            check_in_date=request.check_in_date,
+            check_out_date=request.check_out_date,
+            expires_at=grant.expires_at,
+            status=AvailabilityLockStatus.ACTIVE,
+            can_proceed=True
+        )
+    
+    async def _release_new_hold(self, request: AvailabilityLockRequest, grant: LockGrant, user_id: UUID):
+        """Drop a hold granted by this request, leaving one the user already had"""
+        if grant.acquired and not grant.extended:
+            await self.lock_manager.release(request.property_id, grant.lock_id, user_id)
+    
+    def _failed_lock_response(self, request: AvailabilityLockRequest) -> AvailabilityLockResponse:
+        return AvailabilityLockResponse(
+            lock_id=uuid4(),
+            property_id=request.property_id,
+            check_in_date=request.check_in_date,
+            check_out_date=request.check_out_date,
+            expires_at=datetime.utcnow(),
+            status=AvailabilityLockStatus.FAILED,
+            can_proceed=False
+        )
+    
+    async def release_availability_lock(
+        self,
+        lock_id: UUID,
+        user_id: UUID,
+        property_id: Optional[UUID] = None
+    ) -> bool:
         """Release an availability lock"""
         try:
-            stmt = select(AvailabilityLock).where(
-                and_(
-                    AvailabilityLock.id == lock_id,
-                    AvailabilityLock.user_id == user_id,
-                    AvailabilityLock.status == AvailabilityLockStatus.ACTIVE
+            released = False
+            if self.lock_manager is not None and property_id is not None:
+                released = await self.lock_manager.release(property_id, lock_id, user_id)
+            
+            result = await self.db.execute(
+                update(AvailabilityLock)
+                .where(
+                    and_(
+                        AvailabilityLock.id == lock_id,
+                        AvailabilityLock.user_id == user_id,
+                        AvailabilityLock.status == AvailabilityLockStatus.ACTIVE
+                    )
                 )
+                .values(status=AvailabilityLockStatus.RELEASED, released_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
             )
-            result = await self.db.execute(stmt)
-            lock = result.scalar_one_or_none()
+            await self.db.commit()
             
-            if not lock:
+            if not (released or result.rowcount):
                 return False
             
-            lock.status = AvailabilityLockStatus.RELEASED
-            lock.released_at = datetime.utcnow()
-            await self.db.commit()
-            
             logger.info(f"Released availability lock {lock_id}")
             return True
             
@@ -284,31 +371,32 @@ class AvailabilityService:
             if check_in_date < date.today():
                 errors.append("Check-in date cannot be in the past")
             
-            # Check for booking conflicts
-            conflicts = await self._get_booking_conflicts(
-                property_id,
-                check_in_date,
-                check_out_date,
-                exclude_booking_id
+            # Bookings and blocks in one query
+            property_details, conflicts = await asyncio.gather(
+                self._get_property_details(property_id),
+                self.evaluator.load_conflicts(
+                    property_id,
+                    check_in_date,
+                    check_out_date,
+                    exclude_booking_id
+                )
             )
             
-            if conflicts:
-                booking_numbers = [b.booking_number for b in conflicts]
+            if conflicts.bookings:
+                booking_numbers = [b.label for b in conflicts.bookings]
                 errors.append(f"Dates conflict with existing bookings: {', '.join(booking_numbers)}")
             
-            # Check blocked dates
-            blocked_dates = await self._get_blocked_dates(
-                property_id,
+            blocked_dates = interval_dates(merge_intervals(
+                [(b.start_date, b.end_date) for b in conflicts.blocks],
                 check_in_date,
                 check_out_date
-            )
+            ))
             
             if blocked_dates:
                 blocked_str = ', '.join([d.strftime('%Y-%m-%d') for d in blocked_dates])
                 errors.append(f"Property is blocked on: {blocked_str}")
             
             # Check stay length requirements
-            property_details = await self._get_property_details(property_id)
             nights = (check_out_date - check_in_date).days
             
             min_nights = property_details.get('minimum_stay_nights', 1)
@@ -364,6 +452,8 @@ class AvailabilityService:
                 property_id, start_date, end_date
             )
             
+            blocked_date_set = set(blocked_dates)
+            
             # Get pricing for date range
             pricing_data = await self._get_pricing_calendar(
                 property_id, start_date, end_date
@@ -379,7 +469,7 @@ class AvailabilityService:
                 )
                 
                 # Check if date is blocked
-                is_blocked = current_date in blocked_dates
+                is_blocked = current_date in blocked_date_set
                 
                 # Get pricing for date
                 base_price = pricing_data.get(date_str, Decimal('0.00'))
@@ -513,56 +603,6 @@ class AvailabilityService:
     
     # Private helper methods
     
-    async def _check_date_availability(
-        self,
-        property_id: UUID,
-        check_in_date: date,
-        check_out_date: date
-    ) -> bool:
-        """Check if dates are available (no bookings or blocks)"""
-        # Check for booking conflicts
-        conflicts = await self._get_booking_conflicts(
-            property_id, check_in_date, check_out_date
-        )
-        
-        # Check for blocked dates
-        blocked_dates = await self._get_blocked_dates(
-            property_id, check_in_date, check_out_date
-        )
-        
-        return len(conflicts) == 0 and len(blocked_dates) == 0
-    
-    async def _check_guest_capacity(
-        self,
-        property_id: UUID,
-        number_of_guests: int
-    ) -> bool:
-        """Check if property can accommodate guest count"""
-        property_details = await self._get_property_details(property_id)
-        max_guests = property_details.get('max_guests', 1)
-        return number_of_guests <= max_guests
-    
-    async def _check_stay_requirements(
-        self,
-        property_id: UUID,
-        check_in_date: date,
-        check_out_date: date
-    ) -> bool:
-        """Check minimum/maximum stay requirements"""
-        property_details = await self._get_property_details(property_id)
-        nights = (check_out_date - check_in_date).days
-        
-        min_nights = property_details.get('minimum_stay_nights', 1)
-        max_nights = property_details.get('maximum_stay_nights')
-        
-        if nights < min_nights:
-            return False
-        
-        if max_nights and nights > max_nights:
-            return False
-        
-        return True
-    
     async def _calculate_pricing(
         self,
         property_id: UUID,
@@ -593,64 +633,6 @@ class AvailabilityService:
             'currency': 'USD'
         }
     
-    async def _get_booking_restrictions(
-        self,
-        property_id: UUID,
-        check_in_date: date,
-        check_out_date: date
-    ) -> List[str]:
-        """Get applicable booking restrictions"""
-        restrictions = []
-        
-        property_details = await self._get_property_details(property_id)
-        
-        # Check advance booking requirements
-        advance_days = property_details.get('advance_booking_days', 0)
-        if (check_in_date - date.today()).days < advance_days:
-            restrictions.append(f"Requires {advance_days} days advance booking")
-        
-        # Check same-day booking cutoff
-        if check_in_date == date.today():
-            cutoff_hour = property_details.get('same_day_cutoff_hour', 15)
-            if datetime.now().hour >= cutoff_hour:
-                restrictions.append(f"Same-day bookings close at {cutoff_hour}:00")
-        
-        # Check seasonal restrictions
-        if property_details.get('seasonal_restrictions'):
-            # Add seasonal restriction logic here
-            pass
-        
-        return restrictions
-    
-    async def _get_unavailable_dates(
-        self,
-        property_id: UUID,
-        check_in_date: date,
-        check_out_date: date
-    ) -> List[date]:
-        """Get list of unavailable dates in range"""
-        unavailable = []
-        
-        # Get booked dates
-        bookings = await self._get_bookings_in_range(
-            property_id, check_in_date, check_out_date
-        )
-        
-        for booking in bookings:
-            current_date = booking.check_in_date
-            while current_date < booking.check_out_date:
-                if check_in_date <= current_date < check_out_date:
-                    unavailable.append(current_date)
-                current_date += timedelta(days=1)
-        
-        # Get blocked dates
-        blocked_dates = await self._get_blocked_dates(
-            property_id, check_in_date, check_out_date
-        )
-        unavailable.extend(blocked_dates)
-        
-        return sorted(list(set(unavailable)))
-    
     async def _get_property_details(self, property_id: UUID) -> Dict[str, Any]:
         """Get property details (mock implementation)"""
         # In real implementation, this would call the property service
@@ -719,40 +701,22 @@ class AvailabilityService:
         end_date: date
     ) -> List[date]:
         """Get manually blocked dates"""
-        stmt = select(BookingCalendarSync).where(
+        stmt = select(
+            BookingCalendarSync.external_check_in,
+            BookingCalendarSync.external_check_out
+        ).where(
             and_(
                 BookingCalendarSync.property_id == property_id,
                 BookingCalendarSync.is_blocking == True,
                 BookingCalendarSync.sync_status == 'active',
-                or_(
-                    and_(
-                        BookingCalendarSync.external_check_in >= start_date,
-                        BookingCalendarSync.external_check_in < end_date
-                    ),
-                    and_(
-                        BookingCalendarSync.external_check_out > start_date,
-                        BookingCalendarSync.external_check_out <= end_date
-                    ),
-                    and_(
-                        BookingCalendarSync.external_check_in <= start_date,
-                        BookingCalendarSync.external_check_out >= end_date
-                    )
-                )
+                BookingCalendarSync.external_check_in < end_date,
+                BookingCalendarSync.external_check_out > start_date
             )
         )
         
         result = await self.db.execute(stmt)
-        blocks = result.scalars().all()
         
-        blocked_dates = []
-        for block in blocks:
-            current_date = block.external_check_in
-            while current_date < block.external_check_out:
-                if start_date <= current_date < end_date:
-                    blocked_dates.append(current_date)
-                current_date += timedelta(days=1)
-        
-        return blocked_dates
+        return interval_dates(merge_intervals(list(result.all()), start_date, end_date))
     
     async def _get_bookings_in_range(
         self,
@@ -796,86 +760,29 @@ class AvailabilityService:
             current_date += timedelta(days=1)
         
         return pricing
-    
-    async def _get_conflicting_lock(
-        self,
-        property_id: UUID,
-        check_in_date: date,
-        check_out_date: date
-    ) -> Optional[AvailabilityLock]:
-        """Get conflicting availability lock"""
-        stmt = select(AvailabilityLock).where(
-            and_(
-                AvailabilityLock.property_id == property_id,
-                AvailabilityLock.status == AvailabilityLockStatus.ACTIVE,
-                AvailabilityLock.expires_at > datetime.utcnow(),
-                or_(
-                    and_(
-                        AvailabilityLock.check_in_date >= check_in_date,
-                        AvailabilityLock.check_in_date < check_out_date
-                    ),
-                    and_(
-                        AvailabilityLock.check_out_date > check_in_date,
-                        AvailabilityLock.check_out_date <= check_out_date
-                    ),
-                    and_(
-                        AvailabilityLock.check_in_date <= check_in_date,
-                        AvailabilityLock.check_out_date >= check_out_date
-                    )
-                )
-            )
-        )
-        
-        result = await self.db.execute(stmt)
-        return result.scalar_one_or_none()
-    
-    async def _schedule_lock_cleanup(self, lock_id: UUID):
-        """Schedule cleanup of expired lock"""
-        try:
-            # In production, this would be handled by a background task queue
-            # For now, we'll just mark it for cleanup
-            await asyncio.sleep(1)  # Minimal delay
-            
-            stmt = select(AvailabilityLock).where(
-                and_(
-                    AvailabilityLock.id == lock_id,
-                    AvailabilityLock.expires_at <= datetime.utcnow(),
-                    AvailabilityLock.status == AvailabilityLockStatus.ACTIVE
-                )
-            )
-            result = await self.db.execute(stmt)
-            lock = result.scalar_one_or_none()
-            
-            if lock:
-                lock.status = AvailabilityLockStatus.EXPIRED
-                await self.db.commit()
-                logger.info(f"Cleaned up expired lock {lock_id}")
-        
-        except Exception as e:
-            logger.error(f"Error cleaning up lock {lock_id}: {str(e)}")
 
 
 # Utility functions for availability management
 
 async def cleanup_expired_locks(db_session: AsyncSession) -> int:
-    """Cleanup expired availability locks"""
+    """Expire lapsed availability locks with a single set-based UPDATE"""
     try:
-        stmt = select(AvailabilityLock).where(
-            and_(
-                AvailabilityLock.status == AvailabilityLockStatus.ACTIVE,
-                AvailabilityLock.expires_at <= datetime.utcnow()
+        result = await db_session.execute(
+            update(AvailabilityLock)
+            .where(
+                and_(
+                    AvailabilityLock.status == AvailabilityLockStatus.ACTIVE,
+                    AvailabilityLock.expires_at <= datetime.utcnow()
+                )
             )
+            .values(status=AvailabilityLockStatus.EXPIRED)
+            .execution_options(synchronize_session=False)
         )
-        result = await db_session.execute(stmt)
-        expired_locks = result.scalars().all()
-        
-        for lock in expired_locks:
-            lock.status = AvailabilityLockStatus.EXPIRED
-        
         await db_session.commit()
         
-        logger.info(f"Cleaned up {len(expired_locks)} expired availability locks")
-        return len(expired_locks)
+        expired_count = result.rowcount or 0
+        logger.info(f"Cleaned up {expired_count} expired availability locks")
+        return expired_count
         
     except Exception as e:
         logger.error(f"Error cleaning up expired locks: {str(e)}")
@@ -889,34 +796,12 @@ async def get_property_occupancy_rate(
     start_date: date,
     end_date: date
 ) -> float:
-    """Calculate property occupancy rate for date range"""
+    """Calculate property occupancy rate for date range from the daily summary"""
     try:
-        total_days = (end_date - start_date).days
-        
-        # Get booked days
-        stmt = select(func.sum(
-            func.extract('day', Booking.check_out_date - Booking.check_in_date)
-        )).where(
-            and_(
-                Booking.property_id == property_id,
-                Booking.status.in_([
-                    BookingStatus.CONFIRMED,
-                    BookingStatus.CHECKED_IN,
-                    BookingStatus.CHECKED_OUT
-                ]),
-                Booking.check_in_date < end_date,
-                Booking.check_out_date > start_date
-            )
+        return await BookingAnalyticsEngine(db_session).get_occupancy_rate(
+            property_id, start_date, end_date
         )
         
-        result = await db_session.execute(stmt)
-        booked_days = result.scalar() or 0
-        
-        if total_days == 0:
-            return 0.0
-        
-        return min(float(booked_days) / float(total_days), 1.0)
-        
     except Exception as e:
         logger.error(f"Error calculating occupancy rate: {str(e)}")
-        return 0.0
\ No newline at end of file
+        return 0.0
@@ -0,0 +1,394 @@
+"""Booking search and analytics query engine
+
+Dashboards read from ``booking_daily_summaries``, one row per property and
+day holding the bookings created that day (counts by outcome, revenue,
+confirmation lead time) and whether the night was occupied. The table is
+maintained incrementally: every write path that changes a booking passes
+the before/after state to ``record_booking_change``, and the difference is
+applied with one multi-row upsert in the same transaction.
+
+The lifecycle batch jobs need no hook: PENDING -> DECLINED and
+CHECKED_OUT -> COMPLETED leave every summary column unchanged.
+
+Booking lists use keyset pagination on (sort column, id) backed by the
+covering host/guest indexes on the bookings table.
+"""
+
+import base64
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, delete, func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking_models import Booking, BookingDailySummary, BookingStatus
+
+logger = logging.getLogger(__name__)
+
+
+REVENUE_STATUSES = (
+    BookingStatus.CONFIRMED,
+    BookingStatus.CHECKED_IN,
+    BookingStatus.CHECKED_OUT,
+    BookingStatus.COMPLETED,
+)
+OCCUPIED_STATUSES = REVENUE_STATUSES
+
+SUMMARY_COUNTERS = (
+    'bookings_created',
+    'confirmed_bookings',
+    'cancelled_bookings',
+    'revenue',
+    'lead_time_days_total',
+    'lead_time_samples',
+    'nights_occupied',
+)
+
+SUMMARY_SOURCE_COLUMNS = (
+    Booking.property_id,
+    Booking.host_id,
+    Booking.created_at,
+    Booking.status,
+    Booking.total_amount,
+    Booking.check_in_date,
+    Booking.check_out_date,
+    Booking.confirmed_at,
+)
+
+SORT_COLUMNS = {
+    'created_at': Booking.created_at,
+    'check_in_date': Booking.check_in_date,
+    'total_amount': Booking.total_amount,
+}
+
+SummaryKey = Tuple[UUID, date]
+
+
+@dataclass(frozen=True)
+class BookingSummaryState:
+    """The booking fields that feed the daily summary"""
+    property_id: UUID
+    host_id: UUID
+    created_on: date
+    status: BookingStatus
+    total_amount: Decimal
+    check_in_date: date
+    check_out_date: date
+    confirmed_on: Optional[date] = None
+
+    @classmethod
+    def of(cls, booking: Any) -> "BookingSummaryState":
+        return cls(
+            property_id=booking.property_id,
+            host_id=booking.host_id,
+            created_on=(booking.created_at or datetime.utcnow()).date(),
+            status=booking.status,
+            total_amount=Decimal(booking.total_amount or 0),
+            check_in_date=booking.check_in_date,
+            check_out_date=booking.check_out_date,
+            confirmed_on=booking.confirmed_at.date() if booking.confirmed_at else None,
+        )
+
+
+def summary_contributions(state: BookingSummaryState) -> Dict[SummaryKey, Dict[str, Any]]:
+    """Counters a booking in this state adds to each (property, day) row"""
+    created = {
+        'bookings_created': 1,
+        'confirmed_bookings': int(state.status == BookingStatus.CONFIRMED),
+        'cancelled_bookings': int(state.status == BookingStatus.CANCELLED),
+        'revenue': state.total_amount if state.status in REVENUE_STATUSES else Decimal('0'),
+        'lead_time_days_total': 0,
+        'lead_time_samples': 0,
+    }
+    if state.status == BookingStatus.CONFIRMED and state.confirmed_on:
+        created['lead_time_days_total'] = (state.check_in_date - state.confirmed_on).days
+        created['lead_time_samples'] = 1
+
+    contributions: Dict[SummaryKey, Dict[str, Any]] = defaultdict(dict)
+    contributions[(state.property_id, state.created_on)].update(created)
+
+    if state.status in OCCUPIED_STATUSES:
+        night = state.check_in_date
+        while night < state.check_out_date:
+            contributions[(state.property_id, night)]['nights_occupied'] = 1
+            night += timedelta(days=1)
+
+    return contributions
+
+
+def summary_delta(
+    before: Optional[BookingSummaryState],
+    after: Optional[BookingSummaryState]
+) -> List[Dict[str, Any]]:
+    """Upsert rows turning the summary for `before` into the one for `after`"""
+    rows: Dict[SummaryKey, Dict[str, Any]] = {}
+
+    for state, sign in ((before, -1), (after, 1)):
+        if state is None:
+            continue
+        for key, counters in summary_contributions(state).items():
+            row = rows.setdefault(key, {
+                'property_id': key[0],
+                'summary_date': key[1],
+                'host_id': state.host_id,
+                **{name: 0 for name in SUMMARY_COUNTERS},
+            })
+            for name, value in counters.items():
+                row[name] += sign * value
+
+    return [
+        row for row in rows.values()
+        if any(row[name] for name in SUMMARY_COUNTERS)
+    ]
+
+
+def _upsert_summary_rows(dialect_name: str):
+    insert = sqlite.insert if dialect_name == 'sqlite' else postgresql.insert
+    stmt = insert(BookingDailySummary)
+    return stmt.on_conflict_do_update(
+        index_elements=[BookingDailySummary.property_id, BookingDailySummary.summary_date],
+        set_={
+            'host_id': stmt.excluded.host_id,
+            'updated_at': func.now(),
+            **{
+                name: getattr(BookingDailySummary, name) + getattr(stmt.excluded, name)
+                for name in SUMMARY_COUNTERS
+            },
+        }
+    )
+
+
+async def apply_summary_rows(db_session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Add counter rows to the summary with one multi-row upsert"""
+    if rows:
+        await db_session.execute(_upsert_summary_rows(db_session.get_bind(BookingDailySummary).dialect.name), rows)
+
+
+async def record_booking_change(
+    db_session: AsyncSession,
+    before: Optional[BookingSummaryState],
+    after: Optional[BookingSummaryState]
+) -> None:
+    """Fold one booking change into the summary (caller commits)"""
+    await apply_summary_rows(db_session, summary_delta(before, after))
+
+
+async def rebuild_booking_summaries(
+    db_session: AsyncSession,
+    property_ids: Optional[List[UUID]] = None,
+    batch_size: int = 10000
+) -> int:
+    """
+    Recompute summaries from the bookings table (backfill / repair)
+
+    Bookings are streamed in property order and each property's rows are
+    written as soon as the property is complete, so memory stays bounded by
+    the largest property.
+    """
+    clear = delete(BookingDailySummary)
+    stmt = select(*SUMMARY_SOURCE_COLUMNS).order_by(Booking.property_id)
+    if property_ids is not None:
+        clear = clear.where(BookingDailySummary.property_id.in_(property_ids))
+        stmt = stmt.where(Booking.property_id.in_(property_ids))
+
+    await db_session.execute(clear)
+
+    written = 0
+    current_property = None
+    pending: List[Dict[str, Any]] = []
+    rows: Dict[SummaryKey, Dict[str, Any]] = {}
+
+    async def flush() -> None:
+        nonlocal written
+        pending.extend(rows.values())
+        rows.clear()
+        if len(pending) >= batch_size:
+            await apply_summary_rows(db_session, pending)
+            written += len(pending)
+            pending.clear()
+
+    result = await db_session.stream(stmt.execution_options(yield_per=batch_size))
+    async for booking in result:
+        if booking.property_id != current_property:
+            await flush()
+            current_property = booking.property_id
+
+        for row in summary_delta(None, BookingSummaryState.of(booking)):
+            key = (row['property_id'], row['summary_date'])
+            if key in rows:
+                for name in SUMMARY_COUNTERS:
+                    rows[key][name] += row[name]
+            else:
+                rows[key] = row
+
+    await flush()
+    await apply_summary_rows(db_session, pending)
+    written += len(pending)
+    await db_session.commit()
+
+    logger.info(f"Rebuilt {written} booking summary rows")
+    return written
+
+
+def encode_cursor(sort_value: Any, booking_id: UUID) -> str:
+    """Opaque keyset cursor for the row after which the next page starts"""
+    if isinstance(sort_value, (date, datetime)):
+        sort_value = sort_value.isoformat()
+    elif isinstance(sort_value, Decimal):
+        sort_value = str(sort_value)
+    payload = json.dumps([sort_value, str(booking_id)]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: str, sort_by: str) -> Tuple[Any, UUID]:
+    sort_value, booking_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if sort_by == 'created_at':
+        sort_value = datetime.fromisoformat(sort_value)
+    elif sort_by == 'check_in_date':
+        sort_value = date.fromisoformat(sort_value)
+    else:
+        sort_value = Decimal(sort_value)
+    return sort_value, UUID(booking_id)
+
+
+def apply_keyset_page(stmt, sort_by: str, sort_order: str, cursor: Optional[str], limit: int):
+    """Order by (sort column, id) and continue after cursor"""
+    sort_by = sort_by if sort_by in SORT_COLUMNS else 'created_at'
+    sort_column = SORT_COLUMNS[sort_by]
+
+    if cursor:
+        sort_value, booking_id = decode_cursor(cursor, sort_by)
+        key = tuple_(sort_column, Booking.id)
+        stmt = stmt.where(
+            key < tuple_(sort_value, booking_id) if sort_order == 'desc'
+            else key > tuple_(sort_value, booking_id)
+        )
+
+    if sort_order == 'desc':
+        stmt = stmt.order_by(sort_column.desc(), Booking.id.desc())
+    else:
+        stmt = stmt.order_by(sort_column.asc(), Booking.id.asc())
+
+    return stmt.limit(limit), sort_by
+
+
+class BookingAnalyticsEngine:
+    """Dashboard aggregates served from the daily summary table"""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db = db_session
+
+    async def get_analytics(
+        self,
+        start_date: date,
+        end_date: date,
+        host_id: Optional[UUID] = None,
+        property_ids: Optional[Iterable[UUID]] = None
+    ) -> Dict[str, Any]:
+        """Booking counts, revenue and rates for bookings created in the period"""
+        stmt = select(
+            func.coalesce(func.sum(BookingDailySummary.bookings_created), 0),
+            func.coalesce(func.sum(BookingDailySummary.confirmed_bookings), 0),
+            func.coalesce(func.sum(BookingDailySummary.cancelled_bookings), 0),
+            func.coalesce(func.sum(BookingDailySummary.revenue), 0),
+            func.coalesce(func.sum(BookingDailySummary.lead_time_days_total), 0),
+            func.coalesce(func.sum(BookingDailySummary.lead_time_samples), 0),
+        ).where(
+            BookingDailySummary.summary_date.between(start_date, end_date)
+        )
+        if host_id is not None:
+            stmt = stmt.where(BookingDailySummary.host_id == host_id)
+        if property_ids is not None:
+            stmt = stmt.where(BookingDailySummary.property_id.in_(list(property_ids)))
+
+        totals = (await self.db.execute(stmt)).one()
+        return build_analytics(*totals, start_date=start_date, end_date=end_date)
+
+    async def get_guest_analytics(self, guest_id: UUID, start_date: date, end_date: date) -> Dict[str, Any]:
+        """
+        Same figures for one guest, aggregated from their bookings directly
+
+        A guest has a handful of bookings, read as a range of the
+        (guest_id, created_at, id) index.
+        """
+        stmt = select(*SUMMARY_SOURCE_COLUMNS).where(
+            and_(
+                Booking.guest_id == guest_id,
+                Booking.created_at >= datetime.combine(start_date, datetime.min.time()),
+                Booking.created_at <= datetime.combine(end_date, datetime.max.time())
+            )
+        )
+
+        totals = dict.fromkeys(SUMMARY_COUNTERS, 0)
+        for booking in await self.db.execute(stmt):
+            state = BookingSummaryState.of(booking)
+            created = summary_contributions(state)[(state.property_id, state.created_on)]
+            for name, value in created.items():
+                if name != 'nights_occupied':
+                    totals[name] += value
+
+        return build_analytics(
+            totals['bookings_created'],
+            totals['confirmed_bookings'],
+            totals['cancelled_bookings'],
+            totals['revenue'],
+            totals['lead_time_days_total'],
+            totals['lead_time_samples'],
+            start_date=start_date,
+            end_date=end_date
+        )
+
+    async def get_occupancy_rate(self, property_id: UUID, start_date: date, end_date: date) -> float:
+        """Share of nights in [start_date, end_date) that were occupied"""
+        total_days = (end_date - start_date).days
+        if total_days <= 0:
+            return 0.0
+
+        booked_nights = await self.db.scalar(
+            select(func.coalesce(func.sum(BookingDailySummary.nights_occupied), 0)).where(
+                and_(
+                    BookingDailySummary.property_id == property_id,
+                    BookingDailySummary.summary_date >= start_date,
+                    BookingDailySummary.summary_date < end_date
+                )
+            )
+        )
+        return min(float(booked_nights) / float(total_days), 1.0)
+
+
+def build_analytics(
+    total_bookings: int,
+    confirmed_bookings: int,
+    cancelled_bookings: int,
+    total_revenue: Any,
+    lead_time_days_total: int,
+    lead_time_samples: int,
+    start_date: date,
+    end_date: date
+) -> Dict[str, Any]:
+    """Shape aggregate totals into the analytics response"""
+    total_revenue = Decimal(total_revenue or 0)
+    average_booking_value = total_revenue / total_bookings if total_bookings > 0 else Decimal('0')
+    confirmation_rate = (confirmed_bookings / total_bookings * 100) if total_bookings > 0 else 0
+    cancellation_rate = (cancelled_bookings / total_bookings * 100) if total_bookings > 0 else 0
+    avg_lead_time = lead_time_days_total / lead_time_samples if lead_time_samples else 0
+
+    return {
+        'total_bookings': int(total_bookings),
+        'confirmed_bookings': int(confirmed_bookings),
+        'cancelled_bookings': int(cancelled_bookings),
+        'total_revenue': float(total_revenue),
+        'average_booking_value': float(average_booking_value),
+        'confirmation_rate': round(confirmation_rate, 1),
+        'cancellation_rate': round(cancellation_rate, 1),
+        'average_lead_time_days': round(avg_lead_time, 1),
+        'period_start': start_date,
+        'period_end': end_date
+    }
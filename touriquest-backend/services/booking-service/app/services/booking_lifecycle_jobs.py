@@ -0,0 +1,197 @@
+"""Chunked, set-based batch jobs for booking lifecycle automation
+
+Each job walks the matching bookings in primary-key order (keyset chunks)
+and moves a whole chunk with one ``UPDATE ... WHERE id IN (SELECT ... FOR
+UPDATE SKIP LOCKED) RETURNING`` statement, so several workers can run the
+same job without blocking on or double-processing each other's rows.
+Notifications for the returned rows are enqueued with one multi-row INSERT
+per chunk and every chunk commits on its own.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking_models import Booking, BookingNotification, BookingStatus
+from app.services.calendar_range_loader import invalidate_property_calendar
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Columns handed to notification builders and after-chunk hooks
+RETURNED_COLUMNS = (
+    Booking.id,
+    Booking.booking_number,
+    Booking.property_id,
+    Booking.guest_id,
+    Booking.host_id,
+    Booking.check_in_date,
+)
+
+
+@dataclass
+class BatchRunReport:
+    """Throughput figures for one job run"""
+    job: str
+    rows: int = 0
+    chunks: int = 0
+    notifications: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job': self.job,
+            'rows': self.rows,
+            'chunks': self.chunks,
+            'notifications': self.notifications,
+            'elapsed_seconds': round(self.elapsed_seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+@dataclass
+class LifecycleJob:
+    """
+    A state transition applied to every booking matching criteria
+
+    criteria and values are built per run so time-relative filters use the
+    run's start time. notification maps a returned row to a
+    BookingNotification dict (or None for no notification).
+    """
+    name: str
+    criteria: Callable[[datetime], List[Any]]
+    values: Callable[[datetime], Dict[str, Any]]
+    notification: Optional[Callable[[Any], Optional[Dict[str, Any]]]] = None
+    after_chunk: Optional[Callable[[List[Any]], None]] = None
+
+
+class BookingLifecycleBatchRunner:
+    """Runs lifecycle jobs chunk by chunk against one session"""
+
+    def __init__(self, db_session: AsyncSession, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db_session
+        self.chunk_size = chunk_size
+
+    async def run(self, job: LifecycleJob, now: Optional[datetime] = None) -> BatchRunReport:
+        """Apply the job to all matching bookings and report throughput"""
+        now = now or datetime.utcnow()
+        criteria = job.criteria(now)
+        values = job.values(now)
+        report = BatchRunReport(job=job.name)
+        started = time.perf_counter()
+        last_id: Optional[UUID] = None
+
+        while True:
+            claim = select(Booking.id).where(and_(*criteria))
+            if last_id is not None:
+                claim = claim.where(Booking.id > last_id)
+            claim = claim.order_by(Booking.id).limit(self.chunk_size).with_for_update(skip_locked=True)
+
+            result = await self.db.execute(
+                update(Booking)
+                .where(and_(Booking.id.in_(claim.scalar_subquery()), *criteria))
+                .values(**values)
+                .returning(*RETURNED_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+
+            if not rows:
+                await self.db.commit()
+                break
+
+            notifications = []
+            if job.notification:
+                notifications = [
+                    notification for notification in map(job.notification, rows) if notification
+                ]
+                for notification in notifications:
+                    notification.setdefault('id', uuid4())
+                    notification.setdefault('created_at', now)
+                if notifications:
+                    await self.db.execute(insert(BookingNotification), notifications)
+
+            await self.db.commit()
+
+            if job.after_chunk:
+                job.after_chunk(rows)
+
+            report.rows += len(rows)
+            report.chunks += 1
+            report.notifications += len(notifications)
+            last_id = max(row.id for row in rows)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(f"Lifecycle job finished: {report.to_dict()}")
+        return report
+
+
+def _invalidate_calendars(rows: List[Any]) -> None:
+    for property_id in {row.property_id for row in rows}:
+        invalidate_property_calendar(property_id)
+
+
+AUTO_DECLINE_JOB = LifecycleJob(
+    name='auto_decline_expired_bookings',
+    criteria=lambda now: [
+        Booking.status == BookingStatus.PENDING,
+        Booking.host_response_deadline <= now,
+    ],
+    values=lambda now: {
+        'status': BookingStatus.DECLINED,
+        'declined_at': now,
+        'decline_reason': "Host response deadline expired",
+        'updated_at': now,
+    },
+    notification=lambda row: {
+        'booking_id': row.id,
+        'recipient_id': row.guest_id,
+        'notification_type': 'booking_declined',
+        'title': f"Booking {row.booking_number} declined",
+        'message': "The host did not respond in time, so your booking request was declined.",
+    },
+    after_chunk=_invalidate_calendars,
+)
+
+CHECKIN_REMINDER_JOB = LifecycleJob(
+    name='send_checkin_reminders',
+    criteria=lambda now: [
+        Booking.status == BookingStatus.CONFIRMED,
+        Booking.check_in_date == now.date() + timedelta(days=1),
+        Booking.checkin_reminder_sent_at.is_(None),
+    ],
+    values=lambda now: {'checkin_reminder_sent_at': now},
+    notification=lambda row: {
+        'booking_id': row.id,
+        'recipient_id': row.guest_id,
+        'notification_type': 'checkin_reminder',
+        'title': f"Check-in tomorrow for booking {row.booking_number}",
+        'message': f"Your stay starts on {row.check_in_date.isoformat()}.",
+    },
+)
+
+AUTO_COMPLETE_JOB = LifecycleJob(
+    name='auto_complete_bookings',
+    criteria=lambda now: [
+        Booking.status == BookingStatus.CHECKED_OUT,
+        Booking.check_out_date <= now.date() - timedelta(days=1),
+    ],
+    values=lambda now: {
+        'status': BookingStatus.COMPLETED,
+        'completed_at': now,
+        'updated_at': now,
+    },
+    after_chunk=_invalidate_calendars,
+)
@@ -0,0 +1,197 @@
+"""Collision-free booking number allocation
+
+Booking numbers are drawn from a monotonically increasing counter that
+each worker leases in blocks (a PostgreSQL sequence incremented by the
+block size, or Redis INCRBY), so handing out a number is an in-memory
+increment and never needs a uniqueness lookup. Counter values are passed
+through a fixed 40-bit permutation before encoding so consecutive bookings
+do not get consecutive-looking numbers, then written in Crockford base32
+with a Luhn mod 32 check character:
+
+    TQ + 8 symbols + 1 check symbol, e.g. TQKRVQ0PG85
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import Optional, Protocol, Union
+
+from sqlalchemy import Connection, Engine, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models.booking_models import BOOKING_NUMBER_BLOCK_SIZE, booking_number_block_seq
+
+logger = logging.getLogger(__name__)
+
+
+BOOKING_NUMBER_PREFIX = "TQ"
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+SYMBOL_VALUES = {symbol: value for value, symbol in enumerate(CROCKFORD_ALPHABET)}
+
+COUNTER_BITS = 40
+COUNTER_MASK = (1 << COUNTER_BITS) - 1
+PAYLOAD_SYMBOLS = COUNTER_BITS // 5
+
+# Odd, so multiplication mod 2**40 is invertible
+PERMUTATION_MULTIPLIER = 0x9E3779B97F
+REDIS_COUNTER_KEY = "booking:number:counter"
+
+
+class BookingNumberExhaustedError(Exception):
+    """Raised when the 40-bit counter space is used up"""
+    pass
+
+
+def permute_counter(value: int) -> int:
+    """Bijective scramble of a 40-bit counter value"""
+    value ^= value >> 20
+    value = (value * PERMUTATION_MULTIPLIER) & COUNTER_MASK
+    value ^= value >> 20
+    return value
+
+
+def _check_symbol(payload: str) -> str:
+    """Luhn mod 32 check character over the payload symbols"""
+    total = 0
+    factor = 2
+    for symbol in reversed(payload):
+        addend = factor * SYMBOL_VALUES[symbol]
+        total += addend // 32 + addend % 32
+        factor = 1 if factor == 2 else 2
+    return CROCKFORD_ALPHABET[(32 - total % 32) % 32]
+
+
+def encode_booking_number(counter: int) -> str:
+    """Turn a counter value into a booking number"""
+    if counter < 0 or counter > COUNTER_MASK:
+        raise BookingNumberExhaustedError(f"Booking number counter {counter} out of range")
+
+    value = permute_counter(counter)
+    payload = ''.join(
+        CROCKFORD_ALPHABET[(value >> shift) & 31]
+        for shift in range(COUNTER_BITS - 5, -1, -5)
+    )
+    return f"{BOOKING_NUMBER_PREFIX}{payload}{_check_symbol(payload)}"
+
+
+def is_valid_booking_number(booking_number: str) -> bool:
+    """Check prefix, alphabet and check character (catches most typos)"""
+    if not booking_number.startswith(BOOKING_NUMBER_PREFIX):
+        return False
+
+    body = booking_number[len(BOOKING_NUMBER_PREFIX):].upper()
+    if len(body) != PAYLOAD_SYMBOLS + 1 or any(symbol not in SYMBOL_VALUES for symbol in body):
+        return False
+
+    return _check_symbol(body[:-1]) == body[-1]
+
+
+class BlockSource(Protocol):
+    """Hands out disjoint counter blocks [start, start + size)"""
+
+    block_size: int
+
+    async def lease(self) -> int:
+        ...
+
+
+class PostgresSequenceBlockSource:
+    """Blocks from a sequence whose INCREMENT BY equals the block size"""
+
+    def __init__(self, engine: AsyncEngine, block_size: int = BOOKING_NUMBER_BLOCK_SIZE):
+        self.engine = engine
+        self.block_size = block_size
+
+    async def lease(self) -> int:
+        # nextval() is non-transactional, so a short-lived connection is enough
+        async with self.engine.connect() as conn:
+            return await conn.scalar(select(booking_number_block_seq.next_value()))
+
+
+class RedisBlockSource:
+    """Blocks from a single Redis counter advanced with INCRBY"""
+
+    def __init__(self, redis_client, block_size: int = BOOKING_NUMBER_BLOCK_SIZE, key: str = REDIS_COUNTER_KEY):
+        self.redis = redis_client
+        self.block_size = block_size
+        self.key = key
+
+    async def lease(self) -> int:
+        end = await self.redis.incrby(self.key, self.block_size)
+        return int(end) - self.block_size
+
+
+class BookingNumberAllocator:
+    """
+    Per-process booking number allocator
+
+    Numbers come from the current leased block; the next block is leased
+    in the background once the current one is three quarters used, so
+    callers only ever wait on the block source when a burst outruns the
+    prefetch.
+    """
+
+    def __init__(self, source: BlockSource, prefetch_ratio: float = 0.25):
+        self.source = source
+        self.prefetch_at = max(1, int(source.block_size * prefetch_ratio))
+        self._next = 0
+        self._end = 0
+        self._pending: Optional[asyncio.Future] = None
+        self._refill_lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.blocks_leased = 0
+
+    def _bind_loop(self) -> None:
+        """Recreate the lock and drop the prefetch when used from another event loop"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._refill_lock = asyncio.Lock()
+            # A prefetch started on the previous loop cannot be awaited here;
+            # the block it leased is skipped, which only leaves a gap
+            self._pending = None
+
+    async def allocate(self) -> str:
+        """Next unique booking number"""
+        self._bind_loop()
+        while self._next >= self._end:
+            await self._refill()
+
+        counter = self._next
+        self._next += 1
+
+        if self._end - self._next == self.prefetch_at and self._pending is None:
+            self._pending = asyncio.ensure_future(self.source.lease())
+
+        return encode_booking_number(counter)
+
+    async def _refill(self) -> None:
+        async with self._refill_lock:
+            # Another caller refilled while we waited
+            if self._next < self._end:
+                return
+
+            pending, self._pending = self._pending, None
+            start = await pending if pending is not None else await self.source.lease()
+
+            self._next, self._end = start, start + self.source.block_size
+            self.blocks_leased += 1
+            logger.debug(f"Leased booking number block starting at {start}")
+
+
+_engine_allocators: "weakref.WeakKeyDictionary[Engine, BookingNumberAllocator]" = weakref.WeakKeyDictionary()
+
+
+def get_sequence_allocator(bind: Union[AsyncEngine, Engine, Connection]) -> BookingNumberAllocator:
+    """
+    Process-wide allocator backed by the database sequence of bind's engine
+
+    bind may be an async engine or what ``AsyncSession.get_bind()`` returns,
+    a sync engine or the connection a session was bound to.
+    """
+    engine = bind.sync_engine if isinstance(bind, AsyncEngine) else bind.engine
+    allocator = _engine_allocators.get(engine)
+    if allocator is None:
+        allocator = BookingNumberAllocator(PostgresSequenceBlockSource(AsyncEngine(engine)))
+        _engine_allocators[engine] = allocator
+    return allocator
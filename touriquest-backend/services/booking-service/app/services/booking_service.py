@@ -24,6 +24,18 @@ from app.schemas.booking_schemas import (
     BookingListResponse, BookingListItem, BookingSearchRequest
 )
 from app.services.availability_service import AvailabilityService
+from app.services.booking_analytics_engine import (
+    BookingAnalyticsEngine, BookingSummaryState, apply_keyset_page, encode_cursor,
+    record_booking_change
+)
+from app.services.booking_lifecycle_jobs import (
+    AUTO_COMPLETE_JOB, AUTO_DECLINE_JOB, CHECKIN_REMINDER_JOB,
+    DEFAULT_CHUNK_SIZE, BookingLifecycleBatchRunner
+)
+from app.services.booking_number_allocator import (
+    BookingNumberAllocator, get_sequence_allocator
+)
+from app.services.calendar_range_loader import invalidate_property_calendar
 from app.services.payment_service import PaymentProcessingService
 
 logger = logging.getLogger(__name__)
@@ -54,11 +66,15 @@ class BookingManagementService:
         self,
         db_session: AsyncSession,
         availability_service: AvailabilityService,
-        payment_service: PaymentProcessingService
+        payment_service: PaymentProcessingService,
+        number_allocator: Optional[BookingNumberAllocator] = None
     ):
         self.db = db_session
         self.availability_service = availability_service
         self.payment_service = payment_service
+        self.analytics = BookingAnalyticsEngine(db_session)
+        # Shared per process so leased number blocks outlive the request
+        self.number_allocator = number_allocator or get_sequence_allocator(db_session.get_bind(Booking))
     
     async def create_booking(
         self,
@@ -147,11 +163,13 @@ class BookingManagementService:
             # Step 9: Schedule workflow actions
             await self._schedule_workflow_actions(booking)
             
+            await record_booking_change(self.db, None, BookingSummaryState.of(booking))
             await self.db.commit()
+            invalidate_property_calendar(booking.property_id)
             
             # Step 10: Release availability lock (booking created successfully)
             await self.availability_service.release_availability_lock(
-                availability_lock.lock_id, guest_id
+                availability_lock.lock_id, guest_id, availability_lock.property_id
             )
             
             logger.info(f"Successfully created booking {booking.booking_number}")
@@ -165,7 +183,7 @@ class BookingManagementService:
             # Release lock on error
             if 'availability_lock' in locals():
                 await self.availability_service.release_availability_lock(
-                    availability_lock.lock_id, guest_id
+                    availability_lock.lock_id, guest_id, availability_lock.property_id
                 )
             
             raise
@@ -228,6 +246,7 @@ class BookingManagementService:
             
             # Update booking
             old_status = booking.status
+            summary_before = BookingSummaryState.of(booking)
             booking.status = request.status
             booking.updated_at = datetime.utcnow()
             
@@ -252,7 +271,9 @@ class BookingManagementService:
                     booking, old_status, request
                 )
             
+            await record_booking_change(self.db, summary_before, BookingSummaryState.of(booking))
             await self.db.commit()
+            invalidate_property_calendar(booking.property_id)
             
             logger.info(f"Updated booking {booking.booking_number} status to {request.status}")
             
@@ -393,6 +414,7 @@ class BookingManagementService:
             )
             
             # Update booking status
+            summary_before = BookingSummaryState.of(booking)
             booking.status = BookingStatus.CANCELLED
             booking.cancelled_at = datetime.utcnow()
             booking.cancellation_reason = request.reason
@@ -418,7 +440,9 @@ class BookingManagementService:
                 f"Booking cancelled: {request.reason}"
             )
             
+            await record_booking_change(self.db, summary_before, BookingSummaryState.of(booking))
             await self.db.commit()
+            invalidate_property_calendar(booking.property_id)
             
             logger.info(f"Cancelled booking {booking.booking_number} with refund ${refund_calculation.total_refund}")
             
@@ -485,42 +509,56 @@ class BookingManagementService:
                 if filters.booking_type:
                     stmt = stmt.where(Booking.booking_type == filters.booking_type)
             
-            # Count total results
+            # Count total results (index-only on the covering indexes)
             count_stmt = select(func.count()).select_from(stmt.subquery())
             count_result = await self.db.execute(count_stmt)
             total_count = count_result.scalar()
             
-            # Apply sorting
-            if request.sort_by == 'created_at':
-                sort_column = Booking.created_at
-            elif request.sort_by == 'check_in_date':
-                sort_column = Booking.check_in_date
-            elif request.sort_by == 'total_amount':
-                sort_column = Booking.total_amount
-            else:
-                sort_column = Booking.created_at
-            
-            if request.sort_order == 'desc':
-                stmt = stmt.order_by(sort_column.desc())
-            else:
-                stmt = stmt.order_by(sort_column.asc())
-            
-            # Apply pagination
-            offset = (request.page - 1) * request.per_page
-            stmt = stmt.offset(offset).limit(request.per_page)
+            # Keyset pagination on (sort column, id); page offsets only
+            # apply when no cursor is given
+            offset = 0
+            if not request.cursor:
+                offset = (request.page - 1) * request.per_page
+            stmt, sort_by = apply_keyset_page(
+                stmt, request.sort_by, request.sort_order, request.cursor, request.per_page + 1
+            )
+            if offset:
+                stmt = stmt.offset(offset)
             
             # Execute query
             result = await self.db.execute(stmt)
             bookings = result.scalars().all()
+            has_next = len(bookings) > request.per_page
+            bookings = bookings[:request.per_page]
+            
+            # One payments query for the page instead of a lazy load per row
+            paid_booking_ids = set()
+            if user_role == 'guest' and bookings:
+                paid_result = await self.db.execute(
+                    select(BookingPayment.booking_id).where(
+                        and_(
+                            BookingPayment.booking_id.in_([b.id for b in bookings]),
+                            BookingPayment.status == PaymentStatus.SUCCEEDED
+                        )
+                    )
+                )
+                paid_booking_ids = set(paid_result.scalars().all())
             
             # Build response items
+            property_details_cache: Dict[UUID, Dict[str, Any]] = {}
             booking_items = []
             for booking in bookings:
                 # Get property details for display
-                property_details = await self._get_property_details(booking.property_id)
+                if booking.property_id not in property_details_cache:
+                    property_details_cache[booking.property_id] = await self._get_property_details(
+                        booking.property_id
+                    )
+                property_details = property_details_cache[booking.property_id]
                 
                 # Check if requires action
-                requires_action = await self._booking_requires_action(booking, user_id, user_role)
+                requires_action = self._booking_requires_action(
+                    booking, user_id, user_role, booking.id in paid_booking_ids
+                )
                 
                 item = BookingListItem(
                     id=booking.id,
@@ -542,13 +580,19 @@ class BookingManagementService:
                 )
                 booking_items.append(item)
             
+            next_cursor = None
+            if has_next:
+                last = bookings[-1]
+                next_cursor = encode_cursor(getattr(last, sort_by), last.id)
+            
             return BookingListResponse(
                 bookings=booking_items,
                 total_count=total_count,
                 page=request.page,
                 per_page=request.per_page,
-                has_next=offset + request.per_page < total_count,
-                has_previous=request.page > 1
+                has_next=has_next,
+                has_previous=bool(request.cursor) or request.page > 1,
+                next_cursor=next_cursor
             )
             
         except Exception as e:
@@ -564,59 +608,12 @@ class BookingManagementService:
     ) -> Dict[str, Any]:
         """Get booking analytics for date range"""
         try:
-            # Build base query
-            stmt = select(Booking).where(
-                and_(
-                    Booking.created_at >= datetime.combine(start_date, datetime.min.time()),
-                    Booking.created_at <= datetime.combine(end_date, datetime.max.time())
-                )
-            )
-            
-            # Apply role-based filters
-            if user_role == 'host':
-                stmt = stmt.where(Booking.host_id == user_id)
-            elif user_role == 'guest':
-                stmt = stmt.where(Booking.guest_id == user_id)
-            
-            result = await self.db.execute(stmt)
-            bookings = result.scalars().all()
-            
-            # Calculate metrics
-            total_bookings = len(bookings)
-            confirmed_bookings = sum(1 for b in bookings if b.status == BookingStatus.CONFIRMED)
-            cancelled_bookings = sum(1 for b in bookings if b.status == BookingStatus.CANCELLED)
-            
-            total_revenue = sum(b.total_amount for b in bookings if b.status in [
-                BookingStatus.CONFIRMED, BookingStatus.CHECKED_IN, 
-                BookingStatus.CHECKED_OUT, BookingStatus.COMPLETED
-            ])
-            
-            average_booking_value = total_revenue / total_bookings if total_bookings > 0 else Decimal('0')
-            
-            confirmation_rate = (confirmed_bookings / total_bookings * 100) if total_bookings > 0 else 0
-            cancellation_rate = (cancelled_bookings / total_bookings * 100) if total_bookings > 0 else 0
+            if user_role == 'guest':
+                return await self.analytics.get_guest_analytics(user_id, start_date, end_date)
             
-            # Calculate average lead time
-            lead_times = []
-            for booking in bookings:
-                if booking.status == BookingStatus.CONFIRMED and booking.confirmed_at:
-                    lead_time = (booking.check_in_date - booking.confirmed_at.date()).days
-                    lead_times.append(lead_time)
-            
-            avg_lead_time = sum(lead_times) / len(lead_times) if lead_times else 0
-            
-            return {
-                'total_bookings': total_bookings,
-                'confirmed_bookings': confirmed_bookings,
-                'cancelled_bookings': cancelled_bookings,
-                'total_revenue': float(total_revenue),
-                'average_booking_value': float(average_booking_value),
-                'confirmation_rate': round(confirmation_rate, 1),
-                'cancellation_rate': round(cancellation_rate, 1),
-                'average_lead_time_days': round(avg_lead_time, 1),
-                'period_start': start_date,
-                'period_end': end_date
-            }
+            # Hosts and admins read the daily per-property summary
+            host_id = user_id if user_role == 'host' else None
+            return await self.analytics.get_analytics(start_date, end_date, host_id=host_id)
             
         except Exception as e:
             logger.error(f"Error getting booking analytics: {str(e)}")
@@ -895,14 +892,8 @@ class BookingManagementService:
         )
     
     async def _generate_booking_number(self) -> str:
-        """Generate unique booking number"""
-        # Simple implementation - in production, use a more sophisticated system
-        import random
-        import string
-        
-        prefix = "TQ"
-        suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        return f"{prefix}{suffix}"
+        """Allocate a unique booking number from the leased block (no DB lookup)"""
+        return await self.number_allocator.allocate()
     
     async def _validate_status_transition(
         self,
@@ -1151,11 +1142,12 @@ class BookingManagementService:
         
         return data
     
-    async def _booking_requires_action(
+    def _booking_requires_action(
         self,
         booking: Booking,
         user_id: UUID,
-        user_role: str
+        user_role: str,
+        has_successful_payment: bool = False
     ) -> bool:
         """Check if booking requires user action"""
         if user_role == 'host':
@@ -1172,7 +1164,7 @@ class BookingManagementService:
             return (
                 booking.status == BookingStatus.CONFIRMED and
                 booking.guest_id == user_id and
-                not any(p.status == PaymentStatus.SUCCEEDED for p in booking.payments)
+                not has_successful_payment
             )
         
         return False
@@ -1180,28 +1172,20 @@ class BookingManagementService:
 
 # Utility functions for booking management
 
-async def auto_decline_expired_bookings(db_session: AsyncSession) -> int:
+async def auto_decline_expired_bookings(
+    db_session: AsyncSession,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
     """Auto-decline bookings that have expired host response deadlines"""
     try:
-        stmt = select(Booking).where(
-            and_(
-                Booking.status == BookingStatus.PENDING,
-                Booking.host_response_deadline <= datetime.utcnow()
-            )
-        )
-        
-        result = await db_session.execute(stmt)
-        expired_bookings = result.scalars().all()
-        
-        for booking in expired_bookings:
-            booking.status = BookingStatus.DECLINED
-            booking.declined_at = datetime.utcnow()
-            booking.decline_reason = "Host response deadline expired"
+        runner = BookingLifecycleBatchRunner(db_session, chunk_size)
+        report = await runner.run(AUTO_DECLINE_JOB)
         
-        await db_session.commit()
-        
-        logger.info(f"Auto-declined {len(expired_bookings)} expired bookings")
-        return len(expired_bookings)
+        logger.info(
+            f"Auto-declined {report.rows} expired bookings "
+            f"({report.rows_per_second:.0f} rows/s)"
+        )
+        return report.rows
         
     except Exception as e:
         logger.error(f"Error auto-declining expired bookings: {str(e)}")
@@ -1209,59 +1193,43 @@ async def auto_decline_expired_bookings(db_session: AsyncSession) -> int:
         return 0
 
 
-async def send_checkin_reminders(db_session: AsyncSession) -> int:
-    """Send check-in reminders for upcoming bookings"""
+async def send_checkin_reminders(
+    db_session: AsyncSession,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """Queue check-in reminders for bookings starting tomorrow"""
     try:
-        tomorrow = date.today() + timedelta(days=1)
+        runner = BookingLifecycleBatchRunner(db_session, chunk_size)
+        report = await runner.run(CHECKIN_REMINDER_JOB)
         
-        stmt = select(Booking).where(
-            and_(
-                Booking.status == BookingStatus.CONFIRMED,
-                Booking.check_in_date == tomorrow
-            )
+        logger.info(
+            f"Queued {report.notifications} check-in reminders "
+            f"({report.rows_per_second:.0f} rows/s)"
         )
-        
-        result = await db_session.execute(stmt)
-        upcoming_bookings = result.scalars().all()
-        
-        reminder_count = 0
-        for booking in upcoming_bookings:
-            # In production, would send actual email/SMS
-            logger.info(f"Check-in reminder for booking {booking.booking_number}")
-            reminder_count += 1
-        
-        return reminder_count
+        return report.rows
         
     except Exception as e:
         logger.error(f"Error sending check-in reminders: {str(e)}")
+        await db_session.rollback()
         return 0
 
 
-async def auto_complete_bookings(db_session: AsyncSession) -> int:
+async def auto_complete_bookings(
+    db_session: AsyncSession,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
     """Auto-complete bookings after checkout date"""
     try:
-        yesterday = date.today() - timedelta(days=1)
+        runner = BookingLifecycleBatchRunner(db_session, chunk_size)
+        report = await runner.run(AUTO_COMPLETE_JOB)
         
-        stmt = select(Booking).where(
-            and_(
-                Booking.status == BookingStatus.CHECKED_OUT,
-                Booking.check_out_date <= yesterday
-            )
+        logger.info(
+            f"Auto-completed {report.rows} bookings "
+            f"({report.rows_per_second:.0f} rows/s)"
         )
-        
-        result = await db_session.execute(stmt)
-        completed_bookings = result.scalars().all()
-        
-        for booking in completed_bookings:
-            booking.status = BookingStatus.COMPLETED
-            booking.completed_at = datetime.utcnow()
-        
-        await db_session.commit()
-        
-        logger.info(f"Auto-completed {len(completed_bookings)} bookings")
-        return len(completed_bookings)
+        return report.rows
         
     except Exception as e:
         logger.error(f"Error auto-completing bookings: {str(e)}")
         await db_session.rollback()
-        return 0
\ No newline at end of file
+        return 0
@@ -0,0 +1,498 @@
+"""Range loader for property calendar views
+
+Loads everything a calendar view needs for a date window (bookings,
+external and manual blocks, seasonal pricing and minimum-stay rules) in
+two queries, then assembles the per-day view with interval arithmetic over
+day offsets instead of querying and scanning once per day.
+
+Assembled days are cached per property and calendar month. Each cached
+month carries the property's calendar version (row count and latest
+updated_at of its bookings and calendar rows), which is read with one small
+aggregate query per view, so a booking or block written by any process
+makes the cached months stale. Local writes also invalidate explicitly, and
+entries expire after a TTL to bound memory held by idle properties.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking_models import Booking, BookingCalendarSync, BookingStatus
+
+logger = logging.getLogger(__name__)
+
+
+EXTERNAL_CALENDAR_TYPES = ('airbnb', 'vrbo', 'booking_com', 'ical')
+RULE_CALENDAR_TYPES = ('pricing_rule', 'minimum_stay_rule')
+OCCUPYING_STATUSES = (
+    BookingStatus.CONFIRMED,
+    BookingStatus.CHECKED_IN,
+    BookingStatus.CHECKED_OUT,
+)
+
+DEFAULT_BASE_PRICE = Decimal('100.00')  # Would come from property service
+MINIMUM_PRICE = Decimal('0.01')
+DEFAULT_MINIMUM_STAY = 1
+
+MonthKey = Tuple[int, int]
+CalendarVersion = Tuple[Any, ...]
+
+
+def month_start(value: date) -> date:
+    """First day of the month containing value"""
+    return value.replace(day=1)
+
+
+def next_month_start(value: date) -> date:
+    """First day of the month after the one containing value"""
+    if value.month == 12:
+        return date(value.year + 1, 1, 1)
+    return date(value.year, value.month + 1, 1)
+
+
+def months_between(start_date: date, end_date: date) -> List[MonthKey]:
+    """Calendar months touched by the inclusive range [start_date, end_date]"""
+    months = []
+    current = month_start(start_date)
+    while current <= end_date:
+        months.append((current.year, current.month))
+        current = next_month_start(current)
+    return months
+
+
+@dataclass
+class CalendarInterval:
+    """Half-open [start, end) occupancy interval of a booking or block"""
+    kind: str  # internal, external, manual_block
+    key: str
+    start: date
+    end: date
+    payload: Dict[str, Any]
+    status: Optional[str] = None
+
+    def overlaps(self, start_date: date, end_date: date) -> bool:
+        """Whether the interval touches the inclusive range [start_date, end_date]"""
+        return self.start <= end_date and self.end > start_date
+
+
+@dataclass
+class CalendarSegment:
+    """Assembled days of one calendar month for one property"""
+    days: Dict[date, Dict[str, Any]]
+    intervals: List[CalendarInterval]
+    version: Optional[CalendarVersion] = None
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class CalendarRangeData:
+    """Raw rows for a property calendar window"""
+    bookings: List[Booking] = field(default_factory=list)
+    external_blocks: List[BookingCalendarSync] = field(default_factory=list)
+    manual_blocks: List[BookingCalendarSync] = field(default_factory=list)
+    pricing_rules: List[BookingCalendarSync] = field(default_factory=list)
+    stay_rules: List[BookingCalendarSync] = field(default_factory=list)
+
+
+class CalendarSegmentCache:
+    """LRU cache of assembled calendar months keyed by property"""
+
+    def __init__(self, max_properties: int = 2048, ttl_seconds: float = 300.0):
+        self.max_properties = max_properties
+        self.ttl_seconds = ttl_seconds
+        self._segments: "OrderedDict[UUID, Dict[Tuple[MonthKey, bool], CalendarSegment]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        property_id: UUID,
+        month: MonthKey,
+        include_external: bool,
+        version: Optional[CalendarVersion] = None
+    ) -> Optional[CalendarSegment]:
+        """Return a fresh cached segment built at the given calendar version, or None"""
+        segments = self._segments.get(property_id)
+        segment = segments.get((month, include_external)) if segments else None
+
+        if (
+            segment is None
+            or segment.version != version
+            or time.monotonic() - segment.loaded_at > self.ttl_seconds
+        ):
+            self.misses += 1
+            return None
+
+        self._segments.move_to_end(property_id)
+        self.hits += 1
+        return segment
+
+    def put(
+        self,
+        property_id: UUID,
+        month: MonthKey,
+        include_external: bool,
+        segment: CalendarSegment
+    ) -> None:
+        """Store a segment, evicting the least recently used property if full"""
+        self._segments.setdefault(property_id, {})[(month, include_external)] = segment
+        self._segments.move_to_end(property_id)
+
+        while len(self._segments) > self.max_properties:
+            self._segments.popitem(last=False)
+
+    def invalidate(self, property_id: UUID) -> None:
+        """Drop every cached month of a property after a booking or price change"""
+        if self._segments.pop(property_id, None) is not None:
+            logger.debug(f"Invalidated calendar segments for property {property_id}")
+
+    def clear(self) -> None:
+        self._segments.clear()
+
+
+@lru_cache()
+def get_calendar_segment_cache() -> CalendarSegmentCache:
+    """Process-wide calendar segment cache"""
+    return CalendarSegmentCache()
+
+
+def invalidate_property_calendar(property_id: UUID) -> None:
+    """Invalidate cached calendar months for a property"""
+    get_calendar_segment_cache().invalidate(property_id)
+
+
+class CalendarRangeLoader:
+    """Builds property calendar views from whole-window queries"""
+
+    def __init__(self, db_session: AsyncSession, cache: Optional[CalendarSegmentCache] = None):
+        self.db = db_session
+        self.cache = cache if cache is not None else get_calendar_segment_cache()
+
+    async def get_calendar(
+        self,
+        property_id: UUID,
+        start_date: date,
+        end_date: date,
+        include_external: bool = True
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
+        """
+        Return day data keyed by ISO date and interval counts for the
+        inclusive range [start_date, end_date]
+
+        Cached months built at the current calendar version are reused; all
+        missing months are loaded together with a single pair of queries.
+        """
+        months = months_between(start_date, end_date)
+        version = await self.load_version(property_id)
+        segments: Dict[MonthKey, CalendarSegment] = {}
+        missing: List[MonthKey] = []
+
+        for month in months:
+            segment = self.cache.get(property_id, month, include_external, version)
+            if segment is None:
+                missing.append(month)
+            else:
+                segments[month] = segment
+
+        if missing:
+            load_start = date(missing[0][0], missing[0][1], 1)
+            load_end = next_month_start(date(missing[-1][0], missing[-1][1], 1)) - timedelta(days=1)
+
+            range_data = await self.load_range(property_id, load_start, load_end, include_external)
+            loaded = self.assemble_segments(range_data, load_start, load_end)
+
+            for month, segment in loaded.items():
+                segment.version = version
+                self.cache.put(property_id, month, include_external, segment)
+                if month in missing:
+                    segments[month] = segment
+
+        calendar: Dict[str, Dict[str, Any]] = {}
+        intervals: Dict[Tuple[str, str], CalendarInterval] = {}
+
+        for month in months:
+            segment = segments[month]
+            for day, day_data in segment.days.items():
+                if start_date <= day <= end_date:
+                    calendar[day.strftime('%Y-%m-%d')] = self._copy_day(day_data)
+            for interval in segment.intervals:
+                if interval.overlaps(start_date, end_date):
+                    intervals[(interval.kind, interval.key)] = interval
+
+        counts = {'internal': 0, 'external': 0, 'manual_block': 0}
+        for kind, _ in intervals:
+            counts[kind] += 1
+
+        return calendar, counts
+
+    async def load_version(self, property_id: UUID) -> CalendarVersion:
+        """Row counts and latest updates of a property's bookings and calendar rows"""
+        stmt = select(
+            select(func.count(Booking.id))
+            .where(Booking.property_id == property_id).scalar_subquery(),
+            select(func.max(Booking.updated_at))
+            .where(Booking.property_id == property_id).scalar_subquery(),
+            select(func.count(BookingCalendarSync.id))
+            .where(BookingCalendarSync.property_id == property_id).scalar_subquery(),
+            select(func.max(BookingCalendarSync.updated_at))
+            .where(BookingCalendarSync.property_id == property_id).scalar_subquery(),
+        )
+
+        result = await self.db.execute(stmt)
+        return tuple(result.one())
+
+    async def load_range(
+        self,
+        property_id: UUID,
+        start_date: date,
+        end_date: date,
+        include_external: bool = True
+    ) -> CalendarRangeData:
+        """Fetch bookings, blocks and rules overlapping [start_date, end_date]"""
+        window_end = end_date + timedelta(days=1)
+        data = CalendarRangeData()
+
+        booking_stmt = select(Booking).where(
+            and_(
+                Booking.property_id == property_id,
+                Booking.status.in_(OCCUPYING_STATUSES),
+                Booking.check_in_date < window_end,
+                Booking.check_out_date > start_date
+            )
+        ).order_by(Booking.check_in_date, Booking.id)
+
+        result = await self.db.execute(booking_stmt)
+        data.bookings = list(result.scalars().all())
+
+        calendar_types = ['manual_block', *RULE_CALENDAR_TYPES]
+        if include_external:
+            calendar_types.extend(EXTERNAL_CALENDAR_TYPES)
+
+        rows_stmt = select(BookingCalendarSync).where(
+            and_(
+                BookingCalendarSync.property_id == property_id,
+                BookingCalendarSync.calendar_type.in_(calendar_types),
+                BookingCalendarSync.sync_status == 'active',
+                BookingCalendarSync.external_check_in < window_end,
+                BookingCalendarSync.external_check_out > start_date,
+                or_(
+                    BookingCalendarSync.is_blocking == True,
+                    BookingCalendarSync.calendar_type.in_(RULE_CALENDAR_TYPES)
+                )
+            )
+        ).order_by(BookingCalendarSync.external_check_in, BookingCalendarSync.id)
+
+        result = await self.db.execute(rows_stmt)
+        for row in result.scalars().all():
+            if row.calendar_type == 'pricing_rule':
+                data.pricing_rules.append(row)
+            elif row.calendar_type == 'minimum_stay_rule':
+                data.stay_rules.append(row)
+            elif row.calendar_type == 'manual_block':
+                data.manual_blocks.append(row)
+            else:
+                data.external_blocks.append(row)
+
+        return data
+
+    def assemble_segments(
+        self,
+        data: CalendarRangeData,
+        start_date: date,
+        end_date: date
+    ) -> Dict[MonthKey, CalendarSegment]:
+        """Assemble per-day data for [start_date, end_date] split into months"""
+        days = (end_date - start_date).days + 1
+
+        prices = self._price_by_offset(data.pricing_rules, start_date, days)
+        minimum_stays = self._minimum_stay_by_offset(data.stay_rules, start_date, days)
+
+        internal = self._booking_intervals(data.bookings)
+        external = self._block_intervals(data.external_blocks, 'external')
+        manual = self._block_intervals(data.manual_blocks, 'manual_block')
+
+        # First matching interval wins within a kind; kinds rank internal > external > manual
+        occupants: List[Optional[CalendarInterval]] = [None] * days
+        for intervals in (internal, external, manual):
+            for interval in intervals:
+                first, last = self._clip(interval.start, interval.end, start_date, days)
+                for offset in range(first, last):
+                    if occupants[offset] is None:
+                        occupants[offset] = interval
+
+        segments: Dict[MonthKey, CalendarSegment] = {}
+        all_intervals = internal + external + manual
+
+        for month in months_between(start_date, end_date):
+            month_first = date(month[0], month[1], 1)
+            month_last = next_month_start(month_first) - timedelta(days=1)
+            segments[month] = CalendarSegment(
+                days={},
+                intervals=[i for i in all_intervals if i.overlaps(month_first, month_last)]
+            )
+
+        current_date = start_date
+        for offset in range(days):
+            occupant = occupants[offset]
+            is_available = occupant is None
+
+            day_data = {
+                'date': current_date,
+                'is_available': is_available,
+                'availability_status': self._availability_status(occupant),
+                'price': prices[offset],
+                'minimum_stay': minimum_stays[offset],
+                'check_in_allowed': is_available,
+                'check_out_allowed': True,  # Generally always allowed
+            }
+
+            if occupant is not None:
+                day_data['booking'] = {
+                    **occupant.payload,
+                    'is_check_in': current_date == occupant.start,
+                    'is_check_out': current_date == occupant.end - timedelta(days=1)
+                }
+
+            segments[(current_date.year, current_date.month)].days[current_date] = day_data
+            current_date += timedelta(days=1)
+
+        return segments
+
+    @staticmethod
+    def _copy_day(day_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy cached day data so callers never mutate the cache"""
+        copied = dict(day_data)
+        if 'booking' in copied:
+            copied['booking'] = dict(copied['booking'])
+        return copied
+
+    # Interval helpers
+
+    @staticmethod
+    def _clip(start: date, end: date, window_start: date, days: int) -> Tuple[int, int]:
+        """Clip a half-open date interval to day offsets within the window"""
+        first = max((start - window_start).days, 0)
+        last = min((end - window_start).days, days)
+        return first, max(first, last)
+
+    def _price_by_offset(
+        self,
+        rules: Iterable[BookingCalendarSync],
+        start_date: date,
+        days: int
+    ) -> List[Decimal]:
+        """Apply seasonal pricing rules to the day offsets they cover"""
+        prices = [DEFAULT_BASE_PRICE] * days
+
+        for rule in rules:
+            if not rule.notes or 'price_adjustment' not in rule.notes:
+                continue
+
+            adjustment = Decimal(str(rule.notes['price_adjustment']))
+            is_percentage = rule.notes.get('adjustment_type', 'fixed') == 'percentage'
+            factor = Decimal('1') + adjustment / Decimal('100')
+
+            first, last = self._clip(rule.external_check_in, rule.external_check_out, start_date, days)
+            for offset in range(first, last):
+                prices[offset] = prices[offset] * factor if is_percentage else prices[offset] + adjustment
+
+        return [max(price, MINIMUM_PRICE) for price in prices]
+
+    def _minimum_stay_by_offset(
+        self,
+        rules: Iterable[BookingCalendarSync],
+        start_date: date,
+        days: int
+    ) -> List[int]:
+        """Highest minimum-stay requirement covering each day offset"""
+        minimum_stays = [DEFAULT_MINIMUM_STAY] * days
+
+        for rule in rules:
+            if not rule.notes or 'minimum_stay' not in rule.notes:
+                continue
+
+            rule_min_stay = rule.notes['minimum_stay']
+            first, last = self._clip(rule.external_check_in, rule.external_check_out, start_date, days)
+            for offset in range(first, last):
+                if rule_min_stay > minimum_stays[offset]:
+                    minimum_stays[offset] = rule_min_stay
+
+        return minimum_stays
+
+    @staticmethod
+    def _booking_intervals(bookings: Iterable[Booking]) -> List[CalendarInterval]:
+        return [
+            CalendarInterval(
+                kind='internal',
+                key=str(booking.id),
+                start=booking.check_in_date,
+                end=booking.check_out_date,
+                status=booking.status,
+                payload={
+                    'type': 'internal',
+                    'booking_id': booking.id,
+                    'booking_number': booking.booking_number,
+                    'guest_name': booking.guest_name,
+                    'status': booking.status,
+                }
+            )
+            for booking in bookings
+        ]
+
+    @staticmethod
+    def _block_intervals(blocks: Iterable[BookingCalendarSync], kind: str) -> List[CalendarInterval]:
+        intervals = []
+
+        for block in blocks:
+            if kind == 'manual_block':
+                payload = {
+                    'type': 'manual_block',
+                    'reason': block.external_guest_name,  # Contains block reason
+                }
+            else:
+                payload = {
+                    'type': 'external',
+                    'source': block.calendar_type,
+                    'external_id': block.external_booking_id,
+                    'guest_name': block.external_guest_name,
+                }
+
+            intervals.append(CalendarInterval(
+                kind=kind,
+                key=str(block.id),
+                start=block.external_check_in,
+                end=block.external_check_out,
+                status=block.calendar_type,
+                payload=payload
+            ))
+
+        return intervals
+
+    @staticmethod
+    def _availability_status(occupant: Optional[CalendarInterval]) -> str:
+        """Determine availability status for a date"""
+        if occupant is None:
+            return 'available'
+
+        if occupant.kind == 'internal':
+            if occupant.status == BookingStatus.CONFIRMED:
+                return 'booked'
+            elif occupant.status == BookingStatus.CHECKED_IN:
+                return 'occupied'
+            elif occupant.status == BookingStatus.CHECKED_OUT:
+                return 'checkout'
+            return 'available'
+
+        if occupant.kind == 'external':
+            return f'external_{occupant.status}'
+
+        return 'manually_blocked'
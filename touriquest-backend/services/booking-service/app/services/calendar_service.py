@@ -14,12 +14,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, func, delete
 from sqlalchemy.orm import selectinload
 
-from app.models.booking_models import (
-    BookingCalendarSync, Booking, BookingStatus
-)
+from app.models.booking_models import BookingCalendarSync
 from app.schemas.booking_schemas import (
     CalendarSyncRequest, CalendarSyncResponse
 )
+from app.services.calendar_range_loader import (
+    CalendarRangeLoader, invalidate_property_calendar
+)
+from app.services.ical_sync_engine import (
+    FeedResult, IcalSyncEngine, diff_calendar_blocks
+)
 
 logger = logging.getLogger(__name__)
 
@@ -216,100 +220,11 @@ class CalendarManagementService:
         - Availability status
         """
         try:
-            calendar_data = {}
-            
-            # Get internal bookings
-            internal_bookings = await self._get_internal_bookings(
-                property_id, start_date, end_date
+            loader = CalendarRangeLoader(self.db)
+            calendar_data, interval_counts = await loader.get_calendar(
+                property_id, start_date, end_date, include_external
             )
             
-            # Get external calendar blocks
-            external_blocks = []
-            if include_external:
-                external_blocks = await self._get_external_blocks(
-                    property_id, start_date, end_date
-                )
-            
-            # Get manual blocks
-            manual_blocks = await self._get_manual_blocks(
-                property_id, start_date, end_date
-            )
-            
-            # Build calendar data day by day
-            current_date = start_date
-            while current_date <= end_date:
-                date_str = current_date.strftime('%Y-%m-%d')
-                
-                # Check for internal booking
-                internal_booking = None
-                for booking in internal_bookings:
-                    if booking.check_in_date <= current_date < booking.check_out_date:
-                        internal_booking = booking
-                        break
-                
-                # Check for external blocks
-                external_block = None
-                for block in external_blocks:
-                    if block.external_check_in <= current_date < block.external_check_out:
-                        external_block = block
-                        break
-                
-                # Check for manual blocks
-                manual_block = None
-                for block in manual_blocks:
-                    if block.external_check_in <= current_date < block.external_check_out:
-                        manual_block = block
-                        break
-                
-                # Determine availability status
-                is_available = not (internal_booking or external_block or manual_block)
-                
-                # Build day data
-                day_data = {
-                    'date': current_date,
-                    'is_available': is_available,
-                    'availability_status': self._determine_availability_status(
-                        internal_booking, external_block, manual_block
-                    ),
-                    'price': await self._get_date_pricing(property_id, current_date),
-                    'minimum_stay': await self._get_minimum_stay(property_id, current_date),
-                    'check_in_allowed': is_available,
-                    'check_out_allowed': True,  # Generally always allowed
-                }
-                
-                # Add booking information if occupied
-                if internal_booking:
-                    day_data['booking'] = {
-                        'type': 'internal',
-                        'booking_id': internal_booking.id,
-                        'booking_number': internal_booking.booking_number,
-                        'guest_name': internal_booking.guest_name,
-                        'status': internal_booking.status,
-                        'is_check_in': current_date == internal_booking.check_in_date,
-                        'is_check_out': current_date == internal_booking.check_out_date - timedelta(days=1)
-                    }
-                
-                elif external_block:
-                    day_data['booking'] = {
-                        'type': 'external',
-                        'source': external_block.calendar_type,
-                        'external_id': external_block.external_booking_id,
-                        'guest_name': external_block.external_guest_name,
-                        'is_check_in': current_date == external_block.external_check_in,
-                        'is_check_out': current_date == external_block.external_check_out - timedelta(days=1)
-                    }
-                
-                elif manual_block:
-                    day_data['booking'] = {
-                        'type': 'manual_block',
-                        'reason': manual_block.external_guest_name,  # Contains block reason
-                        'is_check_in': current_date == manual_block.external_check_in,
-                        'is_check_out': current_date == manual_block.external_check_out - timedelta(days=1)
-                    }
-                
-                calendar_data[date_str] = day_data
-                current_date += timedelta(days=1)
-            
             # Calculate summary statistics
             total_days = len(calendar_data)
             available_days = sum(1 for day in calendar_data.values() if day['is_available'])
@@ -325,9 +240,9 @@ class CalendarManagementService:
                     'available_days': available_days,
                     'booked_days': booked_days,
                     'occupancy_rate': (booked_days / total_days * 100) if total_days > 0 else 0,
-                    'internal_bookings': len(internal_bookings),
-                    'external_blocks': len(external_blocks),
-                    'manual_blocks': len(manual_blocks)
+                    'internal_bookings': interval_counts['internal'],
+                    'external_blocks': interval_counts['external'],
+                    'manual_blocks': interval_counts['manual_block']
                 },
                 'sync_status': await self._get_sync_status_summary(property_id)
             }
@@ -388,6 +303,7 @@ class CalendarManagementService:
             
             self.db.add(pricing_rule)
             await self.db.commit()
+            invalidate_property_calendar(property_id)
             
             logger.info(f"Created seasonal pricing rule {pricing_rule.id} for property {property_id}")
             
@@ -441,6 +357,7 @@ class CalendarManagementService:
                 created_rules.append(rule.id)
             
             await self.db.commit()
+            invalidate_property_calendar(property_id)
             
             logger.info(f"Updated minimum stay requirements for property {property_id}")
             
@@ -459,6 +376,7 @@ class CalendarManagementService:
                 and_(
                     BookingCalendarSync.sync_status == 'active',
                     BookingCalendarSync.calendar_url.isnot(None),
+                    BookingCalendarSync.calendar_sync_id.is_(None),
                     or_(
                         BookingCalendarSync.next_sync_at.is_(None),
                         BookingCalendarSync.next_sync_at <= datetime.utcnow()
@@ -476,10 +394,19 @@ class CalendarManagementService:
                 'sync_details': []
             }
             
-            # Process each calendar
-            for calendar_sync in calendars_to_sync:
-                try:
-                    sync_result = await self._perform_calendar_sync(calendar_sync)
+            # Fetch all feeds concurrently, then apply the changes in one pass
+            engine = IcalSyncEngine()
+            feed_results = await engine.fetch_all(calendars_to_sync)
+            feeds = list(zip(calendars_to_sync, feed_results))
+            
+            block_counts = await self._apply_feed_results(
+                [(c, feed) for c, feed in feeds if feed.status != 'error']
+            )
+            sync_results['fetch_stats'] = engine.last_run.to_dict()
+            
+            for calendar_sync, feed in feeds:
+                if feed.status != 'error':
+                    sync_result = self._build_sync_result(feed, block_counts[calendar_sync.id])
                     
                     # Update sync record
                     calendar_sync.last_sync_at = datetime.utcnow()
@@ -495,13 +422,14 @@ class CalendarManagementService:
                         'property_id': calendar_sync.property_id,
                         'calendar_type': calendar_sync.calendar_type,
                         'status': 'success',
-                        'synced_events': sync_result.get('synced_events', 0)
+                        'feed_status': feed.status,
+                        'synced_events': sync_result['synced_events']
                     })
                     
-                except Exception as sync_error:
-                    logger.error(f"Failed to sync calendar {calendar_sync.id}: {str(sync_error)}")
+                else:
+                    logger.error(f"Failed to sync calendar {calendar_sync.id}: {feed.error}")
                     
-                    calendar_sync.last_error = str(sync_error)
+                    calendar_sync.last_error = feed.error
                     calendar_sync.consecutive_failures = (calendar_sync.consecutive_failures or 0) + 1
                     
                     # Disable after too many failures
@@ -514,7 +442,7 @@ class CalendarManagementService:
                         'property_id': calendar_sync.property_id,
                         'calendar_type': calendar_sync.calendar_type,
                         'status': 'failed',
-                        'error': str(sync_error)
+                        'error': feed.error
                     })
             
             await self.db.commit()
@@ -589,190 +517,103 @@ class CalendarManagementService:
             if not calendar_sync.calendar_url:
                 raise CalendarSyncError("No calendar URL configured")
             
-            # Download calendar data
-            calendar_data = await self._download_calendar_data(calendar_sync.calendar_url)
+            feeds = await IcalSyncEngine(max_concurrency=1).fetch_all([calendar_sync])
+            feed = feeds[0]
+            if feed.status == 'error':
+                raise CalendarSyncError(feed.error)
             
-            # Parse calendar events
-            events = await self._parse_ical_data(calendar_data)
+            block_counts = await self._apply_feed_results([(calendar_sync, feed)])
             
-            # Process events for this property
-            sync_result = await self._process_calendar_events(
-                calendar_sync, events
-            )
-            
-            return {
-                'synced_events': len(events),
-                'added_blocks': sync_result['added'],
-                'updated_blocks': sync_result['updated'],
-                'removed_blocks': sync_result['removed'],
-                'sync_time': datetime.utcnow().isoformat()
-            }
+            return self._build_sync_result(feed, block_counts[calendar_sync.id])
             
         except Exception as e:
             logger.error(f"Calendar sync error: {str(e)}")
             raise CalendarSyncError(f"Sync failed: {str(e)}")
     
-    async def _download_calendar_data(self, url: str) -> str:
-        """Download calendar data from URL"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=30) as response:
-                    if response.status != 200:
-                        raise CalendarSyncError(f"Failed to download calendar: HTTP {response.status}")
-                    
-                    return await response.text()
-                    
-        except aiohttp.ClientError as e:
-            raise CalendarSyncError(f"Network error downloading calendar: {str(e)}")
+    def _build_sync_result(self, feed: FeedResult, block_counts: Dict[str, int]) -> Dict[str, Any]:
+        """Summarize a feed fetch and the block changes it produced"""
+        return {
+            'synced_events': len(feed.events),
+            'feed_status': feed.status,
+            'added_blocks': block_counts['added'],
+            'updated_blocks': block_counts['updated'],
+            'removed_blocks': block_counts['removed'],
+            'sync_time': datetime.utcnow().isoformat()
+        }
     
-    async def _parse_ical_data(self, ical_data: str) -> List[Dict[str, Any]]:
-        """Parse iCal data and extract events"""
-        events = []
+    async def _apply_feed_results(
+        self,
+        feeds: List[Tuple[BookingCalendarSync, FeedResult]]
+    ) -> Dict[UUID, Dict[str, int]]:
+        """
+        Apply fetched feeds to stored blocks
+        
+        Existing blocks of every changed feed are loaded with one query and
+        only the diff is written. Feeds that were not modified or hashed
+        the same as last time only have their validators refreshed.
+        """
+        block_counts = {
+            calendar_sync.id: {'added': 0, 'updated': 0, 'removed': 0}
+            for calendar_sync, _ in feeds
+        }
+        changed = [(c, feed) for c, feed in feeds if feed.status == 'changed']
         
         try:
-            # Simple iCal parser (in production, use proper library like icalendar)
-            current_event = None
-            
-            for line in ical_data.split('\n'):
-                line = line.strip()
+            if changed:
+                existing_by_calendar = await self._get_existing_external_blocks(
+                    [calendar_sync.id for calendar_sync, _ in changed]
+                )
+                now = datetime.utcnow()
                 
-                if line == 'BEGIN:VEVENT':
-                    current_event = {}
+                for calendar_sync, feed in changed:
+                    diff = diff_calendar_blocks(
+                        existing_by_calendar.get(calendar_sync.id, {}), feed.events
+                    )
                     
-                elif line == 'END:VEVENT' and current_event:
-                    # Validate and add event
-                    if self._validate_calendar_event(current_event):
-                        events.append(current_event)
-                    current_event = None
+                    self.db.add_all([
+                        BookingCalendarSync(
+                            id=uuid4(),
+                            property_id=calendar_sync.property_id,
+                            calendar_sync_id=calendar_sync.id,
+                            calendar_type=calendar_sync.calendar_type,
+                            calendar_url=calendar_sync.calendar_url,
+                            sync_status='active',
+                            is_blocking=calendar_sync.auto_block_external,
+                            external_booking_id=event['uid'],
+                            external_check_in=event['start_date'],
+                            external_check_out=event['end_date'],
+                            external_guest_name=event.get('summary', 'External Booking'),
+                            last_sync_at=now
+                        )
+                        for event in diff.added
+                    ])
                     
-                elif current_event and ':' in line:
-                    key, value = line.split(':', 1)
+                    for block, event in diff.updated:
+                        block.external_check_in = event['start_date']
+                        block.external_check_out = event['end_date']
+                        block.external_guest_name = event.get('summary', 'External Booking')
+                        block.last_sync_at = now
                     
-                    # Parse important fields
-                    if key == 'DTSTART':
-                        current_event['start_date'] = self._parse_ical_date(value)
-                    elif key == 'DTEND':
-                        current_event['end_date'] = self._parse_ical_date(value)
-                    elif key == 'SUMMARY':
-                        current_event['summary'] = value
-                    elif key == 'UID':
-                        current_event['uid'] = value
-                    elif key == 'DESCRIPTION':
-                        current_event['description'] = value
-            
-            logger.info(f"Parsed {len(events)} events from iCal data")
-            return events
-            
-        except Exception as e:
-            raise CalendarParsingError(f"Failed to parse iCal data: {str(e)}")
-    
-    def _parse_ical_date(self, date_str: str) -> date:
-        """Parse iCal date format"""
-        try:
-            # Handle different date formats
-            if 'T' in date_str:
-                # DateTime format: 20231225T120000Z
-                date_part = date_str.split('T')[0]
-            else:
-                # Date format: 20231225
-                date_part = date_str
-            
-            # Parse YYYYMMDD format
-            if len(date_part) == 8:
-                year = int(date_part[:4])
-                month = int(date_part[4:6])
-                day = int(date_part[6:8])
-                return date(year, month, day)
-            
-            raise ValueError(f"Unrecognized date format: {date_str}")
-            
-        except Exception as e:
-            logger.warning(f"Failed to parse date {date_str}: {str(e)}")
-            return date.today()
-    
-    def _validate_calendar_event(self, event: Dict[str, Any]) -> bool:
-        """Validate calendar event has required fields"""
-        required_fields = ['start_date', 'end_date', 'uid']
-        
-        for field in required_fields:
-            if field not in event:
-                return False
-        
-        # Validate date order
-        if event['end_date'] <= event['start_date']:
-            return False
-        
-        return True
-    
-    async def _process_calendar_events(
-        self,
-        calendar_sync: BookingCalendarSync,
-        events: List[Dict[str, Any]]
-    ) -> Dict[str, int]:
-        """Process calendar events and update blocking records"""
-        added = updated = removed = 0
-        
-        try:
-            # Get existing external blocks for this calendar
-            existing_blocks = await self._get_existing_external_blocks(calendar_sync.id)
-            existing_uids = {block.external_booking_id: block for block in existing_blocks}
-            
-            # Process new/updated events
-            current_uids = set()
-            
-            for event in events:
-                uid = event['uid']
-                current_uids.add(uid)
-                
-                # Prepare block data
-                block_data = {
-                    'external_booking_id': uid,
-                    'external_check_in': event['start_date'],
-                    'external_check_out': event['end_date'],
-                    'external_guest_name': event.get('summary', 'External Booking'),
-                    'last_sync_at': datetime.utcnow()
-                }
-                
-                if uid in existing_uids:
-                    # Update existing block
-                    existing_block = existing_uids[uid]
+                    # Remove blocks that no longer exist in external calendar
+                    for block in diff.removed:
+                        block.sync_status = 'cancelled'
                     
-                    # Check if update needed
-                    if (existing_block.external_check_in != event['start_date'] or
-                        existing_block.external_check_out != event['end_date']):
-                        
-                        existing_block.external_check_in = event['start_date']
-                        existing_block.external_check_out = event['end_date']
-                        existing_block.external_guest_name = event.get('summary', 'External Booking')
-                        existing_block.last_sync_at = datetime.utcnow()
-                        updated += 1
-                else:
-                    # Create new block
-                    new_block = BookingCalendarSync(
-                        id=uuid4(),
-                        property_id=calendar_sync.property_id,
-                        calendar_sync_id=calendar_sync.id,
-                        calendar_type=calendar_sync.calendar_type,
-                        calendar_url=calendar_sync.calendar_url,
-                        sync_status='active',
-                        is_blocking=calendar_sync.auto_block_external,
-                        **block_data
-                    )
+                    block_counts[calendar_sync.id] = {
+                        'added': len(diff.added),
+                        'updated': len(diff.updated),
+                        'removed': len(diff.removed)
+                    }
                     
-                    self.db.add(new_block)
-                    added += 1
+                    if diff:
+                        invalidate_property_calendar(calendar_sync.property_id)
             
-            # Remove blocks that no longer exist in external calendar
-            for uid, block in existing_uids.items():
-                if uid not in current_uids:
-                    block.sync_status = 'cancelled'
-                    removed += 1
+            for calendar_sync, feed in feeds:
+                if feed.status in ('changed', 'unchanged'):
+                    calendar_sync.feed_etag = feed.etag
+                    calendar_sync.feed_last_modified = feed.last_modified
+                    calendar_sync.feed_content_hash = feed.content_hash
             
-            return {
-                'added': added,
-                'updated': updated,
-                'removed': removed
-            }
+            return block_counts
             
         except Exception as e:
             logger.error(f"Error processing calendar events: {str(e)}")
@@ -780,170 +621,23 @@ class CalendarManagementService:
     
     async def _get_existing_external_blocks(
         self,
-        calendar_sync_id: UUID
-    ) -> List[BookingCalendarSync]:
-        """Get existing external blocks for calendar sync"""
+        calendar_sync_ids: List[UUID]
+    ) -> Dict[UUID, Dict[str, BookingCalendarSync]]:
+        """Get active external blocks keyed by calendar sync and external UID"""
         stmt = select(BookingCalendarSync).where(
             and_(
-                BookingCalendarSync.calendar_sync_id == calendar_sync_id,
+                BookingCalendarSync.calendar_sync_id.in_(calendar_sync_ids),
                 BookingCalendarSync.sync_status == 'active'
             )
         )
         
         result = await self.db.execute(stmt)
-        return result.scalars().all()
-    
-    async def _get_internal_bookings(
-        self,
-        property_id: UUID,
-        start_date: date,
-        end_date: date
-    ) -> List[Booking]:
-        """Get internal bookings for date range"""
-        stmt = select(Booking).where(
-            and_(
-                Booking.property_id == property_id,
-                Booking.status.in_([
-                    BookingStatus.CONFIRMED,
-                    BookingStatus.CHECKED_IN,
-                    BookingStatus.CHECKED_OUT
-                ]),
-                Booking.check_in_date < end_date,
-                Booking.check_out_date > start_date
-            )
-        )
-        
-        result = await self.db.execute(stmt)
-        return result.scalars().all()
-    
-    async def _get_external_blocks(
-        self,
-        property_id: UUID,
-        start_date: date,
-        end_date: date
-    ) -> List[BookingCalendarSync]:
-        """Get external calendar blocks for date range"""
-        stmt = select(BookingCalendarSync).where(
-            and_(
-                BookingCalendarSync.property_id == property_id,
-                BookingCalendarSync.calendar_type.in_([
-                    'airbnb', 'vrbo', 'booking_com', 'ical'
-                ]),
-                BookingCalendarSync.sync_status == 'active',
-                BookingCalendarSync.is_blocking == True,
-                BookingCalendarSync.external_check_in < end_date,
-                BookingCalendarSync.external_check_out > start_date
-            )
-        )
-        
-        result = await self.db.execute(stmt)
-        return result.scalars().all()
-    
-    async def _get_manual_blocks(
-        self,
-        property_id: UUID,
-        start_date: date,
-        end_date: date
-    ) -> List[BookingCalendarSync]:
-        """Get manual blocks for date range"""
-        stmt = select(BookingCalendarSync).where(
-            and_(
-                BookingCalendarSync.property_id == property_id,
-                BookingCalendarSync.calendar_type == 'manual_block',
-                BookingCalendarSync.sync_status == 'active',
-                BookingCalendarSync.is_blocking == True,
-                BookingCalendarSync.external_check_in < end_date,
-                BookingCalendarSync.external_check_out > start_date
-            )
-        )
-        
-        result = await self.db.execute(stmt)
-        return result.scalars().all()
-    
-    def _determine_availability_status(
-        self,
-        internal_booking: Optional[Booking],
-        external_block: Optional[BookingCalendarSync],
-        manual_block: Optional[BookingCalendarSync]
-    ) -> str:
-        """Determine availability status for a date"""
-        if internal_booking:
-            if internal_booking.status == BookingStatus.CONFIRMED:
-                return 'booked'
-            elif internal_booking.status == BookingStatus.CHECKED_IN:
-                return 'occupied'
-            elif internal_booking.status == BookingStatus.CHECKED_OUT:
-                return 'checkout'
-        
-        elif external_block:
-            return f'external_{external_block.calendar_type}'
-        
-        elif manual_block:
-            return 'manually_blocked'
-        
-        return 'available'
-    
-    async def _get_date_pricing(self, property_id: UUID, target_date: date) -> Decimal:
-        """Get pricing for specific date including seasonal adjustments"""
-        # Base price (would come from property service)
-        base_price = Decimal('100.00')
-        
-        # Get seasonal pricing rules
-        stmt = select(BookingCalendarSync).where(
-            and_(
-                BookingCalendarSync.property_id == property_id,
-                BookingCalendarSync.calendar_type == 'pricing_rule',
-                BookingCalendarSync.sync_status == 'active',
-                BookingCalendarSync.external_check_in <= target_date,
-                BookingCalendarSync.external_check_out > target_date
-            )
-        )
-        
-        result = await self.db.execute(stmt)
-        pricing_rules = result.scalars().all()
-        
-        final_price = base_price
-        
-        for rule in pricing_rules:
-            if rule.notes and 'price_adjustment' in rule.notes:
-                adjustment = Decimal(str(rule.notes['price_adjustment']))
-                adjustment_type = rule.notes.get('adjustment_type', 'fixed')
-                
-                if adjustment_type == 'percentage':
-                    final_price = final_price * (Decimal('1') + adjustment / Decimal('100'))
-                else:  # fixed
-                    final_price = final_price + adjustment
-        
-        return max(final_price, Decimal('0.01'))  # Minimum price
-    
-    async def _get_minimum_stay(self, property_id: UUID, target_date: date) -> int:
-        """Get minimum stay requirement for specific date"""
-        # Default minimum stay
-        default_min_stay = 1
-        
-        # Get minimum stay rules
-        stmt = select(BookingCalendarSync).where(
-            and_(
-                BookingCalendarSync.property_id == property_id,
-                BookingCalendarSync.calendar_type == 'minimum_stay_rule',
-                BookingCalendarSync.sync_status == 'active',
-                BookingCalendarSync.external_check_in <= target_date,
-                BookingCalendarSync.external_check_out > target_date
-            )
-        )
-        
-        result = await self.db.execute(stmt)
-        stay_rules = result.scalars().all()
-        
-        # Return the highest minimum stay requirement
-        max_min_stay = default_min_stay
         
-        for rule in stay_rules:
-            if rule.notes and 'minimum_stay' in rule.notes:
-                rule_min_stay = rule.notes['minimum_stay']
-                max_min_stay = max(max_min_stay, rule_min_stay)
+        blocks: Dict[UUID, Dict[str, BookingCalendarSync]] = {}
+        for block in result.scalars().all():
+            blocks.setdefault(block.calendar_sync_id, {})[block.external_booking_id] = block
         
-        return max_min_stay
+        return blocks
     
     async def _get_sync_status_summary(self, property_id: UUID) -> Dict[str, Any]:
         """Get sync status summary for property"""
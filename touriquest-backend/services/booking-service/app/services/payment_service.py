@@ -2,7 +2,7 @@
 
 import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple
 from decimal import Decimal
 from uuid import UUID, uuid4
@@ -21,6 +21,11 @@ from app.schemas.booking_schemas import (
     PaymentMethodRequest, PaymentProcessRequest, PaymentResponse,
     RefundCalculation, BookingCancellationResponse
 )
+from app.services.booking_analytics_engine import BookingSummaryState, record_booking_change
+from app.services.stripe_webhook_pipeline import (
+    StripeWebhookWorkerPool, enqueue_webhook_event,
+    mark_failed_payments_for_retry, run_scheduled_payouts
+)
 
 logger = logging.getLogger(__name__)
 
@@ -46,10 +51,16 @@ class PaymentDeclinedError(PaymentError):
 class PaymentProcessingService:
     """Service for handling payments with Stripe Connect integration"""
     
-    def __init__(self, db_session: AsyncSession, stripe_api_key: str):
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        stripe_api_key: str,
+        webhook_workers: Optional[StripeWebhookWorkerPool] = None
+    ):
         self.db = db_session
         stripe.api_key = stripe_api_key
         self._webhook_endpoint_secret = None  # Set from config
+        self.webhook_workers = webhook_workers
     
     async def process_booking_payment(
         self,
@@ -134,8 +145,12 @@ class PaymentProcessingService:
                         payment.processed_at = datetime.utcnow()
                         
                         # Update booking status
+                        summary_before = BookingSummaryState.of(booking)
                         booking.status = BookingStatus.CONFIRMED
                         booking.confirmed_at = datetime.utcnow()
+                        await record_booking_change(
+                            self.db, summary_before, BookingSummaryState.of(booking)
+                        )
                         
                     elif confirmed_intent.status == 'requires_action':
                         payment.status = PaymentStatus.REQUIRES_ACTION
@@ -481,35 +496,25 @@ class PaymentProcessingService:
             raise
     
     async def handle_stripe_webhook(self, payload: str, sig_header: str) -> Dict[str, Any]:
-        """Handle Stripe webhook events"""
+        """
+        Verify and enqueue a Stripe webhook event
+
+        The event is only written to the webhook inbox here so Stripe gets
+        its 2xx quickly; the worker pool applies it. Redeliveries of an event
+        already in the inbox are acknowledged without being queued again.
+        """
         try:
-            # Verify webhook signature
+            # Verify webhook signature; the verified event is the parsed payload
             event = stripe.Webhook.construct_event(
                 payload, sig_header, self._webhook_endpoint_secret
-            )
-            
-            logger.info(f"Received Stripe webhook: {event['type']}")
-            
-            # Handle different event types
-            if event['type'] == 'payment_intent.succeeded':
-                await self._handle_payment_succeeded(event['data']['object'])
+            ).to_dict()
             
-            elif event['type'] == 'payment_intent.payment_failed':
-                await self._handle_payment_failed(event['data']['object'])
+            queued = await enqueue_webhook_event(self.db, event)
+            if queued and self.webhook_workers:
+                self.webhook_workers.wake()
             
-            elif event['type'] == 'payment_intent.requires_action':
-                await self._handle_payment_requires_action(event['data']['object'])
-            
-            elif event['type'] == 'transfer.created':
-                await self._handle_transfer_created(event['data']['object'])
-            
-            elif event['type'] == 'account.updated':
-                await self._handle_account_updated(event['data']['object'])
-            
-            else:
-                logger.info(f"Unhandled webhook event type: {event['type']}")
-            
-            return {'status': 'success'}
+            logger.info(f"Received Stripe webhook: {event['type']} ({'queued' if queued else 'duplicate'})")
+            return {'status': 'queued' if queued else 'duplicate', 'event_id': event['id']}
             
         except stripe.error.SignatureVerificationError:
             logger.error("Invalid webhook signature")
@@ -742,113 +747,15 @@ class PaymentProcessingService:
             policy_details=f"{policy['type']} cancellation policy",
             processing_time_days=5  # Standard processing time
         )
-    
-    # Webhook handlers
-    
-    async def _handle_payment_succeeded(self, payment_intent: Dict[str, Any]):
-        """Handle successful payment webhook"""
-        try:
-            booking_id = payment_intent['metadata'].get('booking_id')
-            if not booking_id:
-                return
-            
-            # Update payment status
-            stmt = select(BookingPayment).where(
-                BookingPayment.stripe_payment_intent_id == payment_intent['id']
-            )
-            result = await self.db.execute(stmt)
-            payment = result.scalar_one_or_none()
-            
-            if payment and payment.status != PaymentStatus.SUCCEEDED:
-                payment.status = PaymentStatus.SUCCEEDED
-                payment.processed_at = datetime.utcnow()
-                
-                # Update booking status
-                booking = await self._get_booking_with_property(UUID(booking_id))
-                if booking:
-                    booking.status = BookingStatus.CONFIRMED
-                    booking.confirmed_at = datetime.utcnow()
-                
-                await self.db.commit()
-                logger.info(f"Payment succeeded for booking {booking_id}")
-                
-        except Exception as e:
-            logger.error(f"Error handling payment succeeded webhook: {str(e)}")
-            await self.db.rollback()
-    
-    async def _handle_payment_failed(self, payment_intent: Dict[str, Any]):
-        """Handle failed payment webhook"""
-        try:
-            stmt = select(BookingPayment).where(
-                BookingPayment.stripe_payment_intent_id == payment_intent['id']
-            )
-            result = await self.db.execute(stmt)
-            payment = result.scalar_one_or_none()
-            
-            if payment:
-                payment.status = PaymentStatus.FAILED
-                payment.failure_reason = payment_intent.get('last_payment_error', {}).get('message', 'Payment failed')
-                await self.db.commit()
-                
-        except Exception as e:
-            logger.error(f"Error handling payment failed webhook: {str(e)}")
-            await self.db.rollback()
-    
-    async def _handle_payment_requires_action(self, payment_intent: Dict[str, Any]):
-        """Handle payment that requires additional action"""
-        try:
-            stmt = select(BookingPayment).where(
-                BookingPayment.stripe_payment_intent_id == payment_intent['id']
-            )
-            result = await self.db.execute(stmt)
-            payment = result.scalar_one_or_none()
-            
-            if payment:
-                payment.status = PaymentStatus.REQUIRES_ACTION
-                await self.db.commit()
-                
-        except Exception as e:
-            logger.error(f"Error handling payment requires action webhook: {str(e)}")
-            await self.db.rollback()
-    
-    async def _handle_transfer_created(self, transfer: Dict[str, Any]):
-        """Handle transfer to host account"""
-        logger.info(f"Transfer created: {transfer['id']} amount: {transfer['amount']}")
-    
-    async def _handle_account_updated(self, account: Dict[str, Any]):
-        """Handle host account updates"""
-        logger.info(f"Stripe account updated: {account['id']}")
 
 
 # Utility functions
 
-async def process_scheduled_payouts(db_session: AsyncSession) -> int:
+async def process_scheduled_payouts(db_session: AsyncSession, chunk_size: int = 1000) -> int:
     """Process scheduled payouts to hosts"""
     try:
-        # Get payments that need payouts
-        stmt = select(BookingPayment).join(Booking).where(
-            and_(
-                BookingPayment.status == PaymentStatus.SUCCEEDED,
-                BookingPayment.payout_processed == False,
-                Booking.check_out_date <= datetime.utcnow().date()  # After checkout
-            )
-        )
-        
-        result = await db_session.execute(stmt)
-        payments_to_payout = result.scalars().all()
-        
-        processed_count = 0
-        for payment in payments_to_payout:
-            try:
-                # Mark as processed (actual payout would be handled by Stripe automatically)
-                payment.payout_processed = True
-                payment.payout_date = datetime.utcnow()
-                processed_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error processing payout for payment {payment.id}: {str(e)}")
-        
-        await db_session.commit()
+        # Actual payouts are handled by Stripe automatically; this marks them
+        processed_count = await run_scheduled_payouts(db_session, chunk_size)
         logger.info(f"Processed {processed_count} scheduled payouts")
         return processed_count
         
@@ -858,41 +765,16 @@ async def process_scheduled_payouts(db_session: AsyncSession) -> int:
         return 0
 
 
-async def retry_failed_payments(db_session: AsyncSession) -> int:
+async def retry_failed_payments(db_session: AsyncSession, chunk_size: int = 1000) -> int:
     """Retry failed payments that are eligible for retry"""
     try:
-        # Get failed payments that can be retried
-        retry_cutoff = datetime.utcnow() - timedelta(hours=24)
-        
-        stmt = select(BookingPayment).where(
-            and_(
-                BookingPayment.status == PaymentStatus.FAILED,
-                BookingPayment.retry_count < 3,
-                BookingPayment.created_at >= retry_cutoff
-            )
-        )
-        
-        result = await db_session.execute(stmt)
-        failed_payments = result.scalars().all()
-        
-        retried_count = 0
-        for payment in failed_payments:
-            try:
-                # Increment retry count
-                payment.retry_count = (payment.retry_count or 0) + 1
-                
-                # In real implementation, would retry the Stripe payment
-                # For now, just mark for retry
-                logger.info(f"Marked payment {payment.id} for retry (attempt {payment.retry_count})")
-                retried_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error retrying payment {payment.id}: {str(e)}")
-        
-        await db_session.commit()
+        # In real implementation, would retry the Stripe payment
+        # For now, just mark for retry
+        retried_count = await mark_failed_payments_for_retry(db_session, chunk_size)
+        logger.info(f"Marked {retried_count} failed payments for retry")
         return retried_count
         
     except Exception as e:
         logger.error(f"Error retrying failed payments: {str(e)}")
         await db_session.rollback()
-        return 0
\ No newline at end of file
+        return 0
@@ -0,0 +1,554 @@
+"""Queued ingestion and ordered processing of Stripe webhook events
+
+The webhook endpoint only verifies the signature and writes the event into
+the ``stripe_webhook_events`` inbox with ``INSERT ... ON CONFLICT DO
+NOTHING`` on the event id, then acknowledges. Redeliveries collapse onto the
+existing row, so every event is applied at most once.
+
+A pool of workers drains the inbox. Every event carries an ordering key (the
+payment intent it concerns) hashed into one of WEBHOOK_PARTITIONS partitions,
+and each partition belongs to exactly one worker, so events for the same
+payment are applied one at a time in Stripe creation order while different
+payments proceed in parallel. A worker claims a batch with ``UPDATE ...
+WHERE event_id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING``, loads all
+payments and bookings the batch touches with one query each, applies the
+events and marks them processed in the same transaction.
+
+While a batch is being applied its worker renews ``claimed_at`` every
+``claim_heartbeat_seconds``, so ``requeue_stale_claims`` only hands back the
+claims of workers that stopped, never a batch that is still running.
+
+A payment whose events keep failing is retried with exponential backoff:
+its head event is not claimed again before ``next_attempt_at``, and no
+later event of the same payment is claimed while the head waits.
+
+The chunked, set-based payout and retry jobs that used to walk payments row
+by row live here as well.
+"""
+
+import asyncio
+import logging
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import and_, exists, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.booking_models import (
+    Booking,
+    BookingPayment,
+    BookingStatus,
+    PaymentStatus,
+    StripeWebhookEventRecord,
+    WebhookEventStatus,
+)
+from app.services.booking_analytics_engine import BookingSummaryState, record_booking_change
+
+logger = logging.getLogger(__name__)
+
+
+WEBHOOK_PARTITIONS = 64
+DEFAULT_CLAIM_SIZE = 200
+MAX_EVENT_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+STALE_CLAIM_SECONDS = 300
+CLAIM_HEARTBEAT_SECONDS = STALE_CLAIM_SECONDS / 5
+
+PAYMENT_INTENT_EVENTS = frozenset({
+    'payment_intent.succeeded',
+    'payment_intent.payment_failed',
+    'payment_intent.requires_action',
+})
+
+# Columns handed to the event processor for each claimed event
+CLAIMED_COLUMNS = (
+    StripeWebhookEventRecord.event_id,
+    StripeWebhookEventRecord.event_type,
+    StripeWebhookEventRecord.ordering_key,
+    StripeWebhookEventRecord.stripe_created,
+    StripeWebhookEventRecord.received_at,
+    StripeWebhookEventRecord.payload,
+    StripeWebhookEventRecord.attempts,
+)
+
+
+def event_ordering_key(event: Dict[str, Any]) -> str:
+    """Key whose events must be applied in order: the payment intent"""
+    obj = event['data']['object']
+    return obj.get('payment_intent') or obj.get('id') or event['id']
+
+
+def event_partition(ordering_key: str) -> int:
+    return zlib.crc32(ordering_key.encode()) % WEBHOOK_PARTITIONS
+
+
+def retry_delay(attempts: int, base_seconds: float = RETRY_BASE_SECONDS) -> timedelta:
+    """Exponential backoff before retrying an event that failed attempts times"""
+    return timedelta(seconds=min(base_seconds * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+@lru_cache(maxsize=None)
+def _insert_ignoring_duplicates(dialect_name: str):
+    insert = sqlite.insert if dialect_name == 'sqlite' else postgresql.insert
+    return insert(StripeWebhookEventRecord).on_conflict_do_nothing(
+        index_elements=[StripeWebhookEventRecord.event_id]
+    )
+
+
+async def enqueue_webhook_event(db_session: AsyncSession, event: Dict[str, Any]) -> bool:
+    """
+    Durably record a verified event; returns False for a redelivery
+
+    This is all the webhook request does before acknowledging, one
+    single-row INSERT and commit.
+    """
+    ordering_key = event_ordering_key(event)
+    result = await db_session.execute(
+        _insert_ignoring_duplicates(db_session.get_bind(StripeWebhookEventRecord).dialect.name).values(
+            event_id=event['id'],
+            event_type=event['type'],
+            ordering_key=ordering_key,
+            partition=event_partition(ordering_key),
+            stripe_created=event['created'],
+            payload=event,
+            status=WebhookEventStatus.RECEIVED,
+            attempts=0,
+            received_at=datetime.utcnow(),
+        )
+    )
+    await db_session.commit()
+    return result.rowcount == 1
+
+
+async def requeue_stale_claims(
+    db_session: AsyncSession,
+    older_than: timedelta = timedelta(seconds=STALE_CLAIM_SECONDS)
+) -> int:
+    """Return events claimed by a worker that died mid-batch to the queue"""
+    result = await db_session.execute(
+        update(StripeWebhookEventRecord)
+        .where(and_(
+            StripeWebhookEventRecord.status == WebhookEventStatus.PROCESSING,
+            StripeWebhookEventRecord.claimed_at < datetime.utcnow() - older_than,
+        ))
+        .values(status=WebhookEventStatus.RECEIVED, claimed_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db_session.commit()
+    if result.rowcount:
+        logger.warning(f"Requeued {result.rowcount} stale webhook claims")
+    return result.rowcount
+
+
+class StripeEventProcessor:
+    """Applies a batch of claimed events to payments and bookings"""
+
+    def __init__(self):
+        self._handlers = {
+            'payment_intent.succeeded': self._payment_succeeded,
+            'payment_intent.payment_failed': self._payment_failed,
+            'payment_intent.requires_action': self._payment_requires_action,
+            'transfer.created': self._transfer_created,
+            'account.updated': self._account_updated,
+        }
+
+    async def apply(self, db_session: AsyncSession, events: Sequence[Any]) -> None:
+        """Apply events (already in per-key order) without committing"""
+        intent_ids = {e.ordering_key for e in events if e.event_type in PAYMENT_INTENT_EVENTS}
+        payments: Dict[str, BookingPayment] = {}
+        if intent_ids:
+            result = await db_session.execute(
+                select(BookingPayment).where(BookingPayment.stripe_payment_intent_id.in_(intent_ids))
+            )
+            payments = {p.stripe_payment_intent_id: p for p in result.scalars()}
+
+        booking_ids = {
+            payments[e.ordering_key].booking_id
+            for e in events
+            if e.event_type == 'payment_intent.succeeded' and e.ordering_key in payments
+        }
+        bookings: Dict[UUID, Booking] = {}
+        if booking_ids:
+            result = await db_session.execute(select(Booking).where(Booking.id.in_(booking_ids)))
+            bookings = {b.id: b for b in result.scalars()}
+
+        for event in events:
+            handler = self._handlers.get(event.event_type)
+            if handler is None:
+                logger.info(f"Unhandled webhook event type: {event.event_type}")
+                continue
+            await handler(db_session, event, payments.get(event.ordering_key), bookings)
+
+    @staticmethod
+    def _is_current(payment: Optional[BookingPayment], event: Any) -> bool:
+        """Skip events older than the newest one already applied"""
+        if payment is None:
+            return False
+        if payment.stripe_event_created is not None and event.stripe_created < payment.stripe_event_created:
+            logger.info(f"Ignoring stale {event.event_type} for {event.ordering_key}")
+            return False
+        payment.stripe_event_created = event.stripe_created
+        return True
+
+    async def _payment_succeeded(self, db_session, event, payment, bookings):
+        if not self._is_current(payment, event) or payment.status == PaymentStatus.SUCCEEDED:
+            return
+        now = datetime.utcnow()
+        payment.status = PaymentStatus.SUCCEEDED
+        payment.processed_at = now
+
+        booking = bookings.get(payment.booking_id)
+        if booking and booking.status == BookingStatus.PENDING:
+            summary_before = BookingSummaryState.of(booking)
+            booking.status = BookingStatus.CONFIRMED
+            booking.confirmed_at = now
+            await record_booking_change(db_session, summary_before, BookingSummaryState.of(booking))
+        logger.info(f"Payment succeeded for booking {payment.booking_id}")
+
+    async def _payment_failed(self, db_session, event, payment, bookings):
+        if not self._is_current(payment, event):
+            return
+        error = event.payload['data']['object'].get('last_payment_error') or {}
+        payment.status = PaymentStatus.FAILED
+        payment.failure_reason = error.get('message', 'Payment failed')
+
+    async def _payment_requires_action(self, db_session, event, payment, bookings):
+        if not self._is_current(payment, event):
+            return
+        payment.status = PaymentStatus.REQUIRES_ACTION
+
+    async def _transfer_created(self, db_session, event, payment, bookings):
+        transfer = event.payload['data']['object']
+        logger.info(f"Transfer created: {transfer['id']} amount: {transfer['amount']}")
+
+    async def _account_updated(self, db_session, event, payment, bookings):
+        logger.info(f"Stripe account updated: {event.payload['data']['object']['id']}")
+
+
+@dataclass
+class WebhookWorkerReport:
+    """Counters for a worker pool run"""
+    processed: int = 0
+    batches: int = 0
+    retried: int = 0
+    dead_lettered: int = 0
+    elapsed_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'processed': self.processed,
+            'batches': self.batches,
+            'retried': self.retried,
+            'dead_lettered': self.dead_lettered,
+            'elapsed_seconds': round(self.elapsed_seconds, 3),
+            'events_per_second': round(self.processed / self.elapsed_seconds, 1) if self.elapsed_seconds else 0.0,
+        }
+
+
+class StripeWebhookWorkerPool:
+    """
+    Drains the webhook inbox with one worker per partition group
+
+    partitions restricts the pool to a subset of WEBHOOK_PARTITIONS when
+    several processes share the inbox; the subsets must not overlap or
+    per-payment ordering is lost.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        processor: Optional[StripeEventProcessor] = None,
+        workers: int = 4,
+        claim_size: int = DEFAULT_CLAIM_SIZE,
+        poll_interval: float = 0.5,
+        max_attempts: int = MAX_EVENT_ATTEMPTS,
+        retry_base_seconds: float = RETRY_BASE_SECONDS,
+        partitions: Optional[Iterable[int]] = None,
+        claim_heartbeat_seconds: float = CLAIM_HEARTBEAT_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.processor = processor or StripeEventProcessor()
+        self.claim_size = claim_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        # Must stay well below STALE_CLAIM_SECONDS
+        self.claim_heartbeat_seconds = claim_heartbeat_seconds
+        owned = sorted(set(partitions)) if partitions is not None else list(range(WEBHOOK_PARTITIONS))
+        workers = max(1, min(workers, len(owned)))
+        self._assignments = [owned[index::workers] for index in range(workers)]
+        self._wakeups = [asyncio.Event() for _ in range(workers)]
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self.report = WebhookWorkerReport()
+
+    def wake(self) -> None:
+        """Let idle workers pick up newly enqueued events immediately"""
+        for wakeup in self._wakeups:
+            wakeup.set()
+
+    def start(self) -> None:
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._worker(index, stop_when_idle=False))
+            for index in range(len(self._assignments))
+        ]
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self.wake()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_until_idle(self) -> WebhookWorkerReport:
+        """Process everything currently queued, then return"""
+        started = time.perf_counter()
+        self._stopping = False
+        async with self.session_factory() as db:
+            await requeue_stale_claims(db)
+        await asyncio.gather(*(
+            self._worker(index, stop_when_idle=True) for index in range(len(self._assignments))
+        ))
+        self.report.elapsed_seconds += time.perf_counter() - started
+        logger.info(f"Webhook inbox drained: {self.report.to_dict()}")
+        return self.report
+
+    async def _worker(self, index: int, stop_when_idle: bool) -> None:
+        partitions = self._assignments[index]
+        wakeup = self._wakeups[index]
+        while not self._stopping:
+            try:
+                claimed = await self.process_batch(partitions)
+            except Exception as e:
+                logger.error(f"Webhook worker {index} failed: {str(e)}")
+                claimed = 0
+            if claimed:
+                continue
+            if stop_when_idle:
+                return
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def process_batch(self, partitions: Sequence[int]) -> int:
+        """Claim and apply one batch from the given partitions"""
+        async with self.session_factory() as db:
+            events = await self._claim(db, partitions)
+            if not events:
+                return 0
+
+            heartbeat = asyncio.create_task(self._renew_claims([e.event_id for e in events]))
+            try:
+                try:
+                    await self.processor.apply(db, events)
+                    await self._mark_processed(db, events)
+                    await db.commit()
+                    self.report.processed += len(events)
+                except Exception as e:
+                    await db.rollback()
+                    logger.warning(f"Webhook batch failed, retrying per payment: {str(e)}")
+                    await self._apply_per_key(db, events)
+            finally:
+                heartbeat.cancel()
+                await asyncio.gather(heartbeat, return_exceptions=True)
+
+            self.report.batches += 1
+            return len(events)
+
+    async def _renew_claims(self, event_ids: List[str]) -> None:
+        """Keep a running batch's claim fresh so it is not requeued as stale"""
+        while True:
+            await asyncio.sleep(self.claim_heartbeat_seconds)
+            try:
+                async with self.session_factory() as db:
+                    await db.execute(
+                        update(StripeWebhookEventRecord)
+                        .where(and_(
+                            StripeWebhookEventRecord.event_id.in_(event_ids),
+                            StripeWebhookEventRecord.status == WebhookEventStatus.PROCESSING,
+                        ))
+                        .values(claimed_at=datetime.utcnow())
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.warning(f"Could not renew webhook claims: {str(e)}")
+
+    async def _claim(self, db: AsyncSession, partitions: Sequence[int]) -> List[Any]:
+        now = datetime.utcnow()
+        # A payment whose head event is backing off keeps its later events queued
+        waiting = aliased(StripeWebhookEventRecord)
+        backing_off = exists().where(and_(
+            waiting.ordering_key == StripeWebhookEventRecord.ordering_key,
+            waiting.status == WebhookEventStatus.RECEIVED,
+            waiting.next_attempt_at > now,
+        ))
+        candidates = (
+            select(StripeWebhookEventRecord.event_id)
+            .where(and_(
+                StripeWebhookEventRecord.status == WebhookEventStatus.RECEIVED,
+                StripeWebhookEventRecord.partition.in_(partitions),
+                or_(
+                    StripeWebhookEventRecord.next_attempt_at.is_(None),
+                    StripeWebhookEventRecord.next_attempt_at <= now,
+                ),
+                ~backing_off,
+            ))
+            .order_by(StripeWebhookEventRecord.stripe_created, StripeWebhookEventRecord.received_at)
+            .limit(self.claim_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            update(StripeWebhookEventRecord)
+            .where(and_(
+                StripeWebhookEventRecord.event_id.in_(candidates.scalar_subquery()),
+                StripeWebhookEventRecord.status == WebhookEventStatus.RECEIVED,
+            ))
+            .values(status=WebhookEventStatus.PROCESSING, claimed_at=now)
+            .returning(*CLAIMED_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        events = result.all()
+        await db.commit()
+        # RETURNING order is unspecified; restore Stripe creation order
+        return sorted(events, key=lambda e: (e.stripe_created, e.received_at, e.event_id))
+
+    async def _mark_processed(self, db: AsyncSession, events: Sequence[Any]) -> None:
+        await db.execute(
+            update(StripeWebhookEventRecord)
+            .where(StripeWebhookEventRecord.event_id.in_([e.event_id for e in events]))
+            .values(status=WebhookEventStatus.PROCESSED, processed_at=datetime.utcnow(), last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _apply_per_key(self, db: AsyncSession, events: Sequence[Any]) -> None:
+        """Isolate a failing payment so it cannot hold back the rest of the batch"""
+        by_key: Dict[str, List[Any]] = defaultdict(list)
+        for event in events:
+            by_key[event.ordering_key].append(event)
+
+        for key, key_events in by_key.items():
+            try:
+                await self.processor.apply(db, key_events)
+                await self._mark_processed(db, key_events)
+                await db.commit()
+                self.report.processed += len(key_events)
+            except Exception as e:
+                await db.rollback()
+                await self._release(db, key_events, str(e))
+
+    async def _release(self, db: AsyncSession, key_events: Sequence[Any], error: str) -> None:
+        """Requeue a failed payment's events after a backoff, dead-lettering the head if it keeps failing"""
+        head, rest = key_events[0], key_events[1:]
+        attempts = head.attempts + 1
+        dead = attempts >= self.max_attempts
+        delay = retry_delay(attempts, self.retry_base_seconds)
+        await db.execute(
+            update(StripeWebhookEventRecord)
+            .where(StripeWebhookEventRecord.event_id == head.event_id)
+            .values(
+                status=WebhookEventStatus.FAILED if dead else WebhookEventStatus.RECEIVED,
+                attempts=attempts,
+                last_error=error[:500],
+                claimed_at=None,
+                next_attempt_at=None if dead else datetime.utcnow() + delay,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if rest:
+            # Later events wait for the head so the payment stays in order;
+            # _claim skips them while the head backs off
+            await db.execute(
+                update(StripeWebhookEventRecord)
+                .where(StripeWebhookEventRecord.event_id.in_([e.event_id for e in rest]))
+                .values(status=WebhookEventStatus.RECEIVED, claimed_at=None)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+
+        if dead:
+            self.report.dead_lettered += 1
+            logger.error(f"Webhook event {head.event_id} failed {attempts} times, giving up: {error}")
+        else:
+            self.report.retried += 1
+            logger.warning(
+                f"Webhook event {head.event_id} failed (attempt {attempts}), "
+                f"retrying in {delay.total_seconds():.0f}s: {error}"
+            )
+
+
+# Batch payment jobs
+
+async def _update_payments_in_chunks(
+    db_session: AsyncSession,
+    criteria: List[Any],
+    values: Dict[str, Any],
+    chunk_size: int
+) -> int:
+    """Keyset-chunked ``UPDATE ... WHERE id IN (SELECT ... SKIP LOCKED)``, committed per chunk"""
+    updated = 0
+    last_id: Optional[UUID] = None
+    while True:
+        claim = select(BookingPayment.id).where(and_(*criteria))
+        if last_id is not None:
+            claim = claim.where(BookingPayment.id > last_id)
+        claim = claim.order_by(BookingPayment.id).limit(chunk_size).with_for_update(skip_locked=True)
+
+        result = await db_session.execute(
+            update(BookingPayment)
+            .where(and_(BookingPayment.id.in_(claim.scalar_subquery()), *criteria))
+            .values(**values)
+            .returning(BookingPayment.id)
+            .execution_options(synchronize_session=False)
+        )
+        ids = result.scalars().all()
+        await db_session.commit()
+        if not ids:
+            return updated
+        updated += len(ids)
+        last_id = max(ids)
+
+
+async def run_scheduled_payouts(db_session: AsyncSession, chunk_size: int = 1000) -> int:
+    """Mark succeeded payments whose stay has ended as paid out to the host"""
+    now = datetime.utcnow()
+    checked_out = select(Booking.id).where(Booking.check_out_date <= now.date())
+    return await _update_payments_in_chunks(
+        db_session,
+        [
+            BookingPayment.status == PaymentStatus.SUCCEEDED,
+            BookingPayment.payout_processed.is_(False),
+            BookingPayment.booking_id.in_(checked_out.scalar_subquery()),
+        ],
+        {'payout_processed': True, 'payout_date': now, 'updated_at': now},
+        chunk_size,
+    )
+
+
+async def mark_failed_payments_for_retry(db_session: AsyncSession, chunk_size: int = 1000) -> int:
+    """Bump the retry counter of recent failed payments that have attempts left"""
+    now = datetime.utcnow()
+    retry_count = func.coalesce(BookingPayment.retry_count, 0)
+    return await _update_payments_in_chunks(
+        db_session,
+        [
+            BookingPayment.status == PaymentStatus.FAILED,
+            retry_count < 3,
+            BookingPayment.created_at >= now - timedelta(hours=24),
+            # A row already bumped by this run is not bumped again
+            func.coalesce(BookingPayment.last_retry_at, datetime.min) < now,
+        ],
+        {'retry_count': retry_count + 1, 'last_retry_at': now, 'updated_at': now},
+        chunk_size,
+    )
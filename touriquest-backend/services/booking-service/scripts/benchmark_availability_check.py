@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Availability Check Benchmark
+
+Compares the previous sequential availability lookups (separate booking
+and block queries, each run twice, with per-day date expansion) against
+the single CTE query plus interval evaluation, reporting p50/p95 latency
+and statements per check on an in-memory SQLite database with a
+simulated network round trip per statement.
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List
+from uuid import uuid4
+
+from sqlalchemy import and_, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models.booking_models import (  # noqa: E402
+    Base,
+    Booking,
+    BookingCalendarSync,
+    BookingStatus,
+    CancellationPolicyType,
+)
+from app.services.availability_evaluator import (  # noqa: E402
+    OCCUPYING_STATUSES,
+    AvailabilityEvaluator,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+PROPERTY_DETAILS = {"max_guests": 4, "minimum_stay_nights": 2, "maximum_stay_nights": 30}
+
+
+async def populate(db: AsyncSession, properties: List[Any], start: date, rng: random.Random) -> None:
+    rows = []
+    for property_id in properties:
+        offset = 0
+        while offset < 365:
+            nights = rng.randint(2, 7)
+            rows.append(Booking(
+                id=uuid4(), booking_number=uuid4().hex[:12], property_id=property_id,
+                guest_id=uuid4(), host_id=uuid4(),
+                check_in_date=start + timedelta(days=offset),
+                check_out_date=start + timedelta(days=offset + nights),
+                number_of_guests=2, adults=2, status=BookingStatus.CONFIRMED,
+                base_price=Decimal("100.00"), total_amount=Decimal("100.00") * nights,
+                guest_email="guest@example.com", guest_name="Guest",
+                cancellation_policy=CancellationPolicyType.MODERATE,
+            ))
+            offset += nights + rng.randint(0, 10)
+        for _ in range(5):
+            first = rng.randint(0, 360)
+            rows.append(BookingCalendarSync(
+                id=uuid4(), property_id=property_id, calendar_type="manual_block",
+                sync_status="active", is_blocking=True,
+                external_check_in=start + timedelta(days=first),
+                external_check_out=start + timedelta(days=first + rng.randint(1, 4)),
+            ))
+    db.add_all(rows)
+    await db.commit()
+
+
+async def sequential_check(db: AsyncSession, property_id, check_in: date, check_out: date) -> List[date]:
+    """Previous flow: conflicts + blocks, then bookings + blocks again, expanded per day"""
+    async def bookings():
+        result = await db.execute(select(Booking).where(and_(
+            Booking.property_id == property_id,
+            Booking.status.in_(OCCUPYING_STATUSES),
+            Booking.check_in_date < check_out,
+            Booking.check_out_date > check_in,
+        )))
+        return result.scalars().all()
+
+    async def blocked_dates():
+        result = await db.execute(select(BookingCalendarSync).where(and_(
+            BookingCalendarSync.property_id == property_id,
+            BookingCalendarSync.is_blocking == True,  # noqa: E712
+            BookingCalendarSync.sync_status == "active",
+            BookingCalendarSync.external_check_in < check_out,
+            BookingCalendarSync.external_check_out > check_in,
+        )))
+        dates = []
+        for block in result.scalars().all():
+            current = block.external_check_in
+            while current < block.external_check_out:
+                if check_in <= current < check_out:
+                    dates.append(current)
+                current += timedelta(days=1)
+        return dates
+
+    await bookings()
+    await blocked_dates()
+    unavailable = []
+    for booking in await bookings():
+        current = booking.check_in_date
+        while current < booking.check_out_date:
+            if check_in <= current < check_out:
+                unavailable.append(current)
+            current += timedelta(days=1)
+    unavailable.extend(await blocked_dates())
+    return sorted(set(unavailable))
+
+
+async def consolidated_check(db: AsyncSession, property_id, check_in: date, check_out: date) -> List[date]:
+    evaluator = AvailabilityEvaluator(db)
+    conflicts = await evaluator.load_conflicts(property_id, check_in, check_out)
+    return evaluator.evaluate(conflicts, PROPERTY_DETAILS, check_in, check_out, 2).unavailable_dates
+
+
+async def run_benchmark(properties: int, checks: int, round_trip_ms: float, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    statements = []
+    simulated_latency = {"seconds": 0.0}
+
+    def on_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+        time.sleep(simulated_latency["seconds"])  # Simulated network round trip
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+
+    start = date.today() + timedelta(days=1)
+    property_ids = [uuid4() for _ in range(properties)]
+    stays = []
+    for _ in range(checks):
+        check_in = start + timedelta(days=rng.randint(0, 330))
+        stays.append((rng.choice(property_ids), check_in, check_in + timedelta(days=rng.randint(2, 21))))
+
+    results: Dict[str, Any] = {"properties": properties, "checks": checks}
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        await populate(db, property_ids, start, rng)
+        simulated_latency["seconds"] = round_trip_ms / 1000
+
+        for label, check in (("sequential", sequential_check), ("consolidated", consolidated_check)):
+            statements.clear()
+            timings = []
+            outcomes = []
+            for stay in stays:
+                t0 = time.perf_counter()
+                outcomes.append(await check(db, *stay))
+                timings.append((time.perf_counter() - t0) * 1000)
+            timings.sort()
+            results[label] = {
+                "p50_ms": statistics.median(timings),
+                "p95_ms": timings[int(len(timings) * 0.95) - 1],
+                "queries_per_check": len(statements) / len(stays),
+            }
+            results[f"{label}_outcomes"] = outcomes
+
+    await engine.dispose()
+
+    if results["sequential_outcomes"] != results["consolidated_outcomes"]:
+        raise AssertionError("Consolidated check disagrees with sequential lookups")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--properties", type=int, default=200)
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--round-trip-ms", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.properties, args.checks, args.round_trip_ms, args.seed))
+
+    logger.info(
+        f"{results['checks']} checks over {results['properties']} properties, "
+        f"{args.round_trip_ms} ms simulated round trip"
+    )
+    for label in ("sequential", "consolidated"):
+        stats = results[label]
+        logger.info(
+            f"{label}: p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms, "
+            f"{stats['queries_per_check']:.0f} queries/check"
+        )
+
+
+if __name__ == "__main__":
+    main()
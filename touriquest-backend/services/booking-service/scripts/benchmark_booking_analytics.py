@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Booking Analytics Benchmark
+
+Loads synthetic bookings (5M by default) into a file-backed SQLite
+database, builds the daily per-property summary, and compares for a large
+host portfolio:
+
+- analytics: loading the host's bookings and aggregating in Python (the
+  previous implementation) vs. one aggregate over booking_daily_summaries
+- occupancy: the overlap query on bookings vs. the summary sum
+- listing: a deep OFFSET page vs. the equivalent keyset cursor page
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List
+from uuid import UUID, uuid4
+
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models.booking_models import (  # noqa: E402
+    Base,
+    Booking,
+    BookingStatus,
+    CancellationPolicyType,
+)
+from app.services.booking_analytics_engine import (  # noqa: E402
+    BookingAnalyticsEngine,
+    apply_keyset_page,
+    encode_cursor,
+    rebuild_booking_summaries,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+PERIOD_START = date(2024, 1, 1)
+PERIOD_DAYS = 730
+STATUSES = [
+    BookingStatus.CONFIRMED, BookingStatus.CONFIRMED, BookingStatus.COMPLETED,
+    BookingStatus.COMPLETED, BookingStatus.CANCELLED, BookingStatus.PENDING,
+]
+
+
+def safe_uuid() -> UUID:
+    # SQLite's NUMERIC affinity would turn an all-digit hex id into a number
+    return UUID("a" + uuid4().hex[1:])
+
+
+async def populate(engine, bookings: int, properties: int, hosts: int, rng: random.Random) -> List[UUID]:
+    host_ids = [safe_uuid() for _ in range(hosts)]
+    property_hosts = [(safe_uuid(), host_ids[n % hosts]) for n in range(properties)]
+
+    batch: List[Dict[str, Any]] = []
+    for n in range(bookings):
+        property_id, host_id = property_hosts[n % properties]
+        created_at = datetime.combine(PERIOD_START, datetime.min.time()) + timedelta(
+            minutes=rng.randint(0, PERIOD_DAYS * 1440)
+        )
+        check_in = created_at.date() + timedelta(days=rng.randint(1, 90))
+        status = rng.choice(STATUSES)
+        batch.append({
+            'id': safe_uuid(),
+            'booking_number': f"TQ{n:09d}",
+            'property_id': property_id,
+            'guest_id': safe_uuid(),
+            'host_id': host_id,
+            'check_in_date': check_in,
+            'check_out_date': check_in + timedelta(days=rng.randint(1, 7)),
+            'number_of_guests': 2,
+            'adults': 2,
+            'status': status,
+            'base_price': Decimal("100.00"),
+            'total_amount': Decimal(rng.choice([180, 320, 540, 900])),
+            'guest_email': "guest@example.com",
+            'guest_name': "Guest",
+            'cancellation_policy': CancellationPolicyType.MODERATE,
+            'created_at': created_at,
+            'confirmed_at': created_at + timedelta(hours=3) if status != BookingStatus.PENDING else None,
+        })
+        if len(batch) == 50_000:
+            async with engine.begin() as conn:
+                await conn.execute(insert(Booking), batch)
+            batch.clear()
+            logger.info(f"Inserted {n + 1} bookings")
+
+    if batch:
+        async with engine.begin() as conn:
+            await conn.execute(insert(Booking), batch)
+
+    return host_ids
+
+
+async def raw_host_analytics(db: AsyncSession, host_id: UUID, start: date, end: date) -> Dict[str, Any]:
+    """Previous implementation: load every booking, aggregate in Python"""
+    result = await db.execute(select(Booking).where(and_(
+        Booking.host_id == host_id,
+        Booking.created_at >= datetime.combine(start, datetime.min.time()),
+        Booking.created_at <= datetime.combine(end, datetime.max.time()),
+    )))
+    bookings = result.scalars().all()
+    revenue = sum(b.total_amount for b in bookings if b.status in (
+        BookingStatus.CONFIRMED, BookingStatus.CHECKED_IN,
+        BookingStatus.CHECKED_OUT, BookingStatus.COMPLETED
+    ))
+    db.expunge_all()
+    return {'total_bookings': len(bookings), 'total_revenue': float(revenue)}
+
+
+async def raw_occupancy(db: AsyncSession, property_id: UUID, start: date, end: date) -> float:
+    result = await db.execute(select(
+        func.sum(func.julianday(Booking.check_out_date) - func.julianday(Booking.check_in_date))
+    ).where(and_(
+        Booking.property_id == property_id,
+        Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.CHECKED_IN, BookingStatus.CHECKED_OUT]),
+        Booking.check_in_date < end,
+        Booking.check_out_date > start,
+    )))
+    return min(float(result.scalar() or 0) / (end - start).days, 1.0)
+
+
+async def timed(label: str, timings: Dict[str, List[float]], coro):
+    t0 = time.perf_counter()
+    value = await coro
+    timings.setdefault(label, []).append((time.perf_counter() - t0) * 1000)
+    return value
+
+
+async def run_benchmark(bookings: int, properties: int, hosts: int, repeats: int, seed: int, path: str) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    results: Dict[str, Any] = {'bookings': bookings, 'properties': properties, 'hosts': hosts}
+
+    t0 = time.perf_counter()
+    host_ids = await populate(engine, bookings, properties, hosts, rng)
+    results['load_seconds'] = time.perf_counter() - t0
+
+    timings: Dict[str, List[float]] = {}
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        t0 = time.perf_counter()
+        results['summary_rows'] = await rebuild_booking_summaries(db, batch_size=20_000)
+        results['summary_build_seconds'] = time.perf_counter() - t0
+
+        analytics = BookingAnalyticsEngine(db)
+        host_id = host_ids[0]
+        start, end = PERIOD_START + timedelta(days=90), PERIOD_START + timedelta(days=455)
+        property_id = (await db.execute(
+            select(Booking.property_id).where(Booking.host_id == host_id).limit(1)
+        )).scalar()
+
+        for _ in range(repeats):
+            raw = await timed('analytics_raw', timings, raw_host_analytics(db, host_id, start, end))
+            summary = await timed('analytics_summary', timings, analytics.get_analytics(start, end, host_id=host_id))
+            if raw['total_bookings'] != summary['total_bookings']:
+                raise AssertionError("Summary analytics disagree with raw aggregation")
+
+            await timed('occupancy_raw', timings, raw_occupancy(db, property_id, start, end))
+            await timed('occupancy_summary', timings, analytics.get_occupancy_rate(property_id, start, end))
+
+            listing = select(Booking).where(Booking.host_id == host_id)
+            deep_offset = 200 * 20
+            offset_stmt, _ = apply_keyset_page(listing, 'created_at', 'desc', None, 20)
+            await timed('page_offset', timings, db.execute(offset_stmt.offset(deep_offset)))
+
+            anchor = (await db.execute(offset_stmt.offset(deep_offset - 1).limit(1))).scalars().one()
+            cursor = encode_cursor(anchor.created_at, anchor.id)
+            keyset_stmt, _ = apply_keyset_page(listing, 'created_at', 'desc', cursor, 20)
+            await timed('page_keyset', timings, db.execute(keyset_stmt))
+            db.expunge_all()
+
+    await engine.dispose()
+
+    results['timings'] = {
+        label: {'p50_ms': statistics.median(values), 'max_ms': max(values)}
+        for label, values in timings.items()
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bookings", type=int, default=5_000_000)
+    parser.add_argument("--properties", type=int, default=20_000)
+    parser.add_argument("--hosts", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", default=None, help="SQLite file (defaults to a temporary file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.database or str(Path(tmp) / "bookings.db")
+        results = asyncio.run(run_benchmark(
+            args.bookings, args.properties, args.hosts, args.repeats, args.seed, path
+        ))
+
+    logger.info(
+        f"{results['bookings']} bookings, {results['properties']} properties, {results['hosts']} hosts; "
+        f"loaded in {results['load_seconds']:.1f}s, {results['summary_rows']} summary rows "
+        f"built in {results['summary_build_seconds']:.1f}s"
+    )
+    for label, stats in results['timings'].items():
+        logger.info(f"{label}: p50 {stats['p50_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Calendar Range Loading Benchmark
+
+Measures building a 365-day property calendar with the range loader
+(cold and cached) against the previous per-day pricing and minimum-stay
+queries, using an in-memory SQLite database populated with synthetic
+bookings, blocks and rules. Query counts are reported alongside latency.
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict
+from uuid import uuid4
+
+from sqlalchemy import and_, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models.booking_models import (  # noqa: E402
+    Base,
+    Booking,
+    BookingCalendarSync,
+    BookingStatus,
+    CancellationPolicyType,
+)
+from app.services.calendar_range_loader import (  # noqa: E402
+    CalendarRangeLoader,
+    CalendarSegmentCache,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def populate(db: AsyncSession, property_id, start: date, days: int, rng: random.Random) -> None:
+    """Insert a year of bookings, blocks and rules for one property"""
+    rows = []
+    offset = 0
+    while offset < days:
+        nights = rng.randint(1, 7)
+        rows.append(Booking(
+            id=uuid4(),
+            booking_number=f"TQ{uuid4().hex[:10].upper()}",
+            property_id=property_id,
+            guest_id=uuid4(),
+            host_id=uuid4(),
+            check_in_date=start + timedelta(days=offset),
+            check_out_date=start + timedelta(days=offset + nights),
+            number_of_guests=2,
+            adults=2,
+            status=BookingStatus.CONFIRMED,
+            base_price=Decimal("120.00"),
+            total_amount=Decimal("120.00") * nights,
+            guest_email="guest@example.com",
+            guest_name="Guest",
+            cancellation_policy=CancellationPolicyType.MODERATE,
+        ))
+        offset += nights + rng.randint(0, 6)
+
+    def calendar_row(calendar_type, first, length, notes=None, is_blocking=True):
+        return BookingCalendarSync(
+            id=uuid4(),
+            property_id=property_id,
+            calendar_type=calendar_type,
+            sync_status="active",
+            external_booking_id=uuid4().hex,
+            external_check_in=start + timedelta(days=first),
+            external_check_out=start + timedelta(days=first + length),
+            external_guest_name=calendar_type,
+            is_blocking=is_blocking,
+            notes=notes,
+        )
+
+    for _ in range(20):
+        rows.append(calendar_row(rng.choice(["airbnb", "vrbo", "manual_block"]), rng.randint(0, days), rng.randint(1, 5)))
+    for _ in range(12):
+        rows.append(calendar_row(
+            "pricing_rule", rng.randint(0, days), rng.randint(7, 60),
+            notes={"price_adjustment": rng.randint(-20, 40), "adjustment_type": rng.choice(["fixed", "percentage"])},
+            is_blocking=False,
+        ))
+    for _ in range(6):
+        rows.append(calendar_row(
+            "minimum_stay_rule", rng.randint(0, days), rng.randint(7, 30),
+            notes={"minimum_stay": rng.randint(2, 7)}, is_blocking=False,
+        ))
+
+    db.add_all(rows)
+    await db.commit()
+
+
+async def per_day_baseline(db: AsyncSession, property_id, start: date, days: int) -> None:
+    """Two rule queries per day, as the calendar view issued before"""
+    for offset in range(days):
+        target_date = start + timedelta(days=offset)
+        for calendar_type in ("pricing_rule", "minimum_stay_rule"):
+            stmt = select(BookingCalendarSync).where(
+                and_(
+                    BookingCalendarSync.property_id == property_id,
+                    BookingCalendarSync.calendar_type == calendar_type,
+                    BookingCalendarSync.sync_status == "active",
+                    BookingCalendarSync.external_check_in <= target_date,
+                    BookingCalendarSync.external_check_out > target_date,
+                )
+            )
+            result = await db.execute(stmt)
+            result.scalars().all()
+
+
+async def run_benchmark(days: int, repeats: int, seed: int) -> Dict[str, Any]:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    property_id = uuid4()
+    start = date.today()
+    end = start + timedelta(days=days - 1)
+    results: Dict[str, Any] = {"days": days}
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        await populate(db, property_id, start, days, random.Random(seed))
+
+        async def measure(label, func):
+            timings = []
+            for _ in range(repeats):
+                statements.clear()
+                t0 = time.perf_counter()
+                await func()
+                timings.append(time.perf_counter() - t0)
+            results[f"{label}_ms"] = sorted(timings)[len(timings) // 2] * 1000
+            results[f"{label}_queries"] = len(statements)
+
+        await measure("per_day", lambda: per_day_baseline(db, property_id, start, days))
+        await measure(
+            "range_cold",
+            lambda: CalendarRangeLoader(db, cache=CalendarSegmentCache()).get_calendar(property_id, start, end),
+        )
+
+        warm_cache = CalendarSegmentCache()
+        await CalendarRangeLoader(db, cache=warm_cache).get_calendar(property_id, start, end)
+        await measure(
+            "range_cached",
+            lambda: CalendarRangeLoader(db, cache=warm_cache).get_calendar(property_id, start, end),
+        )
+
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.days, args.repeats, args.seed))
+
+    logger.info(f"Calendar window: {results['days']} days")
+    logger.info(
+        f"Per-day rule queries (rules only): {results['per_day_ms']:.1f} ms, "
+        f"{results['per_day_queries']} queries"
+    )
+    logger.info(
+        f"Range loader, cold: {results['range_cold_ms']:.1f} ms, "
+        f"{results['range_cold_queries']} queries"
+    )
+    logger.info(
+        f"Range loader, cached months: {results['range_cached_ms']:.1f} ms, "
+        f"{results['range_cached_queries']} queries"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+iCal Sync Throughput Benchmark
+
+Starts a local HTTP fixture server serving thousands of synthetic iCal
+feeds and compares the previous sequential sync (new session per feed,
+full download, in-memory parse) with IcalSyncEngine on a first sync and
+on a conditional re-sync where most feeds are unchanged.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+from uuid import uuid4
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.ical_sync_engine import IcalStreamParser, IcalSyncEngine  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def make_feed(rng: random.Random, events: int) -> bytes:
+    """Build an iCal document with folded description lines"""
+    start = date.today()
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Benchmark//EN"]
+    for i in range(events):
+        check_in = start + timedelta(days=rng.randint(0, 365))
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{uuid4().hex}@benchmark",
+            f"DTSTART;VALUE=DATE:{check_in:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{check_in + timedelta(days=rng.randint(1, 7)):%Y%m%d}",
+            "SUMMARY:Reserved",
+            "DESCRIPTION:Reservation URL: https://example.com/hosting/reservations/",
+            f" details/{uuid4().hex}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+def publish(feeds: Dict[str, Any], name: str, body: bytes) -> None:
+    """Store a feed body with its strong ETag"""
+    feeds[name] = (body, '"%s"' % hashlib.md5(body).hexdigest())
+
+
+async def start_server(feeds: Dict[str, Any], latency: float):
+    async def handle(request):
+        await asyncio.sleep(latency)
+        body, etag = feeds[request.match_info["name"]]
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(body=body, headers={"ETag": etag}, content_type="text/calendar")
+
+    app = web.Application()
+    app.router.add_get("/feeds/{name}.ics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
+
+
+async def sequential_baseline(calendars: List[Any]) -> int:
+    """Previous behaviour: one session per feed, full text, split in memory"""
+    events = 0
+    for calendar in calendars:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(calendar.calendar_url, timeout=30) as response:
+                text = await response.text()
+        parser = IcalStreamParser()
+        events += len(parser.feed(text.encode()) + parser.close())
+    return events
+
+
+async def run_benchmark(feed_count: int, events_per_feed: int, concurrency: int,
+                        latency: float, changed_ratio: float, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    feeds: Dict[str, Any] = {}
+    for i in range(feed_count):
+        publish(feeds, f"cal{i}", make_feed(rng, events_per_feed))
+    runner, port = await start_server(feeds, latency)
+
+    calendars = [
+        SimpleNamespace(
+            id=name, calendar_url=f"http://127.0.0.1:{port}/feeds/{name}.ics",
+            feed_etag=None, feed_last_modified=None, feed_content_hash=None,
+        )
+        for name in feeds
+    ]
+    results: Dict[str, Any] = {"feeds": feed_count, "concurrency": concurrency}
+
+    try:
+        sample = calendars[: min(feed_count, 200)]
+        t0 = time.perf_counter()
+        await sequential_baseline(sample)
+        results["sequential_feeds_per_second"] = len(sample) / (time.perf_counter() - t0)
+
+        engine = IcalSyncEngine(max_concurrency=concurrency)
+        first = await engine.fetch_all(calendars)
+        results["first_sync"] = engine.last_run.to_dict()
+
+        for calendar, result in zip(calendars, first):
+            calendar.feed_etag = result.etag
+            calendar.feed_content_hash = result.content_hash
+
+        for name in rng.sample(list(feeds), int(feed_count * changed_ratio)):
+            publish(feeds, name, make_feed(rng, events_per_feed))
+
+        await engine.fetch_all(calendars)
+        results["resync"] = engine.last_run.to_dict()
+    finally:
+        await runner.cleanup()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--feeds", type=int, default=3000)
+    parser.add_argument("--events-per-feed", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--changed-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(
+        args.feeds, args.events_per_feed, args.concurrency,
+        args.latency_ms / 1000, args.changed_ratio, args.seed
+    ))
+
+    logger.info(f"Feeds: {results['feeds']}, concurrency {results['concurrency']}")
+    logger.info(f"Sequential baseline: {results['sequential_feeds_per_second']:.1f} feeds/s")
+    for label in ("first_sync", "resync"):
+        stats = results[label]
+        logger.info(
+            f"{label}: {stats['feeds_per_second']:.1f} feeds/s in {stats['elapsed_seconds']}s "
+            f"({stats['changed']} changed, {stats['unchanged']} unchanged, "
+            f"{stats['not_modified']} not modified, {stats['bytes_read']} bytes)"
+        )
+
+
+if __name__ == "__main__":
+    main()
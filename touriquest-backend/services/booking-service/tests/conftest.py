@@ -0,0 +1,33 @@
+"""
+Test configuration and shared helpers for booking service tests
+"""
+
+from uuid import UUID, uuid4
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.models.booking_models import Base
+
+
+def sqlite_uuid():
+    """uuid4 whose hex SQLite's NUMERIC affinity cannot coerce to a number"""
+    return UUID("a" + uuid4().hex[1:])
+
+
+async def create_sqlite_engine(url="sqlite+aiosqlite://", relaxed_durability=False, **engine_kwargs) -> AsyncEngine:
+    """SQLite engine with the booking schema created"""
+    engine = create_async_engine(url, **engine_kwargs)
+
+    if relaxed_durability:
+        @event.listens_for(engine.sync_engine, "connect")
+        def relax_durability(dbapi_connection, connection_record):
+            # One commit per delivery; skip the fsync a real database would do
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.close()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
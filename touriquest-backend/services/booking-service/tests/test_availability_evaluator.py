@@ -0,0 +1,164 @@
+"""
+Test Suite for Consolidated Availability Evaluation
+
+Loads stay conflicts from an in-memory SQLite database through the single
+CTE query and checks the interval-based decision.
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.booking_models import (
+    AvailabilityLock,
+    AvailabilityLockStatus,
+    Base,
+    Booking,
+    BookingCalendarSync,
+    BookingStatus,
+    CancellationPolicyType,
+)
+from app.services.availability_evaluator import (
+    AvailabilityEvaluator,
+    interval_dates,
+    merge_intervals,
+)
+
+PROPERTY_ID = uuid4()
+LOCK_OWNER = uuid4()
+WINDOW_START = date.today() + timedelta(days=60)
+PROPERTY_DETAILS = {"max_guests": 4, "minimum_stay_nights": 2, "maximum_stay_nights": 30}
+
+
+def day(n):
+    """Day n (1-based) of a window safely in the future"""
+    return WINDOW_START + timedelta(days=n - 1)
+
+
+def make_booking(check_in, check_out, status=BookingStatus.CONFIRMED, number="TQ0001"):
+    return Booking(
+        id=uuid4(), booking_number=number, property_id=PROPERTY_ID,
+        guest_id=uuid4(), host_id=uuid4(),
+        check_in_date=check_in, check_out_date=check_out,
+        number_of_guests=2, adults=2, status=status,
+        base_price=Decimal("100.00"), total_amount=Decimal("300.00"),
+        guest_email="guest@example.com", guest_name="Guest",
+        cancellation_policy=CancellationPolicyType.MODERATE,
+    )
+
+
+def make_calendar_row(calendar_type, start, end, is_blocking=True, notes=None):
+    return BookingCalendarSync(
+        id=uuid4(), property_id=PROPERTY_ID, calendar_type=calendar_type,
+        sync_status="active", external_check_in=start, external_check_out=end,
+        external_guest_name=calendar_type, is_blocking=is_blocking, notes=notes,
+    )
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        db.add_all([
+            make_booking(day(1), day(4), number="TQ0001"),
+            make_booking(day(3), day(6), number="TQ0002"),
+            make_booking(day(8), day(9), status=BookingStatus.CANCELLED, number="TQ0003"),
+            make_calendar_row("manual_block", day(9), day(11)),
+            make_calendar_row("pricing_rule", day(1), day(31), is_blocking=False),
+            make_calendar_row("minimum_stay_rule", day(20), day(31),
+                              is_blocking=False, notes={"minimum_stay": 5}),
+            AvailabilityLock(
+                id=uuid4(), property_id=PROPERTY_ID, user_id=LOCK_OWNER,
+                check_in_date=day(14), check_out_date=day(16),
+                status=AvailabilityLockStatus.ACTIVE,
+                expires_at=datetime.utcnow() + timedelta(minutes=15),
+            ),
+        ])
+        await db.commit()
+
+        statements.clear()
+        db.statements = statements
+        yield db
+
+    await engine.dispose()
+
+
+class TestIntervalMath:
+    """Test cases for interval merging"""
+
+    def test_overlapping_and_adjacent_intervals_merge(self):
+        merged = merge_intervals(
+            [(date(2025, 1, 5), date(2025, 1, 8)), (date(2025, 1, 1), date(2025, 1, 3)),
+             (date(2025, 1, 3), date(2025, 1, 4)), (date(2025, 1, 6), date(2025, 1, 12))],
+            date(2025, 1, 2), date(2025, 1, 10),
+        )
+
+        assert merged == [(date(2025, 1, 2), date(2025, 1, 4)), (date(2025, 1, 5), date(2025, 1, 10))]
+        assert len(interval_dates(merged)) == 7
+
+
+class TestAvailabilityEvaluator:
+    """Test cases for the single-query availability evaluation"""
+
+    async def test_conflicts_load_in_one_query(self, session):
+        evaluator = AvailabilityEvaluator(session)
+
+        conflicts = await evaluator.load_conflicts(PROPERTY_ID, day(1), day(30))
+
+        assert len(session.statements) == 1
+        assert [b.label for b in conflicts.bookings] == ["TQ0001", "TQ0002"]
+        assert len(conflicts.blocks) == 1
+        assert conflicts.locks[0].owner_id == LOCK_OWNER
+        assert conflicts.locks[0].expires_at is not None
+        assert conflicts.stay_rules[0].notes == {"minimum_stay": 5}
+
+    async def test_overlapping_bookings_and_blocks_yield_unavailable_nights(self, session):
+        evaluator = AvailabilityEvaluator(session)
+        check_in, check_out = day(2), day(12)
+
+        conflicts = await evaluator.load_conflicts(PROPERTY_ID, check_in, check_out)
+        decision = evaluator.evaluate(conflicts, PROPERTY_DETAILS, check_in, check_out, 2)
+
+        assert not decision.is_available
+        assert decision.unavailable_dates == [
+            day(2), day(3), day(4), day(5),
+            day(9), day(10),
+        ]
+
+    async def test_locks_do_not_block_but_are_reported_per_owner(self, session):
+        evaluator = AvailabilityEvaluator(session)
+        check_in, check_out = day(12), day(17)
+
+        conflicts = await evaluator.load_conflicts(PROPERTY_ID, check_in, check_out)
+        decision = evaluator.evaluate(conflicts, PROPERTY_DETAILS, check_in, check_out, 2)
+
+        assert decision.is_available
+        assert conflicts.own_lock(LOCK_OWNER) is not None
+        assert conflicts.foreign_lock(LOCK_OWNER) is None
+        assert conflicts.foreign_lock(uuid4()) is not None
+
+    async def test_minimum_stay_rule_tightens_stay_requirement(self, session):
+        evaluator = AvailabilityEvaluator(session)
+        check_in, check_out = day(22), day(25)
+
+        conflicts = await evaluator.load_conflicts(PROPERTY_ID, check_in, check_out)
+        decision = evaluator.evaluate(conflicts, PROPERTY_DETAILS, check_in, check_out, 2)
+
+        assert decision.dates_available
+        assert not decision.stay_requirements_met
+        assert decision.minimum_stay_nights == 5
+        assert decision.restrictions == ["Minimum stay is 5 nights for the selected dates"]
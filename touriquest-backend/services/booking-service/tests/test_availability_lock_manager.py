@@ -0,0 +1,196 @@
+"""
+Test Suite for Redis-backed Availability Locks
+
+Runs the acquire/release scripts against fakeredis (with Lua support) and
+reconciles the held locks into an in-memory SQLite database.
+"""
+
+import asyncio
+import random
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from fakeredis import aioredis as fake_aioredis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.booking_models import AvailabilityLock, AvailabilityLockStatus, Base
+from app.services.availability_lock_manager import (
+    AvailabilityLockManager,
+    reconcile_availability_locks,
+)
+
+PROPERTY_ID = uuid4()
+WINDOW_START = date(2030, 1, 1)
+
+
+def day(n):
+    return WINDOW_START + timedelta(days=n - 1)
+
+
+class FakeClock:
+    """Millisecond clock the tests can move forward"""
+
+    def __init__(self):
+        self.now = 1_900_000_000_000
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+async def redis_client():
+    client = fake_aioredis.FakeRedis(max_connections=1000)
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def manager(redis_client, clock):
+    return AvailabilityLockManager(redis_client, clock=clock)
+
+
+class TestAcquireRelease:
+    """Test cases for single-user acquire, extend and release"""
+
+    async def test_acquire_then_conflict(self, manager):
+        owner, other = uuid4(), uuid4()
+
+        grant = await manager.acquire(PROPERTY_ID, day(1), day(4), owner, ttl_seconds=900)
+        assert grant.acquired and not grant.extended
+
+        blocked = await manager.acquire(PROPERTY_ID, day(3), day(6), other, ttl_seconds=900)
+        assert not blocked.acquired
+        assert blocked.status == AvailabilityLockStatus.CONFLICT
+        assert blocked.lock_id == grant.lock_id
+        assert blocked.expires_at == grant.expires_at
+
+        # Check-out day is free for the next guest (half-open ranges)
+        adjacent = await manager.acquire(PROPERTY_ID, day(4), day(6), other, ttl_seconds=900)
+        assert adjacent.acquired
+
+    async def test_same_user_extends(self, manager, clock):
+        owner = uuid4()
+        first = await manager.acquire(PROPERTY_ID, day(1), day(4), owner, ttl_seconds=60)
+
+        clock.now += 30_000
+        second = await manager.acquire(PROPERTY_ID, day(1), day(4), owner, ttl_seconds=60)
+
+        assert second.extended
+        assert second.lock_id == first.lock_id
+        assert second.expires_at - first.expires_at == timedelta(seconds=30)
+
+    async def test_expiry_by_ttl(self, manager, clock):
+        owner, other = uuid4(), uuid4()
+        await manager.acquire(PROPERTY_ID, day(1), day(4), owner, ttl_seconds=60)
+
+        clock.now += 60_000
+        grant = await manager.acquire(PROPERTY_ID, day(2), day(3), other, ttl_seconds=60)
+
+        assert grant.acquired
+        assert [lock.user_id for lock in await manager.held_locks()] == [other]
+
+    async def test_many_holds_expiring_together_are_purged(self, manager, redis_client, clock):
+        # More expired members than Lua can unpack onto its stack at once
+        intervals, ranges = manager._property_keys(PROPERTY_ID)
+        expired = {str(uuid4()): clock.now for _ in range(20000)}
+        await redis_client.zadd(intervals, expired)
+        await redis_client.hset(ranges, mapping={
+            lock_id: f"{day(1).toordinal()}|{day(2).toordinal()}|{uuid4()}|" for lock_id in expired
+        })
+
+        grant = await manager.acquire(PROPERTY_ID, day(1), day(2), uuid4(), ttl_seconds=60)
+
+        assert grant.acquired
+        assert await redis_client.hlen(ranges) == 1
+
+    async def test_release_requires_owner(self, manager):
+        owner, other = uuid4(), uuid4()
+        grant = await manager.acquire(PROPERTY_ID, day(1), day(4), owner, ttl_seconds=900)
+
+        assert not await manager.release(PROPERTY_ID, grant.lock_id, other)
+        assert await manager.release(PROPERTY_ID, grant.lock_id, owner)
+        assert not await manager.release(PROPERTY_ID, grant.lock_id, owner)
+        assert (await manager.acquire(PROPERTY_ID, day(1), day(4), other, ttl_seconds=900)).acquired
+
+
+class TestContention:
+    """Test cases for many concurrent checkouts on one property"""
+
+    async def test_concurrent_checkouts_never_overlap(self, manager):
+        rng = random.Random(7)
+        requests = []
+        for _ in range(500):
+            check_in = rng.randint(1, 60)
+            requests.append((day(check_in), day(check_in + rng.randint(1, 7)), uuid4()))
+
+        grants = await asyncio.gather(*(
+            manager.acquire(PROPERTY_ID, check_in, check_out, user_id, ttl_seconds=900)
+            for check_in, check_out, user_id in requests
+        ))
+
+        won = sorted(
+            (check_in, check_out)
+            for (check_in, check_out, _), grant in zip(requests, grants) if grant.acquired
+        )
+        assert len(won) > 1
+        assert all(prev[1] <= cur[0] for prev, cur in zip(won, won[1:]))
+
+        held = await manager.held_locks([PROPERTY_ID])
+        assert sorted((lock.check_in_date, lock.check_out_date) for lock in held) == won
+
+    async def test_same_stay_single_winner(self, manager):
+        grants = await asyncio.gather(*(
+            manager.acquire(PROPERTY_ID, day(10), day(12), uuid4(), ttl_seconds=900)
+            for _ in range(300)
+        ))
+
+        winners = {grant.lock_id for grant in grants if grant.acquired}
+        assert len(winners) == 1
+        assert all(grant.lock_id in winners for grant in grants)
+
+
+class TestReconciliation:
+    """Test cases for bulk database reconciliation"""
+
+    async def test_reconcile_inserts_refreshes_and_expires(self, manager, clock):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        owner = uuid4()
+        stale_id = uuid4()
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            db.add(AvailabilityLock(
+                id=stale_id, property_id=PROPERTY_ID, user_id=uuid4(),
+                check_in_date=day(20), check_out_date=day(22),
+                status=AvailabilityLockStatus.ACTIVE,
+                expires_at=datetime.utcnow() + timedelta(minutes=5),
+            ))
+            await db.commit()
+
+            grant = await manager.acquire(PROPERTY_ID, day(1), day(4), owner, ttl_seconds=900)
+            summary = await reconcile_availability_locks(db, manager)
+            assert summary == {'held': 1, 'inserted': 1, 'refreshed': 0, 'expired': 1}
+
+            clock.now += 60_000
+            await manager.acquire(PROPERTY_ID, day(1), day(4), owner, ttl_seconds=900)
+            summary = await reconcile_availability_locks(db, manager)
+            assert summary == {'held': 1, 'inserted': 0, 'refreshed': 1, 'expired': 0}
+
+            rows = {
+                lock.id: lock for lock in
+                (await db.execute(select(AvailabilityLock))).scalars().all()
+            }
+            assert rows[stale_id].status == AvailabilityLockStatus.EXPIRED
+            assert rows[grant.lock_id].status == AvailabilityLockStatus.ACTIVE
+            assert rows[grant.lock_id].expires_at == grant.expires_at + timedelta(seconds=60)
+
+        await engine.dispose()
+
@@ -0,0 +1,232 @@
+"""
+Test Suite for the Booking Analytics Engine
+
+Checks that the incrementally maintained daily summary matches a full
+rebuild, that dashboard figures read from it agree with aggregating the raw
+bookings, and that keyset pagination walks every booking exactly once.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.booking_models import (
+    Base,
+    Booking,
+    BookingDailySummary,
+    BookingStatus,
+    CancellationPolicyType,
+)
+from app.services.booking_analytics_engine import (
+    REVENUE_STATUSES,
+    BookingAnalyticsEngine,
+    BookingSummaryState,
+    apply_keyset_page,
+    encode_cursor,
+    rebuild_booking_summaries,
+    record_booking_change,
+)
+
+HOST_ID = uuid4()
+OTHER_HOST_ID = uuid4()
+PROPERTY_IDS = [uuid4() for _ in range(3)]
+PERIOD_START = date(2030, 1, 1)
+
+
+def make_booking(rng, n, host_id, property_id):
+    created_at = datetime.combine(PERIOD_START, datetime.min.time()) + timedelta(
+        days=rng.randint(0, 59), hours=rng.randint(0, 23)
+    )
+    check_in = created_at.date() + timedelta(days=rng.randint(1, 60))
+    return Booking(
+        id=uuid4(), booking_number=f"TQ{n:08d}", property_id=property_id,
+        guest_id=uuid4(), host_id=host_id,
+        check_in_date=check_in, check_out_date=check_in + timedelta(days=rng.randint(1, 6)),
+        number_of_guests=2, adults=2, status=BookingStatus.PENDING,
+        base_price=Decimal("100.00"), total_amount=Decimal(rng.choice([150, 300, 450])),
+        guest_email="guest@example.com", guest_name="Guest",
+        cancellation_policy=CancellationPolicyType.MODERATE,
+        created_at=created_at,
+    )
+
+
+def transition(rng, booking):
+    """Move a booking along a plausible lifecycle path"""
+    path = rng.choice([
+        [],
+        [BookingStatus.CANCELLED],
+        [BookingStatus.CONFIRMED],
+        [BookingStatus.CONFIRMED, BookingStatus.CANCELLED],
+        [BookingStatus.CONFIRMED, BookingStatus.CHECKED_IN, BookingStatus.CHECKED_OUT],
+    ])
+    for status in path:
+        booking.status = status
+        if status == BookingStatus.CONFIRMED:
+            booking.confirmed_at = booking.created_at + timedelta(hours=2)
+        yield
+
+
+async def summary_rows(db):
+    result = await db.execute(select(BookingDailySummary))
+    return {
+        (row.property_id, row.summary_date): (
+            row.bookings_created, row.confirmed_bookings, row.cancelled_bookings,
+            float(row.revenue), row.lead_time_days_total, row.lead_time_samples,
+            row.nights_occupied,
+        )
+        for row in result.scalars()
+        if any((row.bookings_created, row.confirmed_bookings, row.cancelled_bookings,
+                float(row.revenue), row.lead_time_samples, row.nights_occupied))
+    }
+
+
+class TestIncrementalSummary:
+    """Test cases for keeping the summary in step with booking changes"""
+
+    async def test_incremental_changes_match_full_rebuild(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        rng = random.Random(5)
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            bookings = [make_booking(rng, n, HOST_ID, PROPERTY_IDS[n % 3]) for n in range(300)]
+            for booking in bookings:
+                db.add(booking)
+                await record_booking_change(db, None, BookingSummaryState.of(booking))
+            await db.commit()
+
+            for booking in bookings:
+                before = BookingSummaryState.of(booking)
+                for _ in transition(rng, booking):
+                    after = BookingSummaryState.of(booking)
+                    await record_booking_change(db, before, after)
+                    before = after
+            await db.commit()
+
+            incremental = await summary_rows(db)
+            await rebuild_booking_summaries(db, batch_size=50)
+            assert await summary_rows(db) == incremental
+
+        await engine.dispose()
+
+    async def test_sessions_bound_per_table_record_changes(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        booking = make_booking(random.Random(1), 0, HOST_ID, PROPERTY_IDS[0])
+        async with AsyncSession(binds={Base: engine}, expire_on_commit=False) as db:
+            db.add(booking)
+            await record_booking_change(db, None, BookingSummaryState.of(booking))
+            await db.commit()
+
+            assert len(await summary_rows(db)) == 1
+
+        await engine.dispose()
+
+
+class TestAnalyticsEngine:
+    """Test cases for dashboard figures read from the summary"""
+
+    @pytest.fixture
+    async def db(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        rng = random.Random(11)
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            for n in range(300):
+                # The last property belongs to another host
+                host_id = OTHER_HOST_ID if n % 3 == 2 else HOST_ID
+                booking = make_booking(rng, n, host_id, PROPERTY_IDS[n % 3])
+                for _ in transition(rng, booking):
+                    pass
+                db.add(booking)
+            await db.commit()
+            await rebuild_booking_summaries(db)
+            yield db
+
+        await engine.dispose()
+
+    async def test_host_analytics_match_raw_aggregation(self, db):
+        start, end = PERIOD_START + timedelta(days=10), PERIOD_START + timedelta(days=40)
+        analytics = await BookingAnalyticsEngine(db).get_analytics(start, end, host_id=HOST_ID)
+
+        bookings = [
+            b for b in (await db.execute(select(Booking))).scalars()
+            if b.host_id == HOST_ID and start <= b.created_at.date() <= end
+        ]
+        confirmed = [b for b in bookings if b.status == BookingStatus.CONFIRMED]
+        revenue = sum(float(b.total_amount) for b in bookings if b.status in REVENUE_STATUSES)
+        lead_times = [(b.check_in_date - b.confirmed_at.date()).days for b in confirmed]
+
+        assert analytics['total_bookings'] == len(bookings)
+        assert analytics['confirmed_bookings'] == len(confirmed)
+        assert analytics['cancelled_bookings'] == sum(
+            1 for b in bookings if b.status == BookingStatus.CANCELLED
+        )
+        assert analytics['total_revenue'] == pytest.approx(revenue)
+        assert analytics['average_lead_time_days'] == round(sum(lead_times) / len(lead_times), 1)
+
+    async def test_occupancy_counts_only_nights_inside_the_window(self, db):
+        property_id = uuid4()
+        rng = random.Random(1)
+        stays = [
+            (25, 32, BookingStatus.CONFIRMED),    # 2 nights inside [30, 60)
+            (40, 45, BookingStatus.CANCELLED),    # not occupied
+            (55, 70, BookingStatus.CHECKED_OUT),  # 5 nights inside
+        ]
+        for n, (check_in, check_out, status) in enumerate(stays):
+            booking = make_booking(rng, 1000 + n, HOST_ID, property_id)
+            booking.check_in_date = PERIOD_START + timedelta(days=check_in)
+            booking.check_out_date = PERIOD_START + timedelta(days=check_out)
+            booking.status = status
+            db.add(booking)
+            await record_booking_change(db, None, BookingSummaryState.of(booking))
+        await db.commit()
+
+        rate = await BookingAnalyticsEngine(db).get_occupancy_rate(
+            property_id, PERIOD_START + timedelta(days=30), PERIOD_START + timedelta(days=60)
+        )
+        assert rate == pytest.approx(7 / 30)
+
+
+class TestKeysetPagination:
+    """Test cases for cursor-based booking lists"""
+
+    @pytest.mark.parametrize("sort_by", ["created_at", "check_in_date", "total_amount"])
+    @pytest.mark.parametrize("sort_order", ["asc", "desc"])
+    async def test_cursor_walk_visits_every_booking_once(self, sort_by, sort_order):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        rng = random.Random(3)
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            db.add_all(make_booking(rng, n, HOST_ID, PROPERTY_IDS[0]) for n in range(103))
+            await db.commit()
+
+            seen, cursor = [], None
+            while True:
+                stmt, column = apply_keyset_page(
+                    select(Booking).where(Booking.host_id == HOST_ID),
+                    sort_by, sort_order, cursor, 10
+                )
+                page = (await db.execute(stmt)).scalars().all()
+                if not page:
+                    break
+                seen.extend(page)
+                cursor = encode_cursor(getattr(page[-1], column), page[-1].id)
+
+            keys = [(getattr(b, sort_by), b.id) for b in seen]
+            assert len({b.id for b in seen}) == len(seen) == 103
+            assert keys == sorted(keys, reverse=sort_order == "desc")
+
+        await engine.dispose()
@@ -0,0 +1,143 @@
+"""
+Test Suite for Booking Lifecycle Batch Jobs
+
+Seeds 100k synthetic bookings into SQLite and runs the chunked, set-based
+auto-decline, check-in reminder and auto-complete jobs over them.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking_models import (
+    Booking,
+    BookingNotification,
+    BookingStatus,
+    CancellationPolicyType,
+)
+from app.services.booking_lifecycle_jobs import (
+    AUTO_COMPLETE_JOB,
+    AUTO_DECLINE_JOB,
+    CHECKIN_REMINDER_JOB,
+    BookingLifecycleBatchRunner,
+)
+from conftest import create_sqlite_engine, sqlite_uuid
+
+NOW = datetime(2030, 6, 15, 12, 0)
+TOTAL_BOOKINGS = 100_000
+
+# Every fifth booking matches one of the jobs; the rest are noise
+SCENARIOS = [
+    # (status, check_in offset, check_out offset, deadline offset in hours)
+    (BookingStatus.PENDING, 10, 13, -1),  # expired deadline -> declined
+    (BookingStatus.CONFIRMED, 1, 4, None),  # checks in tomorrow -> reminder
+    (BookingStatus.CHECKED_OUT, -5, -2, None),  # checked out -> completed
+    (BookingStatus.PENDING, 10, 13, 5),  # deadline still open
+    (BookingStatus.CONFIRMED, 3, 6, None),  # not tomorrow
+]
+
+
+def synthetic_bookings(count):
+    today = NOW.date()
+    for n in range(count):
+        status, check_in, check_out, deadline = SCENARIOS[n % len(SCENARIOS)]
+        yield {
+            'id': sqlite_uuid(),
+            'booking_number': f"TQ{n:010d}",
+            'property_id': sqlite_uuid(),
+            'guest_id': sqlite_uuid(),
+            'host_id': sqlite_uuid(),
+            'check_in_date': today + timedelta(days=check_in),
+            'check_out_date': today + timedelta(days=check_out),
+            'number_of_guests': 2,
+            'adults': 2,
+            'status': status,
+            'base_price': 100,
+            'total_amount': 300,
+            'guest_email': "guest@example.com",
+            'guest_name': "Guest",
+            'cancellation_policy': CancellationPolicyType.MODERATE,
+            'host_response_deadline': NOW + timedelta(hours=deadline) if deadline else None,
+            'created_at': NOW,
+        }
+
+
+async def create_engine_with_bookings(url, count):
+    engine = await create_sqlite_engine(url)
+    async with engine.begin() as conn:
+        await conn.execute(insert(Booking), list(synthetic_bookings(count)))
+    return engine
+
+
+async def count_where(db, *criteria):
+    return await db.scalar(select(func.count()).select_from(Booking).where(*criteria))
+
+
+class TestLifecycleJobs:
+    """Test cases for lifecycle jobs over 100k bookings"""
+
+    async def test_jobs_process_100k_bookings_in_chunks(self):
+        engine = await create_engine_with_bookings("sqlite+aiosqlite://", TOTAL_BOOKINGS)
+        expected = TOTAL_BOOKINGS // len(SCENARIOS)
+
+        statements = []
+        event.listen(
+            engine.sync_engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            runner = BookingLifecycleBatchRunner(db, chunk_size=5000)
+
+            declined = await runner.run(AUTO_DECLINE_JOB, now=NOW)
+            reminded = await runner.run(CHECKIN_REMINDER_JOB, now=NOW)
+            completed = await runner.run(AUTO_COMPLETE_JOB, now=NOW)
+
+            for report in (declined, reminded, completed):
+                assert report.rows == expected
+                assert report.chunks == expected // 5000
+                assert report.rows_per_second > 0
+
+            # One UPDATE per chunk plus a final empty probe, one INSERT per
+            # notifying chunk; nothing row by row
+            assert len(statements) == 3 * (expected // 5000 + 1) + 2 * (expected // 5000)
+
+            assert declined.notifications == reminded.notifications == expected
+            assert completed.notifications == 0
+            assert await count_where(db, Booking.status == BookingStatus.DECLINED) == expected
+            assert await count_where(db, Booking.status == BookingStatus.COMPLETED) == expected
+            assert await count_where(db, Booking.checkin_reminder_sent_at.is_not(None)) == expected
+            assert await db.scalar(select(func.count()).select_from(BookingNotification)) == 2 * expected
+
+            # Re-running finds nothing left to do, so no duplicate reminders
+            again = await runner.run(CHECKIN_REMINDER_JOB, now=NOW)
+            assert again.rows == 0
+
+        await engine.dispose()
+
+    async def test_concurrent_workers_share_work_without_duplicates(self, tmp_path):
+        engine = await create_engine_with_bookings(
+            f"sqlite+aiosqlite:///{tmp_path / 'bookings.db'}", 10_000
+        )
+
+        async def worker():
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                return await BookingLifecycleBatchRunner(db, chunk_size=250).run(
+                    CHECKIN_REMINDER_JOB, now=NOW
+                )
+
+        reports = await asyncio.gather(*(worker() for _ in range(4)))
+
+        async with AsyncSession(engine) as db:
+            notifications = await db.scalar(
+                select(func.count(func.distinct(BookingNotification.booking_id)))
+            )
+            total = await db.scalar(select(func.count()).select_from(BookingNotification))
+
+        assert sum(report.rows for report in reports) == 2_000
+        assert notifications == total == 2_000
+
+        await engine.dispose()
@@ -0,0 +1,166 @@
+"""
+Test Suite for Booking Number Allocation
+
+Several allocators (one per simulated worker) lease blocks from a shared
+Redis counter on fakeredis and hand out a million numbers concurrently.
+The process-wide sequence allocator is looked up from session binds.
+"""
+
+import asyncio
+import time
+
+import pytest
+from fakeredis import aioredis as fake_aioredis
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.booking_models import Base, Booking
+from app.services.booking_number_allocator import (
+    COUNTER_MASK,
+    BookingNumberAllocator,
+    BookingNumberExhaustedError,
+    RedisBlockSource,
+    encode_booking_number,
+    get_sequence_allocator,
+    is_valid_booking_number,
+    permute_counter,
+)
+
+
+class MemorySource:
+    """In-process counter blocks with a short lease round trip, usable from any event loop"""
+
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self.counter = 0
+
+    async def lease(self):
+        start = self.counter
+        self.counter += self.block_size
+        await asyncio.sleep(0.01)
+        return start
+
+
+class CountingSource:
+    """Wraps a block source and records how long callers waited on it"""
+
+    def __init__(self, source, delay=0.0):
+        self.source = source
+        self.block_size = source.block_size
+        self.delay = delay
+        self.leases = 0
+
+    async def lease(self):
+        self.leases += 1
+        await asyncio.sleep(self.delay)
+        return await self.source.lease()
+
+
+class TestEncoding:
+    """Test cases for the booking number format"""
+
+    def test_permutation_is_bijective_on_a_sample(self):
+        sample = range(0, COUNTER_MASK, COUNTER_MASK // 200_000)
+        assert len({permute_counter(value) for value in sample}) == len(sample)
+
+    def test_numbers_are_human_friendly_and_checked(self):
+        number = encode_booking_number(12345)
+
+        assert len(number) == 11 and number.startswith("TQ")
+        assert not set(number[2:]) & set("ILOU")
+        assert is_valid_booking_number(number)
+        assert is_valid_booking_number(number.lower().replace("tq", "TQ"))
+
+        # Any single mistyped symbol is caught by the check character
+        for position in range(2, len(number)):
+            for symbol in "0123456789ABCDEFGHJKMNPQRSTVWXYZ":
+                if symbol != number[position]:
+                    typo = number[:position] + symbol + number[position + 1:]
+                    assert not is_valid_booking_number(typo)
+
+    def test_counter_space_is_bounded(self):
+        encode_booking_number(COUNTER_MASK)
+        with pytest.raises(BookingNumberExhaustedError):
+            encode_booking_number(COUNTER_MASK + 1)
+
+
+class TestAllocator:
+    """Test cases for block-leased allocation"""
+
+    async def test_million_numbers_across_workers_are_unique(self):
+        redis_client = fake_aioredis.FakeRedis()
+        workers = [
+            BookingNumberAllocator(CountingSource(RedisBlockSource(redis_client, block_size=5000)))
+            for _ in range(8)
+        ]
+
+        async def checkout_burst(allocator, count):
+            return [await allocator.allocate() for _ in range(count)]
+
+        # 8 workers x 25 concurrent checkout streams x 5000 bookings
+        bursts = await asyncio.gather(*(
+            checkout_burst(allocator, 5000)
+            for allocator in workers
+            for _ in range(25)
+        ))
+        numbers = [number for burst in bursts for number in burst]
+
+        assert len(numbers) == 1_000_000
+        assert len(set(numbers)) == 1_000_000
+        # One Redis round trip per 5000 numbers, not one per booking
+        assert sum(worker.source.leases for worker in workers) <= 1_000_000 // 5000 + len(workers)
+
+        await redis_client.aclose()
+
+    async def test_prefetch_keeps_slow_source_off_the_hot_path(self):
+        redis_client = fake_aioredis.FakeRedis()
+        source = CountingSource(RedisBlockSource(redis_client, block_size=100), delay=0.005)
+        allocator = BookingNumberAllocator(source)
+
+        await allocator.allocate()  # first block is leased on demand
+
+        stalls = 0
+        for _ in range(300):
+            started = time.perf_counter()
+            await allocator.allocate()
+            if time.perf_counter() - started >= source.delay:
+                stalls += 1
+            await asyncio.sleep(0.001)  # rest of the checkout
+
+        assert allocator.blocks_leased >= 3
+        assert stalls == 0
+
+        await redis_client.aclose()
+
+    def test_allocator_outlives_its_event_loop(self):
+        allocator = BookingNumberAllocator(MemorySource(block_size=8))
+
+        async def allocate(count):
+            return [await allocator.allocate() for _ in range(count)]
+
+        # The first loop leaves a prefetch pending; the second must not await it
+        first = asyncio.run(allocate(7))
+        second = asyncio.run(allocate(10))
+
+        assert len(set(first + second)) == 17
+
+
+class TestSequenceAllocator:
+    """Test cases for the process-wide allocator of a database engine"""
+
+    async def test_sessions_on_the_same_engine_share_an_allocator(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+
+        async with engine.connect() as conn:
+            bound_to_engine = AsyncSession(engine)
+            bound_to_connection = AsyncSession(bind=conn)
+            bound_per_table = AsyncSession(binds={Base: engine})
+
+            allocator = get_sequence_allocator(bound_to_engine.get_bind(Booking))
+            assert get_sequence_allocator(bound_to_connection.get_bind(Booking)) is allocator
+            assert get_sequence_allocator(bound_per_table.get_bind(Booking)) is allocator
+            assert get_sequence_allocator(engine) is allocator
+
+            for session in (bound_to_engine, bound_to_connection, bound_per_table):
+                await session.close()
+
+        await engine.dispose()
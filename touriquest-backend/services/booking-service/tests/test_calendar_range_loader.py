@@ -0,0 +1,202 @@
+"""
+Test Suite for Calendar Range Loading
+
+Runs CalendarRangeLoader against an in-memory SQLite database and counts
+the statements issued for a full-year calendar view.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.booking_models import (
+    Base,
+    Booking,
+    BookingCalendarSync,
+    BookingStatus,
+    CancellationPolicyType,
+)
+from app.services.calendar_range_loader import CalendarRangeLoader, CalendarSegmentCache
+
+PROPERTY_ID = uuid4()
+START = date(2025, 1, 1)
+END = date(2025, 12, 31)
+
+
+def make_booking(check_in, nights, status=BookingStatus.CONFIRMED):
+    return Booking(
+        id=uuid4(),
+        booking_number=f"TQ{uuid4().hex[:10].upper()}",
+        property_id=PROPERTY_ID,
+        guest_id=uuid4(),
+        host_id=uuid4(),
+        check_in_date=check_in,
+        check_out_date=check_in + timedelta(days=nights),
+        number_of_guests=2,
+        adults=2,
+        status=status,
+        base_price=Decimal("100.00"),
+        total_amount=Decimal("100.00") * nights,
+        guest_email="guest@example.com",
+        guest_name="Guest",
+        cancellation_policy=CancellationPolicyType.MODERATE,
+    )
+
+
+def make_calendar_row(calendar_type, start, end, notes=None, is_blocking=True, name="Block"):
+    return BookingCalendarSync(
+        id=uuid4(),
+        property_id=PROPERTY_ID,
+        calendar_type=calendar_type,
+        sync_status="active",
+        external_booking_id=uuid4().hex,
+        external_check_in=start,
+        external_check_out=end,
+        external_guest_name=name,
+        is_blocking=is_blocking,
+        notes=notes,
+    )
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        rows = [
+            make_booking(START + timedelta(days=offset), 3)
+            for offset in range(0, 360, 10)
+        ]
+        rows.append(make_booking(date(2025, 3, 6), 2, status=BookingStatus.CANCELLED))
+        rows.append(make_calendar_row("airbnb", date(2025, 2, 4), date(2025, 2, 8)))
+        rows.append(make_calendar_row("manual_block", date(2025, 2, 6), date(2025, 2, 10), name="Repairs"))
+        rows.append(make_calendar_row(
+            "pricing_rule", date(2025, 7, 1), date(2025, 9, 1), is_blocking=False,
+            notes={"price_adjustment": 20, "adjustment_type": "percentage"},
+        ))
+        rows.append(make_calendar_row(
+            "pricing_rule", date(2025, 8, 1), date(2025, 8, 15), is_blocking=False,
+            notes={"price_adjustment": 15, "adjustment_type": "fixed"},
+        ))
+        rows.append(make_calendar_row(
+            "minimum_stay_rule", date(2025, 12, 20), date(2026, 1, 5), is_blocking=False,
+            notes={"minimum_stay": 5},
+        ))
+        db.add_all(rows)
+        await db.commit()
+
+        statements.clear()
+        db.statements = statements
+        yield db
+
+    await engine.dispose()
+
+
+class TestCalendarRangeLoader:
+    """Test cases for batched calendar loading and month caching"""
+
+    async def test_full_year_uses_constant_number_of_queries(self, session):
+        loader = CalendarRangeLoader(session, cache=CalendarSegmentCache())
+
+        calendar, counts = await loader.get_calendar(PROPERTY_ID, START, END)
+
+        assert len(calendar) == 365
+        assert len(session.statements) == 3  # calendar version, bookings, calendar rows
+        assert counts == {"internal": 36, "external": 1, "manual_block": 1}
+
+    async def test_day_assembly_matches_rules_and_precedence(self, session):
+        loader = CalendarRangeLoader(session, cache=CalendarSegmentCache())
+
+        calendar, _ = await loader.get_calendar(PROPERTY_ID, START, END)
+
+        first_stay = calendar["2025-01-01"]
+        assert first_stay["availability_status"] == "booked"
+        assert first_stay["booking"]["is_check_in"]
+        assert calendar["2025-01-03"]["booking"]["is_check_out"]
+        assert calendar["2025-01-04"]["is_available"]
+
+        # Cancelled bookings do not occupy the calendar
+        assert calendar["2025-03-07"]["is_available"]
+
+        # External blocks take precedence over overlapping manual blocks
+        assert calendar["2025-02-06"]["availability_status"] == "external_airbnb"
+        assert calendar["2025-02-08"]["availability_status"] == "manually_blocked"
+        assert calendar["2025-02-09"]["booking"]["reason"] == "Repairs"
+
+        assert calendar["2025-06-30"]["price"] == Decimal("100.00")
+        assert calendar["2025-07-10"]["price"] == Decimal("120.00")
+        assert calendar["2025-08-05"]["price"] == Decimal("135.00")
+        assert calendar["2025-12-19"]["minimum_stay"] == 1
+        assert calendar["2025-12-31"]["minimum_stay"] == 5
+
+    async def test_cached_months_skip_queries_until_invalidated(self, session):
+        cache = CalendarSegmentCache()
+        loader = CalendarRangeLoader(session, cache=cache)
+
+        await loader.get_calendar(PROPERTY_ID, START, END)
+        session.statements.clear()
+
+        calendar, counts = await loader.get_calendar(PROPERTY_ID, date(2025, 2, 1), date(2025, 2, 28))
+        assert len(session.statements) == 1
+        assert len(calendar) == 28
+        assert counts["external"] == 1
+
+        session.add(make_booking(date(2025, 2, 25), 3))
+        await session.commit()
+        cache.invalidate(PROPERTY_ID)
+        session.statements.clear()
+
+        calendar, _ = await loader.get_calendar(PROPERTY_ID, date(2025, 2, 1), date(2025, 2, 28))
+        assert len(session.statements) == 3
+        assert not calendar["2025-02-26"]["is_available"]
+
+    async def test_writes_from_other_processes_make_cached_months_stale(self, session):
+        # Nothing invalidates the cache here, as for writes made by another worker
+        loader = CalendarRangeLoader(session, cache=CalendarSegmentCache())
+        calendar, _ = await loader.get_calendar(PROPERTY_ID, START, END)
+        assert calendar["2025-02-25"]["is_available"]
+
+        session.add(make_booking(date(2025, 2, 25), 3))
+        await session.commit()
+        calendar, _ = await loader.get_calendar(PROPERTY_ID, date(2025, 2, 1), date(2025, 2, 28))
+        assert not calendar["2025-02-26"]["is_available"]
+
+        booking = (await session.execute(
+            select(Booking).where(Booking.check_in_date == date(2025, 1, 11))
+        )).scalar_one()
+        booking.status = BookingStatus.CANCELLED
+        await session.commit()
+        calendar, counts = await loader.get_calendar(PROPERTY_ID, date(2025, 1, 1), date(2025, 1, 31))
+        assert calendar["2025-01-12"]["is_available"]
+        assert counts["internal"] == 3
+
+        block = (await session.execute(
+            select(BookingCalendarSync).where(BookingCalendarSync.calendar_type == "manual_block")
+        )).scalar_one()
+        await session.delete(block)
+        await session.commit()
+        calendar, _ = await loader.get_calendar(PROPERTY_ID, date(2025, 2, 1), date(2025, 2, 28))
+        assert calendar["2025-02-09"]["is_available"]
+
+    async def test_returned_days_do_not_share_cached_data(self, session):
+        loader = CalendarRangeLoader(session, cache=CalendarSegmentCache())
+        calendar, _ = await loader.get_calendar(PROPERTY_ID, START, END)
+        calendar["2025-01-02"]["is_available"] = True
+        calendar["2025-01-02"]["booking"]["guest_name"] = "Changed"
+
+        calendar, _ = await loader.get_calendar(PROPERTY_ID, date(2025, 1, 1), date(2025, 1, 31))
+        assert not calendar["2025-01-02"]["is_available"]
+        assert calendar["2025-01-02"]["booking"]["guest_name"] == "Guest"
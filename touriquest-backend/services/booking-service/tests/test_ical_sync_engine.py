@@ -0,0 +1,192 @@
+"""
+Test Suite for Concurrent iCal Sync
+
+Serves synthetic feeds from a local aiohttp server and drives
+IcalSyncEngine through first syncs, conditional re-syncs and diffs.
+"""
+
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from aiohttp import web
+
+from app.services.ical_sync_engine import (
+    IcalStreamParser,
+    IcalSyncEngine,
+    diff_calendar_blocks,
+)
+
+
+def make_feed(events):
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0"]
+    for uid, start, end, summary in events:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            f"DTSTART;VALUE=DATE:{start:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{end:%Y%m%d}",
+            f"SUMMARY:{summary}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+class FeedServer:
+    """Local iCal feed server with optional ETag support"""
+
+    def __init__(self, latency=0.0):
+        self.feeds = {}
+        self.latency = latency
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def set_feed(self, name, body, validators=True):
+        etag = f'"{hash(body) & 0xffffffff:x}"' if validators else None
+        self.feeds[name] = (body, etag)
+
+    async def handle(self, request):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if request.match_info["name"] not in self.feeds:
+                return web.Response(status=404)
+            body, etag = self.feeds[request.match_info["name"]]
+            if etag and request.headers.get("If-None-Match") == etag:
+                return web.Response(status=304)
+            headers = {"ETag": etag} if etag else {}
+            return web.Response(body=body, headers=headers, content_type="text/calendar")
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+async def feed_server():
+    server = FeedServer(latency=0.01)
+    app = web.Application()
+    app.router.add_get("/feeds/{name}.ics", server.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    server.url = lambda name: f"http://127.0.0.1:{port}/feeds/{name}.ics"
+    yield server
+    await runner.cleanup()
+
+
+def make_calendar(url):
+    return SimpleNamespace(
+        id=uuid4(), calendar_url=url,
+        feed_etag=None, feed_last_modified=None, feed_content_hash=None,
+    )
+
+
+def remember_validators(calendar, result):
+    calendar.feed_etag = result.etag
+    calendar.feed_last_modified = result.last_modified
+    calendar.feed_content_hash = result.content_hash
+
+
+class TestIcalStreamParser:
+    """Test cases for the streaming line-unfolding parser"""
+
+    def test_folded_lines_split_across_chunks(self):
+        body = (
+            "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:abc\r\n"
+            "DTSTART;VALUE=DATE:20250105\r\nDTEND:20250108T100000Z\r\n"
+            "SUMMARY:Reserved by a very long\r\n  guest name \xe9t\xe9\r\n"
+            "END:VEVENT\r\nBEGIN:VEVENT\r\nUID:bad\r\nDTSTART:20250110\r\n"
+            "DTEND:20250109\r\nEND:VEVENT\r\nEND:VCALENDAR"
+        ).encode()
+
+        parser = IcalStreamParser()
+        events = []
+        for i in range(0, len(body), 7):
+            events.extend(parser.feed(body[i:i + 7]))
+        events.extend(parser.close())
+
+        assert events == [{
+            "uid": "abc",
+            "start_date": date(2025, 1, 5),
+            "end_date": date(2025, 1, 8),
+            "summary": "Reserved by a very long guest name \xe9t\xe9",
+        }]
+        assert parser.events_rejected == 1
+
+
+class TestBlockDiff:
+    """Test cases for diff-based block updates"""
+
+    def test_only_changed_blocks_are_touched(self):
+        def block(start, end, name):
+            return SimpleNamespace(external_check_in=start, external_check_out=end, external_guest_name=name)
+
+        existing = {
+            "same": block(date(2025, 1, 1), date(2025, 1, 3), "Reserved"),
+            "moved": block(date(2025, 2, 1), date(2025, 2, 3), "Reserved"),
+            "gone": block(date(2025, 3, 1), date(2025, 3, 3), "Reserved"),
+        }
+        events = [
+            {"uid": "same", "start_date": date(2025, 1, 1), "end_date": date(2025, 1, 3), "summary": "Reserved"},
+            {"uid": "moved", "start_date": date(2025, 2, 2), "end_date": date(2025, 2, 4), "summary": "Reserved"},
+            {"uid": "new", "start_date": date(2025, 4, 1), "end_date": date(2025, 4, 2), "summary": "Reserved"},
+        ]
+
+        diff = diff_calendar_blocks(existing, events)
+
+        assert [event["uid"] for event in diff.added] == ["new"]
+        assert [b for b, _ in diff.updated] == [existing["moved"]]
+        assert diff.removed == [existing["gone"]]
+
+
+class TestIcalSyncEngine:
+    """Test cases for concurrent conditional feed fetching"""
+
+    async def test_conditional_resync_skips_unchanged_feeds(self, feed_server):
+        events = [(f"uid-{i}", date(2025, 5, 1), date(2025, 5, 4), "Reserved") for i in range(3)]
+        for i in range(40):
+            feed_server.set_feed(f"cal{i}", make_feed(events), validators=i % 2 == 0)
+
+        calendars = [make_calendar(feed_server.url(f"cal{i}")) for i in range(40)]
+        engine = IcalSyncEngine(max_concurrency=8)
+
+        first = await engine.fetch_all(calendars)
+        assert {r.status for r in first} == {"changed"}
+        assert all(len(r.events) == 3 for r in first)
+        assert 1 < feed_server.max_in_flight <= 8
+
+        for calendar, result in zip(calendars, first):
+            remember_validators(calendar, result)
+
+        # Even feeds revalidate by ETag, odd feeds have no validators and are hashed
+        feed_server.set_feed("cal1", make_feed(events[:2]), validators=False)
+        second = await engine.fetch_all(calendars)
+
+        statuses = [r.status for r in second]
+        assert statuses[0] == "not_modified"
+        assert statuses[1] == "changed" and len(second[1].events) == 2
+        assert statuses[3] == "unchanged" and second[3].events == []
+        assert engine.last_run.not_modified == 20
+        assert engine.last_run.unchanged == 19
+        assert engine.last_run.changed == 1
+
+    async def test_failed_feeds_are_reported_per_calendar(self, feed_server):
+        feed_server.set_feed("ok", make_feed([("a", date(2025, 1, 1), date(2025, 1, 2), "x")]))
+        calendars = [
+            make_calendar(feed_server.url("ok")),
+            make_calendar(feed_server.url("missing")),
+            make_calendar("http://127.0.0.1:1/unreachable.ics"),
+        ]
+
+        results = await IcalSyncEngine().fetch_all(calendars)
+
+        assert [r.status for r in results] == ["changed", "error", "error"]
+        assert "HTTP 404" in results[1].error
+        assert results[2].error.startswith("Network error")
@@ -0,0 +1,436 @@
+"""
+Test Suite for the Stripe Webhook Pipeline
+
+A local Stripe stand-in drives payment intents through their lifecycle and
+replays 10k webhook deliveries, duplicates and out-of-order arrivals
+included, into the inbox while the worker pool drains it.
+"""
+
+import asyncio
+import random
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.booking_models import (
+    Base,
+    Booking,
+    BookingPayment,
+    BookingStatus,
+    CancellationPolicyType,
+    PaymentStatus,
+    StripeWebhookEventRecord,
+    WebhookEventStatus,
+)
+from app.services.stripe_webhook_pipeline import (
+    WEBHOOK_PARTITIONS,
+    StripeEventProcessor,
+    StripeWebhookWorkerPool,
+    enqueue_webhook_event,
+    mark_failed_payments_for_retry,
+    requeue_stale_claims,
+    run_scheduled_payouts,
+)
+from conftest import create_sqlite_engine, sqlite_uuid
+
+EVENT_STATUS = {
+    'payment_intent.requires_action': PaymentStatus.REQUIRES_ACTION,
+    'payment_intent.payment_failed': PaymentStatus.FAILED,
+    'payment_intent.succeeded': PaymentStatus.SUCCEEDED,
+}
+
+LIFECYCLES = [
+    ['payment_intent.succeeded'],
+    ['payment_intent.requires_action', 'payment_intent.succeeded'],
+    ['payment_intent.payment_failed'],
+    ['payment_intent.requires_action', 'payment_intent.payment_failed'],
+    ['payment_intent.payment_failed', 'payment_intent.requires_action', 'payment_intent.succeeded'],
+]
+
+
+class LocalStripe:
+    """
+    Stand-in for Stripe's event stream
+
+    Payment intents move through a lifecycle, each step emitting an event
+    with a later creation time. Deliveries are at least once and in no
+    particular order, as with real webhooks.
+    """
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.clock = 1_900_000_000
+        self.events = []
+        self.lifecycles = {}
+
+    def _emit(self, event_type, obj):
+        self.clock += 1
+        event = {
+            'id': f"evt_{uuid4().hex[:24]}",
+            'object': 'event',
+            'type': event_type,
+            'created': self.clock,
+            'livemode': False,
+            'data': {'object': obj},
+        }
+        self.events.append(event)
+        return event
+
+    def run_payment_intent(self, intent_id, lifecycle):
+        self.lifecycles[intent_id] = lifecycle
+        for event_type in lifecycle:
+            obj = {'id': intent_id, 'object': 'payment_intent', 'status': event_type.split('.')[1]}
+            if event_type == 'payment_intent.payment_failed':
+                obj['last_payment_error'] = {'message': "Your card was declined."}
+            self._emit(event_type, obj)
+
+    def update_account(self):
+        self._emit('account.updated', {'id': f"acct_{uuid4().hex[:16]}", 'object': 'account'})
+
+    def deliveries(self, total):
+        """Every event once, topped up with redeliveries to total, shuffled"""
+        redeliveries = [self.rng.choice(self.events) for _ in range(total - len(self.events))]
+        batch = self.events + redeliveries
+        self.rng.shuffle(batch)
+        return batch
+
+
+class RecordingProcessor(StripeEventProcessor):
+    """Records applied events; fails batches touching a key in failures"""
+
+    def __init__(self, failures=None):
+        super().__init__()
+        self.applied = []
+        self.failures = Counter(failures or {})
+
+    async def apply(self, db_session, events):
+        failing = sorted(key for key in {e.ordering_key for e in events} if self.failures[key] > 0)
+        if failing:
+            self.failures.subtract(failing)
+            raise RuntimeError(f"processor unavailable for {failing}")
+        await super().apply(db_session, events)
+        self.applied.extend((e.event_id, e.ordering_key, e.stripe_created) for e in events)
+
+
+class SlowProcessor(RecordingProcessor):
+    """Records applied events after holding each batch for a while"""
+
+    def __init__(self, seconds):
+        super().__init__()
+        self.seconds = seconds
+
+    async def apply(self, db_session, events):
+        await asyncio.sleep(self.seconds)
+        await super().apply(db_session, events)
+
+
+async def create_engine_with_payments(tmp_path, intents):
+    engine = await create_sqlite_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'payments.db'}", relaxed_durability=True, connect_args={'timeout': 60}
+    )
+
+    now = datetime.utcnow()
+    bookings, payments = [], []
+    for n, intent_id in enumerate(intents):
+        booking_id = sqlite_uuid()
+        check_in = now.date() + timedelta(days=10)
+        bookings.append({
+            'id': booking_id,
+            'booking_number': f"TQ{n:010d}",
+            'property_id': sqlite_uuid(),
+            'guest_id': sqlite_uuid(),
+            'host_id': sqlite_uuid(),
+            'check_in_date': check_in,
+            'check_out_date': check_in + timedelta(days=3),
+            'number_of_guests': 2,
+            'adults': 2,
+            'status': BookingStatus.PENDING,
+            'base_price': Decimal("100.00"),
+            'total_amount': Decimal("300.00"),
+            'guest_email': "guest@example.com",
+            'guest_name': "Guest",
+            'cancellation_policy': CancellationPolicyType.MODERATE,
+            'created_at': now,
+        })
+        payments.append({
+            'id': sqlite_uuid(),
+            'booking_id': booking_id,
+            'amount': Decimal("300.00"),
+            'currency': "USD",
+            'payment_type': "booking",
+            'stripe_payment_intent_id': intent_id,
+            'status': PaymentStatus.PENDING,
+            'host_payout': Decimal("270.00"),
+            'created_at': now,
+        })
+
+    async with engine.begin() as conn:
+        if bookings:
+            await conn.execute(insert(Booking), bookings)
+            await conn.execute(insert(BookingPayment), payments)
+    return engine
+
+
+async def payment_states(db):
+    result = await db.execute(
+        select(BookingPayment.stripe_payment_intent_id, BookingPayment.status, Booking.status)
+        .join(Booking, Booking.id == BookingPayment.booking_id)
+    )
+    return {intent_id: (payment, booking) for intent_id, payment, booking in result.all()}
+
+
+class TestWebhookReplay:
+    """Test cases for replaying a large webhook stream with redeliveries"""
+
+    async def test_10k_deliveries_with_duplicates_apply_each_event_once_in_order(self, tmp_path):
+        stripe = LocalStripe(seed=7)
+        intents = [f"pi_{n:06d}" for n in range(3000)]
+        for n, intent_id in enumerate(intents):
+            stripe.run_payment_intent(intent_id, LIFECYCLES[n % len(LIFECYCLES)])
+        for _ in range(50):
+            stripe.update_account()
+        unique = len(stripe.events)
+        deliveries = stripe.deliveries(10_000)
+
+        engine = await create_engine_with_payments(tmp_path, intents)
+        session_factory = lambda: AsyncSession(engine, expire_on_commit=False)  # noqa: E731
+
+        # Webhook endpoint: durable enqueue, then acknowledge
+        acknowledged = Counter()
+        inflight = asyncio.Semaphore(32)
+
+        async def deliver(event):
+            async with inflight, session_factory() as db:
+                acknowledged[await enqueue_webhook_event(db, event)] += 1
+
+        await asyncio.gather(*(deliver(event) for event in deliveries))
+        assert acknowledged[True] == unique
+        assert acknowledged[False] == 10_000 - unique
+
+        processor = RecordingProcessor()
+        pool = StripeWebhookWorkerPool(session_factory, processor, workers=8, claim_size=250)
+        report = await pool.run_until_idle()
+
+        # Exactly once
+        applied_ids = Counter(event_id for event_id, _, _ in processor.applied)
+        assert len(applied_ids) == unique
+        assert max(applied_ids.values()) == 1
+        assert report.processed == unique
+
+        # Per payment, in Stripe creation order
+        per_key = defaultdict(list)
+        for _, key, created in processor.applied:
+            per_key[key].append(created)
+        assert all(created == sorted(created) for created in per_key.values())
+
+        async with session_factory() as db:
+            statuses = dict((await db.execute(
+                select(StripeWebhookEventRecord.status, func.count())
+                .group_by(StripeWebhookEventRecord.status)
+            )).all())
+            assert statuses == {WebhookEventStatus.PROCESSED: unique}
+
+            for intent_id, (payment, booking) in (await payment_states(db)).items():
+                final = stripe.lifecycles[intent_id][-1]
+                assert payment == EVENT_STATUS[final]
+                assert booking == (
+                    BookingStatus.CONFIRMED if final == 'payment_intent.succeeded' else BookingStatus.PENDING
+                )
+
+        await engine.dispose()
+
+    async def test_late_deliveries_do_not_roll_payments_back(self, tmp_path):
+        stripe = LocalStripe(seed=3)
+        intents = [f"pi_{n:06d}" for n in range(300)]
+        for n, intent_id in enumerate(intents):
+            stripe.run_payment_intent(intent_id, LIFECYCLES[n % len(LIFECYCLES)])
+        deliveries = stripe.deliveries(1000)
+
+        engine = await create_engine_with_payments(tmp_path, intents)
+        session_factory = lambda: AsyncSession(engine, expire_on_commit=False)  # noqa: E731
+        pool = StripeWebhookWorkerPool(session_factory, workers=4, poll_interval=0.01)
+
+        # Workers run while deliveries trickle in, so older events can arrive
+        # after a newer one for the same payment has been applied
+        pool.start()
+        for offset in range(0, len(deliveries), 100):
+            for event in deliveries[offset:offset + 100]:
+                async with session_factory() as db:
+                    if await enqueue_webhook_event(db, event):
+                        pool.wake()
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        await pool.run_until_idle()
+
+        async with session_factory() as db:
+            for intent_id, (payment, _) in (await payment_states(db)).items():
+                assert payment == EVENT_STATUS[stripe.lifecycles[intent_id][-1]]
+
+        await engine.dispose()
+
+    async def test_failing_payment_is_retried_without_holding_back_others(self, tmp_path):
+        stripe = LocalStripe(seed=1)
+        intents = [f"pi_{n:06d}" for n in range(40)]
+        for intent_id in intents:
+            stripe.run_payment_intent(intent_id, LIFECYCLES[-1])
+
+        engine = await create_engine_with_payments(tmp_path, intents)
+        session_factory = lambda: AsyncSession(engine, expire_on_commit=False)  # noqa: E731
+        for event in stripe.events:
+            async with session_factory() as db:
+                await enqueue_webhook_event(db, event)
+
+        # Fails in the batch and again when isolated, then recovers
+        processor = RecordingProcessor(failures={"pi_000007": 2})
+        pool = StripeWebhookWorkerPool(
+            session_factory, processor, workers=1, claim_size=1000, retry_base_seconds=0.5
+        )
+        report = await pool.run_until_idle()
+
+        assert report.retried == 1 and report.dead_lettered == 0
+        assert report.processed == len(stripe.events) - 3
+
+        await asyncio.sleep(0.6)
+        report = await pool.run_until_idle()
+        assert report.processed == len(stripe.events)
+        retried = [created for _, key, created in processor.applied if key == "pi_000007"]
+        assert len(retried) == 3 and retried == sorted(retried)
+
+        async with session_factory() as db:
+            states = await payment_states(db)
+        assert {payment for payment, _ in states.values()} == {PaymentStatus.SUCCEEDED}
+
+        await engine.dispose()
+
+    async def test_failing_event_is_not_reclaimed_before_its_backoff(self, tmp_path):
+        stripe = LocalStripe(seed=5)
+        stripe.run_payment_intent("pi_000001", LIFECYCLES[-1])
+
+        engine = await create_engine_with_payments(tmp_path, ["pi_000001"])
+        session_factory = lambda: AsyncSession(engine, expire_on_commit=False)  # noqa: E731
+        for event in stripe.events:
+            async with session_factory() as db:
+                await enqueue_webhook_event(db, event)
+
+        processor = RecordingProcessor(failures={"pi_000001": 100})
+        pool = StripeWebhookWorkerPool(session_factory, processor, workers=1, max_attempts=3)
+        report = await pool.run_until_idle()
+
+        # One attempt, not max_attempts in a tight loop
+        assert report.retried == 1 and report.dead_lettered == 0
+        async with session_factory() as db:
+            head = await db.get(StripeWebhookEventRecord, stripe.events[0]['id'])
+            assert head.status == WebhookEventStatus.RECEIVED and head.attempts == 1
+            assert head.next_attempt_at - datetime.utcnow() > timedelta(seconds=25)
+
+        # A later event of the same payment arriving meanwhile waits as well
+        stripe.run_payment_intent("pi_000001", ['payment_intent.succeeded'])
+        async with session_factory() as db:
+            await enqueue_webhook_event(db, stripe.events[-1])
+        await pool.run_until_idle()
+        assert pool.report.retried == 1 and processor.applied == []
+
+        # Once due, each retry doubles the delay until the head is dead-lettered
+        delays = []
+        for _ in range(2):
+            async with session_factory() as db:
+                await db.execute(
+                    update(StripeWebhookEventRecord)
+                    .where(StripeWebhookEventRecord.event_id == stripe.events[0]['id'])
+                    .values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1))
+                )
+                await db.commit()
+            claimed_at = datetime.utcnow()
+            await pool.process_batch(range(WEBHOOK_PARTITIONS))
+            async with session_factory() as db:
+                head = await db.get(StripeWebhookEventRecord, stripe.events[0]['id'])
+                if head.next_attempt_at is not None:
+                    delays.append(round((head.next_attempt_at - claimed_at).total_seconds()))
+
+        assert delays == [60]
+        assert head.status == WebhookEventStatus.FAILED and head.attempts == 3
+        assert pool.report.dead_lettered == 1
+
+        await engine.dispose()
+
+
+    async def test_running_batch_is_not_requeued_as_stale(self, tmp_path):
+        stripe = LocalStripe(seed=9)
+        intents = [f"pi_{n:06d}" for n in range(10)]
+        for intent_id in intents:
+            stripe.run_payment_intent(intent_id, LIFECYCLES[1])
+
+        engine = await create_engine_with_payments(tmp_path, intents)
+        session_factory = lambda: AsyncSession(engine, expire_on_commit=False)  # noqa: E731
+        for event in stripe.events:
+            async with session_factory() as db:
+                await enqueue_webhook_event(db, event)
+
+        processor = SlowProcessor(seconds=0.5)
+        pool = StripeWebhookWorkerPool(session_factory, processor, workers=1, claim_heartbeat_seconds=0.05)
+        batch = asyncio.create_task(pool.process_batch(range(WEBHOOK_PARTITIONS)))
+
+        # The claim is older than the stale threshold, its heartbeat is not
+        await asyncio.sleep(0.3)
+        async with session_factory() as db:
+            assert await requeue_stale_claims(db, older_than=timedelta(seconds=0.2)) == 0
+
+        assert await batch == len(stripe.events)
+        applied_ids = Counter(event_id for event_id, _, _ in processor.applied)
+        assert len(applied_ids) == len(stripe.events) and max(applied_ids.values()) == 1
+
+        await engine.dispose()
+
+
+    async def test_sessions_bound_per_table_enqueue_events(self, tmp_path):
+        stripe = LocalStripe(seed=11)
+        stripe.run_payment_intent("pi_000001", LIFECYCLES[0])
+
+        engine = await create_engine_with_payments(tmp_path, ["pi_000001"])
+        async with AsyncSession(binds={Base: engine}) as db:
+            assert await enqueue_webhook_event(db, stripe.events[0])
+            assert not await enqueue_webhook_event(db, stripe.events[0])
+
+        await engine.dispose()
+
+
+class TestPaymentBatchJobs:
+    """Test cases for the chunked payout and retry jobs"""
+
+    async def test_payouts_and_retries_are_set_based(self, tmp_path):
+        intents = [f"pi_{n:06d}" for n in range(60)]
+        engine = await create_engine_with_payments(tmp_path, intents)
+        yesterday = datetime.utcnow().date() - timedelta(days=1)
+
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            payments = (await db.execute(
+                select(BookingPayment).options(selectinload(BookingPayment.booking)).order_by(BookingPayment.id)
+            )).scalars().all()
+            for n, payment in enumerate(payments):
+                payment.status = PaymentStatus.SUCCEEDED if n % 2 else PaymentStatus.FAILED
+                if n % 3 == 0:
+                    payment.booking.check_out_date = yesterday
+                if n % 2 == 0 and n % 4 == 0:
+                    payment.retry_count = 3
+            await db.commit()
+
+            eligible_payouts = sum(1 for n in range(60) if n % 2 and n % 3 == 0)
+            eligible_retries = sum(1 for n in range(60) if n % 2 == 0 and n % 4)
+
+            assert await run_scheduled_payouts(db, chunk_size=4) == eligible_payouts
+            assert await run_scheduled_payouts(db, chunk_size=4) == 0
+            assert await mark_failed_payments_for_retry(db, chunk_size=4) == eligible_retries
+
+            db.expire_all()
+            payments = (await db.execute(select(BookingPayment))).scalars().all()
+            assert sum(1 for p in payments if p.payout_processed) == eligible_payouts
+            assert sorted(Counter(p.retry_count for p in payments if p.status == PaymentStatus.FAILED).items()) == [
+                (1, eligible_retries), (3, 30 - eligible_retries)
+            ]
+
+        await engine.dispose()
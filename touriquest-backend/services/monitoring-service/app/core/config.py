@@ -70,7 +70,9 @@ class Settings(BaseSettings):
     # Health check settings
     HEALTH_CHECK_INTERVAL: int = Field(default=60, env="HEALTH_CHECK_INTERVAL")  # seconds
     HEALTH_CHECK_TIMEOUT: int = Field(default=30, env="HEALTH_CHECK_TIMEOUT")  # seconds
-    HEALTH_CHECK_RETRIES: int = Field(default=3, env="HEALTH_CHECK_RETRIES")
+    HEALTH_CHECK_RETRIES: int = Field(default=3, env="HEALTH_CHECK_RETRIES")  # consecutive failures before unhealthy
+    HEALTH_CHECK_JITTER: float = Field(default=0.1, env="HEALTH_CHECK_JITTER")  # fraction of the interval
+    HEALTH_CHECK_DEPENDENCY_TIMEOUTS: Dict[str, float] = Field(default={}, env="HEALTH_CHECK_DEPENDENCY_TIMEOUTS")  # seconds, per dependency
     
     # Performance monitoring settings
     PERFORMANCE_THRESHOLD_RESPONSE_TIME: float = Field(default=1.0, env="PERFORMANCE_THRESHOLD_RESPONSE_TIME")  # seconds
@@ -121,9 +123,15 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
     LOG_FORMAT: str = Field(default="json", env="LOG_FORMAT")  # json or text
     LOG_RETENTION_DAYS: int = Field(default=30, env="LOG_RETENTION_DAYS")
+    LOG_SHIPPER_QUEUE_SIZE: int = Field(default=100000, env="LOG_SHIPPER_QUEUE_SIZE")
+    LOG_SHIPPER_BATCH_SIZE: int = Field(default=1000, env="LOG_SHIPPER_BATCH_SIZE")
+    LOG_SHIPPER_FLUSH_INTERVAL: float = Field(default=2.0, env="LOG_SHIPPER_FLUSH_INTERVAL")  # seconds
+    LOG_EXPORT_PAGE_SIZE: int = Field(default=5000, env="LOG_EXPORT_PAGE_SIZE")
     
     # Metrics collection settings
     METRICS_COLLECTION_INTERVAL: int = Field(default=15, env="METRICS_COLLECTION_INTERVAL")  # seconds
+    METRICS_SAMPLE_INTERVAL: float = Field(default=1.0, env="METRICS_SAMPLE_INTERVAL")  # seconds
+    METRICS_SAMPLER_CPU_BUDGET: float = Field(default=0.01, env="METRICS_SAMPLER_CPU_BUDGET")  # share of one core
     METRICS_RETENTION_DAYS: int = Field(default=90, env="METRICS_RETENTION_DAYS")
     CUSTOM_METRICS_ENABLED: bool = Field(default=True, env="CUSTOM_METRICS_ENABLED")
     
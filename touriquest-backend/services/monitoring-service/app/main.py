@@ -70,6 +70,7 @@ class AlertConfigRequest(BaseModel):
     enabled: bool = True
     notification_channels: List[str] = []
     tags: Dict[str, str] = {}
+    labels: Dict[str, str] = {}
 
 
 class AlertResponse(BaseModel):
@@ -448,7 +449,8 @@ async def configure_alert_rule(
             cooldown=rule_config.cooldown,
             enabled=rule_config.enabled,
             notification_channels=rule_config.notification_channels,
-            tags=rule_config.tags
+            tags=rule_config.tags,
+            labels=rule_config.labels
         )
         
         # Add rule to alerting service
@@ -661,14 +663,14 @@ async def export_logs(
     service: Optional[str] = Query(None, description="Service filter"),
     start_time: Optional[datetime] = Query(None, description="Start time filter"),
     end_time: Optional[datetime] = Query(None, description="End time filter"),
-    format: str = Query(default="json", regex="^(json|csv)$", description="Export format"),
+    format: str = Query(default="json", regex="^(json|ndjson|csv)$", description="Export format"),
     _auth: bool = Depends(verify_token),
     _rate_limit: bool = Depends(rate_limit_check)
 ):
     """
     Export logs in various formats
     
-    Stream logs export in JSON or CSV format with optional filtering
+    Stream logs export in JSON, NDJSON or CSV format with optional filtering
     """
     try:
         # Build log query
@@ -682,7 +684,11 @@ async def export_logs(
         )
         
         # Set appropriate media type
-        media_type = "application/json" if format == "json" else "text/csv"
+        media_type = {
+            "json": "application/json",
+            "ndjson": "application/x-ndjson",
+            "csv": "text/csv"
+        }[format]
         filename = f"logs-{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}"
         
         # Stream the export
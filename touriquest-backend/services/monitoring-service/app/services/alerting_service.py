@@ -2,7 +2,7 @@
 Alerting service with PagerDuty and Slack integration for incident management
 """
 
-from typing import Dict, List, Optional, Any, Union, Callable
+from typing import Dict, List, Optional, Any, Union, Callable, Iterable
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta
 from enum import Enum
@@ -20,6 +20,7 @@ from slack_sdk.errors import SlackApiError
 import pdpyras
 
 from app.core.config import settings
+from app.services.rule_engine import MetricSample, RuleIndex, alert_fingerprint, compile_condition
 
 
 logger = logging.getLogger(__name__)
@@ -65,6 +66,7 @@ class Alert:
     metric_value: Optional[float] = None
     threshold: Optional[float] = None
     tags: Dict[str, str] = field(default_factory=dict)
+    labels: Dict[str, str] = field(default_factory=dict)  # identify the alert beyond its metric, e.g. host
     metadata: Dict[str, Any] = field(default_factory=dict)
     created_at: datetime = field(default_factory=datetime.utcnow)
     updated_at: datetime = field(default_factory=datetime.utcnow)
@@ -86,6 +88,10 @@ class Alert:
     def get_unique_key(self) -> str:
         """Get unique key for deduplication"""
         return f"{self.service}:{self.source}:{self.metric_name or self.title}"
+    
+    def get_fingerprint(self) -> str:
+        """Get fingerprint for deduplication, including the identifying labels"""
+        return alert_fingerprint(self.service, self.source.value, self.metric_name or self.title, self.labels)
 
 
 @dataclass
@@ -105,24 +111,15 @@ class AlertRule:
     notification_channels: List[str] = field(default_factory=list)
     escalation_policy: Optional[str] = None
     tags: Dict[str, str] = field(default_factory=dict)
+    labels: Dict[str, str] = field(default_factory=dict)  # only samples carrying these labels are evaluated
+    
+    def __post_init__(self):
+        # Compiled once; raises ValueError for an unknown condition
+        self._check = compile_condition(self.condition, self.threshold)
     
     def evaluate(self, value: float) -> bool:
         """Evaluate if alert condition is met"""
-        if self.condition == "gt":
-            return value > self.threshold
-        elif self.condition == "lt":
-            return value < self.threshold
-        elif self.condition == "eq":
-            return value == self.threshold
-        elif self.condition == "ne":
-            return value != self.threshold
-        elif self.condition == "gte":
-            return value >= self.threshold
-        elif self.condition == "lte":
-            return value <= self.threshold
-        else:
-            logger.warning(f"Unknown condition: {self.condition}")
-            return False
+        return self._check(value)
 
 
 @dataclass
@@ -499,9 +496,11 @@ class AlertingService:
         self.pagerduty = PagerDutyService()
         self.slack = SlackService()
         self.alert_rules: Dict[str, AlertRule] = {}
+        self.rule_index = RuleIndex()
         self.notification_channels: Dict[str, NotificationChannel] = {}
         self.escalation_policies: Dict[str, EscalationPolicy] = {}
         self.active_alerts: Dict[str, Alert] = {}
+        self.alerts_by_fingerprint: Dict[str, Alert] = {}
         self.alert_history: List[Alert] = []
         self.suppression_rules: Dict[str, Dict[str, Any]] = {}
         self._background_tasks: List[asyncio.Task] = []
@@ -596,6 +595,7 @@ class AlertingService:
         
         for rule in default_rules:
             self.alert_rules[rule.id] = rule
+            self.rule_index.add(rule)
         
         logger.info(f"Loaded {len(default_rules)} default alert rules")
     
@@ -626,6 +626,9 @@ class AlertingService:
                 for alert_id in resolved_alerts:
                     alert = self.active_alerts.pop(alert_id)
                     self.alert_history.append(alert)
+                    fingerprint = alert.get_fingerprint()
+                    if self.alerts_by_fingerprint.get(fingerprint) is alert:
+                        del self.alerts_by_fingerprint[fingerprint]
                 
                 if resolved_alerts:
                     logger.info(f"Cleaned up {len(resolved_alerts)} resolved alerts")
@@ -706,11 +709,14 @@ class AlertingService:
         metric_value: Optional[float] = None,
         threshold: Optional[float] = None,
         tags: Optional[Dict[str, str]] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        labels: Optional[Dict[str, str]] = None
     ) -> Alert:
         """Create a new alert"""
+        fingerprint = alert_fingerprint(service, source.value, metric_name or title, labels)
         alert = Alert(
-            id=f"{service}_{source}_{int(time.time())}",
+            # The fingerprint digest keeps alerts raised in the same second apart
+            id=f"{service}_{source}_{int(time.time())}_{hashlib.sha1(fingerprint.encode()).hexdigest()[:8]}",
             title=title,
             description=description,
             severity=severity,
@@ -720,19 +726,14 @@ class AlertingService:
             metric_value=metric_value,
             threshold=threshold,
             tags=tags or {},
+            labels=labels or {},
             metadata=metadata or {}
         )
         
         # Check for deduplication
-        unique_key = alert.get_unique_key()
-        existing_alert = None
+        existing_alert = self.alerts_by_fingerprint.get(fingerprint)
         
-        for existing in self.active_alerts.values():
-            if existing.get_unique_key() == unique_key and existing.status == AlertStatus.OPEN:
-                existing_alert = existing
-                break
-        
-        if existing_alert:
+        if existing_alert and existing_alert.status == AlertStatus.OPEN:
             # Update existing alert instead of creating new one
             existing_alert.description = description
             existing_alert.metric_value = metric_value
@@ -743,6 +744,7 @@ class AlertingService:
         
         # Add new alert
         self.active_alerts[alert.id] = alert
+        self.alerts_by_fingerprint[fingerprint] = alert
         
         # Send notification
         await self.send_notification(alert)
@@ -839,6 +841,7 @@ class AlertingService:
     
     def add_alert_rule(self, rule: AlertRule) -> None:
         """Add alert rule"""
+        self.rule_index.add(rule)
         self.alert_rules[rule.id] = rule
         logger.info(f"Added alert rule: {rule.id}")
     
@@ -846,51 +849,59 @@ class AlertingService:
         """Remove alert rule"""
         if rule_id in self.alert_rules:
             del self.alert_rules[rule_id]
+            self.rule_index.remove(rule_id)
             logger.info(f"Removed alert rule: {rule_id}")
             return True
         return False
     
-    async def evaluate_metric(self, service: str, metric_name: str, value: float) -> List[Alert]:
+    async def evaluate_metric(
+        self,
+        service: str,
+        metric_name: str,
+        value: float,
+        labels: Optional[Dict[str, str]] = None
+    ) -> List[Alert]:
         """Evaluate metric against alert rules"""
+        return await self.evaluate_metrics([MetricSample(service, metric_name, value, labels)])
+    
+    async def evaluate_metrics(self, samples: Iterable[MetricSample]) -> List[Alert]:
+        """
+        Evaluate a batch of metric samples against alert rules
+        
+        Only the rules indexed under each sample's service, metric name and
+        labels are checked. A rule firing again for the same labels within
+        its cooldown is skipped.
+        """
         triggered_alerts = []
         
-        for rule in self.alert_rules.values():
-            if (rule.enabled and 
-                rule.service == service and 
-                rule.metric_name == metric_name and
-                rule.evaluate(value)):
-                
-                # Check cooldown
-                unique_key = f"{service}:{AlertSource.METRICS}:{metric_name}"
-                existing_alert = None
-                
-                for alert in self.active_alerts.values():
-                    if alert.get_unique_key() == unique_key:
-                        existing_alert = alert
-                        break
-                
-                if existing_alert:
-                    # Check if still in cooldown
-                    if existing_alert.last_notification:
-                        time_since_last = (datetime.utcnow() - existing_alert.last_notification).total_seconds()
-                        if time_since_last < rule.cooldown:
-                            continue
-                
-                # Create alert
-                alert = await self.create_alert(
-                    title=rule.name,
-                    description=rule.description,
-                    severity=rule.severity,
-                    source=AlertSource.METRICS,
-                    service=service,
-                    metric_name=metric_name,
-                    metric_value=value,
-                    threshold=rule.threshold,
-                    tags=rule.tags.copy(),
-                    metadata={"rule_id": rule.id}
-                )
-                
-                triggered_alerts.append(alert)
+        for rule, sample in self.rule_index.match_batch(samples):
+            labels = {**sample.labels, "rule_id": rule.id} if sample.labels else {"rule_id": rule.id}
+            existing_alert = self.alerts_by_fingerprint.get(
+                alert_fingerprint(sample.service, AlertSource.METRICS.value, sample.metric_name, labels)
+            )
+            
+            if existing_alert and existing_alert.last_notification:
+                # Check if still in cooldown
+                time_since_last = (datetime.utcnow() - existing_alert.last_notification).total_seconds()
+                if time_since_last < rule.cooldown:
+                    continue
+            
+            # Create alert
+            alert = await self.create_alert(
+                title=rule.name,
+                description=rule.description,
+                severity=rule.severity,
+                source=AlertSource.METRICS,
+                service=sample.service,
+                metric_name=sample.metric_name,
+                metric_value=sample.value,
+                threshold=rule.threshold,
+                tags=rule.tags.copy(),
+                metadata={"rule_id": rule.id},
+                labels=labels
+            )
+            
+            triggered_alerts.append(alert)
         
         return triggered_alerts
     
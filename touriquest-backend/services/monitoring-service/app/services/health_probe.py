@@ -0,0 +1,247 @@
+"""
+Background dependency probing with cached, debounced health status
+
+Every registered dependency is probed by its own background task on a
+jittered interval, bounded by a per-dependency timeout, so a hanging
+dependency never delays the others and health reads never wait on a probe.
+The last result is cached with its age; results older than `stale_after`
+are reported as unknown. A dependency only changes status after `rise`
+consecutive healthy results or `fall` consecutive failing ones, which keeps
+a flapping dependency from flipping the overall status on every probe.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+from dataclasses import dataclass, asdict, replace
+from datetime import datetime
+from enum import Enum
+import asyncio
+import logging
+import random
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class HealthStatus(str, Enum):
+    """Health status enumeration"""
+    HEALTHY = "healthy"
+    DEGRADED = "degraded"
+    UNHEALTHY = "unhealthy"
+    UNKNOWN = "unknown"
+
+
+@dataclass
+class HealthCheckResult:
+    """Health check result data structure"""
+    service: str
+    status: HealthStatus
+    response_time: float
+    message: str
+    details: Optional[Dict[str, Any]] = None
+    timestamp: datetime = None
+
+    def __post_init__(self):
+        if self.timestamp is None:
+            self.timestamp = datetime.utcnow()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        result = asdict(self)
+        result["timestamp"] = self.timestamp.isoformat()
+        return result
+
+
+def combine_statuses(statuses: Iterable[HealthStatus]) -> HealthStatus:
+    """Overall status of a set of checks"""
+    statuses = list(statuses)
+    if all(status == HealthStatus.HEALTHY for status in statuses):
+        return HealthStatus.HEALTHY
+    if any(status == HealthStatus.UNHEALTHY for status in statuses):
+        return HealthStatus.UNHEALTHY
+    if any(status == HealthStatus.DEGRADED for status in statuses):
+        return HealthStatus.DEGRADED
+    return HealthStatus.UNKNOWN
+
+
+class DependencyState:
+    """Probe configuration, last result and debounced status of one dependency"""
+
+    def __init__(self, name: str, probe: Callable[[], Awaitable[HealthCheckResult]], timeout: float, interval: float):
+        self.name = name
+        self.probe = probe
+        self.timeout = timeout
+        self.interval = interval
+        self.status = HealthStatus.UNKNOWN
+        self.last_result: Optional[HealthCheckResult] = None
+        self.checked_at: Optional[float] = None  # monotonic
+        self.changed_at: Optional[datetime] = None
+        self.candidate: Optional[HealthStatus] = None
+        self.streak = 0
+        self.probes = 0
+        self.timeouts = 0
+        self.task: Optional[asyncio.Task] = None
+
+
+class HealthMonitor:
+    """Probes dependencies in the background and serves their cached status"""
+
+    def __init__(
+        self,
+        interval: float = 60.0,
+        timeout: float = 5.0,
+        jitter: float = 0.1,
+        stale_after: Optional[float] = None,
+        rise: int = 2,
+        fall: int = 2
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.jitter = jitter
+        self.stale_after = stale_after if stale_after is not None else 3 * interval
+        self.rise = rise
+        self.fall = fall
+        self.dependencies: Dict[str, DependencyState] = {}
+        self._running = False
+
+    def register(
+        self,
+        name: str,
+        probe: Callable[[], Awaitable[HealthCheckResult]],
+        timeout: Optional[float] = None,
+        interval: Optional[float] = None
+    ) -> None:
+        """Add a dependency; probe is an async callable returning a HealthCheckResult"""
+        if name in self.dependencies:
+            raise ValueError(f"Dependency already registered: {name}")
+        state = DependencyState(name, probe, timeout or self.timeout, interval or self.interval)
+        self.dependencies[name] = state
+        if self._running:
+            state.task = asyncio.create_task(self._probe_loop(state))
+
+    async def start(self) -> None:
+        """Start one probing task per dependency; the first probes run immediately"""
+        if self._running:
+            return
+        self._running = True
+        for state in self.dependencies.values():
+            state.task = asyncio.create_task(self._probe_loop(state))
+
+    async def stop(self) -> None:
+        """Stop all probing tasks"""
+        self._running = False
+        tasks = [state.task for state in self.dependencies.values() if state.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for state in self.dependencies.values():
+            state.task = None
+
+    async def probe_all(self) -> None:
+        """Probe every dependency once, concurrently"""
+        await asyncio.gather(*(self._probe(state) for state in self.dependencies.values()))
+
+    async def _probe_loop(self, state: DependencyState) -> None:
+        while True:
+            await self._probe(state)
+            # Jitter keeps replicas and dependencies from probing in lockstep
+            await asyncio.sleep(state.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    async def _probe(self, state: DependencyState) -> None:
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(state.probe(), timeout=state.timeout)
+        except asyncio.TimeoutError:
+            state.timeouts += 1
+            result = HealthCheckResult(
+                service=state.name,
+                status=HealthStatus.UNHEALTHY,
+                response_time=round(time.monotonic() - started, 3),
+                message=f"Health check timed out after {state.timeout}s",
+                details={"error": "timeout"}
+            )
+        except Exception as e:
+            result = HealthCheckResult(
+                service=state.name,
+                status=HealthStatus.UNHEALTHY,
+                response_time=round(time.monotonic() - started, 3),
+                message=f"Health check failed: {str(e)}",
+                details={"error": str(e), "error_type": type(e).__name__}
+            )
+        self.observe(state.name, result)
+
+    def observe(self, name: str, result: HealthCheckResult) -> None:
+        """Record a probe result and apply hysteresis to the reported status"""
+        state = self.dependencies[name]
+        state.last_result = result
+        state.checked_at = time.monotonic()
+        state.probes += 1
+
+        observed = result.status
+        if state.status == HealthStatus.UNKNOWN or observed == state.status:
+            if observed != state.status:
+                state.status = observed
+                state.changed_at = datetime.utcnow()
+            state.candidate = None
+            state.streak = 0
+            return
+
+        if observed == state.candidate:
+            state.streak += 1
+        else:
+            state.candidate = observed
+            state.streak = 1
+        needed = self.rise if observed == HealthStatus.HEALTHY else self.fall
+        if state.streak >= needed:
+            logger.info(f"{name} is now {observed.value} (was {state.status.value})")
+            state.status = observed
+            state.changed_at = datetime.utcnow()
+            state.candidate = None
+            state.streak = 0
+
+    def get(self, name: str) -> Optional[HealthCheckResult]:
+        """Cached result of one dependency, with the debounced status; never probes"""
+        state = self.dependencies.get(name)
+        if state is None:
+            return None
+
+        age = None if state.checked_at is None else time.monotonic() - state.checked_at
+        stale = age is None or age > self.stale_after
+        details = {
+            "observed_status": state.last_result.status.value if state.last_result else None,
+            "age_seconds": None if age is None else round(age, 3),
+            "stale": stale,
+            "last_change": state.changed_at.isoformat() if state.changed_at else None
+        }
+        if state.last_result is None:
+            return HealthCheckResult(
+                service=name,
+                status=HealthStatus.UNKNOWN,
+                response_time=0.0,
+                message="Not probed yet",
+                details=details
+            )
+
+        return replace(
+            state.last_result,
+            status=HealthStatus.UNKNOWN if stale else state.status,
+            message=f"Last check is stale: {state.last_result.message}" if stale else state.last_result.message,
+            details={**(state.last_result.details or {}), **details}
+        )
+
+    def results(self, names: Optional[Iterable[str]] = None) -> Dict[str, HealthCheckResult]:
+        """Cached results of several dependencies (all by default)"""
+        names = self.dependencies if names is None else names
+        return {name: self.get(name) for name in names if name in self.dependencies}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Probe counts and the time of the most recent probe"""
+        checked = [state.checked_at for state in self.dependencies.values() if state.checked_at is not None]
+        return {
+            "running": self._running,
+            "dependencies": len(self.dependencies),
+            "probed": len(checked),
+            "probes": sum(state.probes for state in self.dependencies.values()),
+            "timeouts": sum(state.timeouts for state in self.dependencies.values()),
+            "last_probe_age_seconds": round(time.monotonic() - max(checked), 3) if checked else None
+        }
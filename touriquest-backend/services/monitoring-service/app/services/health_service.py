@@ -5,7 +5,7 @@ Comprehensive health check service for monitoring system health, dependencies, a
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
-from enum import Enum
+from functools import partial
 import asyncio
 import time
 import psutil
@@ -16,40 +16,12 @@ from sqlalchemy import text
 import logging
 
 from app.core.config import settings
+from app.services.health_probe import HealthCheckResult, HealthMonitor, HealthStatus, combine_statuses
 
 
 logger = logging.getLogger(__name__)
 
 
-class HealthStatus(str, Enum):
-    """Health status enumeration"""
-    HEALTHY = "healthy"
-    DEGRADED = "degraded"
-    UNHEALTHY = "unhealthy"
-    UNKNOWN = "unknown"
-
-
-@dataclass
-class HealthCheckResult:
-    """Health check result data structure"""
-    service: str
-    status: HealthStatus
-    response_time: float
-    message: str
-    details: Optional[Dict[str, Any]] = None
-    timestamp: datetime = None
-    
-    def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = datetime.utcnow()
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary"""
-        result = asdict(self)
-        result["timestamp"] = self.timestamp.isoformat()
-        return result
-
-
 @dataclass
 class SystemMetrics:
     """System performance metrics"""
@@ -66,17 +38,47 @@ class SystemMetrics:
         return asdict(self)
 
 
+@dataclass
+class HealthReport:
+    """Overall health assembled from cached dependency results"""
+    status: HealthStatus
+    timestamp: str
+    checks: Dict[str, Any]
+    performance: Dict[str, Any]
+
+
 class HealthCheckService:
     """Comprehensive health check service"""
     
     def __init__(self):
         self.session: Optional[aiohttp.ClientSession] = None
         self.redis_client: Optional[redis.Redis] = None
-        self._health_cache: Dict[str, HealthCheckResult] = {}
-        self._cache_ttl = 60  # Cache health checks for 60 seconds
+        self.monitor = HealthMonitor(
+            interval=settings.HEALTH_CHECK_INTERVAL,
+            timeout=settings.HEALTH_CHECK_TIMEOUT,
+            jitter=settings.HEALTH_CHECK_JITTER,
+            fall=settings.HEALTH_CHECK_RETRIES
+        )
     
     async def initialize(self):
-        """Initialize health check service"""
+        """Initialize health check service and start probing dependencies in the background"""
+        await self._create_clients()
+        
+        if not self.monitor.dependencies:
+            timeouts = settings.HEALTH_CHECK_DEPENDENCY_TIMEOUTS
+            self.monitor.register("database", self.check_database_health, timeout=timeouts.get("database"))
+            self.monitor.register("redis", self.check_redis_health, timeout=timeouts.get("redis"))
+            for service_name, health_url in settings.EXTERNAL_SERVICES.items():
+                self.monitor.register(
+                    service_name,
+                    partial(self._check_single_service_health, service_name, health_url),
+                    timeout=timeouts.get(service_name)
+                )
+        
+        await self.monitor.start()
+    
+    async def _create_clients(self):
+        """Create the HTTP session and Redis client used by the probes"""
         self.session = aiohttp.ClientSession(
             timeout=aiohttp.ClientTimeout(total=settings.HEALTH_CHECK_TIMEOUT)
         )
@@ -96,25 +98,27 @@ class HealthCheckService:
     
     async def close(self):
         """Close health check service"""
+        await self.monitor.stop()
         if self.session:
             await self.session.close()
         if self.redis_client:
             await self.redis_client.close()
     
+    async def shutdown(self):
+        """Shutdown health check service"""
+        await self.close()
+    
     async def get_overall_health(self) -> Dict[str, Any]:
-        """Get overall system health status"""
+        """Get overall system health status from the cached probe results"""
         start_time = time.time()
         
-        # Run all health checks concurrently
-        health_checks = await asyncio.gather(
-            self.check_database_health(),
-            self.check_redis_health(),
-            self.check_external_services_health(),
-            self.check_system_resources(),
-            return_exceptions=True
-        )
-        
-        database_health, redis_health, services_health, system_health = health_checks
+        database_health = self.monitor.get("database")
+        redis_health = self.monitor.get("redis")
+        services_health = await self.check_external_services_health()
+        try:
+            system_health = await self.check_system_resources()
+        except Exception as e:
+            system_health = e
         
         # Determine overall status
         all_statuses = []
@@ -127,14 +131,7 @@ class HealthCheckService:
             all_statuses.extend([check.status for check in services_health.values() if isinstance(check, HealthCheckResult)])
         
         # Overall status logic
-        if all(status == HealthStatus.HEALTHY for status in all_statuses):
-            overall_status = HealthStatus.HEALTHY
-        elif any(status == HealthStatus.UNHEALTHY for status in all_statuses):
-            overall_status = HealthStatus.UNHEALTHY
-        elif any(status == HealthStatus.DEGRADED for status in all_statuses):
-            overall_status = HealthStatus.DEGRADED
-        else:
-            overall_status = HealthStatus.UNKNOWN
+        overall_status = combine_statuses(all_statuses)
         
         total_time = time.time() - start_time
         
@@ -233,7 +230,7 @@ class HealthCheckService:
         
         try:
             if not self.redis_client:
-                await self.initialize()
+                await self._create_clients()
             
             if not self.redis_client:
                 raise Exception("Redis client not initialized")
@@ -300,47 +297,51 @@ class HealthCheckService:
             )
     
     async def check_external_services_health(self) -> Dict[str, HealthCheckResult]:
-        """Check health of external services"""
-        if not self.session:
-            await self.initialize()
-        
-        results = {}
-        
-        # Create tasks for concurrent health checks
-        tasks = []
-        service_names = []
+        """Get the last known health of external services; never waits on a probe"""
+        return self.monitor.results(settings.EXTERNAL_SERVICES)
+    
+    async def check_health(self, include_external: bool = True) -> HealthReport:
+        """Get overall health from cached results, optionally without external services"""
+        start_time = time.time()
         
-        for service_name, health_url in settings.EXTERNAL_SERVICES.items():
-            tasks.append(self._check_single_service_health(service_name, health_url))
-            service_names.append(service_name)
+        checks: Dict[str, Any] = {
+            "database": self.monitor.get("database"),
+            "redis": self.monitor.get("redis")
+        }
+        statuses = [check.status for check in checks.values() if check is not None]
+        checks = {name: check.to_dict() for name, check in checks.items() if check is not None}
         
-        # Execute all health checks concurrently
-        check_results = await asyncio.gather(*tasks, return_exceptions=True)
+        if include_external:
+            services_health = self.monitor.results(settings.EXTERNAL_SERVICES)
+            statuses.extend(check.status for check in services_health.values())
+            checks["external_services"] = {name: check.to_dict() for name, check in services_health.items()}
         
-        for service_name, result in zip(service_names, check_results):
-            if isinstance(result, HealthCheckResult):
-                results[service_name] = result
-            else:
-                results[service_name] = HealthCheckResult(
-                    service=service_name,
-                    status=HealthStatus.UNHEALTHY,
-                    response_time=0.0,
-                    message=f"Health check failed: {str(result)}",
-                    details={"error": str(result)}
-                )
-        
-        return results
+        return HealthReport(
+            status=combine_statuses(statuses),
+            timestamp=datetime.utcnow().isoformat(),
+            checks=checks,
+            performance={
+                "total_check_time": round(time.time() - start_time, 6),
+                "probes": self.monitor.get_stats()
+            }
+        )
+    
+    def get_health_stats(self) -> Dict[str, Any]:
+        """Get health check statistics"""
+        stats = self.monitor.get_stats()
+        age = stats["last_probe_age_seconds"]
+        return {
+            "last_check": (datetime.utcnow() - timedelta(seconds=age)).isoformat() if age is not None else None,
+            "cached_results": stats["probed"],
+            **stats
+        }
     
     async def _check_single_service_health(self, service_name: str, health_url: str) -> HealthCheckResult:
         """Check health of a single external service"""
         start_time = time.time()
         
-        # Check cache first
-        cache_key = f"health_{service_name}"
-        if cache_key in self._health_cache:
-            cached_result = self._health_cache[cache_key]
-            if (datetime.utcnow() - cached_result.timestamp).seconds < self._cache_ttl:
-                return cached_result
+        if not self.session:
+            await self._create_clients()
         
         try:
             async with self.session.get(health_url) as response:
@@ -379,7 +380,7 @@ class HealthCheckService:
                     status = HealthStatus.DEGRADED
                     message += f" (slow response: {response_time:.3f}s)"
                 
-                result = HealthCheckResult(
+                return HealthCheckResult(
                     service=service_name,
                     status=status,
                     response_time=round(response_time, 3),
@@ -387,11 +388,6 @@ class HealthCheckService:
                     details=details
                 )
                 
-                # Cache the result
-                self._health_cache[cache_key] = result
-                
-                return result
-                
         except asyncio.TimeoutError:
             response_time = time.time() - start_time
             return HealthCheckResult(
@@ -414,8 +410,8 @@ class HealthCheckService:
     async def check_system_resources(self) -> SystemMetrics:
         """Check system resource usage"""
         try:
-            # CPU usage
-            cpu_usage = psutil.cpu_percent(interval=1)
+            # CPU usage since the previous call; interval=1 would block the event loop for a second
+            cpu_usage = psutil.cpu_percent(interval=None)
             
             # Memory usage
             memory = psutil.virtual_memory()
@@ -521,6 +517,8 @@ class HealthCheckService:
     
     async def get_service_status(self, service_name: str) -> Optional[HealthCheckResult]:
         """Get health status of a specific service"""
+        if service_name in self.monitor.dependencies:
+            return self.monitor.get(service_name)
         if service_name == "database":
             return await self.check_database_health()
         elif service_name == "redis":
@@ -0,0 +1,295 @@
+"""
+Log shipping and export pipeline for Elasticsearch
+
+LogShipper is the single path from log records to Elasticsearch. Records are
+queued without blocking the caller (from any thread), and one background task
+batches them by count, size and age into NDJSON _bulk bodies, retrying failed
+requests and throttled items with exponential backoff. When Elasticsearch
+falls behind, the bounded queue fills up and new records are dropped and
+counted instead of growing memory.
+
+stream_export pages through matching logs with search_after over a point in
+time and yields one NDJSON, JSON or CSV chunk per page, so an export of any
+size runs in constant memory.
+"""
+
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Union
+from collections import deque
+import asyncio
+import csv
+import io
+import json
+import logging
+import random
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+# Per-item bulk statuses worth sending again
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+
+CSV_FIELDS = ["timestamp", "level", "service", "logger_name", "message", "trace_id", "user_id"]
+
+EXPORT_FORMATS = ("ndjson", "json", "csv")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+class LogShipper:
+    """Ships queued log documents to Elasticsearch from one background task"""
+
+    def __init__(
+        self,
+        es_client: Any,
+        max_queue_size: int = 100_000,
+        batch_size: int = 1000,
+        batch_bytes: int = 5 * 1024 * 1024,
+        flush_interval: float = 2.0,
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+        max_backoff: float = 30.0
+    ):
+        self.es_client = es_client
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+
+        # deque appends and pops are thread-safe, so emit() never takes a lock
+        self._queue: Deque[tuple] = deque()
+        self._action_lines: Dict[str, bytes] = {}
+        self._wakeup = asyncio.Event()
+        self._ship_lock = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.shipped = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+
+    async def start(self) -> None:
+        """Start the background shipping task"""
+        if self._task is None:
+            self._closing = False
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._task = asyncio.create_task(self._run())
+            if self._queue:
+                self._wakeup.set()
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Ship whatever is still queued, giving up after timeout seconds, and stop the background task"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Log shipper stopped with {len(self._queue)} documents still queued")
+        self._task = None
+
+    def submit(self, index: str, document: Dict[str, Any]) -> bool:
+        """Queue a document for shipping; returns False if it was dropped because the queue is full"""
+        if len(self._queue) >= self.max_queue_size:
+            self.dropped += 1
+            return False
+
+        self._queue.append((index, document))
+        if len(self._queue) >= self.batch_size and not self._wakeup.is_set():
+            self._wake()
+        return True
+
+    def _wake(self) -> None:
+        if self._loop is None:
+            return
+        if threading.get_ident() == self._loop_thread:
+            self._wakeup.set()
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # The loop is closed; records stay queued
+                pass
+
+    async def flush(self) -> None:
+        """Ship every queued document now"""
+        async with self._ship_lock:
+            while self._queue:
+                await self._ship(self._next_batch())
+
+    async def _run(self) -> None:
+        """Ship a batch as soon as one is full, and partial batches every flush_interval"""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def encode(self, index: str, document: Dict[str, Any]) -> bytes:
+        """Action and source lines of one document in a _bulk body"""
+        action = self._action_lines.get(index)
+        if action is None:
+            action = self._action_lines[index] = (_dumps({"index": {"_index": index}}) + "\n").encode()
+        return action + (_dumps(document) + "\n").encode()
+
+    def _next_batch(self) -> List[bytes]:
+        """Take up to batch_size documents or batch_bytes of NDJSON off the queue"""
+        lines: List[bytes] = []
+        size = 0
+        while self._queue and len(lines) < self.batch_size and size < self.batch_bytes:
+            index, document = self._queue.popleft()
+            try:
+                line = self.encode(index, document)
+            except (TypeError, ValueError):
+                self.failed += 1
+                continue
+            lines.append(line)
+            size += len(line)
+        return lines
+
+    async def _ship(self, lines: List[bytes]) -> None:
+        """Send one batch, retrying the whole request or just its retryable items"""
+        attempt = 0
+        while lines:
+            try:
+                response = await self.es_client.bulk(operations=b"".join(lines), refresh=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not await self._backoff(attempt, f"bulk request failed: {e}"):
+                    self.failed += len(lines)
+                    return
+                attempt += 1
+                continue
+
+            self.batches += 1
+            if not response["errors"]:
+                self.shipped += len(lines)
+                return
+
+            retry = []
+            for line, item in zip(lines, response["items"]):
+                status = next(iter(item.values())).get("status", 500)
+                if status < 300:
+                    self.shipped += 1
+                elif status in RETRYABLE_STATUSES:
+                    retry.append(line)
+                else:
+                    self.failed += 1
+            lines = retry
+            if lines and not await self._backoff(attempt, f"{len(lines)} documents were rejected"):
+                self.failed += len(lines)
+                return
+            attempt += 1
+
+    async def _backoff(self, attempt: int, reason: str) -> bool:
+        """Sleep before the next attempt with jittered exponential backoff; False once retries run out"""
+        if attempt >= self.max_retries:
+            logger.error(f"Dropping log batch after {attempt} retries: {reason}")
+            return False
+
+        self.retries += 1
+        delay = min(self.max_backoff, self.retry_backoff * 2 ** attempt)
+        await asyncio.sleep(delay * (0.5 + random.random() / 2))
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get shipping statistics"""
+        return {
+            "queued": len(self._queue),
+            "shipped": self.shipped,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "retries": self.retries,
+            "batches": self.batches
+        }
+
+
+def _format_page(sources: List[Dict[str, Any]], format: str, first: bool) -> str:
+    """One export chunk from a page of documents"""
+    if format == "ndjson":
+        return "".join(_dumps(source) + "\n" for source in sources)
+
+    if format == "json":
+        chunk = ",\n".join(_dumps(source) for source in sources)
+        return chunk if first else ",\n" + chunk
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows([source.get(name, "") for name in CSV_FIELDS] for source in sources)
+    return buffer.getvalue()
+
+
+async def stream_export(
+    es_client: Any,
+    index: str,
+    query: Dict[str, Any],
+    format: str = "ndjson",
+    page_size: int = 5000,
+    keep_alive: str = "2m"
+) -> AsyncIterator[str]:
+    """
+    Stream every log matching a query, oldest first, one chunk per page.
+
+    Pages are fetched with search_after on a point in time, which stays
+    consistent while logs keep arriving and costs the cluster no scroll
+    context. CSV exports only fetch the exported fields.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {format}")
+
+    source: Union[bool, List[str]] = CSV_FIELDS if format == "csv" else True
+    pit = await es_client.open_point_in_time(index=index, keep_alive=keep_alive, ignore_unavailable=True)
+    pit_id = pit["id"]
+    search_after = None
+    first = True
+
+    try:
+        if format == "csv":
+            yield ",".join(CSV_FIELDS) + "\n"
+        elif format == "json":
+            yield "[\n"
+
+        while True:
+            response = await es_client.search(
+                query=query,
+                size=page_size,
+                sort=[{"timestamp": "asc"}, {"_shard_doc": "asc"}],
+                pit={"id": pit_id, "keep_alive": keep_alive},
+                search_after=search_after,
+                source=source,
+                track_total_hits=False,
+                filter_path="pit_id,hits.hits._source,hits.hits.sort"
+            )
+            hits = response["hits"]["hits"] if "hits" in response else []
+            if not hits:
+                break
+
+            pit_id = response["pit_id"] if "pit_id" in response else pit_id
+            search_after = hits[-1]["sort"]
+            yield _format_page([hit["_source"] for hit in hits], format, first)
+            first = False
+
+            if len(hits) < page_size:
+                break
+
+        if format == "json":
+            yield "\n]\n"
+    finally:
+        try:
+            await es_client.close_point_in_time(id=pit_id)
+        except Exception as e:
+            logger.warning(f"Failed to close point in time: {e}")
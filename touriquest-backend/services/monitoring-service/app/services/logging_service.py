@@ -2,8 +2,8 @@
 Logging service with ELK stack integration for centralized log collection and analysis
 """
 
-from typing import Dict, List, Optional, Any, Union, AsyncGenerator
-from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Any, AsyncGenerator
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 import asyncio
@@ -11,17 +11,14 @@ import json
 import logging
 import traceback
 import sys
-from pathlib import Path
-import gzip
-import aiofiles
-from urllib.parse import urljoin
 
 from elasticsearch import AsyncElasticsearch
-from elasticsearch.exceptions import ElasticsearchException, NotFoundError
+from elasticsearch.exceptions import NotFoundError
 import logstash
 from pythonjsonlogger import jsonlogger
 
 from app.core.config import settings
+from app.services.log_pipeline import LogShipper, stream_export
 
 
 # Configure structured logging
@@ -183,63 +180,26 @@ class LogQuery:
 
 
 class ElasticsearchHandler(logging.Handler):
-    """Custom logging handler for Elasticsearch"""
+    """Logging handler that queues records on a LogShipper for Elasticsearch"""
     
-    def __init__(self, es_client: AsyncElasticsearch, index_pattern: str = "logs"):
+    # The shipper's own errors must not be shipped through itself
+    IGNORED_LOGGERS = ("app.services.log_pipeline",)
+    
+    def __init__(self, es_client: AsyncElasticsearch, index_pattern: str = "logs", shipper: Optional[LogShipper] = None):
         super().__init__()
-        self.es_client = es_client
         self.index_pattern = index_pattern
-        self.buffer: List[Dict[str, Any]] = []
-        self.buffer_size = 100
-        self.flush_interval = 30  # seconds
-        self._last_flush = datetime.utcnow()
+        self.shipper = shipper or LogShipper(es_client)
         
     def emit(self, record: logging.LogRecord):
         """Emit a log record"""
-        try:
-            log_entry = LogEntry.from_log_record(record)
-            doc = log_entry.to_dict()
-            
-            # Add to buffer
-            self.buffer.append({
-                "_index": f"{self.index_pattern}-{datetime.utcnow().strftime('%Y.%m.%d')}",
-                "_source": doc
-            })
-            
-            # Flush if buffer is full or time interval exceeded
-            now = datetime.utcnow()
-            if (len(self.buffer) >= self.buffer_size or 
-                (now - self._last_flush).total_seconds() >= self.flush_interval):
-                asyncio.create_task(self._flush_buffer())
-                
-        except Exception as e:
-            self.handleError(record)
-    
-    async def _flush_buffer(self):
-        """Flush buffer to Elasticsearch"""
-        if not self.buffer:
+        if record.name in self.IGNORED_LOGGERS:
             return
-        
         try:
-            docs = self.buffer.copy()
-            self.buffer.clear()
-            self._last_flush = datetime.utcnow()
-            
-            if docs:
-                await self.es_client.bulk(
-                    operations=[
-                        {"index": {"_index": doc["_index"]}}
-                        if "_index" in doc else {"index": {}},
-                        doc["_source"]
-                        for doc in docs
-                        for _ in [None, None]  # Each doc needs index command + source
-                    ][1::2],  # Take every second item (the source docs)
-                    index=f"{self.index_pattern}-{datetime.utcnow().strftime('%Y.%m.%d')}",
-                    refresh=False
-                )
-                
-        except Exception as e:
-            logging.getLogger(__name__).error(f"Failed to flush logs to Elasticsearch: {e}")
+            doc = LogEntry.from_log_record(record).to_dict()
+            index = f"{self.index_pattern}-{datetime.utcfromtimestamp(record.created).strftime('%Y.%m.%d')}"
+            self.shipper.submit(index, doc)
+        except Exception:
+            self.handleError(record)
 
 
 class LoggingService:
@@ -251,8 +211,6 @@ class LoggingService:
         self.es_handler: Optional[ElasticsearchHandler] = None
         self.file_handlers: Dict[str, logging.FileHandler] = {}
         self.configured_loggers: Dict[str, logging.Logger] = {}
-        self.log_buffer: List[LogEntry] = []
-        self.buffer_size = 1000
         self._background_tasks: List[asyncio.Task] = []
         
     async def initialize(self) -> bool:
@@ -313,8 +271,15 @@ class LoggingService:
             # Setup Elasticsearch handler
             self.es_handler = ElasticsearchHandler(
                 self.es_client,
-                settings.ELASTICSEARCH_LOG_INDEX
+                settings.ELASTICSEARCH_LOG_INDEX,
+                shipper=LogShipper(
+                    self.es_client,
+                    max_queue_size=settings.LOG_SHIPPER_QUEUE_SIZE,
+                    batch_size=settings.LOG_SHIPPER_BATCH_SIZE,
+                    flush_interval=settings.LOG_SHIPPER_FLUSH_INTERVAL
+                )
             )
+            await self.es_handler.shipper.start()
             
             logging.getLogger().addHandler(self.es_handler)
             
@@ -490,41 +455,10 @@ class LoggingService:
     
     def _start_background_tasks(self) -> None:
         """Start background tasks"""
-        # Log buffer flush task
-        flush_task = asyncio.create_task(self._flush_log_buffer())
-        self._background_tasks.append(flush_task)
-        
         # Log cleanup task
         cleanup_task = asyncio.create_task(self._cleanup_old_logs())
         self._background_tasks.append(cleanup_task)
     
-    async def _flush_log_buffer(self) -> None:
-        """Flush log buffer to Elasticsearch periodically"""
-        while True:
-            try:
-                await asyncio.sleep(30)  # Flush every 30 seconds
-                
-                if self.log_buffer and self.es_client:
-                    logs_to_flush = self.log_buffer.copy()
-                    self.log_buffer.clear()
-                    
-                    # Prepare bulk operations
-                    operations = []
-                    for log_entry in logs_to_flush:
-                        index_name = f"{settings.ELASTICSEARCH_LOG_INDEX}-{log_entry.timestamp.strftime('%Y.%m.%d')}"
-                        operations.extend([
-                            {"index": {"_index": index_name}},
-                            log_entry.to_dict()
-                        ])
-                    
-                    if operations:
-                        await self.es_client.bulk(operations=operations, refresh=False)
-                        print(f"Flushed {len(logs_to_flush)} log entries to Elasticsearch")
-                
-            except Exception as e:
-                logging.getLogger(__name__).error(f"Error flushing log buffer: {e}")
-                await asyncio.sleep(60)
-    
     async def _cleanup_old_logs(self) -> None:
         """Clean up old log indices"""
         while True:
@@ -561,80 +495,91 @@ class LoggingService:
                 logging.getLogger(__name__).error(f"Error cleaning up old logs: {e}")
                 await asyncio.sleep(3600)
     
+    def _build_query(self, query: LogQuery) -> Dict[str, Any]:
+        """Build the Elasticsearch query for a log query"""
+        # Build Elasticsearch query
+        es_query = {"bool": {"must": []}}
+        
+        # Text search
+        if query.query:
+            es_query["bool"]["must"].append({
+                "multi_match": {
+                    "query": query.query,
+                    "fields": ["message", "logger_name", "module", "function"]
+                }
+            })
+        
+        # Level filter
+        if query.level:
+            es_query["bool"]["must"].append({
+                "term": {"level": query.level.value}
+            })
+        
+        # Service filter
+        if query.service:
+            es_query["bool"]["must"].append({
+                "term": {"service": query.service}
+            })
+        
+        # Trace ID filter
+        if query.trace_id:
+            es_query["bool"]["must"].append({
+                "term": {"trace_id": query.trace_id}
+            })
+        
+        # User ID filter
+        if query.user_id:
+            es_query["bool"]["must"].append({
+                "term": {"user_id": query.user_id}
+            })
+        
+        # Time range filter
+        if query.start_time or query.end_time:
+            time_range = {}
+            if query.start_time:
+                time_range["gte"] = query.start_time.isoformat()
+            if query.end_time:
+                time_range["lte"] = query.end_time.isoformat()
+            
+            es_query["bool"]["must"].append({
+                "range": {"timestamp": time_range}
+            })
+        
+        # Tags filter
+        for tag_key, tag_value in query.tags.items():
+            es_query["bool"]["must"].append({
+                "term": {f"tags.{tag_key}": tag_value}
+            })
+        
+        return es_query
+    
+    def _index_pattern(self, query: LogQuery) -> str:
+        """Daily log indices covering the query's time range"""
+        # Build index pattern
+        if query.start_time and query.end_time:
+            # Generate index pattern for date range
+            indices = []
+            current_date = query.start_time.date()
+            end_date = query.end_time.date()
+            
+            while current_date <= end_date:
+                indices.append(f"{settings.ELASTICSEARCH_LOG_INDEX}-{current_date.strftime('%Y.%m.%d')}")
+                current_date += timedelta(days=1)
+            
+            index_pattern = ",".join(indices)
+        else:
+            index_pattern = f"{settings.ELASTICSEARCH_LOG_INDEX}-*"
+        
+        return index_pattern
+    
     async def search_logs(self, query: LogQuery) -> Dict[str, Any]:
         """Search logs using Elasticsearch"""
         if not self.es_client:
             return {"error": "Elasticsearch not available", "logs": [], "total": 0}
         
         try:
-            # Build Elasticsearch query
-            es_query = {"bool": {"must": []}}
-            
-            # Text search
-            if query.query:
-                es_query["bool"]["must"].append({
-                    "multi_match": {
-                        "query": query.query,
-                        "fields": ["message", "logger_name", "module", "function"]
-                    }
-                })
-            
-            # Level filter
-            if query.level:
-                es_query["bool"]["must"].append({
-                    "term": {"level": query.level.value}
-                })
-            
-            # Service filter
-            if query.service:
-                es_query["bool"]["must"].append({
-                    "term": {"service": query.service}
-                })
-            
-            # Trace ID filter
-            if query.trace_id:
-                es_query["bool"]["must"].append({
-                    "term": {"trace_id": query.trace_id}
-                })
-            
-            # User ID filter
-            if query.user_id:
-                es_query["bool"]["must"].append({
-                    "term": {"user_id": query.user_id}
-                })
-            
-            # Time range filter
-            if query.start_time or query.end_time:
-                time_range = {}
-                if query.start_time:
-                    time_range["gte"] = query.start_time.isoformat()
-                if query.end_time:
-                    time_range["lte"] = query.end_time.isoformat()
-                
-                es_query["bool"]["must"].append({
-                    "range": {"timestamp": time_range}
-                })
-            
-            # Tags filter
-            for tag_key, tag_value in query.tags.items():
-                es_query["bool"]["must"].append({
-                    "term": {f"tags.{tag_key}": tag_value}
-                })
-            
-            # Build index pattern
-            if query.start_time and query.end_time:
-                # Generate index pattern for date range
-                indices = []
-                current_date = query.start_time.date()
-                end_date = query.end_time.date()
-                
-                while current_date <= end_date:
-                    indices.append(f"{settings.ELASTICSEARCH_LOG_INDEX}-{current_date.strftime('%Y.%m.%d')}")
-                    current_date += timedelta(days=1)
-                
-                index_pattern = ",".join(indices)
-            else:
-                index_pattern = f"{settings.ELASTICSEARCH_LOG_INDEX}-*"
+            es_query = self._build_query(query)
+            index_pattern = self._index_pattern(query)
             
             # Execute search
             response = await self.es_client.search(
@@ -771,24 +716,7 @@ class LoggingService:
         extra_fields: Optional[Dict[str, Any]] = None
     ) -> None:
         """Log a structured message"""
-        log_entry = LogEntry(
-            timestamp=datetime.utcnow(),
-            level=level,
-            message=message,
-            service=settings.SERVICE_NAME,
-            logger_name=logger_name,
-            trace_id=trace_id,
-            user_id=user_id,
-            request_id=request_id,
-            tags=tags or {},
-            extra_fields=extra_fields or {}
-        )
-        
-        # Add to buffer for Elasticsearch
-        if len(self.log_buffer) < self.buffer_size:
-            self.log_buffer.append(log_entry)
-        
-        # Also log through Python logging system
+        # Log through Python logging system; the Elasticsearch handler ships it
         logger = self.create_logger(logger_name)
         
         # Add extra context to log record
@@ -807,7 +735,7 @@ class LoggingService:
         return {
             "elasticsearch_enabled": self.es_client is not None,
             "logstash_enabled": self.logstash_handler is not None,
-            "buffer_size": len(self.log_buffer),
+            "shipping": self.es_handler.shipper.get_stats() if self.es_handler else None,
             "configured_loggers": len(self.configured_loggers),
             "file_handlers": len(self.file_handlers),
             "log_level": settings.LOG_LEVEL,
@@ -817,99 +745,35 @@ class LoggingService:
     async def export_logs(
         self,
         query: LogQuery,
-        format: str = "json"
+        format: str = "ndjson",
+        page_size: Optional[int] = None
     ) -> AsyncGenerator[str, None]:
-        """Export logs in various formats"""
+        """Export logs as NDJSON, a JSON array or CSV, streamed in constant memory one page at a time"""
         if not self.es_client:
             yield '{"error": "Elasticsearch not available"}'
             return
         
         try:
-            # Use scroll API for large exports
-            search_body = {
-                "query": {"bool": {"must": []}},
-                "sort": [{"timestamp": {"order": "asc"}}],
-                "_source": True
-            }
-            
-            # Add query filters (similar to search_logs)
-            if query.query:
-                search_body["query"]["bool"]["must"].append({
-                    "multi_match": {
-                        "query": query.query,
-                        "fields": ["message", "logger_name", "module", "function"]
-                    }
-                })
-            
-            # Initialize scroll
-            response = await self.es_client.search(
-                index=f"{settings.ELASTICSEARCH_LOG_INDEX}-*",
-                body=search_body,
-                scroll="5m",
-                size=1000
-            )
-            
-            scroll_id = response["_scroll_id"]
-            
-            if format == "json":
-                yield "[\n"
-                first = True
-                
-                while True:
-                    hits = response["hits"]["hits"]
-                    if not hits:
-                        break
-                    
-                    for hit in hits:
-                        if not first:
-                            yield ",\n"
-                        yield json.dumps(hit["_source"], indent=2)
-                        first = False
-                    
-                    # Get next batch
-                    response = await self.es_client.scroll(
-                        scroll_id=scroll_id,
-                        scroll="5m"
-                    )
-                
-                yield "\n]"
-            
-            elif format == "csv":
-                # CSV headers
-                yield "timestamp,level,service,logger_name,message,trace_id,user_id\n"
-                
-                while True:
-                    hits = response["hits"]["hits"]
-                    if not hits:
-                        break
-                    
-                    for hit in hits:
-                        source = hit["_source"]
-                        row = [
-                            source.get("timestamp", ""),
-                            source.get("level", ""),
-                            source.get("service", ""),
-                            source.get("logger_name", ""),
-                            source.get("message", "").replace('"', '""'),
-                            source.get("trace_id", ""),
-                            source.get("user_id", "")
-                        ]
-                        yield f'"{"\",\"".join(row)}"\n'
-                    
-                    response = await self.es_client.scroll(
-                        scroll_id=scroll_id,
-                        scroll="5m"
-                    )
-            
-            # Clear scroll
-            await self.es_client.clear_scroll(scroll_id=scroll_id)
+            async for chunk in stream_export(
+                self.es_client,
+                self._index_pattern(query),
+                self._build_query(query),
+                format=format,
+                page_size=page_size or settings.LOG_EXPORT_PAGE_SIZE
+            ):
+                yield chunk
             
         except Exception as e:
-            yield f'{{"error": "{str(e)}"}}'
+            logging.getLogger(__name__).error(f"Error exporting logs: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
     
     async def shutdown(self) -> None:
         """Shutdown logging service"""
         try:
+            # Ship queued logs and stop the shipper
+            if self.es_handler:
+                await self.es_handler.shipper.close()
+            
             # Cancel background tasks
             for task in self._background_tasks:
                 task.cancel()
@@ -918,10 +782,6 @@ class LoggingService:
             if self._background_tasks:
                 await asyncio.gather(*self._background_tasks, return_exceptions=True)
             
-            # Flush remaining logs
-            if self.es_handler:
-                await self.es_handler._flush_buffer()
-            
             # Close Elasticsearch client
             if self.es_client:
                 await self.es_client.close()
@@ -2,12 +2,11 @@
 Prometheus metrics collection service for comprehensive application and infrastructure monitoring
 """
 
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 import time
-import asyncio
 import logging
 from collections import defaultdict, Counter
 import psutil
@@ -30,6 +29,7 @@ from prometheus_client.openmetrics.exposition import CONTENT_TYPE_LATEST as OPEN
 from prometheus_fastapi_instrumentator import Instrumentator, metrics
 
 from app.core.config import settings
+from app.services.system_sampler import SystemSampler
 
 
 logger = logging.getLogger(__name__)
@@ -83,6 +83,13 @@ class MetricsCollector:
         self._last_collection_time = time.time()
         self._collection_errors = 0
         
+        # System metrics are sampled in the background into 1m/5m/1h windows
+        self.sampler = SystemSampler(
+            self.collect_system_metrics,
+            interval=settings.METRICS_SAMPLE_INTERVAL,
+            cpu_budget=settings.METRICS_SAMPLER_CPU_BUDGET
+        )
+        
     def _setup_application_metrics(self) -> Dict[str, Any]:
         """Setup application-level metrics"""
         return {
@@ -543,8 +550,8 @@ class MetricsCollector:
             logger.error(f"Failed to record metric {metric_name}: {e}")
             return False
     
-    def collect_system_metrics(self) -> None:
-        """Collect system-level metrics"""
+    def collect_system_metrics(self) -> Dict[str, float]:
+        """Collect system-level metrics into the gauges and return them for the sampler windows"""
         try:
             # CPU metrics
             cpu_percent = psutil.cpu_percent(interval=None, percpu=True)
@@ -600,9 +607,28 @@ class MetricsCollector:
                 interface="total"
             )._value._value = network_io.bytes_recv
             
+            self._last_collection_time = time.time()
+            
+            return {
+                "cpu_usage_percent": sum(cpu_percent) / len(cpu_percent) if cpu_percent else 0.0,
+                "memory_usage_percent": memory.percent,
+                "memory_used_bytes": memory.used,
+                "memory_available_bytes": memory.available,
+                "disk_usage_percent": disk_usage.percent,
+                "disk_used_bytes": disk_usage.used,
+                "network_sent_bytes": network_io.bytes_sent,
+                "network_recv_bytes": network_io.bytes_recv
+            }
+            
         except Exception as e:
             logger.error(f"Failed to collect system metrics: {e}")
             self._collection_errors += 1
+            return {}
+    
+    def get_system_metric_window(self, metric_name: str, window: str = "1m") -> Optional[Dict[str, Any]]:
+        """Get min/max/avg/p95 of a sampled system metric over a 1m, 5m or 1h window"""
+        stats = self.sampler.get_window(metric_name, window)
+        return stats.to_dict() if stats else None
     
     def record_request_metrics(self, method: str, endpoint: str, status_code: int, duration: float, service: str = "monitoring-service") -> None:
         """Record HTTP request metrics"""
@@ -652,8 +678,9 @@ class MetricsCollector:
     def get_metrics_exposition(self, accept_header: Optional[str] = None) -> Tuple[str, str]:
         """Get metrics in Prometheus exposition format"""
         try:
-            # Collect latest system metrics
-            self.collect_system_metrics()
+            # The sampler keeps the system gauges current; only sample here if it never ran
+            if self.sampler.last_sample_time is None:
+                self.sampler.sample()
             
             # Generate metrics
             if accept_header and OPENMETRICS_CONTENT_TYPE in accept_header:
@@ -675,8 +702,8 @@ class MetricsCollector:
             if not gateway_url:
                 return False
             
-            # Collect latest metrics
-            self.collect_system_metrics()
+            if self.sampler.last_sample_time is None:
+                self.sampler.sample()
             
             # Push to gateway
             push_to_gateway(
@@ -724,28 +751,49 @@ class MetricsCollector:
     async def start_background_collection(self) -> None:
         """Start background metrics collection"""
         logger.info("Starting background metrics collection")
-        
-        while True:
-            try:
-                start_time = time.time()
-                
-                # Collect system metrics
-                self.collect_system_metrics()
-                
-                # Update collection time
-                self._last_collection_time = time.time()
-                
-                collection_duration = self._last_collection_time - start_time
-                logger.debug(f"Metrics collection completed in {collection_duration:.3f}s")
-                
-                # Wait for next collection interval
-                await asyncio.sleep(settings.METRICS_COLLECTION_INTERVAL)
-                
-            except Exception as e:
-                logger.error(f"Error in background metrics collection: {e}")
-                self._collection_errors += 1
-                await asyncio.sleep(settings.METRICS_COLLECTION_INTERVAL)
+        await self.sampler.start()
+    
+    async def initialize(self) -> bool:
+        """Initialize metrics service"""
+        try:
+            await self.start_background_collection()
+            logger.info("Metrics service initialized")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to initialize metrics service: {e}")
+            return False
+    
+    async def get_metrics(self) -> str:
+        """Get metrics in Prometheus exposition format"""
+        metrics_output, _ = self.get_metrics_exposition()
+        return metrics_output
+    
+    async def get_metrics_dict(self) -> Dict[str, Any]:
+        """Get sampled system metrics with their 1m/5m/1h aggregates"""
+        return {
+            "system": {
+                window: self.sampler.get_summary(window)
+                for window in self.sampler.window_specs
+            },
+            "sampler": self.sampler.get_stats()
+        }
+    
+    def get_metrics_stats(self) -> Dict[str, Any]:
+        """Get metrics service statistics"""
+        return {
+            "prometheus_enabled": True,
+            "total_metrics": len(self.app_metrics) + len(self.business_metrics) + len(self.infrastructure_metrics) + len(self.custom_metrics),
+            "collection_errors": self._collection_errors,
+            "sampler": self.sampler.get_stats()
+        }
+    
+    async def shutdown(self) -> None:
+        """Shutdown metrics service"""
+        await self.sampler.stop()
+        logger.info("Metrics service shutdown completed")
 
 
 # Global metrics collector instance
-metrics_collector = MetricsCollector()
\ No newline at end of file
+metrics_collector = MetricsCollector()
+metrics_service = metrics_collector
\ No newline at end of file
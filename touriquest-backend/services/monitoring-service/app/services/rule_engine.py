@@ -0,0 +1,148 @@
+"""
+Indexed alert rule evaluation
+
+Rules are compiled once when they are added: the condition string becomes a
+callable bound to the threshold, and the rule is filed under its service and
+metric name and then under its label matchers. Evaluating a sample only looks
+at the rules for that metric whose label matchers are a subset of the sample's
+labels, so the cost of a sample does not grow with the total number of rules.
+"""
+
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+from functools import partial
+import operator
+
+
+# Each condition is applied as `threshold <op> value`, so a compiled condition
+# is a partial of a C comparison and costs one call per sample
+_REVERSED_OPERATORS: Dict[str, Callable[[float, float], bool]] = {
+    "gt": operator.lt,
+    "lt": operator.gt,
+    "gte": operator.le,
+    "lte": operator.ge,
+    "eq": operator.eq,
+    "ne": operator.ne,
+}
+
+CONDITIONS = tuple(_REVERSED_OPERATORS)
+
+
+class MetricSample(NamedTuple):
+    """One metric observation to evaluate"""
+    service: str
+    metric_name: str
+    value: float
+    labels: Optional[Mapping[str, str]] = None
+
+
+def compile_condition(condition: str, threshold: float) -> Callable[[float], bool]:
+    """Turn a condition name and threshold into a predicate on the metric value"""
+    try:
+        compare = _REVERSED_OPERATORS[condition]
+    except KeyError:
+        raise ValueError(f"Unknown condition: {condition}") from None
+    return partial(compare, threshold)
+
+
+def alert_fingerprint(service: str, source: str, name: str, labels: Optional[Mapping[str, str]] = None) -> str:
+    """Identity of an alert: the same fingerprint means the same ongoing problem"""
+    key = f"{service}:{source}:{name}"
+    if labels:
+        key += "{" + ",".join(f"{k}={labels[k]}" for k in sorted(labels)) + "}"
+    return key
+
+
+class RuleIndex:
+    """Alert rules indexed by service, metric name and label matchers"""
+
+    def __init__(self):
+        # (service, metric_name) -> (rules without label matchers, {label matchers: rules})
+        self._index: Dict[Tuple[str, str], Tuple[List[Tuple[Callable, Any]], Dict[FrozenSet, List[Tuple[Callable, Any]]]]] = {}
+        self._rules: Dict[str, Tuple[Tuple[str, str], FrozenSet, Tuple[Callable, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def add(self, rule: Any) -> None:
+        """
+        Index a rule, replacing any rule with the same id.
+
+        The condition is compiled here, so changes to a rule's condition,
+        threshold, labels or enabled flag take effect when it is added again.
+        Disabled rules are not indexed.
+        """
+        check = compile_condition(rule.condition, rule.threshold)
+        self.remove(rule.id)
+        if not rule.enabled:
+            return
+
+        key = (rule.service, rule.metric_name)
+        label_set = frozenset(rule.labels.items())
+        entry = (check, rule)
+        unlabelled, labelled = self._index.setdefault(key, ([], {}))
+        if label_set:
+            labelled.setdefault(label_set, []).append(entry)
+        else:
+            unlabelled.append(entry)
+        self._rules[rule.id] = (key, label_set, entry)
+
+    def remove(self, rule_id: str) -> bool:
+        """Drop a rule from the index"""
+        indexed = self._rules.pop(rule_id, None)
+        if indexed is None:
+            return False
+
+        key, label_set, entry = indexed
+        unlabelled, labelled = self._index[key]
+        if label_set:
+            labelled[label_set].remove(entry)
+            if not labelled[label_set]:
+                del labelled[label_set]
+        else:
+            unlabelled.remove(entry)
+        if not unlabelled and not labelled:
+            del self._index[key]
+        return True
+
+    def clear(self) -> None:
+        self._index.clear()
+        self._rules.clear()
+
+    def match(self, service: str, metric_name: str, value: float, labels: Optional[Mapping[str, str]] = None) -> List[Any]:
+        """Rules whose condition holds for one sample"""
+        buckets = self._index.get((service, metric_name))
+        if buckets is None:
+            return []
+
+        unlabelled, labelled = buckets
+        matched = [rule for check, rule in unlabelled if check(value)]
+        if labelled and labels:
+            items = labels.items()
+            for label_set, entries in labelled.items():
+                if label_set <= items:
+                    matched.extend(rule for check, rule in entries if check(value))
+        return matched
+
+    def match_batch(self, samples: Iterable[MetricSample]) -> List[Tuple[Any, MetricSample]]:
+        """(rule, sample) pairs for every rule that fires on a batch of samples"""
+        index_get = self._index.get
+        matches: List[Tuple[Any, MetricSample]] = []
+        append = matches.append
+        for sample in samples:
+            service, metric_name, value, labels = sample
+            buckets = index_get((service, metric_name))
+            if buckets is None:
+                continue
+
+            unlabelled, labelled = buckets
+            for check, rule in unlabelled:
+                if check(value):
+                    append((rule, sample))
+            if labelled and labels:
+                items = labels.items()
+                for label_set, entries in labelled.items():
+                    if label_set <= items:
+                        for check, rule in entries:
+                            if check(value):
+                                append((rule, sample))
+        return matches
@@ -0,0 +1,307 @@
+"""
+Fixed-cadence system metrics sampler with pre-aggregated windows
+
+One background task calls a probe on a fixed cadence. Each value is folded
+into ring buffers of time slots for every window (1m, 5m and 1h by default),
+and each window keeps running totals across its live slots, so min, max,
+average and p95 are read from the aggregates instead of re-scanning raw
+samples. Percentiles come from an HDR-style histogram with log-spaced
+buckets of fixed relative precision.
+
+The sampler measures the CPU time of every tick and stretches its interval
+whenever its own overhead would exceed the configured share of one core.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, asdict
+import asyncio
+import logging
+import math
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# name -> (length in seconds, slots in the ring)
+DEFAULT_WINDOWS: Dict[str, Tuple[float, int]] = {
+    "1m": (60.0, 12),
+    "5m": (300.0, 10),
+    "1h": (3600.0, 12),
+}
+
+
+@dataclass
+class WindowStats:
+    """Aggregates of one metric over one window"""
+    count: int
+    min: float
+    max: float
+    avg: float
+    p95: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return asdict(self)
+
+
+class LogHistogram:
+    """
+    HDR-style histogram over log-spaced buckets.
+
+    A value maps to the bucket floor(log(v) / log(1 + precision)), so any
+    quantile is reported within `precision` relative error whatever the
+    value range. Zero and negative values share one bucket below the rest.
+    """
+
+    ZERO_BUCKET = -(2 ** 31)
+
+    def __init__(self, precision: float = 0.01):
+        self.precision = precision
+        self._log_base = math.log1p(precision)
+        self.counts: Dict[int, int] = {}
+
+    def bucket(self, value: float) -> int:
+        if value <= 0:
+            return self.ZERO_BUCKET
+        return math.floor(math.log(value) / self._log_base)
+
+    def value_of(self, bucket: int) -> float:
+        """Midpoint of a bucket"""
+        if bucket == self.ZERO_BUCKET:
+            return 0.0
+        return math.exp((bucket + 0.5) * self._log_base)
+
+    def add_bucket(self, bucket: int, count: int = 1) -> None:
+        counts = self.counts
+        counts[bucket] = counts.get(bucket, 0) + count
+
+    def subtract(self, counts: Dict[int, int]) -> None:
+        own = self.counts
+        for bucket, count in counts.items():
+            remaining = own[bucket] - count
+            if remaining:
+                own[bucket] = remaining
+            else:
+                del own[bucket]
+
+    def quantile(self, q: float, total: int) -> float:
+        """Value at quantile q of `total` recorded values"""
+        rank = q * total
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return self.value_of(bucket)
+        return 0.0
+
+
+class _Slot:
+    """Aggregates of the values recorded during one slot of a window"""
+
+    __slots__ = ("id", "count", "total", "minimum", "maximum", "buckets")
+
+    def __init__(self, slot_id: int):
+        self.id = slot_id
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.buckets: Dict[int, int] = {}
+
+
+class RollingWindow:
+    """
+    Ring of time slots covering one window, with running totals.
+
+    Adding a value touches one slot and the running totals. Expired slots
+    are subtracted from the totals as the ring turns, so count, average and
+    the histogram never need a rescan; min and max take one pass over the
+    fixed number of slots. Stats are cached until the next change.
+    """
+
+    def __init__(self, length: float, n_slots: int, precision: float = 0.01):
+        self.length = length
+        self.slot_length = length / n_slots
+        self.slots: List[Optional[_Slot]] = [None] * n_slots
+        self.histogram = LogHistogram(precision)
+        self.count = 0
+        self.total = 0.0
+        self._current_id = -1
+        self._cached: Optional[WindowStats] = None
+
+    def _advance(self, slot_id: int) -> None:
+        """Drop slots that fell out of the window ending in slot_id"""
+        if slot_id == self._current_id:
+            return
+        self._current_id = slot_id
+        oldest = slot_id - len(self.slots) + 1
+        for position, slot in enumerate(self.slots):
+            if slot is not None and slot.id < oldest:
+                self.count -= slot.count
+                self.total -= slot.total
+                self.histogram.subtract(slot.buckets)
+                self.slots[position] = None
+                self._cached = None
+
+    def add(self, now: float, value: float, bucket: int) -> None:
+        slot_id = int(now // self.slot_length)
+        self._advance(slot_id)
+        position = slot_id % len(self.slots)
+        slot = self.slots[position]
+        if slot is None:
+            slot = self.slots[position] = _Slot(slot_id)
+
+        slot.count += 1
+        slot.total += value
+        if value < slot.minimum:
+            slot.minimum = value
+        if value > slot.maximum:
+            slot.maximum = value
+        slot.buckets[bucket] = slot.buckets.get(bucket, 0) + 1
+
+        self.count += 1
+        self.total += value
+        self.histogram.add_bucket(bucket)
+        self._cached = None
+
+    def stats(self, now: float) -> Optional[WindowStats]:
+        """Aggregates over the window ending now, or None if it holds no values"""
+        self._advance(int(now // self.slot_length))
+        if self._cached is None and self.count:
+            live = [slot for slot in self.slots if slot is not None]
+            self._cached = WindowStats(
+                count=self.count,
+                min=min(slot.minimum for slot in live),
+                max=max(slot.maximum for slot in live),
+                avg=self.total / self.count,
+                p95=self.histogram.quantile(0.95, self.count)
+            )
+        return self._cached
+
+
+class SystemSampler:
+    """Samples a probe on a fixed cadence into pre-aggregated windows"""
+
+    def __init__(
+        self,
+        probe: Callable[[], Dict[str, float]],
+        interval: float = 1.0,
+        cpu_budget: float = 0.01,
+        windows: Optional[Dict[str, Tuple[float, int]]] = None,
+        precision: float = 0.01,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.probe = probe
+        self.interval = interval
+        self.cpu_budget = cpu_budget
+        self.window_specs = windows or DEFAULT_WINDOWS
+        self.precision = precision
+        self.clock = clock
+
+        self.windows: Dict[str, Dict[str, RollingWindow]] = {}
+        self.latest: Dict[str, float] = {}
+        self.last_sample_time: Optional[float] = None
+        self._histogram = LogHistogram(precision)
+        self._task: Optional[asyncio.Task] = None
+
+        # Overhead accounting
+        self.samples = 0
+        self.errors = 0
+        self.skipped_ticks = 0
+        self.cpu_seconds = 0.0
+        self.avg_tick_cpu = 0.0
+        self.effective_interval = interval
+
+    async def start(self) -> None:
+        """Start the background sampling task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background sampling task"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def sample(self) -> None:
+        """Take one sample now and fold it into every window"""
+        started = time.thread_time()
+        try:
+            values = self.probe()
+        except Exception as e:
+            logger.error(f"System metrics probe failed: {e}")
+            self.errors += 1
+            values = {}
+        self.record(values, self.clock())
+        self.last_sample_time = time.time()
+
+        tick_cpu = time.thread_time() - started
+        self.cpu_seconds += tick_cpu
+        self.samples += 1
+        # Moving average of the tick cost, so one slow tick does not stretch the cadence
+        self.avg_tick_cpu = tick_cpu if self.samples == 1 else 0.8 * self.avg_tick_cpu + 0.2 * tick_cpu
+        self.effective_interval = max(self.interval, self.avg_tick_cpu / self.cpu_budget)
+
+    def record(self, values: Dict[str, float], now: float) -> None:
+        """Fold one set of values observed at `now` into the windows"""
+        bucket = self._histogram.bucket
+        for name, value in values.items():
+            windows = self.windows.get(name)
+            if windows is None:
+                windows = self.windows[name] = {
+                    window: RollingWindow(length, n_slots, self.precision)
+                    for window, (length, n_slots) in self.window_specs.items()
+                }
+            value_bucket = bucket(value)
+            for window in windows.values():
+                window.add(now, value, value_bucket)
+        self.latest.update(values)
+
+    async def _run(self) -> None:
+        """Sample on a fixed schedule, skipping ticks that were missed rather than bursting"""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            self.sample()
+            next_tick += self.effective_interval
+            now = loop.time()
+            if next_tick < now:
+                missed = math.ceil((now - next_tick) / self.effective_interval)
+                self.skipped_ticks += missed
+                next_tick += missed * self.effective_interval
+            await asyncio.sleep(next_tick - now)
+
+    def get_window(self, metric: str, window: str = "1m") -> Optional[WindowStats]:
+        """Aggregates of one metric over one window"""
+        windows = self.windows.get(metric)
+        if windows is None:
+            return None
+        return windows[window].stats(self.clock())
+
+    def get_summary(self, window: str = "1m") -> Dict[str, Dict[str, Any]]:
+        """Latest value and window aggregates of every metric"""
+        now = self.clock()
+        summary = {}
+        for metric, windows in self.windows.items():
+            stats = windows[window].stats(now)
+            summary[metric] = {
+                "latest": self.latest.get(metric),
+                **(stats.to_dict() if stats else {})
+            }
+        return summary
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Sampler overhead and cadence"""
+        return {
+            "running": self._task is not None,
+            "samples": self.samples,
+            "errors": self.errors,
+            "skipped_ticks": self.skipped_ticks,
+            "interval": self.interval,
+            "effective_interval": self.effective_interval,
+            "avg_tick_cpu_ms": self.avg_tick_cpu * 1000,
+            "cpu_budget": self.cpu_budget,
+            "cpu_overhead": self.avg_tick_cpu / self.effective_interval,
+            "metrics": len(self.windows)
+        }
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Log Export and Shipping Benchmark
+
+Exports a synthetic log index (10M lines by default) through
+stream_export the way the /logs/export StreamingResponse consumes it, each
+chunk encoded to bytes as Starlette does, and reports lines per second,
+chunk count, the largest chunk and traced peak memory. The previous
+scroll-based export (one pretty-printed JSON string yielded per log line)
+runs on a smaller slice of the same index for comparison.
+
+The index is served by an in-process stand-in for the point-in-time search
+and scroll APIs that builds each page on request from a pool of generated
+documents, so the numbers measure the export code rather than a cluster.
+A shipping run pushes records through LogShipper into a bulk endpoint that
+only counts bytes.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.log_pipeline import LogShipper, stream_export  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+LEVELS = ("INFO", "INFO", "INFO", "WARNING", "ERROR")
+SERVICES = ("booking-service", "property-service", "auth-service", "payment-service")
+POOL_SIZE = 10_000
+
+
+def log_document(n: int) -> Dict[str, Any]:
+    return {
+        "timestamp": f"2025-06-{1 + n // 86_400_000 % 28:02d}T{n // 3_600_000 % 24:02d}:{n // 60_000 % 60:02d}:{n // 1000 % 60:02d}.{n % 1000:03d}Z",
+        "level": LEVELS[n % 5],
+        "message": f"request {n} handled in {n % 997} ms",
+        "service": SERVICES[n % 4],
+        "logger_name": "app.api",
+        "module": "routes",
+        "function": "handle",
+        "line_number": 120 + n % 40,
+        "trace_id": f"{n * 2654435761 % 2 ** 128:032x}",
+        "user_id": f"user_{n % 50_000}",
+        "tags": {"region": "eu-west-1"},
+        "extra_fields": {"status_code": 200 if n % 50 else 500},
+    }
+
+
+class SyntheticLogIndex:
+    """Point-in-time search and scroll over n generated log documents"""
+
+    def __init__(self, n_documents: int, pool: List[Dict[str, Any]]):
+        self.n_documents = n_documents
+        self.pool = pool
+        self.scrolls: Dict[str, int] = {}
+
+    def _hits(self, start: int, size: int, source: Any):
+        hits = []
+        for n in range(start, min(start + size, self.n_documents)):
+            document = self.pool[n % POOL_SIZE]
+            if source is not True:
+                document = {name: document[name] for name in source if name in document}
+            hits.append({"_source": document, "sort": [document["timestamp"], n]})
+        return hits
+
+    async def open_point_in_time(self, index, keep_alive, ignore_unavailable=False):
+        return {"id": "pit"}
+
+    async def close_point_in_time(self, id):
+        return {"succeeded": True}
+
+    async def search(self, index=None, body=None, scroll=None, size=10, query=None, sort=None, pit=None,
+                     search_after=None, source=True, track_total_hits=None, filter_path=None):
+        if scroll:
+            self.scrolls["scroll"] = size
+            return {"_scroll_id": "scroll", "hits": {"hits": self._hits(0, size, True)}}
+        start = 0 if search_after is None else search_after[1] + 1
+        hits = self._hits(start, size, source)
+        return {"pit_id": pit["id"], "hits": {"hits": hits}} if hits else {"pit_id": pit["id"]}
+
+    async def scroll(self, scroll_id, scroll):
+        size = self.scrolls[scroll_id]
+        position = self.scrolls[f"{scroll_id}_position"] = self.scrolls.get(f"{scroll_id}_position", 0) + size
+        return {"_scroll_id": scroll_id, "hits": {"hits": self._hits(position, size, True)}}
+
+    async def clear_scroll(self, scroll_id):
+        return {"succeeded": True}
+
+
+async def previous_export(es_client):
+    """The previous export_logs JSON path: scroll pages of 1000, one pretty-printed string per log"""
+    response = await es_client.search(index="logs-*", body={}, scroll="5m", size=1000)
+    scroll_id = response["_scroll_id"]
+    yield "[\n"
+    first = True
+    while True:
+        hits = response["hits"]["hits"]
+        if not hits:
+            break
+        for hit in hits:
+            if not first:
+                yield ",\n"
+            yield json.dumps(hit["_source"], indent=2)
+            first = False
+        response = await es_client.scroll(scroll_id=scroll_id, scroll="5m")
+    yield "\n]"
+    await es_client.clear_scroll(scroll_id=scroll_id)
+
+
+async def consume(chunks) -> Dict[str, Any]:
+    """Drain an export like StreamingResponse does, encoding every chunk"""
+    n_chunks = n_bytes = largest = 0
+    async for chunk in chunks:
+        encoded = chunk.encode("utf-8")
+        n_chunks += 1
+        n_bytes += len(encoded)
+        largest = max(largest, len(encoded))
+    return {"chunks": n_chunks, "bytes": n_bytes, "largest_chunk": largest}
+
+
+async def measure(make_chunks, lines: int, trace_lines: int, make_traced) -> Dict[str, Any]:
+    started = time.perf_counter()
+    result = await consume(make_chunks())
+    result["seconds"] = time.perf_counter() - started
+    result["lines_per_second"] = lines / result["seconds"]
+
+    tracemalloc.start()
+    await consume(make_traced())
+    result["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+    result["traced_lines"] = trace_lines
+    tracemalloc.stop()
+    return result
+
+
+class CountingBulk:
+    """Bulk endpoint that accepts everything and counts the bytes"""
+
+    def __init__(self):
+        self.bytes = 0
+        self.requests = 0
+
+    async def bulk(self, operations, refresh=False):
+        self.bytes += len(operations)
+        self.requests += 1
+        return {"errors": False, "items": []}
+
+
+async def run_shipping(args, pool: List[Dict[str, Any]]) -> Dict[str, Any]:
+    es = CountingBulk()
+    shipper = LogShipper(es, max_queue_size=args.ship_lines, batch_size=args.ship_batch_size, flush_interval=0.5)
+    await shipper.start()
+    started = time.perf_counter()
+    for n in range(args.ship_lines):
+        shipper.submit("logs-2025.06.01", pool[n % POOL_SIZE])
+        if n % 1000 == 0:
+            # Emitting code yields to the loop between requests, which is when the shipper runs
+            await asyncio.sleep(0)
+    await shipper.close()
+    seconds = time.perf_counter() - started
+    return {
+        "lines_per_second": args.ship_lines / seconds,
+        "requests": es.requests,
+        "mb": es.bytes / 1e6,
+        "stats": shipper.get_stats(),
+    }
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    pool = [log_document(n) for n in range(POOL_SIZE)]
+    for format in args.formats:
+        logger.info(f"Exporting {args.lines} lines as {format}...")
+        results[format] = await measure(
+            lambda: stream_export(SyntheticLogIndex(args.lines, pool), "logs-*", {"match_all": {}},
+                                  format=format, page_size=args.page_size),
+            args.lines,
+            args.trace_lines,
+            lambda: stream_export(SyntheticLogIndex(args.trace_lines, pool), "logs-*", {"match_all": {}},
+                                  format=format, page_size=args.page_size)
+        )
+
+    if args.previous_lines:
+        logger.info(f"Exporting {args.previous_lines} lines with the previous implementation...")
+        results["previous"] = await measure(
+            lambda: previous_export(SyntheticLogIndex(args.previous_lines, pool)),
+            args.previous_lines,
+            args.trace_lines,
+            lambda: previous_export(SyntheticLogIndex(args.trace_lines, pool))
+        )
+
+    if args.ship_lines:
+        logger.info(f"Shipping {args.ship_lines} lines...")
+        results["shipping"] = await run_shipping(args, pool)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=10_000_000)
+    parser.add_argument("--formats", nargs="+", default=["ndjson", "csv"], choices=["ndjson", "json", "csv"])
+    parser.add_argument("--page-size", type=int, default=5000)
+    parser.add_argument("--previous-lines", type=int, default=1_000_000, help="0 skips the previous implementation")
+    parser.add_argument("--trace-lines", type=int, default=200_000, help="Lines exported under tracemalloc")
+    parser.add_argument("--ship-lines", type=int, default=1_000_000, help="0 skips the shipping run")
+    parser.add_argument("--ship-batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+
+    for name in [*args.formats, "previous"]:
+        if name not in results:
+            continue
+        result = results[name]
+        logger.info(
+            f"{name}: {result['lines_per_second']:,.0f} lines/s ({result['seconds']:.1f}s), "
+            f"{result['bytes'] / 1e9:.2f} GB in {result['chunks']:,} chunks, largest {result['largest_chunk'] / 1e6:.2f} MB, "
+            f"traced peak {result['traced_peak_mb']:.1f} MB over {result['traced_lines']:,} lines"
+        )
+    if "shipping" in results:
+        shipping = results["shipping"]
+        logger.info(
+            f"shipping: {shipping['lines_per_second']:,.0f} lines/s in {shipping['requests']} bulk requests "
+            f"({shipping['mb']:.0f} MB), {shipping['stats']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
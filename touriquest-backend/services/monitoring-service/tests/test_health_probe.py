@@ -0,0 +1,157 @@
+"""
+Test Suite for Background Health Probing
+
+Runs the health monitor against local fake dependencies that answer, hang or
+raise, and checks that a hanging dependency times out without delaying the
+others, that reads are served from the cache without probing, that old
+results are reported as unknown, and that status changes are debounced.
+"""
+
+import asyncio
+import time
+
+from app.services.health_probe import HealthCheckResult, HealthMonitor, HealthStatus, combine_statuses
+
+
+class FakeDependency:
+    """Probe target that answers, hangs or raises on demand"""
+
+    def __init__(self, name: str, mode: str = "healthy"):
+        self.name = name
+        self.mode = mode
+        self.calls = 0
+
+    async def __call__(self) -> HealthCheckResult:
+        self.calls += 1
+        if self.mode == "hang":
+            await asyncio.Event().wait()
+        if self.mode == "fail":
+            raise ConnectionError(f"{self.name} refused the connection")
+        status = HealthStatus.HEALTHY if self.mode == "healthy" else HealthStatus.DEGRADED
+        return HealthCheckResult(service=self.name, status=status, response_time=0.0, message=self.mode)
+
+
+def result(status: HealthStatus) -> HealthCheckResult:
+    return HealthCheckResult(service="api", status=status, response_time=0.0, message=status.value)
+
+
+class TestProbing:
+    """Test cases for concurrent probing with per-dependency timeouts"""
+
+    async def test_hanging_dependency_does_not_delay_the_others(self):
+        monitor = HealthMonitor(interval=60, timeout=0.2)
+        monitor.register("database", FakeDependency("database"))
+        monitor.register("redis", FakeDependency("redis", "fail"))
+        monitor.register("payments", FakeDependency("payments", "hang"))
+        monitor.register("search", FakeDependency("search", "hang"), timeout=0.05)
+
+        await monitor.start()
+        await asyncio.sleep(0.02)
+
+        # The answering dependencies are already reported while the others hang
+        assert monitor.get("database").status == HealthStatus.HEALTHY
+        assert monitor.get("redis").status == HealthStatus.UNHEALTHY
+        assert "refused" in monitor.get("redis").message
+        assert monitor.get("payments").status == HealthStatus.UNKNOWN
+
+        await asyncio.sleep(0.1)
+        assert monitor.get("search").status == HealthStatus.UNHEALTHY
+        assert monitor.get("payments").status == HealthStatus.UNKNOWN
+
+        await asyncio.sleep(0.15)
+        await monitor.stop()
+        assert monitor.get("payments").status == HealthStatus.UNHEALTHY
+        assert "timed out" in monitor.get("payments").message
+        assert monitor.get_stats()["timeouts"] == 2
+
+    async def test_probe_all_is_bounded_by_the_largest_timeout(self):
+        monitor = HealthMonitor(timeout=0.1)
+        for n in range(20):
+            monitor.register(f"hanging-{n}", FakeDependency(f"hanging-{n}", "hang"))
+
+        started = time.monotonic()
+        await monitor.probe_all()
+
+        assert time.monotonic() - started < 0.5
+        assert combine_statuses(check.status for check in monitor.results().values()) == HealthStatus.UNHEALTHY
+
+    async def test_probes_repeat_on_a_jittered_interval(self):
+        dependency = FakeDependency("database")
+        monitor = HealthMonitor(interval=0.02, jitter=0.5)
+        monitor.register("database", dependency)
+
+        await monitor.start()
+        await asyncio.sleep(0.2)
+        await monitor.stop()
+
+        # Sleeps are drawn from [0.01, 0.03]
+        assert 6 <= dependency.calls <= 21
+        assert monitor.get_stats()["running"] is False
+
+    async def test_registering_twice_is_rejected(self):
+        monitor = HealthMonitor()
+        monitor.register("database", FakeDependency("database"))
+
+        try:
+            monitor.register("database", FakeDependency("database"))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("duplicate registration accepted")
+
+
+class TestCachedStatus:
+    """Test cases for cached reads, staleness and hysteresis"""
+
+    async def test_reads_never_probe(self):
+        dependency = FakeDependency("payments", "hang")
+        monitor = HealthMonitor(timeout=10)
+        monitor.register("payments", dependency)
+
+        started = time.monotonic()
+        for _ in range(1000):
+            check = monitor.get("payments")
+
+        assert time.monotonic() - started < 0.1
+        assert dependency.calls == 0
+        assert check.status == HealthStatus.UNKNOWN and check.message == "Not probed yet"
+        assert monitor.get("missing") is None
+
+    def test_old_results_are_reported_unknown(self):
+        monitor = HealthMonitor(interval=60, stale_after=0.05)
+        monitor.register("api", FakeDependency("api"))
+        monitor.observe("api", result(HealthStatus.HEALTHY))
+
+        assert monitor.get("api").status == HealthStatus.HEALTHY
+        assert monitor.get("api").details["stale"] is False
+
+        time.sleep(0.06)
+        check = monitor.get("api")
+        assert check.status == HealthStatus.UNKNOWN
+        assert check.details["stale"] is True
+        assert check.details["observed_status"] == "healthy"
+        assert check.message.startswith("Last check is stale")
+
+    def test_status_changes_after_consecutive_results(self):
+        monitor = HealthMonitor(rise=2, fall=3)
+        monitor.register("api", FakeDependency("api"))
+
+        # The first result is adopted immediately
+        monitor.observe("api", result(HealthStatus.HEALTHY))
+        assert monitor.get("api").status == HealthStatus.HEALTHY
+
+        # A flapping dependency never reaches three failures in a row
+        for status in [HealthStatus.UNHEALTHY, HealthStatus.UNHEALTHY, HealthStatus.HEALTHY] * 3:
+            monitor.observe("api", result(status))
+            assert monitor.get("api").status == HealthStatus.HEALTHY
+
+        for _ in range(3):
+            monitor.observe("api", result(HealthStatus.UNHEALTHY))
+        assert monitor.get("api").status == HealthStatus.UNHEALTHY
+        assert monitor.get("api").details["last_change"] is not None
+
+        monitor.observe("api", result(HealthStatus.HEALTHY))
+        assert monitor.get("api").status == HealthStatus.UNHEALTHY
+        assert monitor.get("api").details["observed_status"] == "healthy"
+        monitor.observe("api", result(HealthStatus.HEALTHY))
+        assert monitor.get("api").status == HealthStatus.HEALTHY
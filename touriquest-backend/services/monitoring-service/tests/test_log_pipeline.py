@@ -0,0 +1,229 @@
+"""
+Test Suite for the Log Shipping and Export Pipeline
+
+Checks NDJSON bulk bodies, size- and time-based batching, retries of failed
+requests and throttled items, backpressure on a full queue, and streaming
+exports in every format against an in-memory Elasticsearch stand-in.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import threading
+
+import pytest
+
+from app.services.log_pipeline import LogShipper, stream_export
+
+
+def log_document(n):
+    return {
+        "timestamp": f"2025-06-01T00:{n // 60 % 60:02d}:{n % 60:02d}.{n:06d}",
+        "level": "ERROR" if n % 10 == 0 else "INFO",
+        "service": "booking-service",
+        "logger_name": "app.bookings",
+        "message": f"booking {n} confirmed",
+        "trace_id": f"{n:032x}",
+    }
+
+
+class FakeElasticsearch:
+    """In-memory bulk and point-in-time search APIs"""
+
+    def __init__(self, documents=(), failures=0, item_statuses=None):
+        self.documents = list(documents)
+        self.failures = failures
+        # message -> statuses returned for it on successive attempts
+        self.item_statuses = item_statuses or {}
+        self.bodies = []
+        self.indexed = []
+        self.open_pits = set()
+        self.searches = 0
+
+    async def bulk(self, operations, refresh=False):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection refused")
+
+        self.bodies.append(operations)
+        lines = operations.decode().splitlines()
+        items = []
+        for action, source in zip(lines[::2], lines[1::2]):
+            document = json.loads(source)
+            document["_index"] = json.loads(action)["index"]["_index"]
+            statuses = self.item_statuses.get(document["message"])
+            status = statuses.pop(0) if statuses else 201
+            if status < 300:
+                self.indexed.append(document)
+            items.append({"index": {"status": status}})
+        return {"errors": any(item["index"]["status"] >= 300 for item in items), "items": items}
+
+    async def open_point_in_time(self, index, keep_alive, ignore_unavailable=False):
+        pit_id = f"pit-{len(self.open_pits)}"
+        self.open_pits.add(pit_id)
+        return {"id": pit_id}
+
+    async def close_point_in_time(self, id):
+        self.open_pits.discard(id)
+
+    async def search(self, query, size, sort, pit, search_after, source, track_total_hits, filter_path):
+        self.searches += 1
+        start = 0 if search_after is None else search_after[1] + 1
+        hits = [
+            {
+                "_source": document if source is True else {name: document[name] for name in source if name in document},
+                "sort": [document["timestamp"], start + n]
+            }
+            for n, document in enumerate(self.documents[start:start + size])
+        ]
+        return {"pit_id": pit["id"], "hits": {"hits": hits}} if hits else {"pit_id": pit["id"]}
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+class TestLogShipper:
+    """Test cases for batching, retries and backpressure"""
+
+    async def test_bulk_bodies_are_ndjson_action_and_source_pairs(self):
+        es = FakeElasticsearch()
+        shipper = LogShipper(es, batch_size=1000)
+        for n in range(5):
+            shipper.submit("logs-2025.06.01", {**log_document(n), "message": f'quote " and\nnewline {n}'})
+
+        await shipper.flush()
+
+        body = es.bodies[0]
+        assert body.endswith(b"\n")
+        lines = body.decode().split("\n")[:-1]
+        assert len(lines) == 10
+        assert all(json.loads(action) == {"index": {"_index": "logs-2025.06.01"}} for action in lines[::2])
+        assert [json.loads(source)["message"] for source in lines[1::2]][1] == 'quote " and\nnewline 1'
+
+    async def test_full_batches_ship_immediately_and_partial_ones_on_the_interval(self):
+        es = FakeElasticsearch()
+        shipper = LogShipper(es, batch_size=100, flush_interval=0.2)
+        await shipper.start()
+
+        for n in range(30):
+            shipper.submit("logs", log_document(n))
+        await asyncio.sleep(0.05)
+        assert es.indexed == []
+
+        for n in range(30, 250):
+            shipper.submit("logs", log_document(n))
+        await asyncio.sleep(0.05)
+        assert len(es.indexed) == 250
+        assert [len(body.splitlines()) // 2 for body in es.bodies] == [100, 100, 50]
+
+        shipper.submit("logs", log_document(250))
+        await asyncio.sleep(0.3)
+        assert len(es.indexed) == 251
+        await shipper.close()
+
+    async def test_failed_requests_and_throttled_items_are_retried(self):
+        es = FakeElasticsearch(failures=2, item_statuses={
+            "booking 3 confirmed": [429, 429],
+            "booking 4 confirmed": [400],
+        })
+        shipper = LogShipper(es, retry_backoff=0.001)
+        for n in range(10):
+            shipper.submit("logs", log_document(n))
+
+        await shipper.flush()
+
+        assert sorted(document["message"] for document in es.indexed) == sorted(
+            f"booking {n} confirmed" for n in range(10) if n != 4
+        )
+        stats = shipper.get_stats()
+        assert stats["shipped"] == 9 and stats["failed"] == 1 and stats["retries"] == 4
+        # The retries only resend the throttled document
+        assert len(es.bodies[-1].splitlines()) == 2
+
+    async def test_batches_are_dropped_once_retries_run_out(self):
+        es = FakeElasticsearch(failures=10)
+        shipper = LogShipper(es, max_retries=2, retry_backoff=0.001)
+        shipper.submit("logs", log_document(1))
+
+        await shipper.flush()
+
+        assert shipper.get_stats()["failed"] == 1
+        assert shipper.get_stats()["queued"] == 0
+
+    async def test_full_queue_drops_new_records_without_blocking(self):
+        es = FakeElasticsearch()
+        shipper = LogShipper(es, max_queue_size=100, batch_size=1000)
+
+        accepted = [shipper.submit("logs", log_document(n)) for n in range(150)]
+
+        assert accepted.count(False) == 50
+        assert shipper.get_stats()["dropped"] == 50
+        await shipper.flush()
+        assert [document["message"] for document in es.indexed] == [f"booking {n} confirmed" for n in range(100)]
+
+    async def test_records_from_other_threads_wake_the_shipper(self):
+        es = FakeElasticsearch()
+        shipper = LogShipper(es, batch_size=50, flush_interval=10)
+        await shipper.start()
+
+        thread = threading.Thread(target=lambda: [shipper.submit("logs", log_document(n)) for n in range(50)])
+        thread.start()
+        thread.join()
+        for _ in range(100):
+            if len(es.indexed) == 50:
+                break
+            await asyncio.sleep(0.01)
+
+        assert len(es.indexed) == 50
+        await shipper.close()
+
+
+class TestStreamExport:
+    """Test cases for search_after exports"""
+
+    async def test_ndjson_export_streams_every_log_in_pages(self):
+        es = FakeElasticsearch(log_document(n) for n in range(2345))
+
+        chunks = await collect(stream_export(es, "logs-*", {"match_all": {}}, format="ndjson", page_size=1000))
+
+        assert len(chunks) == 3
+        lines = "".join(chunks).splitlines()
+        assert [json.loads(line)["message"] for line in lines] == [f"booking {n} confirmed" for n in range(2345)]
+        assert es.open_pits == set()
+
+    async def test_json_export_is_one_array(self):
+        es = FakeElasticsearch(log_document(n) for n in range(30))
+
+        chunks = await collect(stream_export(es, "logs-*", {"match_all": {}}, format="json", page_size=7))
+
+        assert json.loads("".join(chunks)) == [log_document(n) for n in range(30)]
+
+    async def test_csv_export_quotes_fields_and_only_fetches_exported_columns(self):
+        documents = [log_document(n) for n in range(3)]
+        documents[1]["message"] = 'payment "declined", retrying\nsecond line'
+        documents[2]["stack"] = "x" * 1000
+        es = FakeElasticsearch(documents)
+
+        chunks = await collect(stream_export(es, "logs-*", {"match_all": {}}, format="csv"))
+
+        rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+        assert rows[1]["message"] == documents[1]["message"]
+        assert rows[2]["trace_id"] == documents[2]["trace_id"]
+        assert rows[0]["user_id"] == ""
+        assert "stack" not in "".join(chunks)
+
+    async def test_point_in_time_is_closed_when_the_client_disconnects(self):
+        es = FakeElasticsearch(log_document(n) for n in range(100))
+        chunks = stream_export(es, "logs-*", {"match_all": {}}, page_size=10)
+
+        await chunks.__anext__()
+        await chunks.aclose()
+
+        assert es.open_pits == set()
+        assert es.searches == 1
+
+    async def test_unknown_format_is_rejected(self):
+        with pytest.raises(ValueError):
+            await collect(stream_export(FakeElasticsearch(), "logs-*", {"match_all": {}}, format="xml"))
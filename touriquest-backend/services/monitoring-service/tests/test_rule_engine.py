@@ -0,0 +1,127 @@
+"""
+Test Suite for Indexed Alert Rule Evaluation
+
+Checks compiled conditions against the comparisons they replace, lookups by
+service, metric name and label matchers, adding and removing rules, and that
+batch evaluation fires exactly the rules a linear scan over every rule would.
+"""
+
+import operator
+import random
+from dataclasses import dataclass, field
+from typing import Dict
+
+import pytest
+
+from app.services.rule_engine import CONDITIONS, MetricSample, RuleIndex, alert_fingerprint, compile_condition
+
+
+@dataclass
+class Rule:
+    id: str
+    service: str
+    metric_name: str
+    condition: str
+    threshold: float
+    enabled: bool = True
+    labels: Dict[str, str] = field(default_factory=dict)
+
+
+def linear_matches(rules, sample):
+    """The rules a full scan fires for one sample"""
+    comparisons = {"gt": operator.gt, "lt": operator.lt, "gte": operator.ge,
+                   "lte": operator.le, "eq": operator.eq, "ne": operator.ne}
+    labels = sample.labels or {}
+    return [
+        rule for rule in rules
+        if rule.enabled
+        and rule.service == sample.service
+        and rule.metric_name == sample.metric_name
+        and all(labels.get(name) == value for name, value in rule.labels.items())
+        and comparisons[rule.condition](sample.value, rule.threshold)
+    ]
+
+
+class TestConditions:
+    """Test cases for compiled conditions"""
+
+    @pytest.mark.parametrize("condition", CONDITIONS)
+    def test_compiled_condition_compares_the_value_with_the_threshold(self, condition):
+        expected = {"gt": lambda v: v > 80, "lt": lambda v: v < 80, "gte": lambda v: v >= 80,
+                    "lte": lambda v: v <= 80, "eq": lambda v: v == 80, "ne": lambda v: v != 80}[condition]
+        check = compile_condition(condition, 80.0)
+
+        assert [check(value) for value in (79.9, 80.0, 80.1)] == [expected(value) for value in (79.9, 80.0, 80.1)]
+
+    def test_unknown_condition_is_rejected(self):
+        with pytest.raises(ValueError):
+            compile_condition("between", 1.0)
+
+
+class TestRuleIndex:
+    """Test cases for indexed rule lookups"""
+
+    def test_only_rules_for_the_sample_metric_and_labels_fire(self):
+        index = RuleIndex()
+        index.add(Rule("cpu", "system", "cpu_usage_percent", "gt", 80.0))
+        index.add(Rule("cpu_web", "system", "cpu_usage_percent", "gt", 50.0, labels={"role": "web"}))
+        index.add(Rule("memory", "system", "memory_usage_percent", "gt", 10.0))
+        index.add(Rule("api_cpu", "api", "cpu_usage_percent", "gt", 10.0))
+
+        assert [rule.id for rule in index.match("system", "cpu_usage_percent", 90.0)] == ["cpu"]
+        assert [rule.id for rule in index.match("system", "cpu_usage_percent", 60.0, {"role": "web", "host": "a"})] == ["cpu_web"]
+        assert [rule.id for rule in index.match("system", "cpu_usage_percent", 60.0, {"role": "db"})] == []
+        assert index.match("system", "disk_usage_percent", 99.0) == []
+
+    def test_rules_are_replaced_removed_and_disabled(self):
+        index = RuleIndex()
+        index.add(Rule("errors", "api", "http_error_rate", "gt", 5.0))
+        index.add(Rule("errors", "api", "http_error_rate", "gt", 20.0))
+        assert index.match("api", "http_error_rate", 10.0) == []
+        assert len(index) == 1
+
+        index.add(Rule("errors", "api", "http_error_rate", "gt", 5.0, enabled=False))
+        assert index.match("api", "http_error_rate", 10.0) == []
+        assert len(index) == 0
+
+        index.add(Rule("errors", "api", "http_error_rate", "gt", 5.0, labels={"route": "/bookings"}))
+        assert index.remove("errors")
+        assert not index.remove("errors")
+        assert index.match("api", "http_error_rate", 10.0, {"route": "/bookings"}) == []
+
+    def test_batch_evaluation_matches_a_linear_scan(self):
+        rng = random.Random(7)
+        services = ["api", "system", "database"]
+        metrics = ["cpu", "memory", "latency", "errors"]
+        label_sets = [{}, {"region": "eu"}, {"region": "us"}, {"region": "eu", "tier": "gold"}]
+        rules = [
+            Rule(f"rule_{n}", rng.choice(services), rng.choice(metrics), rng.choice(CONDITIONS),
+                 float(rng.randint(0, 10)), enabled=rng.random() > 0.1, labels=rng.choice(label_sets))
+            for n in range(500)
+        ]
+        index = RuleIndex()
+        for rule in rules:
+            index.add(rule)
+        samples = [
+            MetricSample(rng.choice(services), rng.choice(metrics + ["unknown"]), float(rng.randint(0, 10)),
+                         rng.choice(label_sets + [None]))
+            for _ in range(2000)
+        ]
+
+        matches = index.match_batch(samples)
+
+        expected = [(rule.id, n) for n, sample in enumerate(samples) for rule in linear_matches(rules, sample)]
+        position = {id(sample): n for n, sample in enumerate(samples)}
+        assert sorted((rule.id, position[id(sample)]) for rule, sample in matches) == sorted(expected)
+        assert [rule.id for rule in index.match(*samples[0])] == [rule.id for rule, sample in matches if sample is samples[0]]
+
+
+class TestFingerprint:
+    """Test cases for alert fingerprints"""
+
+    def test_fingerprint_ignores_label_order_and_separates_label_values(self):
+        assert alert_fingerprint("api", "metrics", "latency", {"a": "1", "b": "2"}) == \
+            alert_fingerprint("api", "metrics", "latency", {"b": "2", "a": "1"})
+        assert alert_fingerprint("api", "metrics", "latency", {"a": "1"}) != \
+            alert_fingerprint("api", "metrics", "latency", {"a": "2"})
+        assert alert_fingerprint("api", "metrics", "latency") == "api:metrics:latency"
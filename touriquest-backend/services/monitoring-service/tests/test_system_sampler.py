@@ -0,0 +1,113 @@
+"""
+Test Suite for the System Metrics Sampler
+
+Checks histogram percentiles against numpy, window aggregates against the
+raw samples they cover as slots expire, the fixed sampling cadence, and that
+the sampler stretches its interval to stay within its CPU budget.
+"""
+
+import asyncio
+import time
+
+import numpy as np
+
+from app.services.system_sampler import LogHistogram, RollingWindow, SystemSampler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAggregates:
+    """Test cases for histograms and rolling windows"""
+
+    def test_histogram_percentiles_are_within_the_precision(self):
+        rng = np.random.default_rng(3)
+        histogram = LogHistogram(precision=0.01)
+        for values in (rng.lognormal(3, 1, 20000), rng.uniform(0, 100, 20000)):
+            histogram.counts.clear()
+            for value in values:
+                histogram.add_bucket(histogram.bucket(value))
+
+            for q in (0.5, 0.95, 0.99):
+                assert abs(histogram.quantile(q, len(values)) / np.quantile(values, q) - 1) < 0.01
+
+    def test_window_aggregates_cover_the_live_slots_only(self):
+        histogram = LogHistogram()
+        window = RollingWindow(60.0, 12)
+        values = np.arange(1, 121, dtype=float)
+        for second, value in enumerate(values):
+            window.add(second + 0.5, value, histogram.bucket(value))
+
+        stats = window.stats(119.5)
+
+        # Slots of 5s: the window ending in the slot [115, 120) starts at 60
+        live = values[60:]
+        assert stats.count == len(live)
+        assert stats.min == live.min() and stats.max == live.max()
+        assert np.isclose(stats.avg, live.mean())
+        assert abs(stats.p95 / np.quantile(live, 0.95) - 1) < 0.01
+
+        assert window.stats(200.0) is None
+        assert window.count == 0 and window.histogram.counts == {}
+
+    def test_summary_reports_every_window(self):
+        clock = FakeClock()
+        sampler = SystemSampler(lambda: {"cpu_usage_percent": clock.now % 10}, clock=clock)
+        for second in range(600):
+            clock.now = float(second)
+            sampler.sample()
+
+        one_minute = sampler.get_summary("1m")["cpu_usage_percent"]
+        one_hour = sampler.get_window("cpu_usage_percent", "1h")
+
+        assert one_minute["latest"] == 9.0
+        assert one_minute["count"] == 60 and one_hour.count == 600
+        assert one_minute["min"] == 0.0 and one_minute["max"] == 9.0
+        assert np.isclose(one_hour.avg, 4.5)
+        assert sampler.get_window("missing_metric") is None
+
+
+class TestSampler:
+    """Test cases for the sampling cadence and its overhead"""
+
+    async def test_samples_on_a_fixed_cadence(self):
+        sampler = SystemSampler(lambda: {"memory_usage_percent": 42.0}, interval=0.02, cpu_budget=1.0)
+
+        await sampler.start()
+        await asyncio.sleep(0.2)
+        await sampler.stop()
+
+        assert 8 <= sampler.samples <= 12
+        assert sampler.get_stats()["running"] is False
+        assert sampler.get_window("memory_usage_percent").avg == 42.0
+
+    async def test_interval_is_stretched_to_the_cpu_budget(self):
+        def expensive_probe():
+            deadline = time.thread_time() + 0.005
+            while time.thread_time() < deadline:
+                pass
+            return {"cpu_usage_percent": 1.0}
+
+        sampler = SystemSampler(expensive_probe, interval=0.01, cpu_budget=0.05)
+        for _ in range(10):
+            sampler.sample()
+
+        stats = sampler.get_stats()
+        assert stats["effective_interval"] >= 0.09
+        assert stats["cpu_overhead"] <= 0.05 + 1e-9
+
+    async def test_probe_failures_are_counted_and_skipped(self):
+        def failing_probe():
+            raise OSError("no /proc")
+
+        sampler = SystemSampler(failing_probe)
+        sampler.sample()
+
+        assert sampler.errors == 1
+        assert sampler.samples == 1
+        assert sampler.get_summary() == {}
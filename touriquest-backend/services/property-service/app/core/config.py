@@ -36,6 +36,16 @@ class Settings(BaseSettings):
         default="touriquest_properties", 
         env="ELASTICSEARCH_INDEX_PROPERTIES"
     )
+    elasticsearch_bulk_max_docs: int = Field(default=500, env="ELASTICSEARCH_BULK_MAX_DOCS")
+    elasticsearch_bulk_max_bytes: int = Field(
+        default=5 * 1024 * 1024, env="ELASTICSEARCH_BULK_MAX_BYTES"
+    )
+    elasticsearch_bulk_max_in_flight: int = Field(default=4, env="ELASTICSEARCH_BULK_MAX_IN_FLIGHT")
+    elasticsearch_reindex_fetch_size: int = Field(default=1000, env="ELASTICSEARCH_REINDEX_FETCH_SIZE")
+    elasticsearch_reindex_checkpoint_path: str = Field(
+        default="/tmp/property_reindex_checkpoint.json",
+        env="ELASTICSEARCH_REINDEX_CHECKPOINT_PATH"
+    )
     
     # Security Configuration
     secret_key: str = Field(default="your-secret-key-change-this", env="SECRET_KEY")
@@ -56,6 +66,13 @@ class Settings(BaseSettings):
     search_max_results: int = Field(default=100, env="SEARCH_MAX_RESULTS")
     search_default_radius: float = Field(default=50.0, env="SEARCH_DEFAULT_RADIUS")  # km
     search_max_radius: float = Field(default=500.0, env="SEARCH_MAX_RADIUS")  # km
+    search_es_timeout_ms: float = Field(default=800.0, env="SEARCH_ES_TIMEOUT_MS")
+    search_es_p95_threshold_ms: float = Field(default=500.0, env="SEARCH_ES_P95_THRESHOLD_MS")
+    search_es_latency_window: int = Field(default=200, env="SEARCH_ES_LATENCY_WINDOW")
+    search_es_degraded_cooldown_seconds: float = Field(
+        default=30.0, env="SEARCH_ES_DEGRADED_COOLDOWN_SECONDS"
+    )
+    search_hedge_delay_ms: float = Field(default=150.0, env="SEARCH_HEDGE_DELAY_MS")
     
     # Pagination
     default_page_size: int = Field(default=20, env="DEFAULT_PAGE_SIZE")
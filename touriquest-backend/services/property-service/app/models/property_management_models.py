@@ -240,7 +240,7 @@ class PricingCalendar(Base):
     
     # Indexes
     __table_args__ = (
-        Index('idx_pricing_calendar_property_date', 'property_id', 'date'),
+        Index('idx_pricing_calendar_property_date', 'property_id', 'date', unique=True),
     )
 
 
@@ -2,7 +2,7 @@
 
 from sqlalchemy import (
     Column, Integer, String, Text, Boolean, DateTime, Numeric, 
-    ForeignKey, Index, CheckConstraint, JSON, Enum as SQLEnum
+    ForeignKey, Index, CheckConstraint, JSON, Enum as SQLEnum, text
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
@@ -14,6 +14,13 @@ import uuid
 from app.core.database import Base
 
 
+# Full-text document used by the database search path; the GIN index below is
+# built on this exact expression so queries must reuse it verbatim
+PROPERTY_SEARCH_DOCUMENT_SQL = (
+    "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(city, '') || ' ' || "
+    "coalesce(address, '') || ' ' || coalesce(description, ''))"
+)
+
 class PropertyType(str, Enum):
     """Property type enumeration"""
     APARTMENT = "apartment"
@@ -160,6 +167,8 @@ class Property(Base):
         CheckConstraint('overall_rating >= 0 AND overall_rating <= 5', name='check_rating_range'),
         CheckConstraint('review_count >= 0', name='check_review_count_non_negative'),
         Index('idx_property_location_gin', location, postgresql_using='gist'),
+        Index('idx_property_location_geography', text('(location::geography)'), postgresql_using='gist'),
+        Index('idx_property_fulltext', text(PROPERTY_SEARCH_DOCUMENT_SQL), postgresql_using='gin'),
         Index('idx_property_search', 'city', 'country', 'property_type', 'max_guests'),
         Index('idx_property_price_rating', 'base_price_per_night', 'overall_rating'),
         Index('idx_property_features', 'eco_friendly', 'pets_allowed', 'smoking_allowed'),
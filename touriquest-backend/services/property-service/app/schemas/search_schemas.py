@@ -174,6 +174,9 @@ class AdvancedSearchRequest(BasicSearchRequest):
     
     # A/B testing
     experiment_variant: Optional[str] = Field(None, description="A/B test variant")
+    
+    # Latency-critical queries race Elasticsearch against the database search
+    critical: bool = Field(False, description="Hedge the search against the database fallback")
 
 
 # Location autocomplete request
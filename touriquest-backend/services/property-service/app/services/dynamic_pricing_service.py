@@ -6,9 +6,11 @@ from datetime import datetime, date, timedelta
 from typing import Optional, Dict, List, Any, Tuple
 from decimal import Decimal
 from enum import Enum
+import numpy as np
 import structlog
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, desc, update
+from sqlalchemy import select, func, and_, or_, desc, update, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import joinedload, selectinload
 
 from app.core.database import get_session
@@ -21,6 +23,10 @@ from app.schemas.property_management_schemas import (
     PricingRecommendation, PricingRuleRequest, PricingRuleResponse
 )
 from app.services.cache_service import CacheService
+from app.services.pricing_engine import (
+    VectorizedPricingEngine, DateFeatures, WEEKDAY_DEMAND_LEVELS, SEASON_CODES,
+    UPSERT_BATCH_SIZE, to_price
+)
 
 logger = structlog.get_logger()
 
@@ -44,6 +50,8 @@ class DynamicPricingService:
     
     def __init__(self, cache_service: Optional[CacheService] = None):
         self.cache = cache_service
+        # Whether pricing_calendar has the unique (property_id, date) index; checked once
+        self._calendar_upsert_supported: Optional[bool] = None
         
         # Pricing configuration
         self.pricing_config = {
@@ -94,6 +102,8 @@ class DynamicPricingService:
                 30: 0.15   # 15% discount for 1 month
             }
         }
+        
+        self.engine = VectorizedPricingEngine(self.pricing_config)
     
     async def generate_pricing_recommendations(
         self,
@@ -111,17 +121,23 @@ class DynamicPricingService:
             market_data = await self._analyze_market_conditions(session, property_listing)
             competitor_data = await self._get_competitor_analysis(session, request.property_id)
             
-            # Generate recommendations for each date
-            recommendations = []
-            current_date = request.start_date
+            # Evaluate every date of the range at once
+            features = self.engine.date_features(request.start_date, request.end_date)
+            competitor_average = self._average_competitor_price(competitor_data)
+            factors = self.engine.recommend(
+                np.array([float(property_listing.base_price)]),
+                [property_listing.country],
+                features,
+                np.array([np.nan if competitor_average is None else competitor_average])
+            )
+            current_prices = await self._get_current_prices(
+                session, request.property_id, request.start_date, request.end_date
+            )
             
-            while current_date <= request.end_date:
-                recommendation = await self._generate_date_recommendation(
-                    session, property_listing, current_date, historical_data, 
-                    market_data, competitor_data, request.optimization_goals
-                )
-                recommendations.append(recommendation)
-                current_date += timedelta(days=1)
+            recommendations = self._build_recommendations(
+                property_listing, features, factors, current_prices,
+                historical_data, market_data, competitor_data
+            )
             
             # Generate summary
             summary = await self._generate_optimization_summary(
@@ -157,22 +173,17 @@ class DynamicPricingService:
             # Get active pricing rules
             pricing_rules = await self._get_active_pricing_rules(session, property_id)
             
-            # Apply pricing for each date
+            # Evaluate rules over the whole range and persist in bulk
             start_date, end_date = date_range
-            current_date = start_date
-            
-            while current_date <= end_date:
-                # Calculate dynamic price
-                dynamic_price = await self._calculate_dynamic_price(
-                    session, property_listing, current_date, pricing_rules
-                )
-                
-                # Update pricing calendar
-                await self._update_pricing_calendar_entry(
-                    session, property_id, current_date, dynamic_price
-                )
-                
-                current_date += timedelta(days=1)
+            features = self.engine.date_features(start_date, end_date)
+            prices = self.engine.apply_rules(
+                np.array([float(property_listing.base_price)]),
+                self.engine.compile_rules([pricing_rules]),
+                features
+            )
+            await self._bulk_upsert_pricing_calendar(
+                session, [property_listing.id], features, prices
+            )
             
             await session.commit()
             
@@ -187,6 +198,63 @@ class DynamicPricingService:
             logger.error(f"Error applying dynamic pricing: {str(e)}")
             raise
     
+    async def apply_dynamic_pricing_to_portfolio(
+        self,
+        session: AsyncSession,
+        host_id: str,
+        date_range: Tuple[date, date],
+        property_ids: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Apply dynamic pricing to all (or selected) host properties in one pass"""
+        try:
+            query = select(PropertyListing).where(PropertyListing.host_id == host_id)
+            if property_ids:
+                query = query.where(PropertyListing.id.in_(property_ids))
+            result = await session.execute(query)
+            listings = result.scalars().all()
+            
+            if not listings:
+                return {"properties_updated": 0, "days": 0, "calendar_entries_written": 0}
+            
+            rules_by_property = await self._get_active_pricing_rules_for_properties(
+                session, [listing.id for listing in listings]
+            )
+            
+            start_date, end_date = date_range
+            features = self.engine.date_features(start_date, end_date)
+            prices = self.engine.apply_rules(
+                np.array([float(listing.base_price) for listing in listings]),
+                self.engine.compile_rules(
+                    [rules_by_property.get(str(listing.id), []) for listing in listings]
+                ),
+                features
+            )
+            written = await self._bulk_upsert_pricing_calendar(
+                session, [listing.id for listing in listings], features, prices
+            )
+            
+            await session.commit()
+            
+            if self.cache:
+                for listing in listings:
+                    await self.cache.invalidate_pattern(f"property:{listing.id}:pricing:*")
+            
+            logger.info(
+                f"Dynamic pricing applied to {len(listings)} properties "
+                f"({written} calendar entries) for host {host_id}"
+            )
+            
+            return {
+                "properties_updated": len(listings),
+                "days": features.size,
+                "calendar_entries_written": written
+            }
+            
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error applying portfolio dynamic pricing: {str(e)}")
+            raise
+    
     async def create_pricing_rule(
         self,
         session: AsyncSession,
@@ -490,189 +558,94 @@ class DynamicPricingService:
         result = await session.execute(query)
         return result.scalars().all()
     
-    async def _generate_date_recommendation(
-        self,
-        session: AsyncSession,
-        property_listing: PropertyListing,
-        target_date: date,
-        historical_data: Dict[str, Any],
-        market_data: Dict[str, Any],
-        competitor_data: List[PropertyCompetitorAnalysis],
-        optimization_goals: List[str]
-    ) -> PricingRecommendation:
-        """Generate pricing recommendation for specific date"""
-        
-        # Start with base price
-        base_price = property_listing.base_price
-        recommended_price = base_price
-        
-        # Apply demand-based adjustments
-        demand_level = await self._calculate_demand_level(session, property_listing, target_date)
-        demand_multiplier = self.pricing_config["demand_multipliers"][demand_level]
-        recommended_price *= Decimal(str(demand_multiplier))
-        
-        # Apply seasonal adjustments
-        season_type = self._determine_season_type(target_date, property_listing.city, property_listing.country)
-        seasonal_multiplier = self.pricing_config["seasonal_multipliers"][season_type]
-        recommended_price *= Decimal(str(seasonal_multiplier))
-        
-        # Apply weekday adjustments
-        weekday = target_date.weekday()
-        weekday_multiplier = self.pricing_config["weekday_multipliers"][weekday]
-        recommended_price *= Decimal(str(weekday_multiplier))
-        
-        # Apply advance booking adjustments
-        days_in_advance = (target_date - date.today()).days
-        advance_multiplier = self._get_advance_booking_multiplier(days_in_advance)
-        recommended_price *= Decimal(str(advance_multiplier))
-        
-        # Apply competitor-based adjustments
-        if competitor_data:
-            competitor_adjustment = self._calculate_competitor_adjustment(
-                recommended_price, competitor_data
-            )
-            recommended_price *= Decimal(str(competitor_adjustment))
-        
-        # Ensure price is within reasonable bounds
-        min_price = base_price * Decimal('0.5')  # 50% of base price
-        max_price = base_price * Decimal('2.0')   # 200% of base price
-        recommended_price = max(min_price, min(max_price, recommended_price))
-        
-        # Calculate expected impact
-        current_price = await self._get_current_price(session, property_listing.id, target_date)
-        price_change_percentage = float((recommended_price - current_price) / current_price * 100)
-        
-        # Estimate impact on occupancy and revenue
-        occupancy_impact = self._estimate_occupancy_impact(price_change_percentage)
-        revenue_impact = self._estimate_revenue_impact(price_change_percentage, occupancy_impact)
-        
-        # Generate reasoning
-        reasoning = self._generate_pricing_reasoning(
-            demand_level, season_type, weekday, days_in_advance, competitor_data
-        )
-        
-        # Calculate confidence score
-        confidence_score = self._calculate_confidence_score(
-            historical_data, market_data, competitor_data
-        )
-        
-        return PricingRecommendation(
-            date=target_date,
-            current_price=current_price,
-            recommended_price=recommended_price,
-            price_change_percentage=price_change_percentage,
-            confidence_score=confidence_score,
-            reasoning=reasoning,
-            expected_impact={
-                "occupancy_change": occupancy_impact,
-                "revenue_change": revenue_impact
-            }
-        )
-    
-    async def _calculate_demand_level(
+    def _average_competitor_price(
         self,
-        session: AsyncSession,
-        property_listing: PropertyListing,
-        target_date: date
-    ) -> DemandLevel:
-        """Calculate demand level for specific date"""
-        # This would use ML models and market data in production
-        # For now, using simplified logic
-        
-        # Check day of week
-        weekday = target_date.weekday()
-        if weekday in [4, 5, 6]:  # Friday, Saturday, Sunday
-            return DemandLevel.HIGH
-        elif weekday in [0, 3]:   # Monday, Thursday
-            return DemandLevel.MEDIUM
-        else:
-            return DemandLevel.LOW
-    
-    def _determine_season_type(
-        self,
-        target_date: date,
-        city: str,
-        country: str
-    ) -> SeasonType:
-        """Determine season type for location and date"""
-        # Simplified seasonal logic (would be location-specific in production)
-        month = target_date.month
-        
-        if month in [12, 1, 2]:  # Winter
-            if country in ['Australia', 'New Zealand']:  # Southern hemisphere
-                return SeasonType.HIGH
-            else:
-                return SeasonType.LOW
-        elif month in [6, 7, 8]:  # Summer
-            if country in ['Australia', 'New Zealand']:
-                return SeasonType.LOW
-            else:
-                return SeasonType.HIGH
-        elif month in [3, 4, 5, 9, 10, 11]:  # Spring/Fall
-            return SeasonType.SHOULDER
-        else:
-            return SeasonType.MEDIUM
-    
-    def _get_advance_booking_multiplier(self, days_in_advance: int) -> float:
-        """Get multiplier based on advance booking period"""
-        multipliers = self.pricing_config["advance_booking_multipliers"]
-        
-        # Find closest matching period
-        for days, multiplier in sorted(multipliers.items()):
-            if days_in_advance <= days:
-                return multiplier
-        
-        return multipliers[max(multipliers.keys())]
-    
-    def _calculate_competitor_adjustment(
-        self,
-        current_price: Decimal,
         competitor_data: List[PropertyCompetitorAnalysis]
-    ) -> float:
-        """Calculate adjustment based on competitor pricing"""
-        if not competitor_data:
-            return 1.0
-        
-        competitor_prices = [c.competitor_price for c in competitor_data if c.competitor_price]
+    ) -> Optional[float]:
+        """Average competitor price, or None without usable competitor data"""
+        competitor_prices = [float(c.competitor_price) for c in competitor_data if c.competitor_price]
         if not competitor_prices:
-            return 1.0
-        
-        avg_competitor_price = sum(competitor_prices) / len(competitor_prices)
-        
-        # If we're significantly above competitors, suggest lower price
-        if current_price > avg_competitor_price * Decimal('1.2'):
-            return 0.95
-        # If we're significantly below, suggest higher price
-        elif current_price < avg_competitor_price * Decimal('0.8'):
-            return 1.05
-        else:
-            return 1.0
+            return None
+        return sum(competitor_prices) / len(competitor_prices)
     
-    async def _get_current_price(
+    async def _get_current_prices(
         self,
         session: AsyncSession,
         property_id: str,
-        target_date: date
-    ) -> Decimal:
-        """Get current price for specific date"""
-        query = select(PricingCalendar).where(
+        start_date: date,
+        end_date: date
+    ) -> Dict[date, Decimal]:
+        """Get current calendar prices for a date range in a single query"""
+        query = select(PricingCalendar.date, PricingCalendar.final_price).where(
             and_(
                 PricingCalendar.property_id == property_id,
-                PricingCalendar.date == target_date
+                PricingCalendar.date >= start_date,
+                PricingCalendar.date <= end_date
             )
         )
         result = await session.execute(query)
-        pricing = result.scalar_one_or_none()
-        
-        if pricing:
-            return pricing.final_price
-        else:
-            # Get base price from property
-            query = select(PropertyListing.base_price).where(
-                PropertyListing.id == property_id
-            )
-            result = await session.execute(query)
-            return result.scalar() or Decimal('100')
+        return {row.date: row.final_price for row in result}
+    
+    def _build_recommendations(
+        self,
+        property_listing: PropertyListing,
+        features: DateFeatures,
+        factors: Dict[str, np.ndarray],
+        current_prices: Dict[date, Decimal],
+        historical_data: Dict[str, Any],
+        market_data: Dict[str, Any],
+        competitor_data: List[PropertyCompetitorAnalysis]
+    ) -> List[PricingRecommendation]:
+        """Turn one row of engine output into per-date recommendations"""
+        base_price = property_listing.base_price or Decimal('100')
+        confidence_score = self._calculate_confidence_score(
+            historical_data, market_data, competitor_data
+        )
+        
+        recommended_prices = factors["recommended_price"][0].tolist()
+        season_codes = factors["season_code"][0].tolist()
+        weekdays = features.weekdays.tolist()
+        days_in_advance = features.days_in_advance.tolist()
+        
+        # Reasoning only depends on a handful of categorical inputs
+        reasoning_cache: Dict[Tuple[int, int, int, bool], str] = {}
+        recommendations = []
+        
+        for i, target_date in enumerate(features.as_dates()):
+            weekday = weekdays[i]
+            advance_bucket = -1 if days_in_advance[i] <= 1 else (1 if days_in_advance[i] >= 90 else 0)
+            reasoning_key = (weekday, season_codes[i], advance_bucket, bool(competitor_data))
+            reasoning = reasoning_cache.get(reasoning_key)
+            if reasoning is None:
+                reasoning = self._generate_pricing_reasoning(
+                    DemandLevel(WEEKDAY_DEMAND_LEVELS[weekday]),
+                    SeasonType(SEASON_CODES[season_codes[i]]),
+                    weekday,
+                    days_in_advance[i],
+                    competitor_data
+                )
+                reasoning_cache[reasoning_key] = reasoning
+            
+            recommended_price = to_price(recommended_prices[i])
+            current_price = current_prices.get(target_date, base_price)
+            price_change_percentage = float((recommended_price - current_price) / current_price * 100)
+            occupancy_impact = self._estimate_occupancy_impact(price_change_percentage)
+            revenue_impact = self._estimate_revenue_impact(price_change_percentage, occupancy_impact)
+            
+            recommendations.append(PricingRecommendation(
+                date=target_date,
+                current_price=current_price,
+                recommended_price=recommended_price,
+                price_change_percentage=price_change_percentage,
+                confidence_score=confidence_score,
+                reasoning=reasoning,
+                expected_impact={
+                    "occupancy_change": occupancy_impact,
+                    "revenue_change": revenue_impact
+                }
+            ))
+        
+        return recommendations
     
     def _estimate_occupancy_impact(self, price_change_percentage: float) -> float:
         """Estimate impact on occupancy based on price change"""
@@ -796,94 +769,131 @@ class DynamicPricingService:
         result = await session.execute(query)
         return result.scalars().all()
     
-    async def _calculate_dynamic_price(
+    async def _get_active_pricing_rules_for_properties(
         self,
         session: AsyncSession,
-        property_listing: PropertyListing,
-        target_date: date,
-        pricing_rules: List[PricingRule]
-    ) -> Decimal:
-        """Calculate dynamic price for specific date"""
-        base_price = property_listing.base_price
-        final_price = base_price
-        
-        # Apply pricing rules in priority order
-        for rule in pricing_rules:
-            if self._rule_applies_to_date(rule, target_date):
-                adjustment = self._calculate_rule_adjustment(rule, final_price)
-                final_price = adjustment
-        
-        return final_price
+        property_ids: List[str]
+    ) -> Dict[str, List[PricingRule]]:
+        """Get active pricing rules for many properties in one query, priority ordered"""
+        query = select(PricingRule).where(
+            and_(
+                PricingRule.property_id.in_(property_ids),
+                PricingRule.is_active == True
+            )
+        ).order_by(PricingRule.property_id, PricingRule.priority.desc())
+        
+        result = await session.execute(query)
+        rules_by_property: Dict[str, List[PricingRule]] = {str(pid): [] for pid in property_ids}
+        for rule in result.scalars().all():
+            rules_by_property.setdefault(str(rule.property_id), []).append(rule)
+        
+        return rules_by_property
     
-    def _rule_applies_to_date(self, rule: PricingRule, target_date: date) -> bool:
-        """Check if pricing rule applies to specific date"""
-        conditions = rule.conditions
-        
-        # Check date range conditions
-        if "date_range" in conditions:
-            start_date = datetime.strptime(conditions["date_range"]["start"], "%Y-%m-%d").date()
-            end_date = datetime.strptime(conditions["date_range"]["end"], "%Y-%m-%d").date()
-            if not (start_date <= target_date <= end_date):
-                return False
-        
-        # Check weekday conditions
-        if "weekdays" in conditions:
-            if target_date.weekday() not in conditions["weekdays"]:
-                return False
-        
-        # Check seasonal conditions
-        if "seasons" in conditions:
-            season = self._determine_season_type(target_date, "", "")
-            if season.value not in conditions["seasons"]:
-                return False
-        
-        return True
+    async def _bulk_upsert_pricing_calendar(
+        self,
+        session: AsyncSession,
+        property_ids: List[Any],
+        features: DateFeatures,
+        prices: np.ndarray
+    ) -> int:
+        """Upsert a (properties x dates) price matrix into the pricing calendar.
+        
+        Existing rows only get their final price refreshed; new rows start with
+        the computed price as both base and final price. Prices are quantized to
+        cents here. Databases without the unique (property_id, date) index (see
+        scripts/add_pricing_calendar_unique_index.py) take the select-then-write
+        path instead of ON CONFLICT.
+        """
+        dates = features.as_dates()
+        if not dates or not property_ids:
+            return 0
+        now = datetime.utcnow()
+        rows = [
+            {
+                "property_id": property_id,
+                "date": target_date,
+                "base_price": price,
+                "final_price": price,
+                "updated_at": now
+            }
+            for property_id, row_prices in zip(property_ids, prices.tolist())
+            for target_date, price in zip(dates, map(to_price, row_prices))
+        ]
+        
+        if not await self._supports_calendar_upsert(session):
+            await self._write_pricing_calendar_rows(session, property_ids, dates, rows)
+            return len(rows)
+        
+        for offset in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = pg_insert(PricingCalendar).values(rows[offset:offset + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[PricingCalendar.property_id, PricingCalendar.date],
+                set_={
+                    "final_price": stmt.excluded.final_price,
+                    "updated_at": stmt.excluded.updated_at
+                }
+            )
+            await session.execute(stmt)
+        
+        return len(rows)
     
-    def _calculate_rule_adjustment(self, rule: PricingRule, current_price: Decimal) -> Decimal:
-        """Calculate price adjustment based on rule"""
-        if rule.adjustment_type == "percentage":
-            adjustment = current_price * (Decimal(str(rule.adjustment_value)) / 100)
-            new_price = current_price + adjustment
-        else:  # fixed_amount
-            new_price = current_price + Decimal(str(rule.adjustment_value))
-        
-        # Apply min/max constraints
-        if rule.minimum_price:
-            new_price = max(new_price, rule.minimum_price)
-        if rule.maximum_price:
-            new_price = min(new_price, rule.maximum_price)
-        
-        return new_price
+    async def _supports_calendar_upsert(self, session: AsyncSession) -> bool:
+        """Check once whether ON CONFLICT (property_id, date) has a unique index to use"""
+        if self._calendar_upsert_supported is None:
+            result = await session.execute(text("""
+                SELECT 1
+                FROM pg_index i
+                JOIN pg_class t ON t.oid = i.indrelid
+                WHERE t.relname = 'pricing_calendar'
+                  AND i.indisunique
+                  AND i.indisvalid
+                  AND i.indpred IS NULL
+                  AND (
+                      SELECT array_agg(a.attname::text ORDER BY a.attname)
+                      FROM pg_attribute a
+                      WHERE a.attrelid = t.oid AND a.attnum = ANY(i.indkey)
+                  ) = ARRAY['date', 'property_id']
+                  AND i.indnatts = 2
+                LIMIT 1
+            """))
+            self._calendar_upsert_supported = result.scalar() is not None
+            if not self._calendar_upsert_supported:
+                logger.warning(
+                    "pricing_calendar has no unique (property_id, date) index; "
+                    "falling back to per-row calendar writes"
+                )
+        return self._calendar_upsert_supported
     
-    async def _update_pricing_calendar_entry(
+    async def _write_pricing_calendar_rows(
         self,
         session: AsyncSession,
-        property_id: str,
-        target_date: date,
-        new_price: Decimal
+        property_ids: List[Any],
+        dates: List[date],
+        rows: List[Dict[str, Any]]
     ):
-        """Update pricing calendar entry"""
-        query = select(PricingCalendar).where(
-            and_(
-                PricingCalendar.property_id == property_id,
-                PricingCalendar.date == target_date
+        """Update existing calendar rows and insert missing ones without ON CONFLICT"""
+        result = await session.execute(
+            select(PricingCalendar).where(
+                and_(
+                    PricingCalendar.property_id.in_(property_ids),
+                    PricingCalendar.date >= dates[0],
+                    PricingCalendar.date <= dates[-1]
+                )
             )
         )
-        result = await session.execute(query)
-        pricing = result.scalar_one_or_none()
-        
-        if pricing:
-            pricing.final_price = new_price
-            pricing.updated_at = datetime.utcnow()
-        else:
-            # Create new pricing entry
-            pricing = PricingCalendar(
-                property_id=property_id,
-                date=target_date,
-                base_price=new_price,
-                final_price=new_price
-            )
-            session.add(pricing)
+        existing: Dict[Tuple[str, date], List[PricingCalendar]] = {}
+        for entry in result.scalars().all():
+            existing.setdefault((str(entry.property_id), entry.date), []).append(entry)
+        
+        for row in rows:
+            entries = existing.get((str(row["property_id"]), row["date"]))
+            if entries:
+                # Duplicates can exist until the unique index is in place
+                for entry in entries:
+                    entry.final_price = row["final_price"]
+                    entry.updated_at = row["updated_at"]
+            else:
+                session.add(PricingCalendar(**row))
     
     def _get_seasonal_periods(
         self,
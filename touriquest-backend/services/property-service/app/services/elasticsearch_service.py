@@ -2,13 +2,16 @@
 
 import asyncio
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterable, AsyncIterable, Union, Callable
 from datetime import datetime
 import structlog
 from elasticsearch import AsyncElasticsearch
 from elasticsearch.helpers import async_bulk
 
 from app.core.config import get_settings
+from app.services.property_reindex_service import (
+    PropertyReindexer, ReindexCheckpointStore, ReindexReport
+)
 
 logger = structlog.get_logger()
 
@@ -50,14 +53,18 @@ class ElasticsearchService:
         """Create the main property search index with optimized mappings"""
         index_name = self.settings.elasticsearch_index_properties
         
-        # Check if index exists
+        # Check if index (or alias) exists
         exists = await self.client.indices.exists(index=index_name)
         if exists:
             logger.info(f"Property index '{index_name}' already exists")
             return
         
-        # Define property index mapping
-        mapping = {
+        await self.client.indices.create(index=index_name, body=self._property_index_body())
+        logger.info(f"Created property index '{index_name}' with optimized mappings")
+    
+    def _property_index_body(self) -> Dict[str, Any]:
+        """Settings and mappings for the property search index"""
+        return {
             "settings": {
                 "number_of_shards": 3,
                 "number_of_replicas": 1,
@@ -209,9 +216,6 @@ class ElasticsearchService:
                 }
             }
         }
-        
-        await self.client.indices.create(index=index_name, body=mapping)
-        logger.info(f"Created property index '{index_name}' with optimized mappings")
     
     async def _create_search_analytics_index(self):
         """Create index for search analytics and A/B testing"""
@@ -260,22 +264,31 @@ class ElasticsearchService:
             logger.error(f"Failed to index property {property_data.get('property_id')}: {str(e)}")
             raise
     
-    async def bulk_index_properties(self, properties: List[Dict[str, Any]]):
-        """Bulk index multiple properties"""
+    async def bulk_index_properties(
+        self,
+        properties: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+    ):
+        """Bulk index properties from any (async) iterable without materializing it"""
+        index_name = self.settings.elasticsearch_index_properties
+        
+        def to_action(prop: Dict[str, Any]) -> Dict[str, Any]:
+            return {"_index": index_name, "_id": prop["property_id"], "_source": prop}
+        
+        if hasattr(properties, "__aiter__"):
+            async def actions():
+                async for prop in properties:
+                    yield to_action(prop)
+            actions = actions()
+        else:
+            actions = (to_action(prop) for prop in properties)
+        
         try:
-            actions = []
-            for prop in properties:
-                actions.append({
-                    "_index": self.settings.elasticsearch_index_properties,
-                    "_id": prop["property_id"],
-                    "_source": prop
-                })
-            
             success_count, failed_items = await async_bulk(
                 self.client,
                 actions,
-                chunk_size=100,
-                max_chunk_bytes=10485760  # 10MB
+                chunk_size=self.settings.elasticsearch_bulk_max_docs,
+                max_chunk_bytes=self.settings.elasticsearch_bulk_max_bytes,
+                raise_on_error=False
             )
             
             logger.info(f"Bulk indexed {success_count} properties")
@@ -355,21 +368,38 @@ class ElasticsearchService:
             logger.error(f"Failed to delete property {property_id}: {str(e)}")
             raise
     
-    async def reindex_all_properties(self, properties: List[Dict[str, Any]]):
-        """Completely reindex all properties (for schema changes)"""
+    async def reindex_all_properties(
+        self,
+        session_factory: Callable[[], Any],
+        resume: bool = True
+    ) -> ReindexReport:
+        """Rebuild the property index from the database with zero downtime.
+        
+        Properties are streamed into a new concrete index which replaces the old
+        one behind the search alias only once it is fully loaded.
+        """
         try:
-            # Delete and recreate index
-            index_name = self.settings.elasticsearch_index_properties
-            
-            if await self.client.indices.exists(index=index_name):
-                await self.client.indices.delete(index=index_name)
-            
-            await self._create_property_index()
-            
-            # Bulk index all properties
-            await self.bulk_index_properties(properties)
+            reindexer = PropertyReindexer(
+                client=self.client,
+                session_factory=session_factory,
+                alias=self.settings.elasticsearch_index_properties,
+                index_body=self._property_index_body(),
+                checkpoint_store=ReindexCheckpointStore(
+                    self.settings.elasticsearch_reindex_checkpoint_path
+                ),
+                fetch_size=self.settings.elasticsearch_reindex_fetch_size,
+                max_chunk_docs=self.settings.elasticsearch_bulk_max_docs,
+                max_chunk_bytes=self.settings.elasticsearch_bulk_max_bytes,
+                max_in_flight=self.settings.elasticsearch_bulk_max_in_flight
+            )
+            report = await reindexer.run(resume=resume)
             
-            logger.info(f"Reindexed {len(properties)} properties")
+            logger.info(
+                f"Reindexed {report.docs_indexed} properties "
+                + (f"after {report.docs_resumed} from an earlier run " if report.resumed_from else "")
+                + f"({report.docs_per_second:.0f} docs/s, error rate {report.error_rate:.4f})"
+            )
+            return report
             
         except Exception as e:
             logger.error(f"Reindexing failed: {str(e)}")
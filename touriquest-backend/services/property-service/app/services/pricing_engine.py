@@ -0,0 +1,308 @@
+"""Vectorized pricing engine evaluating rules and multipliers over whole date ranges"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+
+logger = structlog.get_logger()
+
+
+# Weekday (0=Monday) -> demand level used when no demand model is available
+WEEKDAY_DEMAND_LEVELS = ("medium", "low", "low", "medium", "high", "high", "high")
+
+# Season codes used by the vectorized season lookup
+SEASON_CODES = ("low", "shoulder", "high", "peak")
+
+SOUTHERN_HEMISPHERE_COUNTRIES = frozenset({"Australia", "New Zealand"})
+
+# Month (1-12) -> season code index for each hemisphere
+_NORTHERN_SEASON_BY_MONTH = np.array([0, 0, 1, 1, 1, 2, 2, 2, 1, 1, 1, 0], dtype=np.int8)
+_SOUTHERN_SEASON_BY_MONTH = np.array([2, 2, 1, 1, 1, 0, 0, 0, 1, 1, 1, 2], dtype=np.int8)
+
+# Rows per INSERT ... ON CONFLICT statement (asyncpg caps bind parameters at 32767)
+UPSERT_BATCH_SIZE = 5000
+
+CENT = Decimal("0.01")
+
+
+def to_price(value: float) -> Decimal:
+    """Quantize an engine price to cents, rounding half up like the numeric(10, 2) columns.
+
+    The float is first rounded to 6 places so binary noise (114.99999999999999
+    for 100 * 1.15) rounds the same way as the exact Decimal result.
+    """
+    return Decimal(f"{value:.6f}").quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+@dataclass
+class DateFeatures:
+    """Per-date calendar features for a contiguous date range"""
+    dates: np.ndarray           # datetime64[D]
+    weekdays: np.ndarray        # int8, 0=Monday
+    months: np.ndarray          # int8, 1-12
+    days_in_advance: np.ndarray  # int32, relative to ``today``
+
+    @property
+    def size(self) -> int:
+        return len(self.dates)
+
+    def as_dates(self) -> List[date]:
+        return self.dates.astype(date).tolist()
+
+
+@dataclass
+class CompiledRuleSet:
+    """Pricing rules of one priority rank, stacked across properties"""
+    property_index: np.ndarray   # int64, row in the price matrix
+    is_percentage: np.ndarray    # bool
+    adjustment_value: np.ndarray  # float64
+    minimum_price: np.ndarray    # float64, NaN when unset
+    maximum_price: np.ndarray    # float64, NaN when unset
+    start: np.ndarray            # datetime64[D], NaT when unset
+    end: np.ndarray              # datetime64[D], NaT when unset
+    weekday_bits: np.ndarray     # int64 bitmask over weekdays, all set when unset
+    season_bits: np.ndarray      # int64 bitmask over SEASON_CODES, all set when unset
+
+
+class VectorizedPricingEngine:
+    """Computes prices for many properties x dates at once with numpy masks.
+
+    Mirrors the per-date logic of ``DynamicPricingService`` (rule application in
+    priority order, demand/seasonal/weekday/advance multipliers, competitor
+    adjustment and bounds) but evaluates each step over a whole price matrix.
+    """
+
+    def __init__(self, pricing_config: Dict[str, Any]):
+        self.pricing_config = pricing_config
+
+        demand = pricing_config["demand_multipliers"]
+        self._weekday_demand = np.array(
+            [_multiplier(demand, level) for level in WEEKDAY_DEMAND_LEVELS], dtype=np.float64
+        )
+        weekday = pricing_config["weekday_multipliers"]
+        self._weekday = np.array([weekday[d] for d in range(7)], dtype=np.float64)
+        seasonal = pricing_config["seasonal_multipliers"]
+        self._seasonal = np.array(
+            [_multiplier(seasonal, code) for code in SEASON_CODES], dtype=np.float64
+        )
+        advance = sorted(pricing_config["advance_booking_multipliers"].items())
+        self._advance_thresholds = np.array([days for days, _ in advance], dtype=np.int32)
+        self._advance_multipliers = np.array([m for _, m in advance], dtype=np.float64)
+
+    # Date features
+
+    def date_features(
+        self,
+        start_date: date,
+        end_date: date,
+        today: Optional[date] = None
+    ) -> DateFeatures:
+        """Build calendar features for the inclusive range [start_date, end_date]"""
+        dates = np.arange(
+            np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1, dtype="datetime64[D]"
+        )
+        day_numbers = dates.astype(np.int64)
+        # 1970-01-01 was a Thursday (weekday 3)
+        weekdays = ((day_numbers + 3) % 7).astype(np.int8)
+        months = (dates.astype("datetime64[M]").astype(np.int64) % 12 + 1).astype(np.int8)
+        today_number = np.datetime64(today or date.today(), "D").astype(np.int64)
+        days_in_advance = (day_numbers - today_number).astype(np.int32)
+
+        return DateFeatures(
+            dates=dates, weekdays=weekdays, months=months, days_in_advance=days_in_advance
+        )
+
+    def season_codes(self, features: DateFeatures, countries: Sequence[str] = ("",)) -> np.ndarray:
+        """Season code index per (country, date) as an int8 matrix"""
+        month_index = features.months - 1
+        southern = np.array(
+            [country in SOUTHERN_HEMISPHERE_COUNTRIES for country in countries], dtype=bool
+        )
+        return np.where(
+            southern[:, None],
+            _SOUTHERN_SEASON_BY_MONTH[month_index][None, :],
+            _NORTHERN_SEASON_BY_MONTH[month_index][None, :]
+        )
+
+    def advance_multipliers(self, features: DateFeatures) -> np.ndarray:
+        """Advance-booking multiplier per date (first threshold >= days in advance)"""
+        index = np.searchsorted(self._advance_thresholds, features.days_in_advance, side="left")
+        index = np.minimum(index, len(self._advance_thresholds) - 1)
+        return self._advance_multipliers[index]
+
+    # Pricing rules
+
+    def compile_rules(
+        self,
+        rules_by_property: Sequence[Sequence[Any]]
+    ) -> List[CompiledRuleSet]:
+        """Stack rules by priority rank so each rank is applied in one vectorized step.
+
+        ``rules_by_property[i]`` holds the active rules of property ``i`` already
+        ordered by priority (highest first), as returned by the rule query.
+        """
+        max_rules = max((len(rules) for rules in rules_by_property), default=0)
+        compiled = []
+
+        for rank in range(max_rules):
+            rows = [
+                (index, rules[rank])
+                for index, rules in enumerate(rules_by_property)
+                if len(rules) > rank
+            ]
+            compiled.append(self._compile_rank(rows))
+
+        return compiled
+
+    def _compile_rank(self, rows: List[Tuple[int, Any]]) -> CompiledRuleSet:
+        size = len(rows)
+        all_weekdays = (1 << 7) - 1
+        all_seasons = (1 << len(SEASON_CODES)) - 1
+
+        property_index = np.empty(size, dtype=np.int64)
+        is_percentage = np.empty(size, dtype=bool)
+        adjustment_value = np.empty(size, dtype=np.float64)
+        minimum_price = np.full(size, np.nan)
+        maximum_price = np.full(size, np.nan)
+        start = np.full(size, np.datetime64("NaT"), dtype="datetime64[D]")
+        end = np.full(size, np.datetime64("NaT"), dtype="datetime64[D]")
+        weekday_bits = np.full(size, all_weekdays, dtype=np.int64)
+        season_bits = np.full(size, all_seasons, dtype=np.int64)
+
+        for i, (index, rule) in enumerate(rows):
+            conditions = rule.conditions or {}
+            property_index[i] = index
+            is_percentage[i] = rule.adjustment_type == "percentage"
+            adjustment_value[i] = float(rule.adjustment_value)
+            if rule.minimum_price:
+                minimum_price[i] = float(rule.minimum_price)
+            if rule.maximum_price:
+                maximum_price[i] = float(rule.maximum_price)
+
+            if "date_range" in conditions:
+                start[i] = np.datetime64(
+                    datetime.strptime(conditions["date_range"]["start"], "%Y-%m-%d").date(), "D"
+                )
+                end[i] = np.datetime64(
+                    datetime.strptime(conditions["date_range"]["end"], "%Y-%m-%d").date(), "D"
+                )
+            if "weekdays" in conditions:
+                weekday_bits[i] = sum(1 << int(d) for d in set(conditions["weekdays"]))
+            if "seasons" in conditions:
+                season_bits[i] = sum(
+                    1 << SEASON_CODES.index(s) for s in set(conditions["seasons"]) if s in SEASON_CODES
+                )
+
+        return CompiledRuleSet(
+            property_index=property_index,
+            is_percentage=is_percentage,
+            adjustment_value=adjustment_value,
+            minimum_price=minimum_price,
+            maximum_price=maximum_price,
+            start=start,
+            end=end,
+            weekday_bits=weekday_bits,
+            season_bits=season_bits
+        )
+
+    def rule_mask(self, rule_set: CompiledRuleSet, features: DateFeatures) -> np.ndarray:
+        """Boolean (rules x dates) mask of where each rule applies"""
+        dates = features.dates[None, :]
+        # Rule seasons are evaluated without location, matching ``_rule_applies_to_date``
+        seasons = self.season_codes(features)[0].astype(np.int64)
+
+        has_range = ~np.isnat(rule_set.start)
+        in_range = (dates >= rule_set.start[:, None]) & (dates <= rule_set.end[:, None])
+        mask = np.where(has_range[:, None], in_range, True)
+        mask &= ((rule_set.weekday_bits[:, None] >> features.weekdays[None, :].astype(np.int64)) & 1) == 1
+        mask &= ((rule_set.season_bits[:, None] >> seasons[None, :]) & 1) == 1
+        return mask
+
+    def apply_rules(
+        self,
+        base_prices: np.ndarray,
+        compiled_rules: List[CompiledRuleSet],
+        features: DateFeatures
+    ) -> np.ndarray:
+        """Apply compiled rules rank by rank to a (properties x dates) price matrix
+
+        Intermediate prices are not rounded, as with the previous Decimal
+        arithmetic.
+        """
+        prices = np.repeat(base_prices.astype(np.float64)[:, None], features.size, axis=1)
+
+        for rule_set in compiled_rules:
+            mask = self.rule_mask(rule_set, features)
+            current = prices[rule_set.property_index]
+            value = rule_set.adjustment_value[:, None]
+            adjusted = np.where(
+                rule_set.is_percentage[:, None],
+                current * (1 + value / 100),
+                current + value
+            )
+            adjusted = np.where(
+                np.isnan(rule_set.minimum_price)[:, None],
+                adjusted,
+                np.maximum(adjusted, rule_set.minimum_price[:, None])
+            )
+            adjusted = np.where(
+                np.isnan(rule_set.maximum_price)[:, None],
+                adjusted,
+                np.minimum(adjusted, rule_set.maximum_price[:, None])
+            )
+            prices[rule_set.property_index] = np.where(mask, adjusted, current)
+
+        # Unrounded; callers quantize with ``to_price`` when persisting
+        return prices
+
+    # Recommendations
+
+    def recommend(
+        self,
+        base_prices: np.ndarray,
+        countries: Sequence[str],
+        features: DateFeatures,
+        competitor_averages: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """Compute recommended prices for (properties x dates) and the factors used"""
+        base = base_prices.astype(np.float64)[:, None]
+        seasons = self.season_codes(features, countries)
+
+        demand = self._weekday_demand[features.weekdays][None, :]
+        seasonal = self._seasonal[seasons]
+        weekday = self._weekday[features.weekdays][None, :]
+        advance = self.advance_multipliers(features)[None, :]
+
+        recommended = base * demand * seasonal * weekday * advance
+
+        competitor = np.ones_like(recommended)
+        if competitor_averages is not None:
+            average = competitor_averages.astype(np.float64)[:, None]
+            has_data = ~np.isnan(average)
+            competitor = np.where(
+                has_data & (recommended > average * 1.2), 0.95,
+                np.where(has_data & (recommended < average * 0.8), 1.05, 1.0)
+            )
+            recommended = recommended * competitor
+
+        recommended = np.clip(recommended, base * 0.5, base * 2.0)
+
+        return {
+            "recommended_price": recommended,
+            "season_code": seasons,
+            "demand_multiplier": np.broadcast_to(demand, recommended.shape),
+            "seasonal_multiplier": seasonal,
+            "competitor_factor": competitor
+        }
+
+
+def _multiplier(mapping: Dict[Any, float], code: str) -> float:
+    """Look up a multiplier keyed by str-valued enum members or plain strings"""
+    for key, value in mapping.items():
+        if getattr(key, "value", key) == code:
+            return value
+    raise KeyError(code)
@@ -0,0 +1,463 @@
+"""Streaming, resumable Elasticsearch reindex for the property search index"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload
+
+from app.models.property_models import Property, PropertyAmenity, PropertyStatus
+
+logger = structlog.get_logger()
+
+
+@dataclass
+class BulkChunk:
+    """A size-bounded NDJSON bulk body ready to send"""
+    sequence: int
+    body: bytes
+    doc_count: int
+    last_id: str
+    docs_indexed: int = 0
+
+
+@dataclass
+class ReindexReport:
+    """Throughput and error statistics for a reindex run"""
+    index_name: str
+    alias: str
+    resumed_from: Optional[str] = None
+    docs_resumed: int = 0   # indexed by earlier runs, before resumed_from
+    docs_indexed: int = 0   # indexed by this run
+    docs_failed: int = 0
+    chunks_sent: int = 0
+    chunks_failed: int = 0
+    bytes_sent: int = 0
+    retries: int = 0
+    alias_swapped: bool = False
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return max(end - self.started_at, 1e-9)
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.docs_indexed / self.elapsed_seconds
+
+    @property
+    def error_rate(self) -> float:
+        total = self.docs_indexed + self.docs_failed
+        return self.docs_failed / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index_name": self.index_name,
+            "alias": self.alias,
+            "resumed_from": self.resumed_from,
+            "docs_resumed": self.docs_resumed,
+            "docs_indexed": self.docs_indexed,
+            "docs_failed": self.docs_failed,
+            "chunks_sent": self.chunks_sent,
+            "chunks_failed": self.chunks_failed,
+            "bytes_sent": self.bytes_sent,
+            "retries": self.retries,
+            "alias_swapped": self.alias_swapped,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "docs_per_second": round(self.docs_per_second, 1),
+            "error_rate": round(self.error_rate, 6),
+            "errors": self.errors[:20],
+        }
+
+
+class ReindexCheckpointStore:
+    """Persists reindex progress to a small JSON file so a run can resume"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable reindex checkpoint {self.path}: {str(e)}")
+            return None
+
+    def save(self, state: Dict[str, Any]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def property_to_document(
+    prop: Property,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None
+) -> Dict[str, Any]:
+    """Build the search document for a property row"""
+    amenities = [pa.amenity for pa in (prop.amenities or []) if pa.amenity is not None]
+    images = sorted(prop.images or [], key=lambda image: image.order_index or 0)
+    primary_image = next((image for image in images if image.is_primary), images[0] if images else None)
+
+    document = {
+        "property_id": str(prop.id),
+        "host_id": str(prop.host_id),
+        "title": prop.title,
+        "description": prop.description,
+        "address": prop.address,
+        "city": prop.city,
+        "state_province": prop.state_province,
+        "country": prop.country,
+        "property_type": _enum_value(prop.property_type),
+        "max_guests": prop.max_guests,
+        "bedrooms": prop.bedrooms,
+        "bathrooms": _float(prop.bathrooms),
+        "beds": prop.beds,
+        "base_price": _float(prop.base_price_per_night),
+        "currency": prop.currency,
+        "cleaning_fee": _float(prop.cleaning_fee),
+        "overall_rating": _float(prop.overall_rating),
+        "review_count": prop.review_count,
+        "cleanliness_rating": _float(prop.cleanliness_rating),
+        "communication_rating": _float(prop.communication_rating),
+        "location_rating": _float(prop.location_rating),
+        "value_rating": _float(prop.value_rating),
+        "host_verified": prop.host_verified,
+        "host_response_rate": _float(prop.host_response_rate),
+        "host_response_time_hours": prop.host_response_time_hours,
+        "host_languages": prop.languages_spoken or [],
+        "booking_type": _enum_value(prop.booking_type),
+        "cancellation_policy": _enum_value(prop.cancellation_policy),
+        "minimum_stay": prop.minimum_stay,
+        "maximum_stay": prop.maximum_stay,
+        "amenity_ids": [amenity.id for amenity in amenities],
+        "amenity_names": [amenity.name for amenity in amenities],
+        "amenity_categories": sorted({_enum_value(amenity.category) for amenity in amenities}),
+        "eco_friendly": prop.eco_friendly,
+        "pets_allowed": prop.pets_allowed,
+        "smoking_allowed": prop.smoking_allowed,
+        "children_welcome": prop.children_welcome,
+        "accessible": bool(prop.accessibility_features),
+        "accessibility_features": prop.accessibility_features or [],
+        "created_at": prop.created_at,
+        "updated_at": prop.updated_at,
+        "last_booked_at": prop.last_booked_at,
+        "popularity_score": _float(prop.popularity_score),
+        "views_count": prop.views_count,
+        "search_vector": prop.search_vector,
+        "primary_image_url": primary_image.url if primary_image else None,
+        "image_count": len(images),
+    }
+    if latitude is not None and longitude is not None:
+        document["location"] = {"lat": latitude, "lon": longitude}
+
+    return document
+
+
+class PropertyReindexer:
+    """Streams properties from the database into a fresh index and swaps the alias.
+
+    Rows are read through a server-side cursor in primary-key order, serialized
+    once into size-bounded NDJSON bulk bodies and sent with a bounded number of
+    requests in flight. Progress is checkpointed by the last contiguous id that
+    was acknowledged, so an interrupted run can resume into the same index.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        session_factory: Callable[[], Any],
+        alias: str,
+        index_body: Dict[str, Any],
+        checkpoint_store: Optional[ReindexCheckpointStore] = None,
+        fetch_size: int = 1000,
+        max_chunk_docs: int = 500,
+        max_chunk_bytes: int = 5 * 1024 * 1024,
+        max_in_flight: int = 4,
+        max_retries: int = 3,
+        retry_backoff_seconds: float = 0.5,
+        max_error_rate: float = 0.01,
+        delete_old_indices: bool = True
+    ):
+        self.client = client
+        self.session_factory = session_factory
+        self.alias = alias
+        self.index_body = index_body
+        self.checkpoint_store = checkpoint_store
+        self.fetch_size = fetch_size
+        self.max_chunk_docs = max_chunk_docs
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_error_rate = max_error_rate
+        self.delete_old_indices = delete_old_indices
+
+    async def run(self, resume: bool = True) -> ReindexReport:
+        """Build a new index from the database and point the alias at it"""
+        index_name, after_id, docs_already_indexed = await self._prepare_target_index(resume)
+
+        report = ReindexReport(
+            index_name=index_name,
+            alias=self.alias,
+            resumed_from=after_id,
+            docs_resumed=docs_already_indexed
+        )
+
+        logger.info(
+            f"Starting property reindex into '{index_name}'"
+            + (f" resuming after {after_id}" if after_id else "")
+        )
+
+        await self._load_index(index_name, after_id, report)
+
+        if report.chunks_failed == 0 and report.error_rate <= self.max_error_rate:
+            await self._finalize_index(index_name)
+            await self._swap_alias(index_name)
+            report.alias_swapped = True
+            if self.checkpoint_store:
+                self.checkpoint_store.clear()
+        else:
+            logger.error(
+                f"Reindex into '{index_name}' left alias untouched: "
+                f"{report.chunks_failed} failed chunks, error rate {report.error_rate:.4f}"
+            )
+
+        report.finished_at = time.monotonic()
+        logger.info(f"Property reindex finished: {report.to_dict()}")
+        return report
+
+    # Source
+
+    async def stream_documents(self, after_id: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (id, document) pairs in id order using a server-side cursor"""
+        query = (
+            select(
+                Property,
+                func.ST_Y(Property.location).label("latitude"),
+                func.ST_X(Property.location).label("longitude")
+            )
+            .where(Property.status == PropertyStatus.APPROVED)
+            .options(
+                selectinload(Property.amenities).selectinload(PropertyAmenity.amenity),
+                selectinload(Property.images)
+            )
+            .order_by(Property.id)
+            .execution_options(yield_per=self.fetch_size)
+        )
+        if after_id:
+            query = query.where(Property.id > uuid.UUID(after_id))
+
+        async with self.session_factory() as session:
+            result = await session.stream(query)
+            async for partition in result.partitions():
+                for prop, latitude, longitude in partition:
+                    yield str(prop.id), property_to_document(prop, latitude, longitude)
+                # Rows of a partition are no longer needed once serialized
+                session.expunge_all()
+
+    async def chunk_documents(
+        self,
+        documents: AsyncIterator[Tuple[str, Dict[str, Any]]]
+    ) -> AsyncIterator[BulkChunk]:
+        """Serialize documents once and group them into size-bounded bulk bodies"""
+        sequence = 0
+        lines: List[bytes] = []
+        size = 0
+        doc_count = 0
+        last_id = ""
+
+        async for doc_id, document in documents:
+            action = json.dumps({"index": {"_id": doc_id}}, separators=(",", ":")).encode()
+            source = json.dumps(document, default=_json_default, separators=(",", ":")).encode()
+            entry_size = len(action) + len(source) + 2
+
+            if doc_count and (doc_count >= self.max_chunk_docs or size + entry_size > self.max_chunk_bytes):
+                yield BulkChunk(sequence, b"".join(lines), doc_count, last_id)
+                sequence += 1
+                lines, size, doc_count = [], 0, 0
+
+            lines.extend((action, b"\n", source, b"\n"))
+            size += entry_size
+            doc_count += 1
+            last_id = doc_id
+
+        if doc_count:
+            yield BulkChunk(sequence, b"".join(lines), doc_count, last_id)
+
+    # Loading
+
+    async def _load_index(self, index_name: str, after_id: Optional[str], report: ReindexReport):
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        pending: set = set()
+        acknowledged: Dict[int, BulkChunk] = {}
+        next_sequence = 0
+        committed_docs = report.docs_resumed
+
+        def commit_progress():
+            # Advance the checkpoint only over a contiguous run of finished chunks
+            nonlocal next_sequence, committed_docs
+            last_id = None
+            while next_sequence in acknowledged:
+                chunk = acknowledged.pop(next_sequence)
+                last_id = chunk.last_id
+                committed_docs += chunk.docs_indexed
+                next_sequence += 1
+            if last_id and self.checkpoint_store:
+                self.checkpoint_store.save({
+                    "index_name": index_name,
+                    "alias": self.alias,
+                    "last_id": last_id,
+                    "docs_indexed": committed_docs,
+                    "updated_at": datetime.utcnow().isoformat()
+                })
+
+        async def send(chunk: BulkChunk):
+            try:
+                if await self._send_chunk(index_name, chunk, report):
+                    acknowledged[chunk.sequence] = chunk
+                    commit_progress()
+            finally:
+                semaphore.release()
+
+        async for chunk in self.chunk_documents(self.stream_documents(after_id)):
+            await semaphore.acquire()
+            if report.chunks_failed:
+                # Stop feeding new work once a chunk is lost; the checkpoint stays behind it
+                semaphore.release()
+                break
+            task = asyncio.create_task(send(chunk))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def _send_chunk(self, index_name: str, chunk: BulkChunk, report: ReindexReport) -> bool:
+        """Send one bulk body with retries; returns whether the chunk was acknowledged"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.bulk(index=index_name, operations=chunk.body)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    report.chunks_failed += 1
+                    report.docs_failed += chunk.doc_count
+                    report.errors.append(f"chunk {chunk.sequence}: {str(e)}")
+                    logger.error(f"Bulk chunk {chunk.sequence} failed after {attempt + 1} attempts: {str(e)}")
+                    return False
+                report.retries += 1
+                await asyncio.sleep(self.retry_backoff_seconds * (2 ** attempt))
+
+        failed = 0
+        if response.get("errors"):
+            for item in response.get("items", []):
+                result = item.get("index") or next(iter(item.values()), {})
+                if result.get("error"):
+                    failed += 1
+                    if len(report.errors) < 100:
+                        report.errors.append(f"{result.get('_id')}: {result['error']}")
+
+        report.chunks_sent += 1
+        report.bytes_sent += len(chunk.body)
+        chunk.docs_indexed = chunk.doc_count - failed
+        report.docs_indexed += chunk.docs_indexed
+        report.docs_failed += failed
+        return True
+
+    # Index lifecycle
+
+    async def _prepare_target_index(self, resume: bool) -> Tuple[str, Optional[str], int]:
+        """Pick the index to load into, reusing a checkpointed one when resuming"""
+        if resume and self.checkpoint_store:
+            state = self.checkpoint_store.load()
+            if (
+                state
+                and state.get("alias") == self.alias
+                and await self.client.indices.exists(index=state["index_name"])
+            ):
+                return state["index_name"], state.get("last_id"), state.get("docs_indexed", 0)
+
+        if self.checkpoint_store:
+            self.checkpoint_store.clear()
+
+        index_name = f"{self.alias}_{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}"
+        body = json.loads(json.dumps(self.index_body))
+        settings = body.setdefault("settings", {})
+        # Bulk loading is cheaper without replicas or periodic refreshes
+        settings["number_of_replicas"] = 0
+        settings["refresh_interval"] = "-1"
+        await self.client.indices.create(index=index_name, body=body)
+        return index_name, None, 0
+
+    async def _finalize_index(self, index_name: str):
+        settings = self.index_body.get("settings", {})
+        await self.client.indices.put_settings(
+            index=index_name,
+            body={
+                "index": {
+                    "number_of_replicas": settings.get("number_of_replicas", 1),
+                    "refresh_interval": settings.get("refresh_interval", "1s")
+                }
+            }
+        )
+        await self.client.indices.refresh(index=index_name)
+
+    async def _swap_alias(self, index_name: str):
+        """Atomically move the alias to the new index"""
+        actions: List[Dict[str, Any]] = []
+        old_indices: List[str] = []
+
+        if await self.client.indices.exists_alias(name=self.alias):
+            current = await self.client.indices.get_alias(name=self.alias)
+            old_indices = [name for name in current.keys() if name != index_name]
+            actions.extend({"remove": {"index": name, "alias": self.alias}} for name in old_indices)
+        elif await self.client.indices.exists(index=self.alias):
+            # A concrete index still owns the alias name; drop it in the same atomic step
+            actions.append({"remove_index": {"index": self.alias}})
+
+        actions.append({"add": {"index": index_name, "alias": self.alias}})
+        await self.client.indices.update_aliases(body={"actions": actions})
+        logger.info(f"Alias '{self.alias}' now points to '{index_name}'")
+
+        if self.delete_old_indices:
+            for name in old_indices:
+                await self.client.indices.delete(index=name)
+                logger.info(f"Deleted previous property index '{name}'")
+
+
+def _enum_value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+def _float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
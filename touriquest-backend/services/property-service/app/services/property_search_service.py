@@ -18,8 +18,12 @@ from app.schemas import (
     BasicSearchRequest, AdvancedSearchRequest, PropertySearchResult, 
     PropertySearchResponse, Coordinates, PaginationMeta, SearchMetadata
 )
+from app.core import database
 from app.core.config import get_settings
 from app.services.elasticsearch_service import ElasticsearchService
+from app.services.search_fallback_service import (
+    DatabaseSearchService, SearchRouter, get_search_latency_tracker
+)
 from app.services.ranking_service import RankingService
 from app.services.cache_service import CacheService
 from app.services.analytics_service import AnalyticsService
@@ -42,6 +46,12 @@ class PropertySearchService:
         self.cache = cache_service
         self.analytics = analytics_service
         self.settings = get_settings()
+        self.db_search = DatabaseSearchService(max_results=self.settings.search_max_results)
+        self.router = SearchRouter(
+            tracker=get_search_latency_tracker(),
+            es_timeout_ms=self.settings.search_es_timeout_ms,
+            hedge_delay_ms=self.settings.search_hedge_delay_ms
+        )
         
     async def search_properties(
         self,
@@ -145,8 +155,15 @@ class PropertySearchService:
         """
         Execute multi-stage search combining Elasticsearch and database queries
         """
-        # Stage 1: Elasticsearch for text and location search
-        es_results = await self._elasticsearch_search(request)
+        # Stage 1: Elasticsearch for text and location search, SQL when degraded
+        es_results, source = await self.router.search(
+            es_search=lambda: self._elasticsearch_search(request),
+            db_search=lambda: self._fallback_database_search(request, db),
+            critical=request.critical,
+            isolated_db_search=lambda: self._isolated_fallback_database_search(request)
+        )
+        if source == "database":
+            logger.info("Search stage 1 served by database", results_count=len(es_results))
         
         # Stage 2: Database filters for complex relationships
         db_filtered_results = await self._database_filter_search(request, db, es_results)
@@ -188,8 +205,7 @@ class PropertySearchService:
             
         except Exception as e:
             logger.error(f"Elasticsearch search failed: {str(e)}")
-            # Fallback to database-only search
-            return await self._fallback_database_search(request)
+            raise
     
     async def _build_elasticsearch_query(self, request: AdvancedSearchRequest) -> Dict[str, Any]:
         """
@@ -553,16 +569,23 @@ class PropertySearchService:
         logger.info(f"Advanced filters: {len(filtered_results)}/{len(results)} properties passed")
         return filtered_results
     
-    async def _fallback_database_search(self, request: AdvancedSearchRequest) -> List[Dict[str, Any]]:
+    async def _fallback_database_search(
+        self,
+        request: AdvancedSearchRequest,
+        db: AsyncSession
+    ) -> List[Dict[str, Any]]:
         """
-        Fallback search using only database when Elasticsearch is unavailable
+        Fallback search using only database when Elasticsearch is unavailable or slow
         """
         logger.warning("Using database fallback search")
-        
-        # This would implement a basic database-only search
-        # For brevity, returning empty list - in real implementation,
-        # this would use PostGIS for geospatial queries
-        return []
+        return await self.db_search.search(request, db)
+    
+    async def _isolated_fallback_database_search(self, request: AdvancedSearchRequest) -> List[Dict[str, Any]]:
+        """
+        Database fallback on its own session, safe to cancel when it loses a hedged race
+        """
+        async with database.async_session() as session:
+            return await self.db_search.search(request, session)
     
     def _apply_pagination(self, results: List[Dict[str, Any]], request: AdvancedSearchRequest) -> List[Dict[str, Any]]:
         """Apply pagination to search results"""
@@ -0,0 +1,379 @@
+"""Database fallback search and Elasticsearch latency-aware routing"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import structlog
+from geoalchemy2 import Geography
+from sqlalchemy import and_, cast, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.property_models import (
+    PROPERTY_SEARCH_DOCUMENT_SQL,
+    BookingType,
+    CancellationPolicy,
+    Property,
+    PropertyAmenity,
+    PropertyStatus,
+)
+
+logger = structlog.get_logger()
+
+
+SearchCall = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+
+class SearchLatencyTracker:
+    """Rolling Elasticsearch latency window with p95-based switch-over.
+
+    Once p95 crosses the threshold, Elasticsearch is bypassed for a cooldown
+    period; afterwards the window starts empty so recovery is judged on fresh
+    samples only.
+    """
+
+    def __init__(
+        self,
+        p95_threshold_ms: float,
+        window_size: int = 200,
+        min_samples: int = 20,
+        cooldown_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.p95_threshold_ms = p95_threshold_ms
+        self.min_samples = min_samples
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._samples: Deque[float] = deque(maxlen=window_size)
+        self._failures = 0
+        self._degraded_until = 0.0
+
+    def record(self, latency_ms: float, success: bool = True):
+        self._samples.append(latency_ms)
+        if not success:
+            self._failures += 1
+
+    def p95(self) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+    @property
+    def is_degraded(self) -> bool:
+        now = self._clock()
+        if now < self._degraded_until:
+            return True
+
+        if len(self._samples) >= self.min_samples:
+            p95 = self.p95()
+            if p95 is not None and p95 > self.p95_threshold_ms:
+                self._degraded_until = now + self.cooldown_seconds
+                logger.warning(
+                    "Elasticsearch p95 over budget, switching to database search",
+                    p95_ms=round(p95, 1),
+                    threshold_ms=self.p95_threshold_ms,
+                    cooldown_seconds=self.cooldown_seconds
+                )
+                self._samples.clear()
+                self._failures = 0
+                return True
+
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self._samples),
+            "failures": self._failures,
+            "p95_ms": self.p95(),
+            "p95_threshold_ms": self.p95_threshold_ms,
+            "degraded": self._clock() < self._degraded_until
+        }
+
+
+@lru_cache()
+def get_search_latency_tracker() -> SearchLatencyTracker:
+    """Process-wide latency tracker shared by all search service instances"""
+    settings = get_settings()
+    return SearchLatencyTracker(
+        p95_threshold_ms=settings.search_es_p95_threshold_ms,
+        window_size=settings.search_es_latency_window,
+        cooldown_seconds=settings.search_es_degraded_cooldown_seconds
+    )
+
+
+class SearchRouter:
+    """Runs the Elasticsearch search within a latency budget, falling back to SQL.
+
+    Three paths are supported: straight database search while Elasticsearch is
+    degraded, Elasticsearch with fallback on error or timeout, and a hedged race
+    for critical queries where the database search starts if Elasticsearch has
+    not answered after a short delay and the first good answer wins.
+    """
+
+    def __init__(
+        self,
+        tracker: SearchLatencyTracker,
+        es_timeout_ms: float,
+        hedge_delay_ms: float
+    ):
+        self.tracker = tracker
+        self.es_timeout = es_timeout_ms / 1000
+        self.hedge_delay = hedge_delay_ms / 1000
+
+    async def search(
+        self,
+        es_search: SearchCall,
+        db_search: SearchCall,
+        critical: bool = False,
+        isolated_db_search: Optional[SearchCall] = None
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """Return (results, source) where source is "elasticsearch" or "database".
+
+        ``isolated_db_search`` must not share state with the caller's session; it
+        is used for the hedged race, where the losing task gets cancelled.
+        """
+        if self.tracker.is_degraded:
+            return await db_search(), "database"
+
+        if critical:
+            return await self._hedged_search(es_search, db_search, isolated_db_search or db_search)
+
+        try:
+            return await self._timed_es_search(es_search), "elasticsearch"
+        except Exception as e:
+            logger.error(f"Elasticsearch search failed, using database fallback: {str(e) or type(e).__name__}")
+            return await db_search(), "database"
+
+    async def _timed_es_search(self, es_search: SearchCall) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            results = await asyncio.wait_for(es_search(), timeout=self.es_timeout)
+        except asyncio.CancelledError:
+            # Lost a hedged race; the elapsed time is still a lower bound on latency
+            self.tracker.record((time.perf_counter() - started) * 1000, success=False)
+            raise
+        except Exception:
+            self.tracker.record((time.perf_counter() - started) * 1000, success=False)
+            raise
+        self.tracker.record((time.perf_counter() - started) * 1000)
+        return results
+
+    async def _hedged_search(
+        self,
+        es_search: SearchCall,
+        db_search: SearchCall,
+        isolated_db_search: SearchCall
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        es_task = asyncio.create_task(self._timed_es_search(es_search))
+        done, _ = await asyncio.wait({es_task}, timeout=self.hedge_delay)
+
+        if es_task in done:
+            if es_task.exception() is None:
+                return es_task.result(), "elasticsearch"
+            logger.error(f"Elasticsearch search failed before hedge: {str(es_task.exception())}")
+            return await db_search(), "database"
+
+        db_task = asyncio.create_task(isolated_db_search())
+        sources = {es_task: "elasticsearch", db_task: "database"}
+        pending = {es_task, db_task}
+        last_error: Optional[BaseException] = None
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if pending:
+                        await asyncio.gather(*pending, return_exceptions=True)
+                    return task.result(), sources[task]
+                last_error = task.exception()
+                logger.warning(f"Hedged {sources[task]} search failed: {str(last_error)}")
+
+        raise last_error
+
+
+class DatabaseSearchService:
+    """SQL implementation of the property search using PostGIS and full-text search.
+
+    Mirrors the Elasticsearch query: indexed column filters, ``ST_DWithin`` on
+    the geography cast of the location and ``tsvector`` matching on the same
+    document expression the GIN index is built on.
+    """
+
+    def __init__(self, max_results: int = 100, default_radius_km: Optional[float] = None):
+        self.max_results = max_results
+        # Used when a request has coordinates but no radius
+        self.default_radius_km = default_radius_km or get_settings().search_default_radius
+        self._search_document = literal_column(PROPERTY_SEARCH_DOCUMENT_SQL)
+
+    async def search(self, request: Any, db: AsyncSession) -> List[Dict[str, Any]]:
+        """Execute the fallback search and return ES-shaped result dicts"""
+        result = await db.execute(self.build_query(request))
+
+        results = []
+        for rank, row in enumerate(result.all(), start=1):
+            results.append({
+                "property_id": str(row.id),
+                "title": row.title,
+                "description": row.description,
+                "location": {"lat": row.latitude, "lon": row.longitude},
+                "property_type": getattr(row.property_type, "value", row.property_type),
+                "max_guests": row.max_guests,
+                "base_price": float(row.base_price_per_night),
+                "overall_rating": float(row.overall_rating or 0),
+                "amenity_ids": list(row.amenity_ids or []),
+                "distance_km": float(row.distance_km) if row.distance_km is not None else None,
+                "_score": float(row.text_rank or 0),
+                "_es_rank": rank,
+                "_search_source": "database"
+            })
+
+        logger.info(f"Database fallback search returned {len(results)} results")
+        return results
+
+    def build_query(self, request: Any):
+        """Build the SELECT equivalent of the Elasticsearch query for a request"""
+        conditions = [
+            Property.status == PropertyStatus.APPROVED,
+            Property.max_guests >= request.guests.total_guests
+        ]
+
+        text_rank = literal_column("0")
+        if request.location:
+            ts_query = func.plainto_tsquery("simple", request.location)
+            conditions.append(self._search_document.op("@@")(ts_query))
+            text_rank = func.ts_rank(self._search_document, ts_query)
+
+        distance_km = literal_column("NULL")
+        if request.coordinates:
+            geography = cast(Property.location, Geography)
+            point = cast(
+                func.ST_SetSRID(
+                    func.ST_MakePoint(request.coordinates.longitude, request.coordinates.latitude), 4326
+                ),
+                Geography
+            )
+            radius_km = request.radius or self.default_radius_km
+            conditions.append(func.ST_DWithin(geography, point, radius_km * 1000))
+            distance_km = func.ST_Distance(geography, point) / 1000
+
+        if request.price_range:
+            if request.price_range.min_price:
+                conditions.append(Property.base_price_per_night >= request.price_range.min_price)
+            if request.price_range.max_price:
+                conditions.append(Property.base_price_per_night <= request.price_range.max_price)
+
+        if request.property_types:
+            conditions.append(Property.property_type.in_([pt.value for pt in request.property_types]))
+
+        if getattr(request, "filters", None):
+            conditions.extend(self._filter_conditions(request.filters))
+
+        amenity_ids = (
+            select(func.array_agg(PropertyAmenity.amenity_id))
+            .where(PropertyAmenity.property_id == Property.id)
+            .correlate(Property)
+            .scalar_subquery()
+        )
+
+        query = select(
+            Property.id,
+            Property.title,
+            Property.description,
+            Property.property_type,
+            Property.max_guests,
+            Property.base_price_per_night,
+            Property.overall_rating,
+            func.ST_Y(Property.location).label("latitude"),
+            func.ST_X(Property.location).label("longitude"),
+            amenity_ids.label("amenity_ids"),
+            distance_km.label("distance_km"),
+            text_rank.label("text_rank")
+        ).where(and_(*conditions))
+
+        return query.order_by(*self._order_by(request, text_rank, distance_km)).limit(self.max_results)
+
+    def _filter_conditions(self, filters: Any) -> List[Any]:
+        conditions = []
+
+        if filters.min_rating:
+            conditions.append(Property.overall_rating >= filters.min_rating)
+        if filters.min_reviews:
+            conditions.append(Property.review_count >= filters.min_reviews)
+        if filters.instant_book_only:
+            conditions.append(Property.booking_type == BookingType.INSTANT_BOOK)
+        if filters.host_verified_only:
+            conditions.append(Property.host_verified == True)
+        if filters.eco_friendly_only:
+            conditions.append(Property.eco_friendly == True)
+        if filters.pets_allowed is not None:
+            conditions.append(Property.pets_allowed == filters.pets_allowed)
+        if filters.smoking_allowed is not None:
+            conditions.append(Property.smoking_allowed == filters.smoking_allowed)
+        if filters.children_welcome is not None:
+            conditions.append(Property.children_welcome == filters.children_welcome)
+        if filters.accessible_only:
+            conditions.append(Property.accessibility_features.isnot(None))
+        if filters.min_bedrooms:
+            conditions.append(Property.bedrooms >= filters.min_bedrooms)
+        if filters.min_bathrooms:
+            conditions.append(Property.bathrooms >= filters.min_bathrooms)
+        if filters.min_beds:
+            conditions.append(Property.beds >= filters.min_beds)
+        if filters.max_response_time_hours:
+            conditions.append(Property.host_response_time_hours <= filters.max_response_time_hours)
+        if filters.min_response_rate:
+            conditions.append(Property.host_response_rate >= filters.min_response_rate)
+        if filters.min_stay:
+            conditions.append(Property.minimum_stay <= filters.min_stay)
+        if filters.max_stay:
+            conditions.append(Property.maximum_stay >= filters.max_stay)
+        if filters.host_languages:
+            conditions.append(Property.languages_spoken.contains(filters.host_languages))
+        if filters.flexible_cancellation:
+            conditions.append(Property.cancellation_policy == CancellationPolicy.FLEXIBLE)
+
+        if filters.required_amenities:
+            required = set(filters.required_amenities)
+            conditions.append(Property.id.in_(
+                select(PropertyAmenity.property_id)
+                .where(PropertyAmenity.amenity_id.in_(required))
+                .group_by(PropertyAmenity.property_id)
+                .having(func.count(PropertyAmenity.amenity_id.distinct()) == len(required))
+            ))
+
+        return conditions
+
+    def _order_by(self, request: Any, text_rank: Any, distance_km: Any) -> List[Any]:
+        sort_by = getattr(request.sort_by, "value", request.sort_by)
+
+        if sort_by == "price_asc":
+            order = [Property.base_price_per_night.asc()]
+        elif sort_by == "price_desc":
+            order = [Property.base_price_per_night.desc()]
+        elif sort_by == "rating_desc":
+            order = [Property.overall_rating.desc()]
+        elif sort_by == "newest":
+            order = [Property.created_at.desc()]
+        elif sort_by == "most_reviewed":
+            order = [Property.review_count.desc()]
+        elif sort_by == "popular":
+            order = [Property.popularity_score.desc()]
+        elif sort_by == "distance_asc" and request.coordinates:
+            order = [distance_km.asc()]
+        elif request.location:
+            order = [text_rank.desc()]
+        elif request.coordinates:
+            order = [distance_km.asc()]
+        else:
+            order = [Property.popularity_score.desc()]
+
+        # Stable secondary sort, as in the Elasticsearch query
+        order.append(Property.id.asc())
+        return order
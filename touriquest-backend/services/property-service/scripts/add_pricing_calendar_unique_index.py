@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Pricing Calendar Unique Index Migration
+
+Makes idx_pricing_calendar_property_date unique on existing databases so
+dynamic pricing can write the calendar with INSERT ... ON CONFLICT:
+
+1. deletes duplicate (property_id, date) rows, keeping the most recently
+   updated one
+2. builds the unique index concurrently under a temporary name
+3. drops the old non-unique index and renames the new one in its place
+
+Safe to re-run: it exits early when the index is already unique. Until it
+has run, DynamicPricingService falls back to per-row calendar writes.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "idx_pricing_calendar_property_date"
+NEW_INDEX_NAME = "idx_pricing_calendar_property_date_unique"
+
+DEDUPLICATE = text("""
+    DELETE FROM pricing_calendar p
+    USING (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY property_id, date
+            ORDER BY updated_at DESC NULLS LAST, created_at DESC NULLS LAST, id
+        ) AS position
+        FROM pricing_calendar
+    ) ranked
+    WHERE p.id = ranked.id AND ranked.position > 1
+""")
+
+INDEX_STATE = text("""
+    SELECT i.indisunique, i.indisvalid
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = :name
+""")
+
+
+async def migrate(database_url: str) -> int:
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    engine = create_async_engine(database_url, isolation_level="AUTOCOMMIT")
+    try:
+        async with engine.connect() as conn:
+            current = (await conn.execute(INDEX_STATE, {"name": INDEX_NAME})).first()
+            if current is not None and current.indisunique and current.indisvalid:
+                logger.info(f"{INDEX_NAME} is already unique, nothing to do")
+                return 0
+
+            result = await conn.execute(DEDUPLICATE)
+            logger.info(f"Deleted {result.rowcount} duplicate pricing calendar rows")
+
+            # A failed concurrent build leaves an invalid index behind
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {NEW_INDEX_NAME}"))
+            await conn.execute(text(
+                f"CREATE UNIQUE INDEX CONCURRENTLY {NEW_INDEX_NAME} "
+                f"ON pricing_calendar (property_id, date)"
+            ))
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+            await conn.execute(text(f"ALTER INDEX {NEW_INDEX_NAME} RENAME TO {INDEX_NAME}"))
+            logger.info(f"{INDEX_NAME} is now unique on (property_id, date)")
+            return 0
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        return 1
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    args = parser.parse_args()
+
+    if not args.database_url:
+        logger.error("DATABASE_URL environment variable not set")
+        return 1
+    return asyncio.run(migrate(args.database_url))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
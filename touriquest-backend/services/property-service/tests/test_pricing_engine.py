@@ -0,0 +1,239 @@
+"""
+Test Suite for the Vectorized Pricing Engine
+
+Compares VectorizedPricingEngine with the per-date Decimal calculation it
+replaced (reproduced below from the previous DynamicPricingService): rule
+date ranges, weekdays and seasons, rule priority and bounds, advance-booking
+multipliers, recommendations, and cent rounding of persisted prices.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.pricing_engine import VectorizedPricingEngine, to_price
+
+PRICING_CONFIG = {
+    "demand_multipliers": {"low": 0.85, "medium": 1.0, "high": 1.25, "very_high": 1.5},
+    "seasonal_multipliers": {"low": 0.80, "shoulder": 0.95, "high": 1.15, "peak": 1.4},
+    "advance_booking_multipliers": {0: 0.7, 1: 0.8, 7: 0.9, 30: 1.0, 90: 1.05, 180: 1.1},
+    "weekday_multipliers": {0: 0.9, 1: 0.9, 2: 0.9, 3: 0.95, 4: 1.1, 5: 1.2, 6: 1.15},
+}
+
+TODAY = date(2025, 1, 1)
+
+
+def stored(value: Decimal) -> Decimal:
+    """What a numeric(10, 2) column stores for an unrounded Decimal"""
+    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+# Previous per-date implementation
+
+def previous_season(target_date: date, country: str = "") -> str:
+    month = target_date.month
+    southern = country in ("Australia", "New Zealand")
+    if month in (12, 1, 2):
+        return "high" if southern else "low"
+    if month in (6, 7, 8):
+        return "low" if southern else "high"
+    return "shoulder"
+
+
+def previous_rule_applies(rule, target_date: date) -> bool:
+    conditions = rule.conditions
+    if "date_range" in conditions:
+        start_date = datetime.strptime(conditions["date_range"]["start"], "%Y-%m-%d").date()
+        end_date = datetime.strptime(conditions["date_range"]["end"], "%Y-%m-%d").date()
+        if not (start_date <= target_date <= end_date):
+            return False
+    if "weekdays" in conditions and target_date.weekday() not in conditions["weekdays"]:
+        return False
+    if "seasons" in conditions and previous_season(target_date) not in conditions["seasons"]:
+        return False
+    return True
+
+
+def previous_rule_adjustment(rule, current_price: Decimal) -> Decimal:
+    if rule.adjustment_type == "percentage":
+        new_price = current_price + current_price * (Decimal(str(rule.adjustment_value)) / 100)
+    else:
+        new_price = current_price + Decimal(str(rule.adjustment_value))
+    if rule.minimum_price:
+        new_price = max(new_price, rule.minimum_price)
+    if rule.maximum_price:
+        new_price = min(new_price, rule.maximum_price)
+    return new_price
+
+
+def previous_dynamic_price(base_price: Decimal, rules, target_date: date) -> Decimal:
+    final_price = base_price
+    for rule in rules:
+        if previous_rule_applies(rule, target_date):
+            final_price = previous_rule_adjustment(rule, final_price)
+    return final_price
+
+
+def previous_advance_multiplier(days_in_advance: int) -> float:
+    multipliers = PRICING_CONFIG["advance_booking_multipliers"]
+    for days, multiplier in sorted(multipliers.items()):
+        if days_in_advance <= days:
+            return multiplier
+    return multipliers[max(multipliers.keys())]
+
+
+def previous_recommendation(base_price: Decimal, target_date: date, country: str, competitor_average=None) -> Decimal:
+    demand = ("medium", "low", "low", "medium", "high", "high", "high")[target_date.weekday()]
+    price = base_price
+    price *= Decimal(str(PRICING_CONFIG["demand_multipliers"][demand]))
+    price *= Decimal(str(PRICING_CONFIG["seasonal_multipliers"][previous_season(target_date, country)]))
+    price *= Decimal(str(PRICING_CONFIG["weekday_multipliers"][target_date.weekday()]))
+    price *= Decimal(str(previous_advance_multiplier((target_date - TODAY).days)))
+    if competitor_average is not None:
+        if price > competitor_average * Decimal("1.2"):
+            price *= Decimal("0.95")
+        elif price < competitor_average * Decimal("0.8"):
+            price *= Decimal("1.05")
+    return max(base_price * Decimal("0.5"), min(base_price * Decimal("2.0"), price))
+
+
+def rule(adjustment_type="percentage", adjustment_value="10", minimum_price=None, maximum_price=None, **conditions):
+    return SimpleNamespace(
+        conditions=conditions,
+        adjustment_type=adjustment_type,
+        adjustment_value=Decimal(adjustment_value),
+        minimum_price=Decimal(minimum_price) if minimum_price else None,
+        maximum_price=Decimal(maximum_price) if maximum_price else None,
+    )
+
+
+@pytest.fixture
+def engine():
+    return VectorizedPricingEngine(PRICING_CONFIG)
+
+
+def engine_prices(engine, base_prices, rules_by_property, start, end):
+    features = engine.date_features(start, end, today=TODAY)
+    prices = engine.apply_rules(
+        np.array([float(price) for price in base_prices]),
+        engine.compile_rules(rules_by_property),
+        features
+    )
+    return features.as_dates(), [[to_price(price) for price in row] for row in prices.tolist()]
+
+
+class TestRuleEvaluation:
+    """Test cases for pricing rules against the previous per-date calculation"""
+
+    def test_season_and_weekday_conditions(self, engine):
+        rules = [
+            rule(adjustment_value="20", seasons=["high"]),
+            rule(adjustment_type="fixed_amount", adjustment_value="-15", seasons=["low"], weekdays=[5, 6]),
+            rule(adjustment_value="5", date_range={"start": "2025-03-10", "end": "2025-04-02"}),
+        ]
+        dates, prices = engine_prices(engine, [Decimal("150.00")], [rules], date(2025, 1, 1), date(2025, 12, 31))
+
+        expected = [stored(previous_dynamic_price(Decimal("150.00"), rules, d)) for d in dates]
+        assert prices[0] == expected
+        assert prices[0][dates.index(date(2025, 7, 1))] == Decimal("180.00")
+        assert prices[0][dates.index(date(2025, 1, 4))] == Decimal("135.00")  # Saturday, low season
+
+    def test_rules_apply_in_priority_order_with_bounds(self, engine):
+        # Percentage then fixed amount, each clamped by its own bounds
+        rules = [
+            rule(adjustment_value="50", maximum_price="200"),
+            rule(adjustment_type="fixed_amount", adjustment_value="30", minimum_price="260"),
+        ]
+        _, prices = engine_prices(engine, [Decimal("160.00")], [rules], date(2025, 5, 1), date(2025, 5, 3))
+        assert prices[0] == [Decimal("260.00")] * 3
+
+        _, reversed_prices = engine_prices(engine, [Decimal("160.00")], [rules[::-1]], date(2025, 5, 1), date(2025, 5, 3))
+        assert reversed_prices[0] == [Decimal("200.00")] * 3
+
+    def test_random_portfolio_matches_to_the_cent(self, engine):
+        rng = random.Random(7)
+        start, end = date(2025, 1, 1), date(2025, 12, 31)
+        base_prices, rules_by_property = [], []
+        for _ in range(40):
+            base_prices.append(Decimal(f"{rng.uniform(40, 600):.2f}"))
+            rules = []
+            for _ in range(rng.randint(0, 5)):
+                conditions = {}
+                if rng.random() < 0.5:
+                    offset = rng.randint(0, 330)
+                    conditions["date_range"] = {
+                        "start": (start + timedelta(days=offset)).isoformat(),
+                        "end": (start + timedelta(days=offset + rng.randint(1, 60))).isoformat(),
+                    }
+                if rng.random() < 0.5:
+                    conditions["weekdays"] = rng.sample(range(7), rng.randint(1, 4))
+                if rng.random() < 0.3:
+                    conditions["seasons"] = [rng.choice(["low", "shoulder", "high"])]
+                rules.append(rule(
+                    adjustment_type=rng.choice(["percentage", "fixed_amount"]),
+                    adjustment_value=f"{rng.uniform(-25, 35):.2f}",
+                    minimum_price="60" if rng.random() < 0.3 else None,
+                    maximum_price="700" if rng.random() < 0.3 else None,
+                    **conditions
+                ))
+            rules_by_property.append(rules)
+
+        dates, prices = engine_prices(engine, base_prices, rules_by_property, start, end)
+
+        for base_price, rules, row in zip(base_prices, rules_by_property, prices):
+            assert row == [stored(previous_dynamic_price(base_price, rules, d)) for d in dates]
+
+
+class TestMultipliers:
+    """Test cases for advance-booking multipliers and recommendations"""
+
+    def test_advance_multipliers(self, engine):
+        features = engine.date_features(TODAY - timedelta(days=5), TODAY + timedelta(days=400), today=TODAY)
+        multipliers = engine.advance_multipliers(features).tolist()
+
+        assert multipliers == [previous_advance_multiplier(days) for days in features.days_in_advance.tolist()]
+
+    @pytest.mark.parametrize("country", ["France", "Australia"])
+    def test_recommendations(self, engine, country):
+        base_prices = [Decimal("95.00"), Decimal("240.50"), Decimal("410.00")]
+        competitor_averages = [None, Decimal("150.00"), Decimal("600.00")]
+        features = engine.date_features(date(2025, 1, 1), date(2025, 12, 31), today=TODAY)
+
+        factors = engine.recommend(
+            np.array([float(price) for price in base_prices]),
+            [country] * len(base_prices),
+            features,
+            np.array([np.nan if avg is None else float(avg) for avg in competitor_averages])
+        )
+
+        for base_price, average, row in zip(base_prices, competitor_averages, factors["recommended_price"].tolist()):
+            assert [to_price(price) for price in row] == [
+                stored(previous_recommendation(base_price, d, country, average)) for d in features.as_dates()
+            ]
+
+
+class TestRounding:
+    """Test cases for cent rounding at the persistence boundary"""
+
+    def test_half_cents_round_up_like_numeric_columns(self):
+        # 20 * 1.00125 is 20.025 exactly; as a float it sits just below
+        assert round(20 * (1 + 0.125 / 100), 2) == 20.02
+        assert to_price(20 * (1 + 0.125 / 100)) == Decimal("20.03")
+
+    def test_binary_noise_does_not_move_the_cent(self):
+        assert 100 * 1.15 < 115
+        assert to_price(100 * 1.15) == Decimal("115.00")
+        assert to_price(0.1 + 0.2) == Decimal("0.30")
+
+    def test_engine_prices_are_unrounded(self, engine):
+        features = engine.date_features(date(2025, 5, 1), date(2025, 5, 1), today=TODAY)
+        prices = engine.apply_rules(
+            np.array([20.0]), engine.compile_rules([[rule(adjustment_value="0.125")]]), features
+        )
+
+        assert prices[0, 0] == pytest.approx(20.025)
+        assert to_price(prices[0, 0]) == stored(Decimal("20") * Decimal("1.00125"))
@@ -0,0 +1,200 @@
+"""
+Test Suite for Streaming Property Reindex
+
+Drives PropertyReindexer against an in-memory Elasticsearch stand-in with a
+synthetic document stream in place of the database cursor.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.services.property_reindex_service import (
+    PropertyReindexer,
+    ReindexCheckpointStore,
+)
+
+ALIAS = "touriquest_properties"
+
+
+class FakeIndices:
+    """Subset of the indices API used by the reindexer"""
+
+    def __init__(self, es: "FakeElasticsearch"):
+        self.es = es
+
+    async def exists(self, index):
+        return index in self.es.index_docs or index in self.es.aliases
+
+    async def exists_alias(self, name):
+        return name in self.es.aliases
+
+    async def get_alias(self, name):
+        return {index: {"aliases": {name: {}}} for index in self.es.aliases[name]}
+
+    async def create(self, index, body):
+        self.es.index_docs[index] = {}
+        self.es.settings[index] = dict(body.get("settings", {}))
+
+    async def put_settings(self, index, body):
+        self.es.settings[index].update(body["index"])
+
+    async def refresh(self, index):
+        self.es.refreshed.add(index)
+
+    async def delete(self, index):
+        self.es.index_docs.pop(index)
+
+    async def update_aliases(self, body):
+        for action in body["actions"]:
+            (kind, spec), = action.items()
+            if kind == "add":
+                self.es.aliases.setdefault(spec["alias"], set()).add(spec["index"])
+            elif kind == "remove":
+                self.es.aliases[spec["alias"]].discard(spec["index"])
+            elif kind == "remove_index":
+                self.es.index_docs.pop(spec["index"])
+
+
+class FakeElasticsearch:
+    """In-memory Elasticsearch stand-in that parses NDJSON bulk bodies"""
+
+    def __init__(self, fail_chunks=(), latency=0.002):
+        self.index_docs = {}
+        self.settings = {}
+        self.aliases = {}
+        self.refreshed = set()
+        self.fail_chunks = set(fail_chunks)
+        self.latency = latency
+        self.bulk_calls = 0
+        self.body_sizes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.indices = FakeIndices(self)
+
+    async def bulk(self, index, operations):
+        self.bulk_calls += 1
+        call = self.bulk_calls
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if call in self.fail_chunks:
+                raise ConnectionError("simulated transport failure")
+
+            self.body_sizes.append(len(operations))
+            lines = operations.decode().splitlines()
+            items = []
+            for action_line, source_line in zip(lines[0::2], lines[1::2]):
+                doc_id = json.loads(action_line)["index"]["_id"]
+                self.index_docs[index][doc_id] = json.loads(source_line)
+                items.append({"index": {"_id": doc_id, "status": 201}})
+            return {"errors": False, "items": items}
+        finally:
+            self.in_flight -= 1
+
+
+class SyntheticReindexer(PropertyReindexer):
+    """Reindexer reading from an in-memory list instead of a database cursor"""
+
+    def __init__(self, documents, **kwargs):
+        super().__init__(session_factory=None, alias=ALIAS, index_body={"settings": {}}, **kwargs)
+        self.documents = documents
+
+    async def stream_documents(self, after_id=None):
+        for doc_id, document in self.documents:
+            if after_id is None or doc_id > after_id:
+                yield doc_id, document
+
+
+def synthetic_documents(count):
+    return [
+        (f"{i:08d}", {"property_id": f"{i:08d}", "title": f"Property {i}", "description": "x" * 200})
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def checkpoint_store(tmp_path):
+    return ReindexCheckpointStore(str(tmp_path / "checkpoint.json"))
+
+
+class TestPropertyReindexer:
+    """Test cases for streaming reindex with alias swap and resume"""
+
+    async def test_full_reindex_swaps_alias_over_concrete_index(self, checkpoint_store):
+        fake = FakeElasticsearch()
+        fake.index_docs[ALIAS] = {"stale": {}}
+        documents = synthetic_documents(2_000)
+
+        reindexer = SyntheticReindexer(
+            documents,
+            client=fake,
+            checkpoint_store=checkpoint_store,
+            max_chunk_docs=10_000,
+            max_chunk_bytes=32 * 1024,
+            max_in_flight=3,
+        )
+        report = await reindexer.run()
+
+        assert report.alias_swapped
+        assert report.docs_indexed == 2_000
+        assert report.docs_failed == 0
+        assert report.error_rate == 0.0
+        assert report.docs_per_second > 0
+
+        # The old concrete index is replaced by an alias to the new index
+        assert ALIAS not in fake.index_docs
+        assert fake.aliases[ALIAS] == {report.index_name}
+        assert len(fake.index_docs[report.index_name]) == 2_000
+
+        # Bulk bodies respect the byte bound and several requests overlap
+        assert max(fake.body_sizes) <= 32 * 1024
+        assert 1 < fake.max_in_flight <= 3
+
+        # Bulk-load settings are restored before going live
+        assert fake.settings[report.index_name]["refresh_interval"] != "-1"
+        assert report.index_name in fake.refreshed
+        assert checkpoint_store.load() is None
+
+    async def test_reindex_resumes_from_checkpoint(self, checkpoint_store):
+        documents = synthetic_documents(1_000)
+        fake = FakeElasticsearch(fail_chunks={5, 6, 7, 8})
+
+        first = SyntheticReindexer(
+            documents,
+            client=fake,
+            checkpoint_store=checkpoint_store,
+            max_chunk_docs=100,
+            max_in_flight=1,
+            max_retries=3,
+            retry_backoff_seconds=0,
+        )
+        report = await first.run()
+
+        assert not report.alias_swapped
+        assert report.chunks_failed == 1
+        assert ALIAS not in fake.aliases
+        state = checkpoint_store.load()
+        assert state["last_id"] == documents[399][0]
+        assert state["docs_indexed"] == 400
+
+        fake.fail_chunks.clear()
+        second = SyntheticReindexer(
+            documents,
+            client=fake,
+            checkpoint_store=checkpoint_store,
+            max_chunk_docs=100,
+            max_in_flight=4,
+        )
+        resumed = await second.run()
+
+        assert resumed.index_name == report.index_name
+        assert resumed.resumed_from == documents[399][0]
+        assert resumed.alias_swapped
+        # Only this run's documents count towards its throughput
+        assert resumed.docs_resumed == 400
+        assert resumed.docs_indexed == 600
+        assert resumed.to_dict()["docs_per_second"] == round(600 / resumed.elapsed_seconds, 1)
+        assert len(fake.index_docs[resumed.index_name]) == 1_000
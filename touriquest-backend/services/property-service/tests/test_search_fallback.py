@@ -0,0 +1,179 @@
+"""
+Test Suite for Database Fallback Search
+
+Injects Elasticsearch failures and slow-downs into SearchRouter and checks
+that results still come back from the database within the latency budget.
+"""
+
+import asyncio
+import time
+
+from sqlalchemy.dialects import postgresql
+
+from app.schemas.search_schemas import AdvancedSearchRequest
+from app.services.search_fallback_service import (
+    DatabaseSearchService,
+    SearchLatencyTracker,
+    SearchRouter,
+)
+
+ES_RESULTS = [{"property_id": "es-1", "_score": 3.2}]
+DB_RESULTS = [{"property_id": "db-1", "_score": 0.4, "_search_source": "database"}]
+
+
+class FakeSearch:
+    """Awaitable search stand-in with configurable latency and failure"""
+
+    def __init__(self, results, latency=0.0, error=None):
+        self.results = results
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.results
+
+
+def make_router(tracker=None, es_timeout_ms=100, hedge_delay_ms=20):
+    return SearchRouter(
+        tracker=tracker or SearchLatencyTracker(p95_threshold_ms=50, min_samples=5),
+        es_timeout_ms=es_timeout_ms,
+        hedge_delay_ms=hedge_delay_ms,
+    )
+
+
+class TestSearchRouter:
+    """Test cases for Elasticsearch failure handling and switch-over"""
+
+    async def test_es_failure_returns_database_results(self):
+        es = FakeSearch(ES_RESULTS, error=ConnectionError("elasticsearch unreachable"))
+        db = FakeSearch(DB_RESULTS, latency=0.01)
+
+        started = time.perf_counter()
+        results, source = await make_router().search(es, db)
+        elapsed = time.perf_counter() - started
+
+        assert source == "database"
+        assert results == DB_RESULTS
+        assert elapsed < 0.1
+
+    async def test_es_hang_is_cut_off_by_latency_budget(self):
+        es = FakeSearch(ES_RESULTS, latency=5.0)
+        db = FakeSearch(DB_RESULTS, latency=0.01)
+
+        started = time.perf_counter()
+        results, source = await make_router(es_timeout_ms=100).search(es, db)
+        elapsed = time.perf_counter() - started
+
+        assert source == "database"
+        assert results == DB_RESULTS
+        assert elapsed < 0.3
+
+    async def test_slow_p95_switches_over_to_database(self):
+        tracker = SearchLatencyTracker(p95_threshold_ms=50, min_samples=5, cooldown_seconds=60)
+        router = make_router(tracker=tracker, es_timeout_ms=1000)
+        es = FakeSearch(ES_RESULTS, latency=0.08)
+        db = FakeSearch(DB_RESULTS)
+
+        for _ in range(5):
+            results, source = await router.search(es, db)
+            assert source == "elasticsearch"
+
+        results, source = await router.search(es, db)
+
+        assert source == "database"
+        assert results == DB_RESULTS
+        assert es.calls == 5
+        assert tracker.snapshot()["degraded"]
+
+    async def test_fast_es_is_used_normally(self):
+        tracker = SearchLatencyTracker(p95_threshold_ms=50, min_samples=5)
+        es = FakeSearch(ES_RESULTS)
+        db = FakeSearch(DB_RESULTS)
+
+        results, source = await make_router(tracker=tracker).search(es, db)
+
+        assert source == "elasticsearch"
+        assert results == ES_RESULTS
+        assert db.calls == 0
+        assert not tracker.is_degraded
+
+    async def test_hedged_request_takes_first_answer(self):
+        es = FakeSearch(ES_RESULTS, latency=1.0)
+        db = FakeSearch(DB_RESULTS, latency=0.01)
+        isolated_db = FakeSearch(DB_RESULTS, latency=0.01)
+
+        started = time.perf_counter()
+        results, source = await make_router(es_timeout_ms=2000).search(
+            es, db, critical=True, isolated_db_search=isolated_db
+        )
+        elapsed = time.perf_counter() - started
+
+        assert source == "database"
+        assert results == DB_RESULTS
+        assert elapsed < 0.2
+        assert isolated_db.calls == 1
+        assert db.calls == 0
+        assert es.cancelled
+
+    async def test_hedged_request_skips_database_when_es_is_fast(self):
+        es = FakeSearch(ES_RESULTS, latency=0.001)
+        isolated_db = FakeSearch(DB_RESULTS)
+
+        results, source = await make_router().search(
+            es, FakeSearch(DB_RESULTS), critical=True, isolated_db_search=isolated_db
+        )
+
+        assert source == "elasticsearch"
+        assert isolated_db.calls == 0
+
+
+class TestDatabaseSearchQuery:
+    """Test cases for the SQL fallback query shape"""
+
+    def compile(self, request):
+        query = DatabaseSearchService(max_results=50).build_query(request)
+        return str(query.compile(dialect=postgresql.dialect()))
+
+    def test_geo_text_and_filters_are_pushed_into_sql(self):
+        request = AdvancedSearchRequest(
+            location="Marrakech riad",
+            coordinates={"latitude": 31.63, "longitude": -8.0},
+            radius=10,
+            filters={"min_rating": 4.5, "required_amenities": [1, 2], "pets_allowed": True},
+        )
+
+        sql = self.compile(request)
+
+        assert "ST_DWithin" in sql
+        assert "plainto_tsquery" in sql and "@@" in sql
+        assert "to_tsvector('simple'" in sql
+        assert "properties.overall_rating >=" in sql
+        assert "HAVING count(DISTINCT property_amenities.amenity_id)" in sql
+        assert "LIMIT" in sql
+
+    def test_coordinates_without_radius_use_the_default_radius(self):
+        request = AdvancedSearchRequest(coordinates={"latitude": 31.63, "longitude": -8.0}, radius=None)
+
+        query = DatabaseSearchService(max_results=50, default_radius_km=25).build_query(request)
+        compiled = query.compile(dialect=postgresql.dialect())
+
+        assert "ST_DWithin" in str(compiled)
+        assert 25000 in compiled.params.values()
+
+    def test_price_sort_orders_by_indexed_price(self):
+        request = AdvancedSearchRequest(sort_by="price_asc")
+
+        sql = self.compile(request)
+
+        assert "ORDER BY properties.base_price_per_night ASC, properties.id ASC" in sql
+        assert "ST_DWithin" not in sql
@@ -6,9 +6,11 @@ import pandas as pd
 from typing import Dict, List, Tuple, Optional, Any
 from abc import ABC, abstractmethod
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.decomposition import NMF, TruncatedSVD
 from scipy.sparse import csr_matrix
 import logging
+import time
+
+from app.algorithms import implicit_als
 
 logger = logging.getLogger(__name__)
 
@@ -35,9 +37,35 @@ class BaseRecommendationAlgorithm(ABC):
     def recommend(self, user_id: str, n_recommendations: int = 10, **kwargs) -> List[Tuple[str, float]]:
         """Generate top-N recommendations for a user."""
         pass
+    
 
 
-class CollaborativeFilteringAlgorithm(BaseRecommendationAlgorithm):
+class ArtifactMixin(ABC):
+    """
+    Artifact protocol of algorithms the model registry can publish and load.
+    
+    Params are JSON-serializable and arrays are plain numeric or string
+    arrays, so restoring a model never executes code from the artifact.
+    Only algorithms implementing this mixin can be registered.
+    """
+    
+    @abstractmethod
+    def get_artifacts(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Export the trained state as (params, arrays) for the model registry."""
+        pass
+    
+    @classmethod
+    @abstractmethod
+    def from_artifacts(cls, params: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> 'ArtifactMixin':
+        """Restore a trained model from get_artifacts() output."""
+        pass
+    
+    def _check_trained(self) -> None:
+        if not self.is_trained:
+            raise ValueError("Model must be trained before export")
+
+
+class CollaborativeFilteringAlgorithm(ArtifactMixin, BaseRecommendationAlgorithm):
     """User-based collaborative filtering algorithm."""
     
     def __init__(self, n_neighbors: int = 50, min_interactions: int = 5):
@@ -175,9 +203,33 @@ class CollaborativeFilteringAlgorithm(BaseRecommendationAlgorithm):
         recommendations = sorted(predictions.items(), key=lambda x: x[1], reverse=True)
         
         return recommendations[:n_recommendations]
+    
+    def get_artifacts(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Export the rating matrix and user similarities."""
+        self._check_trained()
+        params = {'n_neighbors': self.n_neighbors, 'min_interactions': self.min_interactions}
+        arrays = {
+            'user_ids': np.asarray(self.user_ids, dtype=str),
+            'item_ids': np.asarray(self.item_ids, dtype=str),
+            'ratings': self.user_item_matrix.to_numpy(dtype=np.float32),
+            'user_similarity': np.asarray(self.user_similarity_matrix, dtype=np.float32)
+        }
+        return params, arrays
+    
+    @classmethod
+    def from_artifacts(cls, params: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> 'CollaborativeFilteringAlgorithm':
+        """Restore a trained collaborative filtering model."""
+        model = cls(n_neighbors=params['n_neighbors'], min_interactions=params['min_interactions'])
+        model.user_ids = arrays['user_ids'].tolist()
+        model.item_ids = arrays['item_ids'].tolist()
+        model.user_item_matrix = pd.DataFrame(arrays['ratings'], index=model.user_ids, columns=model.item_ids)
+        model.user_means = model.user_item_matrix.mean(axis=1)
+        model.user_similarity_matrix = arrays['user_similarity']
+        model.is_trained = True
+        return model
 
 
-class ContentBasedAlgorithm(BaseRecommendationAlgorithm):
+class ContentBasedAlgorithm(ArtifactMixin, BaseRecommendationAlgorithm):
     """Content-based filtering algorithm."""
     
     def __init__(self, feature_weights: Optional[Dict[str, float]] = None):
@@ -275,118 +327,320 @@ class ContentBasedAlgorithm(BaseRecommendationAlgorithm):
         recommendations = sorted(predictions.items(), key=lambda x: x[1], reverse=True)
         
         return recommendations[:n_recommendations]
+    
+    def get_artifacts(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Export item features and user profiles."""
+        self._check_trained()
+        profile_user_ids = list(self.user_profiles)
+        params = {'feature_weights': self.feature_weights}
+        arrays = {
+            'item_ids': np.asarray(self.item_features.index, dtype=str),
+            'feature_names': np.asarray(self.feature_names, dtype=str),
+            'item_features': self.item_features[self.feature_names].to_numpy(dtype=np.float32),
+            'profile_user_ids': np.asarray(profile_user_ids, dtype=str),
+            'user_profiles': np.asarray([self.user_profiles[user_id] for user_id in profile_user_ids], dtype=np.float32)
+        }
+        return params, arrays
+    
+    @classmethod
+    def from_artifacts(cls, params: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> 'ContentBasedAlgorithm':
+        """Restore a trained content-based model."""
+        model = cls(feature_weights=params['feature_weights'])
+        model.feature_names = arrays['feature_names'].tolist()
+        model.item_features = pd.DataFrame(
+            arrays['item_features'],
+            index=arrays['item_ids'].tolist(),
+            columns=model.feature_names
+        )
+        model.user_profiles = dict(zip(arrays['profile_user_ids'].tolist(), arrays['user_profiles']))
+        model.is_trained = True
+        return model
 
 
-class MatrixFactorizationAlgorithm(BaseRecommendationAlgorithm):
-    """Matrix factorization algorithm using NMF or SVD."""
+class MatrixFactorizationAlgorithm(ArtifactMixin, BaseRecommendationAlgorithm):
+    """Implicit-feedback matrix factorization trained with alternating least squares."""
     
-    def __init__(self, n_factors: int = 50, algorithm: str = "nmf", max_iter: int = 200):
+    def __init__(self, n_factors: int = 50, algorithm: str = "als", max_iter: int = 15,
+                 regularization: float = 0.01, alpha: float = 10.0, cg_steps: int = 3,
+                 random_state: int = 42):
         super().__init__("matrix_factorization")
         self.n_factors = n_factors
         self.algorithm = algorithm
         self.max_iter = max_iter
+        self.regularization = regularization
+        self.alpha = alpha
+        self.cg_steps = cg_steps
+        self.random_state = random_state
         self.user_factors = None
         self.item_factors = None
         self.user_ids = None
         self.item_ids = None
+        # Preference for unknown users and items; unobserved pairs have preference 0
         self.global_mean = None
-        
-    def fit(self, interactions: pd.DataFrame, **kwargs) -> None:
+        self.training_history: List[Dict[str, float]] = []
+    
+    @property
+    def user_ids(self) -> Optional[List[str]]:
+        return self._user_ids
+    
+    @user_ids.setter
+    def user_ids(self, ids: Optional[List[str]]) -> None:
+        self._user_ids = ids
+        self._user_index = {user_id: row for row, user_id in enumerate(ids)} if ids is not None else {}
+    
+    @property
+    def item_ids(self) -> Optional[List[str]]:
+        return self._item_ids
+    
+    @item_ids.setter
+    def item_ids(self, ids: Optional[List[str]]) -> None:
+        self._item_ids = ids
+        self._item_index = {item_id: row for row, item_id in enumerate(ids)} if ids is not None else {}
+    
+    def fit(self, interactions: pd.DataFrame, warm_start: bool = False, **kwargs) -> None:
         """
         Train matrix factorization model.
         
         Args:
-            interactions: DataFrame with columns ['user_id', 'item_id', 'rating']
+            interactions: DataFrame with columns ['user_id', 'item_id'] and
+                optional 'rating'; ratings scale the confidence of a pair
+            warm_start: start from the current factors of users and items
+                the model already knows instead of random ones
+            max_iter: optional override of the number of ALS sweeps
+        """
+        rows, user_ids = pd.factorize(interactions['user_id'].astype(str))
+        cols, item_ids = pd.factorize(interactions['item_id'].astype(str))
+        values = (
+            interactions['rating'].to_numpy(dtype=np.float32) if 'rating' in interactions.columns
+            else np.ones(len(interactions), dtype=np.float32)
+        )
+        matrix = csr_matrix((values, (rows, cols)), shape=(len(user_ids), len(item_ids)), dtype=np.float32)
+        self.fit_matrix(matrix, user_ids, item_ids, warm_start=warm_start, **kwargs)
+    
+    def fit_matrix(self, matrix: csr_matrix, user_ids, item_ids, warm_start: bool = False, **kwargs) -> None:
+        """
+        Train on a sparse user-item matrix of interaction weights.
+        
+        Args:
+            matrix: (n_users, n_items) sparse matrix; duplicate entries add up
+            user_ids: id of every row
+            item_ids: id of every column
+            warm_start: start from the current factors of known ids
+            max_iter: optional override of the number of ALS sweeps
         """
         try:
+            if self.algorithm != "als":
+                raise ValueError(f"Unknown algorithm: {self.algorithm}")
             logger.info(f"Training matrix factorization model with {self.algorithm}...")
-            
-            # Create user-item matrix
-            user_item_matrix = interactions.pivot_table(
-                index='user_id',
-                columns='item_id',
-                values='rating',
-                fill_value=0
+            started = time.perf_counter()
+            
+            user_ids = pd.Index(user_ids).astype(str)
+            item_ids = pd.Index(item_ids).astype(str)
+            coo = matrix.tocoo()
+            confidence = implicit_als.confidence_matrix(coo.row, coo.col, coo.data, matrix.shape, self.alpha)
+            
+            rng = np.random.default_rng(self.random_state)
+            user_factors = implicit_als.init_factors(len(user_ids), self.n_factors, rng)
+            item_factors = implicit_als.init_factors(len(item_ids), self.n_factors, rng)
+            if warm_start and self.is_trained:
+                reused_users = self._copy_known_factors(user_factors, user_ids, self._user_index, self.user_factors)
+                reused_items = self._copy_known_factors(item_factors, item_ids, self._item_index, self.item_factors)
+                logger.info(f"Warm start from {reused_users} user and {reused_items} item factors")
+            
+            self.training_history = self._run_sweeps(
+                confidence, user_factors, item_factors, kwargs.get('max_iter', self.max_iter), started
             )
             
-            self.user_ids = list(user_item_matrix.index)
-            self.item_ids = list(user_item_matrix.columns)
-            self.global_mean = interactions['rating'].mean()
-            
-            # Convert to sparse matrix for efficiency
-            sparse_matrix = csr_matrix(user_item_matrix.values)
-            
-            if self.algorithm == "nmf":
-                # Non-negative Matrix Factorization
-                model = NMF(
-                    n_components=self.n_factors,
-                    max_iter=self.max_iter,
-                    random_state=42
-                )
-                self.user_factors = model.fit_transform(sparse_matrix)
-                self.item_factors = model.components_.T
-                
-            elif self.algorithm == "svd":
-                # Singular Value Decomposition
-                model = TruncatedSVD(
-                    n_components=self.n_factors,
-                    random_state=42
-                )
-                self.user_factors = model.fit_transform(sparse_matrix)
-                self.item_factors = model.components_.T
-                
-            else:
-                raise ValueError(f"Unknown algorithm: {self.algorithm}")
-            
-            self.model = model
+            self.user_ids = user_ids.tolist()
+            self.item_ids = item_ids.tolist()
+            self.user_factors = user_factors
+            self.item_factors = item_factors
+            self.global_mean = 0.0
             self.is_trained = True
-            logger.info("Matrix factorization model trained successfully")
+            logger.info(
+                f"Matrix factorization model trained successfully on {confidence.nnz} interactions "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
             
         except Exception as e:
             logger.error(f"Error training matrix factorization model: {str(e)}")
             raise
     
-    def predict(self, user_id: str, item_ids: List[str], **kwargs) -> Dict[str, float]:
-        """Predict ratings for user-item pairs."""
-        if not self.is_trained:
-            raise ValueError("Model must be trained before prediction")
+    def fold_in(self, interactions: pd.DataFrame) -> Tuple[int, int]:
+        """
+        Add factors for new users and items without retraining.
         
-        predictions = {}
+        New items are solved against the current user factors, then new
+        users against all item factors, each with the other side held
+        fixed. Interactions of users and items the model already knows only
+        inform the new ones; their own factors change at the next fit.
         
-        if user_id not in self.user_ids:
-            # Cold start - return global mean
-            return {item_id: self.global_mean for item_id in item_ids}
+        Returns:
+            Number of users and items added
+        """
+        if not self.is_trained:
+            raise ValueError("Model must be trained before fold-in")
+        
+        frame = pd.DataFrame({
+            'user_id': interactions['user_id'].astype(str).to_numpy(),
+            'item_id': interactions['item_id'].astype(str).to_numpy(),
+            'rating': (
+                interactions['rating'].to_numpy(dtype=np.float32) if 'rating' in interactions.columns
+                else np.ones(len(interactions), dtype=np.float32)
+            )
+        })
+        rng = np.random.default_rng(self.random_state)
+        
+        # Items first, from users the model already knows
+        new_items = pd.unique(frame.loc[~frame['item_id'].isin(self._item_index.keys()), 'item_id'])
+        if len(new_items):
+            known_users = frame[frame['user_id'].isin(self._user_index.keys())]
+            item_factors = self._solve_new_rows(
+                known_users, 'item_id', new_items, 'user_id', self._user_index, self.user_factors, rng
+            )
+            self.item_factors = np.vstack([self.item_factors, item_factors])
+            self.item_ids = list(self.item_ids) + new_items.tolist()
         
-        user_idx = self.user_ids.index(user_id)
-        user_vector = self.user_factors[user_idx]
+        new_users = pd.unique(frame.loc[~frame['user_id'].isin(self._user_index.keys()), 'user_id'])
+        if len(new_users):
+            user_factors = self._solve_new_rows(
+                frame, 'user_id', new_users, 'item_id', self._item_index, self.item_factors, rng
+            )
+            self.user_factors = np.vstack([self.user_factors, user_factors])
+            self.user_ids = list(self.user_ids) + new_users.tolist()
         
-        for item_id in item_ids:
-            if item_id in self.item_ids:
-                item_idx = self.item_ids.index(item_id)
-                item_vector = self.item_factors[item_idx]
-                
-                # Predict rating as dot product of user and item factors
-                predicted_rating = np.dot(user_vector, item_vector)
-                
-                # Ensure rating is in valid range
-                predictions[item_id] = max(0, min(5, predicted_rating))
-            else:
-                predictions[item_id] = self.global_mean
+        logger.info(f"Folded in {len(new_users)} users and {len(new_items)} items")
+        return len(new_users), len(new_items)
+    
+    def predict(self, user_id: str, item_ids: List[str], **kwargs) -> Dict[str, float]:
+        """Predict ratings for user-item pairs on the [1, 5] scale of the other algorithms."""
+        if not self.is_trained:
+            raise ValueError("Model must be trained before prediction")
         
-        return predictions
+        preferences = np.full(len(item_ids), self.global_mean, dtype=np.float64)
+        user_idx = self._user_index.get(user_id)
+        if user_idx is not None:
+            cols = np.fromiter((self._item_index.get(item_id, -1) for item_id in item_ids), dtype=np.int64, count=len(item_ids))
+            known = cols >= 0
+            # Dot products of user and item factors estimate the 0/1 implicit preference
+            preferences[known] = self.item_factors[cols[known]] @ self.user_factors[user_idx]
+        
+        return dict(zip(item_ids, self._preference_to_rating(preferences).tolist()))
     
     def recommend(self, user_id: str, n_recommendations: int = 10, **kwargs) -> List[Tuple[str, float]]:
         """Generate top-N recommendations for a user."""
         if not self.is_trained:
             raise ValueError("Model must be trained before recommendation")
         
-        # Predict ratings for all items
-        predictions = self.predict(user_id, self.item_ids)
+        user_idx = self._user_index.get(user_id)
+        if user_idx is None:
+            rating = float(self._preference_to_rating(self.global_mean))
+            return [(item_id, rating) for item_id in self.item_ids[:n_recommendations]]
         
-        # Sort by predicted rating
-        recommendations = sorted(predictions.items(), key=lambda x: x[1], reverse=True)
+        # Rank by raw preference; only the reported scores are rescaled
+        preferences = self.item_factors @ self.user_factors[user_idx]
+        n = min(n_recommendations, len(preferences))
+        top = np.argpartition(-preferences, n - 1)[:n] if n else np.empty(0, dtype=np.int64)
+        top = top[np.argsort(-preferences[top], kind='stable')]
+        ratings = self._preference_to_rating(preferences[top])
         
-        return recommendations[:n_recommendations]
+        return [(self.item_ids[idx], float(rating)) for idx, rating in zip(top, ratings)]
+    
+    @staticmethod
+    def _preference_to_rating(preferences: np.ndarray) -> np.ndarray:
+        """
+        Map implicit preferences onto the rating scale the engine blends.
+        
+        ALS fits preferences of 0 (no interaction) and 1 (interaction), so
+        estimates are clipped to [0, 1] and scaled to [1, 5] like the
+        content-based similarities.
+        """
+        return 1.0 + 4.0 * np.clip(np.asarray(preferences, dtype=np.float64), 0.0, 1.0)
+    
+    def get_artifacts(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Export user and item factors."""
+        self._check_trained()
+        params = {
+            'n_factors': self.n_factors,
+            'algorithm': self.algorithm,
+            'max_iter': self.max_iter,
+            'regularization': self.regularization,
+            'alpha': self.alpha,
+            'cg_steps': self.cg_steps,
+            'random_state': self.random_state,
+            'global_mean': float(self.global_mean)
+        }
+        arrays = {
+            'user_ids': np.asarray(self.user_ids, dtype=str),
+            'item_ids': np.asarray(self.item_ids, dtype=str),
+            'user_factors': np.asarray(self.user_factors, dtype=np.float32),
+            'item_factors': np.asarray(self.item_factors, dtype=np.float32)
+        }
+        return params, arrays
+    
+    @classmethod
+    def from_artifacts(cls, params: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> 'MatrixFactorizationAlgorithm':
+        """Restore a trained matrix factorization model; factors may be memory-mapped."""
+        hyperparameters = {
+            name: params[name] for name in ('regularization', 'alpha', 'cg_steps', 'random_state')
+            if name in params
+        }
+        model = cls(
+            n_factors=params['n_factors'],
+            algorithm=params['algorithm'],
+            max_iter=params['max_iter'],
+            **hyperparameters
+        )
+        model.user_ids = arrays['user_ids'].tolist()
+        model.item_ids = arrays['item_ids'].tolist()
+        model.user_factors = arrays['user_factors']
+        model.item_factors = arrays['item_factors']
+        model.global_mean = params['global_mean']
+        model.is_trained = True
+        return model
+    
+    def _run_sweeps(self, confidence, user_factors: np.ndarray, item_factors: np.ndarray,
+                    iterations: int, started: float) -> List[Dict[str, float]]:
+        """Alternate user and item solves, recording the loss after each sweep."""
+        confidence_t = confidence.T.tocsr()
+        history = []
+        for iteration in range(iterations):
+            implicit_als.least_squares_cg(confidence, user_factors, item_factors, self.regularization, self.cg_steps)
+            implicit_als.least_squares_cg(confidence_t, item_factors, user_factors, self.regularization, self.cg_steps)
+            loss = implicit_als.implicit_loss(confidence, user_factors, item_factors, self.regularization)
+            history.append({'iteration': iteration + 1, 'loss': loss, 'seconds': time.perf_counter() - started})
+            logger.debug(f"ALS sweep {iteration + 1}/{iterations}: loss {loss:.5f}")
+        return history
+    
+    @staticmethod
+    def _copy_known_factors(factors: np.ndarray, ids: pd.Index, previous_index: Dict[str, int],
+                            previous_factors: np.ndarray) -> int:
+        previous_rows = np.fromiter((previous_index.get(id_, -1) for id_ in ids), dtype=np.int64, count=len(ids))
+        known = previous_rows >= 0
+        if previous_factors.shape[1] == factors.shape[1]:
+            factors[known] = previous_factors[previous_rows[known]]
+            return int(known.sum())
+        return 0
+    
+    def _solve_new_rows(self, frame: pd.DataFrame, row_column: str, new_ids: np.ndarray, other_column: str,
+                        other_index: Dict[str, int], other_factors: np.ndarray,
+                        rng: np.random.Generator) -> np.ndarray:
+        """Factors for new_ids from their interactions with known rows of the other side."""
+        frame = frame[frame[row_column].isin(set(new_ids.tolist()))]
+        rows = pd.Index(new_ids).get_indexer(frame[row_column])
+        cols = np.fromiter((other_index.get(id_, -1) for id_ in frame[other_column]), dtype=np.int64, count=len(frame))
+        known = cols >= 0
+        confidence = implicit_als.confidence_matrix(
+            rows[known], cols[known], frame['rating'].to_numpy()[known],
+            (len(new_ids), len(other_factors)), self.alpha
+        )
+        factors = implicit_als.init_factors(len(new_ids), self.n_factors, rng)
+        # One exact-enough solve: a CG step per factor dimension
+        implicit_als.least_squares_cg(
+            confidence, factors, np.asarray(other_factors, dtype=np.float32), self.regularization,
+            cg_steps=max(self.cg_steps, self.n_factors)
+        )
+        return factors
 
 
 class HybridRecommendationAlgorithm(BaseRecommendationAlgorithm):
@@ -475,7 +729,7 @@ class HybridRecommendationAlgorithm(BaseRecommendationAlgorithm):
         return final_recommendations[:n_recommendations]
 
 
-class PopularityBasedAlgorithm(BaseRecommendationAlgorithm):
+class PopularityBasedAlgorithm(ArtifactMixin, BaseRecommendationAlgorithm):
     """Simple popularity-based recommendation algorithm."""
     
     def __init__(self, time_decay: float = 0.95):
@@ -537,4 +791,22 @@ class PopularityBasedAlgorithm(BaseRecommendationAlgorithm):
             raise ValueError("Model must be trained before recommendation")
         
         top_items = self.item_popularity.head(n_recommendations)
-        return [(item_id, score) for item_id, score in top_items.items()]
\ No newline at end of file
+        return [(item_id, score) for item_id, score in top_items.items()]
+    
+    def get_artifacts(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Export popularity scores."""
+        self._check_trained()
+        params = {'time_decay': self.time_decay}
+        arrays = {
+            'item_ids': np.asarray(self.item_popularity.index, dtype=str),
+            'scores': self.item_popularity.to_numpy(dtype=np.float64)
+        }
+        return params, arrays
+    
+    @classmethod
+    def from_artifacts(cls, params: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> 'PopularityBasedAlgorithm':
+        """Restore a trained popularity model."""
+        model = cls(time_decay=params['time_decay'])
+        model.item_popularity = pd.Series(arrays['scores'], index=arrays['item_ids'].tolist())
+        model.is_trained = True
+        return model
\ No newline at end of file
@@ -0,0 +1,587 @@
+"""
+Candidate generation for the real-time recommendation engine.
+
+Per-user candidate pools are built offline from three sources: item
+co-visitation, popularity in the regions a user travels to, and content
+similarity. They are stored as flat arrays in CSR layout (one offsets array
+and one item index array shared by all users). Looking up a user's
+candidates is an array slice plus a type/region mask, so the algorithms
+score a few hundred likely items instead of the whole catalogue.
+
+The pools also carry per-item attribute arrays (category, location cell,
+price band, tags and optional content vectors) so the re-ranking stage can
+work on arrays indexed by catalogue position instead of parsing item ids.
+"""
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+# Bit flags recording which sources proposed a candidate
+SOURCE_COVISITATION = 1
+SOURCE_REGIONAL_POPULARITY = 2
+SOURCE_CONTENT_SIMILARITY = 4
+SOURCE_POPULARITY_FALLBACK = 8
+
+# Price bands, cheapest first; names match BudgetRange
+PRICE_BANDS = ('budget', 'mid_range', 'luxury', 'ultra_luxury')
+# Price percentile (within an item type) at which each band after the first starts
+PRICE_BAND_PERCENTILES = (0.4, 0.8, 0.95)
+# Location cells are squares of this many degrees (about 5 km at the equator)
+CELL_DEGREES = 0.05
+# Tags are stored as a uint32 bitmask over the most common tags
+MAX_TAGS = 32
+
+
+def top_per_row(rows: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores of every row, ordered by row then score."""
+    order = np.lexsort((-scores, rows))
+    sorted_rows = rows[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_rows, sorted_rows, side='left')
+    return order[rank < k]
+
+
+def _normalize_by_row_max(rows: np.ndarray, scores: np.ndarray, n_rows: int) -> np.ndarray:
+    row_max = np.zeros(n_rows, dtype=np.float32)
+    np.maximum.at(row_max, rows, scores)
+    return scores / np.maximum(row_max[rows], 1e-9)
+
+
+def _tag_lists(values: pd.Series) -> List[List[str]]:
+    """Normalize a tags column of lists or comma-separated strings."""
+    tags = []
+    for value in values.tolist():
+        if isinstance(value, str):
+            value = value.split(',')
+        elif not isinstance(value, (list, tuple, set, np.ndarray)):
+            value = []
+        tags.append([str(tag).strip().lower() for tag in value if str(tag).strip()])
+    return tags
+
+
+@dataclass
+class ItemAttributes:
+    """Re-ranking attributes of every catalogue item, indexed by catalogue position."""
+    categories: np.ndarray  # int16 codes into category_names
+    category_names: np.ndarray
+    cell_rows: np.ndarray  # int16 latitude cell, -1 when the item has no coordinates
+    cell_cols: np.ndarray  # int16 longitude cell, -1 when the item has no coordinates
+    price_bands: np.ndarray  # int8 index into PRICE_BANDS, -1 when unknown
+    tags: np.ndarray  # uint32 bitmask over tag_names
+    tag_names: np.ndarray
+    vectors: Optional[np.ndarray] = None  # unit-norm float16 content vectors
+    cell_degrees: float = CELL_DEGREES
+
+    PREFIX = 'attr_'
+
+    @classmethod
+    def from_frame(cls, items: pd.DataFrame, vectors: Optional[np.ndarray] = None,
+                   cell_degrees: float = CELL_DEGREES) -> 'ItemAttributes':
+        """
+        Extract attributes from an item catalogue.
+
+        Uses the optional columns 'category' (defaults to 'item_type'),
+        'latitude'/'longitude', 'price_band' or 'price' (banded by percentile
+        within the item type) and 'tags' (lists or comma-separated strings).
+        """
+        n_items = len(items)
+        category_column = 'category' if 'category' in items.columns else 'item_type'
+        categories, category_names = pd.factorize(items[category_column].astype(str).str.lower())
+
+        cell_rows = np.full(n_items, -1, dtype=np.int16)
+        cell_cols = np.full(n_items, -1, dtype=np.int16)
+        if 'latitude' in items.columns and 'longitude' in items.columns:
+            latitude = pd.to_numeric(items['latitude'], errors='coerce').to_numpy(dtype=np.float64)
+            longitude = pd.to_numeric(items['longitude'], errors='coerce').to_numpy(dtype=np.float64)
+            located = np.isfinite(latitude) & np.isfinite(longitude)
+            rows, cols = cls.cell_of(latitude[located], longitude[located], cell_degrees)
+            cell_rows[located], cell_cols[located] = rows, cols
+
+        price_bands = np.full(n_items, -1, dtype=np.int8)
+        if 'price_band' in items.columns:
+            band_codes = {name: code for code, name in enumerate(PRICE_BANDS)}
+            price_bands[:] = items['price_band'].astype(str).str.lower().map(band_codes).fillna(-1).to_numpy()
+        elif 'price' in items.columns:
+            price = pd.to_numeric(items['price'], errors='coerce')
+            percentile = price.groupby(items['item_type'].astype(str)).rank(pct=True).to_numpy()
+            priced = np.isfinite(percentile)
+            price_bands[priced] = np.searchsorted(PRICE_BAND_PERCENTILES, percentile[priced], side='right')
+
+        tags = np.zeros(n_items, dtype=np.uint32)
+        tag_names: List[str] = []
+        if 'tags' in items.columns:
+            tag_lists = _tag_lists(items['tags'])
+            counts = pd.Series([tag for item_tags in tag_lists for tag in item_tags], dtype=object).value_counts()
+            tag_names = counts.index[:MAX_TAGS].tolist()
+            tag_bits = {tag: np.uint32(1 << bit) for bit, tag in enumerate(tag_names)}
+            for row, item_tags in enumerate(tag_lists):
+                for tag in item_tags:
+                    tags[row] |= tag_bits.get(tag, np.uint32(0))
+
+        if vectors is not None:
+            vectors = np.asarray(vectors, dtype=np.float32)
+            if vectors.shape[0] != n_items:
+                raise ValueError(f"Expected {n_items} item vectors, got {vectors.shape[0]}")
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+            vectors = vectors.astype(np.float16)
+
+        return cls(
+            categories=categories.astype(np.int16),
+            category_names=np.asarray(category_names, dtype=str),
+            cell_rows=cell_rows,
+            cell_cols=cell_cols,
+            price_bands=price_bands,
+            tags=tags,
+            tag_names=np.asarray(tag_names, dtype=str),
+            vectors=vectors,
+            cell_degrees=cell_degrees,
+        )
+
+    @staticmethod
+    def cell_of(latitude, longitude, cell_degrees: float = CELL_DEGREES) -> Tuple[np.ndarray, np.ndarray]:
+        """Location cell (row, column) of coordinates."""
+        rows = np.floor((np.asarray(latitude) + 90.0) / cell_degrees).astype(np.int16)
+        cols = np.floor((np.asarray(longitude) + 180.0) / cell_degrees).astype(np.int16)
+        return rows, cols
+
+    def tag_mask(self, item_index: np.ndarray, names) -> np.ndarray:
+        """Items carrying any of the named tags; tags the catalogue lacks match nothing."""
+        known = self.tag_names.tolist()
+        bits = 0
+        for name in names:
+            if name in known:
+                bits |= 1 << known.index(name)
+        return (self.tags[item_index] & np.uint32(bits)) != 0
+
+    def price_band_mask(self, item_index: np.ndarray, bands) -> np.ndarray:
+        """Items in any of the named price bands."""
+        codes = [PRICE_BANDS.index(band) for band in bands]
+        return np.isin(self.price_bands[item_index], codes)
+
+    def near_mask(self, item_index: np.ndarray, latitude: float, longitude: float, radius_cells: int = 1) -> np.ndarray:
+        """Items within radius_cells location cells of a point."""
+        row, col = self.cell_of(latitude, longitude, self.cell_degrees)
+        rows, cols = self.cell_rows[item_index], self.cell_cols[item_index]
+        return (
+            (rows >= 0)
+            & (np.abs(rows.astype(np.int32) - int(row)) <= radius_cells)
+            & (np.abs(cols.astype(np.int32) - int(col)) <= radius_cells)
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {
+            'categories': self.categories,
+            'category_names': self.category_names,
+            'cell_rows': self.cell_rows,
+            'cell_cols': self.cell_cols,
+            'price_bands': self.price_bands,
+            'tags': self.tags,
+            'tag_names': self.tag_names,
+            'cell_degrees': np.asarray(self.cell_degrees),
+        }
+        if self.vectors is not None:
+            arrays['vectors'] = self.vectors
+        return {self.PREFIX + name: array for name, array in arrays.items()}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> Optional['ItemAttributes']:
+        """Attributes stored by to_arrays(), or None for pools built without them."""
+        if cls.PREFIX + 'categories' not in arrays:
+            return None
+        fields = {name[len(cls.PREFIX):]: array for name, array in arrays.items() if name.startswith(cls.PREFIX)}
+        fields['cell_degrees'] = float(fields['cell_degrees'])
+        return cls(**fields)
+
+
+@dataclass
+class CandidateSet:
+    """Candidates for one request; all fields are aligned by position."""
+    item_ids: List[str]
+    item_index: np.ndarray
+    prior_scores: np.ndarray
+    sources: np.ndarray
+    # Attributes of the catalogue item_index points into, if the pools carry them
+    attributes: Optional[ItemAttributes] = None
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+
+class CandidatePools:
+    """Precomputed per-user candidate pools with popularity fallbacks."""
+
+    ARRAYS = (
+        'item_ids', 'item_types', 'item_regions', 'type_names', 'region_names',
+        'popularity', 'popular_items', 'user_ids', 'offsets', 'items', 'priors',
+        'sources', 'built_at'
+    )
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.item_ids = arrays['item_ids']
+        self.item_types = arrays['item_types']
+        self.item_regions = arrays['item_regions']
+        self.popularity = arrays['popularity']
+        self.popular_items = arrays['popular_items']
+        self.user_ids = arrays['user_ids']
+        self.offsets = arrays['offsets']
+        self.items = arrays['items']
+        self.priors = arrays['priors']
+        self.sources = arrays['sources']
+        self.built_at = float(arrays['built_at'])
+        self.attributes = ItemAttributes.from_arrays(arrays)
+
+        self._user_rows = {user_id: row for row, user_id in enumerate(self.user_ids.tolist())}
+        self._type_codes = {name.lower(): code for code, name in enumerate(arrays['type_names'].tolist())}
+        self._region_codes = {name.lower(): code for code, name in enumerate(arrays['region_names'].tolist())}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def candidates_for(
+        self,
+        user_id: str,
+        item_type: Optional[str] = None,
+        region: Optional[str] = None,
+        limit: int = 500,
+        min_candidates: int = 50,
+        fallback_weight: float = 0.2,
+    ) -> CandidateSet:
+        """
+        Get up to `limit` candidates for a user, best prior score first.
+
+        Unknown users and pools thinned out by the filters are topped up
+        with the most popular items matching the same filters. A region the
+        catalogue does not know is ignored rather than matching nothing.
+        """
+        row = self._user_rows.get(user_id)
+        if row is not None:
+            start, end = self.offsets[row], self.offsets[row + 1]
+            items = self.items[start:end]
+            priors = self.priors[start:end]
+            sources = self.sources[start:end]
+        else:
+            items = np.empty(0, dtype=np.int32)
+            priors = np.empty(0, dtype=np.float16)
+            sources = np.empty(0, dtype=np.uint8)
+
+        type_code, region_code = self._filter_codes(item_type, region)
+        if type_code is not None or region_code is not None:
+            mask = self._attribute_mask(items, type_code, region_code)
+            items, priors, sources = items[mask], priors[mask], sources[mask]
+
+        items, priors, sources = items[:limit], priors[:limit], sources[:limit]
+        wanted = min(min_candidates, limit) - len(items)
+        if wanted > 0 and type_code != -1:
+            fill = self._popular_items(type_code, region_code, exclude=items, count=wanted)
+            items = np.concatenate([items, fill])
+            priors = np.concatenate([priors.astype(np.float32), fallback_weight * self.popularity[fill]])
+            sources = np.concatenate([sources, np.full(len(fill), SOURCE_POPULARITY_FALLBACK, dtype=np.uint8)])
+
+        return CandidateSet(
+            item_ids=self.item_ids[items].tolist(),
+            item_index=items,
+            prior_scores=priors.astype(np.float32),
+            sources=sources,
+            attributes=self.attributes,
+        )
+
+    def _filter_codes(self, item_type: Optional[str], region: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+        type_code = None
+        if item_type is not None:
+            # -1 matches nothing: a type without items has no candidates
+            type_code = self._type_codes.get(str(getattr(item_type, 'value', item_type)).lower(), -1)
+        region_code = self._region_codes.get(region.lower()) if region else None
+        return type_code, region_code
+
+    def _attribute_mask(self, items: np.ndarray, type_code: Optional[int], region_code: Optional[int]) -> np.ndarray:
+        mask = np.ones(len(items), dtype=bool)
+        if type_code is not None:
+            mask &= self.item_types[items] == type_code
+        if region_code is not None:
+            mask &= self.item_regions[items] == region_code
+        return mask
+
+    def _popular_items(self, type_code: Optional[int], region_code: Optional[int],
+                       exclude: np.ndarray, count: int) -> np.ndarray:
+        ranked = self.popular_items
+        if type_code is not None or region_code is not None:
+            ranked = ranked[self._attribute_mask(ranked, type_code, region_code)]
+        if len(exclude):
+            # Excluded items can push at most len(exclude) others out of the head
+            head = ranked[:count + len(exclude)]
+            ranked = head[~np.isin(head, exclude)]
+        return ranked[:count].astype(np.int32, copy=False)
+
+    def save(self, path: str) -> None:
+        """Write the pools as one uncompressed .npz, replacing any previous file atomically."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **self.arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'CandidatePools':
+        """Load pools written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in cls.ARRAYS}
+            arrays.update({name: data[name] for name in data.files if name.startswith(ItemAttributes.PREFIX)})
+            return cls(arrays)
+
+
+class CandidatePoolBuilder:
+    """Offline job building CandidatePools from interaction history."""
+
+    def __init__(
+        self,
+        pool_size: int = 300,
+        recent_items: int = 20,
+        covisitation_neighbors: int = 50,
+        regional_items: int = 100,
+        regions_per_user: int = 2,
+        content_neighbors: int = 100,
+        source_weights: Optional[Dict[str, float]] = None,
+        chunk_size: int = 512,
+    ):
+        self.pool_size = pool_size
+        self.recent_items = recent_items
+        self.covisitation_neighbors = covisitation_neighbors
+        self.regional_items = regional_items
+        self.regions_per_user = regions_per_user
+        self.content_neighbors = content_neighbors
+        self.source_weights = source_weights or {
+            'covisitation': 0.5,
+            'content_similarity': 0.3,
+            'regional_popularity': 0.2
+        }
+        self.chunk_size = chunk_size
+
+    def build(self, interactions: pd.DataFrame, items: pd.DataFrame,
+              item_vectors: Optional[np.ndarray] = None) -> CandidatePools:
+        """
+        Build candidate pools.
+
+        Args:
+            interactions: DataFrame with columns ['user_id', 'item_id'] and
+                optional 'rating' and 'timestamp'
+            items: DataFrame with columns ['item_id', 'item_type', 'region']
+                and the optional re-ranking attributes read by
+                ItemAttributes.from_frame()
+            item_vectors: optional content features, one row per row of items
+        """
+        started = time.perf_counter()
+
+        item_ids = items['item_id'].astype(str).to_numpy()
+        item_types, type_names = pd.factorize(items['item_type'].astype(str))
+        item_regions, region_names = pd.factorize(items['region'].astype(str))
+        n_items = len(item_ids)
+
+        cols = pd.Index(item_ids).get_indexer(interactions['item_id'].astype(str))
+        known = cols >= 0
+        if not known.all():
+            logger.warning(f"Ignoring {int((~known).sum())} interactions with items missing from the catalogue")
+        frame = interactions.loc[known]
+        cols = cols[known]
+        rows, user_ids = pd.factorize(frame['user_id'].astype(str))
+        n_users = len(user_ids)
+
+        weights = (
+            frame['rating'].to_numpy(dtype=np.float32) if 'rating' in frame.columns
+            else np.ones(len(frame), dtype=np.float32)
+        )
+        history = sparse.csr_matrix((weights, (rows, cols)), shape=(n_users, n_items), dtype=np.float32)
+        history.sum_duplicates()
+        seen = history.copy()
+        seen.data[:] = 1.0
+
+        user_counts = np.asarray(seen.sum(axis=0)).ravel()
+        popularity = np.log1p(user_counts).astype(np.float32)
+        popularity /= max(float(popularity.max()), 1e-9)
+        popular_items = np.argsort(-popularity, kind='stable').astype(np.int32)
+
+        recent = self._recent_items(frame, rows, cols, n_users, n_items)
+        covisitation = self._covisitation(recent)
+        regional_lists = self._regional_lists(popular_items, item_regions, len(region_names))
+        user_regions = self._user_regions(seen, item_regions, len(region_names))
+        vectors = self._normalized_vectors(item_vectors, n_items)
+
+        pool_counts = np.zeros(n_users, dtype=np.int64)
+        pool_items, pool_priors, pool_sources = [], [], []
+        for chunk_start in range(0, n_users, self.chunk_size):
+            chunk = slice(chunk_start, min(chunk_start + self.chunk_size, n_users))
+            chunk_rows, chunk_items, priors, sources = self._chunk_pools(
+                chunk, n_items, history, seen, recent, covisitation, user_regions, regional_lists, popularity, vectors
+            )
+            pool_counts[chunk_start:chunk.stop] = np.bincount(chunk_rows, minlength=chunk.stop - chunk_start)
+            pool_items.append(chunk_items)
+            pool_priors.append(priors)
+            pool_sources.append(sources)
+
+        offsets = np.zeros(n_users + 1, dtype=np.int64)
+        np.cumsum(pool_counts, out=offsets[1:])
+
+        pools = CandidatePools({
+            'item_ids': item_ids.astype(str),
+            'item_types': item_types.astype(np.int16),
+            'item_regions': item_regions.astype(np.int32),
+            'type_names': np.asarray(type_names, dtype=str),
+            'region_names': np.asarray(region_names, dtype=str),
+            'popularity': popularity,
+            'popular_items': popular_items,
+            'user_ids': np.asarray(user_ids, dtype=str),
+            'offsets': offsets,
+            'items': np.concatenate(pool_items) if pool_items else np.empty(0, dtype=np.int32),
+            # Priors only order candidates, so half precision is plenty
+            'priors': (np.concatenate(pool_priors) if pool_priors else np.empty(0)).astype(np.float16),
+            'sources': np.concatenate(pool_sources) if pool_sources else np.empty(0, dtype=np.uint8),
+            'built_at': np.asarray(time.time()),
+            **ItemAttributes.from_frame(items, vectors).to_arrays(),
+        })
+        logger.info(
+            f"Built candidate pools for {n_users} users over {n_items} items in "
+            f"{time.perf_counter() - started:.1f}s ({pools.nbytes / 1e6:.1f} MB)"
+        )
+        return pools
+
+    def _recent_items(self, frame: pd.DataFrame, rows: np.ndarray, cols: np.ndarray,
+                      n_users: int, n_items: int) -> sparse.csr_matrix:
+        """Binary matrix of each user's latest distinct items, which seed co-visitation."""
+        recent = pd.DataFrame({'row': rows, 'col': cols})
+        if 'timestamp' in frame.columns:
+            recent['timestamp'] = pd.to_datetime(frame['timestamp']).to_numpy()
+            recent = recent.sort_values('timestamp', kind='stable')
+        recent = recent.drop_duplicates(['row', 'col'], keep='last')
+        latest_first = recent.groupby('row').cumcount(ascending=False)
+        recent = recent[latest_first.to_numpy() < self.recent_items]
+        return sparse.csr_matrix(
+            (np.ones(len(recent), dtype=np.float32), (recent['row'].to_numpy(), recent['col'].to_numpy())),
+            shape=(n_users, n_items)
+        )
+
+    def _covisitation(self, recent: sparse.csr_matrix) -> sparse.csr_matrix:
+        """Item-item cosine co-visitation, pruned to the strongest neighbours per item."""
+        counts = (recent.T @ recent).tocoo()
+        item_users = np.asarray(recent.sum(axis=0)).ravel()
+        off_diagonal = counts.row != counts.col
+        rows, cols = counts.row[off_diagonal], counts.col[off_diagonal]
+        scores = counts.data[off_diagonal] / np.sqrt(item_users[rows] * item_users[cols])
+        keep = top_per_row(rows, scores, self.covisitation_neighbors)
+        return sparse.csr_matrix(
+            (scores[keep].astype(np.float32), (rows[keep], cols[keep])),
+            shape=counts.shape
+        )
+
+    @staticmethod
+    def _regional_lists(popular_items: np.ndarray, item_regions: np.ndarray, n_regions: int) -> List[np.ndarray]:
+        by_region = item_regions[popular_items]
+        return [popular_items[by_region == region] for region in range(n_regions)]
+
+    def _user_regions(self, seen: sparse.csr_matrix, item_regions: np.ndarray, n_regions: int) -> np.ndarray:
+        """Each user's most visited regions as an (n_users, regions_per_user) array, -1 padded."""
+        n_items = len(item_regions)
+        region_matrix = sparse.csr_matrix(
+            (np.ones(n_items, dtype=np.float32), (np.arange(n_items), item_regions)),
+            shape=(n_items, n_regions)
+        )
+        visits = (seen @ region_matrix).tocoo()
+        keep = top_per_row(visits.row, visits.data, self.regions_per_user)
+        rows, regions = visits.row[keep], visits.col[keep]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side='left')
+        user_regions = np.full((seen.shape[0], self.regions_per_user), -1, dtype=np.int32)
+        user_regions[rows, rank] = regions
+        return user_regions
+
+    @staticmethod
+    def _normalized_vectors(item_vectors: Optional[np.ndarray], n_items: int) -> Optional[np.ndarray]:
+        if item_vectors is None:
+            return None
+        vectors = np.asarray(item_vectors, dtype=np.float32)
+        if vectors.shape[0] != n_items:
+            raise ValueError(f"Expected {n_items} item vectors, got {vectors.shape[0]}")
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+    def _chunk_pools(self, chunk: slice, n_items: int, history: sparse.csr_matrix,
+                     seen: sparse.csr_matrix, recent: sparse.csr_matrix,
+                     covisitation: sparse.csr_matrix, user_regions: np.ndarray,
+                     regional_lists: List[np.ndarray], popularity: np.ndarray,
+                     vectors: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        n_rows = chunk.stop - chunk.start
+        parts: List[Tuple[np.ndarray, np.ndarray, np.ndarray, int]] = []
+
+        # Co-visitation: items seen together with the user's recent items
+        covisited = (recent[chunk] @ covisitation).tocoo()
+        if covisited.nnz:
+            keep = top_per_row(covisited.row, covisited.data, self.pool_size)
+            rows, cols = covisited.row[keep], covisited.col[keep]
+            scores = _normalize_by_row_max(rows, covisited.data[keep], n_rows)
+            parts.append((rows, cols, self.source_weights['covisitation'] * scores, SOURCE_COVISITATION))
+
+        # Regional popularity: top items of the regions the user visits most
+        regions = user_regions[chunk]
+        for slot in range(regions.shape[1]):
+            for region in np.unique(regions[:, slot]):
+                if region < 0:
+                    continue
+                users = np.flatnonzero(regions[:, slot] == region)
+                region_items = regional_lists[region][:self.regional_items]
+                rows = np.repeat(users, len(region_items))
+                cols = np.tile(region_items, len(users))
+                scores = self.source_weights['regional_popularity'] * popularity[cols]
+                parts.append((rows, cols, scores, SOURCE_REGIONAL_POPULARITY))
+
+        # Content similarity to the user's rating-weighted profile
+        if vectors is not None:
+            profiles = np.asarray(history[chunk] @ vectors)
+            profiles /= np.maximum(np.linalg.norm(profiles, axis=1, keepdims=True), 1e-9)
+            similarities = profiles @ vectors.T
+            k = min(self.content_neighbors, n_items)
+            cols = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            rows = np.repeat(np.arange(n_rows), k)
+            cols = cols.ravel()
+            scores = np.clip(similarities[rows, cols], 0, None)
+            positive = scores > 0
+            rows, cols, scores = rows[positive], cols[positive], scores[positive]
+            scores = _normalize_by_row_max(rows, scores, n_rows)
+            parts.append((rows, cols, self.source_weights['content_similarity'] * scores, SOURCE_CONTENT_SIMILARITY))
+
+        if not parts:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty.astype(np.int32), empty.astype(np.float32), empty.astype(np.uint8)
+
+        rows = np.concatenate([part[0] for part in parts]).astype(np.int64)
+        cols = np.concatenate([part[1] for part in parts]).astype(np.int64)
+        scores = np.concatenate([part[2] for part in parts]).astype(np.float32)
+        bits = np.concatenate([np.full(len(part[0]), part[3], dtype=np.uint8) for part in parts])
+
+        # Merge duplicates proposed by several sources: scores add up, flags OR together
+        keys = rows * n_items + cols
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        keys = keys[starts]
+        scores = np.add.reduceat(scores[order], starts)
+        bits = np.bitwise_or.reduceat(bits[order], starts)
+
+        # Never propose what the user already interacted with
+        seen_chunk = seen[chunk]
+        seen_rows = np.repeat(np.arange(n_rows), np.diff(seen_chunk.indptr))
+        fresh = ~np.isin(keys, seen_rows * n_items + seen_chunk.indices)
+        keys, scores, bits = keys[fresh], scores[fresh], bits[fresh]
+
+        rows, cols = keys // n_items, keys % n_items
+        keep = top_per_row(rows, scores, self.pool_size)
+        return rows[keep], cols[keep].astype(np.int32), scores[keep], bits[keep]
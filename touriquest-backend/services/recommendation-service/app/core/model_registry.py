@@ -0,0 +1,270 @@
+"""
+Versioned in-memory model registry with hot reload.
+
+Trained models are published as version directories:
+
+    <model_root>/<model_type>/<version>/manifest.json
+    <model_root>/<model_type>/<version>/<array>.npy
+
+publish_model() writes a version into a hidden staging directory and renames
+it into place, so a version directory is either complete or absent. Models
+are restored from JSON params and .npy arrays for a fixed set of algorithm
+classes, never from pickle, and large arrays are memory-mapped.
+
+refresh() loads any version newer than the live one in a worker thread, runs
+a warm-up prediction and only then swaps it in with a single dict
+assignment. Requests already holding the previous model finish on it.
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Type
+
+import numpy as np
+
+from app.algorithms.ml_algorithms import (
+    ArtifactMixin,
+    CollaborativeFilteringAlgorithm,
+    ContentBasedAlgorithm,
+    MatrixFactorizationAlgorithm,
+    PopularityBasedAlgorithm
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+# Only registered classes can be restored; the manifest names one, it never carries code
+ALGORITHMS: Dict[str, Type[ArtifactMixin]] = {}
+
+
+def register_algorithm(algorithm_cls: Type[ArtifactMixin]) -> Type[ArtifactMixin]:
+    """Allow a class implementing the artifact protocol to be published and loaded."""
+    if not (isinstance(algorithm_cls, type) and issubclass(algorithm_cls, ArtifactMixin)):
+        raise TypeError(f"{algorithm_cls!r} does not implement the model artifact protocol")
+    ALGORITHMS[algorithm_cls.__name__] = algorithm_cls
+    return algorithm_cls
+
+
+for _algorithm_cls in (
+    CollaborativeFilteringAlgorithm,
+    ContentBasedAlgorithm,
+    MatrixFactorizationAlgorithm,
+    PopularityBasedAlgorithm
+):
+    register_algorithm(_algorithm_cls)
+
+
+@dataclass
+class ModelVersion:
+    """A loaded and warmed-up model version."""
+    model_type: str
+    version: str
+    path: str
+    algorithm: str
+    model: Any
+    loaded_at: datetime
+    load_seconds: float
+    warmup_ms: float
+    memory_bytes: int  # arrays read into process memory
+    mapped_bytes: int  # arrays memory-mapped from disk
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'algorithm': self.algorithm,
+            'model_path': self.path,
+            'loaded_at': self.loaded_at,
+            'load_seconds': round(self.load_seconds, 3),
+            'warmup_ms': round(self.warmup_ms, 2),
+            'memory_bytes': self.memory_bytes,
+            'mapped_bytes': self.mapped_bytes,
+            'is_ready': True
+        }
+
+
+def new_version() -> str:
+    """Version name that sorts chronologically."""
+    return datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+
+
+def publish_model(model: ArtifactMixin, model_root: str, model_type: str,
+                  version: Optional[str] = None) -> str:
+    """Write a trained model as a new version directory and return its path."""
+    if ALGORITHMS.get(type(model).__name__) is not type(model):
+        raise TypeError(f"{type(model).__name__} is not a registered model algorithm")
+    params, arrays = model.get_artifacts()
+    version = version or new_version()
+    type_dir = os.path.join(model_root, model_type)
+    os.makedirs(type_dir, exist_ok=True)
+
+    final_path = os.path.join(type_dir, version)
+    if os.path.exists(final_path):
+        raise ValueError(f"Model version {model_type}/{version} already exists")
+
+    staging_path = os.path.join(type_dir, f".{version}.tmp")
+    shutil.rmtree(staging_path, ignore_errors=True)
+    os.makedirs(staging_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(staging_path, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+
+    manifest = {
+        'model_type': model_type,
+        'version': version,
+        'algorithm': type(model).__name__,
+        'params': params,
+        'arrays': sorted(arrays),
+        'created_at': datetime.utcnow().isoformat()
+    }
+    with open(os.path.join(staging_path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Renaming the directory is atomic, so pollers never see a partial version
+    os.replace(staging_path, final_path)
+    logger.info(f"Published model {model_type} version {version}")
+    return final_path
+
+
+class ModelRegistry:
+    """Live model versions, refreshed from published artifacts."""
+
+    def __init__(
+        self,
+        model_root: str = "models",
+        mmap_threshold_bytes: int = 64 * 1024 * 1024,
+        warmup_items: int = 100,
+    ):
+        self.model_root = model_root
+        self.mmap_threshold_bytes = mmap_threshold_bytes
+        self.warmup_items = warmup_items
+        # model_type -> model; request paths read a model once and keep that version
+        self.models: Dict[str, Any] = {}
+        self.versions: Dict[str, ModelVersion] = {}
+        # Versions that failed to load or warm up are not retried
+        self.rejected_versions: Dict[str, str] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+        self._refresh_lock = asyncio.Lock()
+
+    def available_versions(self) -> Dict[str, str]:
+        """Latest complete published version of each model type."""
+        latest: Dict[str, str] = {}
+        if not os.path.isdir(self.model_root):
+            return latest
+
+        for type_entry in os.scandir(self.model_root):
+            if not type_entry.is_dir() or type_entry.name.startswith('.'):
+                continue
+            versions = [
+                entry.name for entry in os.scandir(type_entry.path)
+                if entry.is_dir() and not entry.name.startswith('.')
+                and os.path.exists(os.path.join(entry.path, MANIFEST_FILE))
+            ]
+            if versions:
+                latest[type_entry.name] = max(versions)
+        return latest
+
+    async def refresh(self) -> List[str]:
+        """Load and swap in every published version newer than the live one."""
+        async with self._refresh_lock:
+            loop = asyncio.get_running_loop()
+            available = await loop.run_in_executor(self._executor, self.available_versions)
+
+            swapped = []
+            for model_type, version in sorted(available.items()):
+                live = self.versions.get(model_type)
+                if (live and live.version >= version) or self.rejected_versions.get(model_type) == version:
+                    continue
+
+                path = os.path.join(self.model_root, model_type, version)
+                try:
+                    loaded = await loop.run_in_executor(self._executor, self.load_version, model_type, path)
+                except Exception as e:
+                    self.rejected_versions[model_type] = version
+                    logger.error(f"Error loading model {model_type} version {version}: {str(e)}")
+                    continue
+
+                self.activate(loaded)
+                swapped.append(model_type)
+            return swapped
+
+    def load_version(self, model_type: str, path: str) -> ModelVersion:
+        """Restore and warm up one version directory (blocking; run it off the event loop)."""
+        started = time.perf_counter()
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+
+        algorithm_cls = ALGORITHMS.get(manifest['algorithm'])
+        if algorithm_cls is None:
+            raise ValueError(f"Unsupported algorithm {manifest['algorithm']!r}")
+
+        arrays: Dict[str, np.ndarray] = {}
+        memory_bytes = mapped_bytes = 0
+        for name in manifest['arrays']:
+            array_path = os.path.join(path, f"{name}.npy")
+            mmap = os.path.getsize(array_path) >= self.mmap_threshold_bytes
+            array = np.load(array_path, mmap_mode='r' if mmap else None, allow_pickle=False)
+            if mmap and array.dtype.kind in 'fiu':
+                mapped_bytes += array.nbytes
+            else:
+                if mmap:
+                    # String arrays become Python lists anyway, so read them outright
+                    array = np.array(array)
+                memory_bytes += array.nbytes
+            arrays[name] = array
+
+        model = algorithm_cls.from_artifacts(manifest['params'], arrays)
+        load_seconds = time.perf_counter() - started
+        warmup_ms = self._warm_up(model, arrays)
+
+        return ModelVersion(
+            model_type=model_type,
+            version=manifest['version'],
+            path=path,
+            algorithm=manifest['algorithm'],
+            model=model,
+            loaded_at=datetime.now(),
+            load_seconds=load_seconds,
+            warmup_ms=warmup_ms,
+            memory_bytes=memory_bytes,
+            mapped_bytes=mapped_bytes
+        )
+
+    def activate(self, loaded: ModelVersion) -> None:
+        """Make a loaded version the live one."""
+        previous = self.versions.get(loaded.model_type)
+        self.models[loaded.model_type] = loaded.model
+        self.versions[loaded.model_type] = loaded
+        logger.info(
+            f"Model {loaded.model_type} serving version {loaded.version} "
+            f"(was {previous.version if previous else 'none'}): loaded in {loaded.load_seconds:.2f}s, "
+            f"{loaded.memory_bytes / 1e6:.1f} MB in memory, {loaded.mapped_bytes / 1e6:.1f} MB mapped, "
+            f"warm-up {loaded.warmup_ms:.1f} ms"
+        )
+
+    def get_model_info(self) -> Dict[str, Dict[str, Any]]:
+        """Version, load time and memory of every live model."""
+        return {model_type: version.info() for model_type, version in self.versions.items()}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def _warm_up(self, model: Any, arrays: Dict[str, np.ndarray]) -> float:
+        """Run one prediction so a version that cannot serve never goes live."""
+        user_ids = arrays.get('user_ids', arrays.get('profile_user_ids'))
+        user_id = str(user_ids[0]) if user_ids is not None and len(user_ids) else "warmup-user"
+        item_ids = arrays['item_ids'][:self.warmup_items].tolist() if 'item_ids' in arrays else []
+
+        started = time.perf_counter()
+        predictions = model.predict(user_id, item_ids)
+        warmup_ms = (time.perf_counter() - started) * 1000
+
+        scores = np.fromiter(predictions.values(), dtype=np.float64, count=len(predictions))
+        if len(predictions) != len(item_ids) or not np.all(np.isfinite(scores)):
+            raise ValueError("Warm-up prediction returned missing or non-finite scores")
+        return warmup_ms
@@ -3,7 +3,7 @@ Real-time recommendation engine with caching and fallback strategies.
 """
 import asyncio
 import json
-import pickle
+import os
 import redis
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
@@ -19,6 +19,9 @@ from app.algorithms.ml_algorithms import (
     HybridRecommendationAlgorithm,
     PopularityBasedAlgorithm
 )
+from app.core.candidate_pools import CandidatePools, CandidateSet
+from app.core.model_registry import ModelRegistry
+from app.core.reranking import Reranker
 from app.features.feature_engineering import FeatureEngineer
 from app.models.schemas import (
     RecommendationRequest,
@@ -78,62 +81,77 @@ class RecommendationCache:
 class ModelManager:
     """Manages trained ML models and their lifecycle."""
     
-    def __init__(self):
-        self.models = {}
-        self.model_metadata = {}
+    def __init__(self, model_root: str = 'models'):
+        self.registry = ModelRegistry(model_root)
+        # Live models by type; a hot swap replaces an entry in place
+        self.models = self.registry.models
         self.feature_engineer = FeatureEngineer()
         self.executor = ThreadPoolExecutor(max_workers=4)
-        
+        self._initialized = False
+    
+    async def initialize(self) -> None:
+        """Load the latest published version of every model."""
+        await self.refresh_models()
+        self._initialized = True
+    
+    def is_initialized(self) -> bool:
+        """Whether the initial model load has run."""
+        return self._initialized
+    
+    async def refresh_models(self) -> List[str]:
+        """Hot-swap models for which a newer version has been published."""
+        return await self.registry.refresh()
+    
     async def load_model(self, model_type: str, model_path: str) -> bool:
-        """Load a trained model from disk."""
+        """Load a published model version directory and make it live."""
         try:
-            with open(model_path, 'rb') as f:
-                model = pickle.load(f)
-            
-            self.models[model_type] = model
-            self.model_metadata[model_type] = {
-                'loaded_at': datetime.now(),
-                'model_path': model_path,
-                'is_ready': True
-            }
-            
-            logger.info(f"Loaded model: {model_type}")
-            return True
-            
+            loop = asyncio.get_running_loop()
+            loaded = await loop.run_in_executor(self.executor, self.registry.load_version, model_type, model_path)
         except Exception as e:
             logger.error(f"Error loading model {model_type}: {str(e)}")
             return False
+        
+        self.registry.activate(loaded)
+        return True
     
     async def predict_batch(self, model_type: str, user_ids: List[str], item_ids: List[str]) -> Dict[str, Dict[str, float]]:
         """Batch prediction for multiple users and items."""
-        if model_type not in self.models:
+        # Read the model once so the whole batch is served by one version
+        model = self.models.get(model_type)
+        if model is None:
             logger.warning(f"Model {model_type} not available")
             return {}
         
-        model = self.models[model_type]
         predictions = {}
         
         try:
             # Run prediction in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            
-            for user_id in user_ids:
-                user_predictions = await loop.run_in_executor(
-                    self.executor,
-                    model.predict,
-                    user_id,
-                    item_ids
-                )
-                predictions[user_id] = user_predictions
+            loop = asyncio.get_running_loop()
+            predictions = await loop.run_in_executor(
+                self.executor,
+                self._predict_users,
+                model,
+                user_ids,
+                item_ids
+            )
                 
         except Exception as e:
             logger.error(f"Batch prediction error: {str(e)}")
         
         return predictions
     
+    @staticmethod
+    def _predict_users(model: Any, user_ids: List[str], item_ids: List[str]) -> Dict[str, Dict[str, float]]:
+        return {user_id: model.predict(user_id, item_ids) for user_id in user_ids}
+    
     def get_model_info(self) -> Dict[str, Dict[str, Any]]:
-        """Get information about loaded models."""
-        return self.model_metadata
+        """Get version, load time and memory of the loaded models."""
+        return self.registry.get_model_info()
+    
+    def close(self) -> None:
+        """Release the prediction and loader threads."""
+        self.registry.close()
+        self.executor.shutdown(wait=False)
 
 
 class FallbackRecommendationEngine:
@@ -209,26 +227,82 @@ class RealtimeRecommendationEngine:
             'popularity': 0.1
         }
         self.min_confidence_threshold = 0.3
+        self.candidate_pools: Optional[CandidatePools] = None
+        self.candidate_pool_path = 'models/candidate_pools.npz'
+        self._candidate_pool_mtime: Optional[float] = None
+        self.max_candidates = 500
+        self.reranker = Reranker()
+        self.artifact_poll_interval = 30.0  # seconds
+        self._watch_task: Optional[asyncio.Task] = None
         
     async def initialize(self):
         """Initialize the recommendation engine."""
         logger.info("Initializing recommendation engine...")
         
-        # Load pre-trained models (in production, load from model storage)
-        model_paths = {
-            'collaborative_filtering': 'models/cf_model.pkl',
-            'content_based': 'models/cb_model.pkl',
-            'matrix_factorization': 'models/mf_model.pkl'
-        }
+        # Load the latest published model versions
+        await self.model_manager.initialize()
+        missing = [name for name in self.algorithm_weights if name not in self.model_manager.models]
+        if missing:
+            logger.warning(f"No published models for {', '.join(missing)}, will use fallbacks")
         
-        for model_type, path in model_paths.items():
-            try:
-                await self.model_manager.load_model(model_type, path)
-            except:
-                logger.warning(f"Could not load {model_type} model, will use fallbacks")
+        await self.refresh_candidate_pools()
+        
+        # Pick up new models and candidate pools as they are published
+        self._watch_task = asyncio.create_task(self._watch_artifacts())
         
         logger.info("Recommendation engine initialized")
     
+    async def cleanup(self):
+        """Stop watching for new artifacts and release worker threads."""
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+        self.model_manager.close()
+    
+    async def _watch_artifacts(self):
+        """Poll for newly published models and candidate pools."""
+        while True:
+            await asyncio.sleep(self.artifact_poll_interval)
+            try:
+                await self.model_manager.refresh_models()
+                await self.refresh_candidate_pools()
+            except Exception as e:
+                logger.error(f"Error refreshing model artifacts: {str(e)}")
+    
+    async def refresh_candidate_pools(self) -> bool:
+        """Reload the candidate pools when the offline job has replaced the file."""
+        try:
+            mtime = os.path.getmtime(self.candidate_pool_path)
+        except OSError:
+            return False
+        if mtime == self._candidate_pool_mtime:
+            return False
+        
+        loop = asyncio.get_running_loop()
+        loaded = await loop.run_in_executor(
+            self.model_manager.executor, self.load_candidate_pools, self.candidate_pool_path
+        )
+        if loaded:
+            self._candidate_pool_mtime = mtime
+        return loaded
+    
+    def load_candidate_pools(self, path: str) -> bool:
+        """Load candidate pools built offline; the previous pools stay live on failure."""
+        try:
+            pools = CandidatePools.load(path)
+        except Exception as e:
+            logger.warning(f"Could not load candidate pools from {path}: {str(e)}")
+            return False
+        
+        # Swapping the reference is atomic for in-flight requests
+        self.candidate_pools = pools
+        logger.info(f"Loaded candidate pools for {len(pools)} users ({pools.nbytes / 1e6:.1f} MB)")
+        return True
+    
     async def get_recommendations(self, request: RecommendationRequest, context: UserContext = None) -> RecommendationResponse:
         """Get personalized recommendations for a user."""
         start_time = datetime.now()
@@ -278,48 +352,29 @@ class RealtimeRecommendationEngine:
             )
         
         # Get candidate items based on request type and filters
-        candidate_items = await self._get_candidate_items(request)
+        candidates = await self._get_candidate_items(request)
         
-        if not candidate_items:
+        if not len(candidates):
             return await self._get_fallback_recommendations(request)
         
         # Collect predictions from different algorithms
-        algorithm_predictions = {}
-        
-        for algorithm_name, weight in self.algorithm_weights.items():
-            if weight > 0 and algorithm_name in self.model_manager.models:
-                try:
-                    predictions = await self.model_manager.predict_batch(
-                        algorithm_name,
-                        [user_id],
-                        candidate_items
-                    )
-                    
-                    if user_id in predictions:
-                        algorithm_predictions[algorithm_name] = predictions[user_id]
-                        
-                except Exception as e:
-                    logger.warning(f"Algorithm {algorithm_name} failed: {str(e)}")
+        algorithm_predictions = await self._collect_algorithm_predictions(user_id, candidates.item_ids)
         
         # Combine predictions using weighted average
-        combined_scores = self._combine_algorithm_predictions(algorithm_predictions)
-        
-        # Apply contextual boosting
-        if context_features:
-            combined_scores = self._apply_contextual_boosting(combined_scores, context_features)
-        
-        # Apply diversity and novelty factors
-        combined_scores = self._apply_diversity_boost(combined_scores, user_id)
-        
-        # Filter by confidence threshold
-        filtered_scores = {
-            item_id: score for item_id, score in combined_scores.items()
-            if score >= self.min_confidence_threshold
-        }
-        
-        # Sort and limit results
-        sorted_recommendations = sorted(filtered_scores.items(), key=lambda x: x[1], reverse=True)
-        top_recommendations = sorted_recommendations[:request.limit]
+        combined = self._combine_algorithm_predictions(candidates, algorithm_predictions)
+        
+        # Contextual boosts, confidence threshold and diversity over the candidate arrays
+        positions, scores = self.reranker.rerank(
+            combined,
+            candidates,
+            context_features,
+            k=request.limit,
+            min_score=self.min_confidence_threshold
+        )
+        top_recommendations = [
+            (candidates.item_ids[position], score)
+            for position, score in zip(positions.tolist(), scores.tolist())
+        ]
         
         # Format recommendations with explanations
         formatted_recommendations = await self._format_recommendations(
@@ -330,114 +385,85 @@ class RealtimeRecommendationEngine:
         
         return formatted_recommendations
     
-    async def _get_candidate_items(self, request: RecommendationRequest) -> List[str]:
-        """Get candidate items based on request filters."""
-        # In production, this would query the database with filters
-        # For now, return mock candidate items
-        
+    async def _get_candidate_items(self, request: RecommendationRequest) -> CandidateSet:
+        """Get candidate items from the user's precomputed pool."""
+        pools = self.candidate_pools
+        if pools is None:
+            return self._get_mock_candidate_items(request)
+        
+        return pools.candidates_for(
+            str(request.user_id),
+            item_type=request.recommendation_type,
+            region=request.filters.get('location'),
+            limit=self.max_candidates
+        )
+    
+    def _get_mock_candidate_items(self, request: RecommendationRequest) -> CandidateSet:
+        """Mock candidates used until candidate pools have been built."""
         item_type = request.recommendation_type
         filters = request.filters
         
-        # Generate mock candidate items based on type
-        candidates = []
-        base_count = 1000  # Base number of candidates
-        
-        for i in range(base_count):
-            item_id = f"{item_type}_item_{i+1}"
-            candidates.append(item_id)
-        
-        # Apply basic filtering (mock implementation)
+        count = 1000  # Base number of candidates
         if 'location' in filters:
-            # Filter by location proximity
-            candidates = candidates[:int(len(candidates) * 0.7)]
-        
+            count = int(count * 0.7)
         if 'budget_max' in filters:
-            # Filter by budget
-            candidates = candidates[:int(len(candidates) * 0.8)]
-        
-        return candidates[:500]  # Limit candidates for performance
+            count = int(count * 0.8)
+        count = min(count, self.max_candidates)
+        
+        return CandidateSet(
+            item_ids=[f"{item_type}_item_{i+1}" for i in range(count)],
+            item_index=np.arange(count, dtype=np.int32),
+            prior_scores=np.zeros(count, dtype=np.float32),
+            sources=np.zeros(count, dtype=np.uint8)
+        )
     
-    def _combine_algorithm_predictions(self, algorithm_predictions: Dict[str, Dict[str, float]]) -> Dict[str, float]:
-        """Combine predictions from multiple algorithms."""
-        combined_scores = {}
+    async def _collect_algorithm_predictions(self, user_id: str, item_ids: List[str]) -> Dict[str, Dict[str, float]]:
+        """Score the candidates with every loaded algorithm concurrently."""
+        algorithm_names = [
+            name for name, weight in self.algorithm_weights.items()
+            if weight > 0 and name in self.model_manager.models
+        ]
+        results = await asyncio.gather(
+            *(self.model_manager.predict_batch(name, [user_id], item_ids) for name in algorithm_names),
+            return_exceptions=True
+        )
         
-        # Get all unique items
-        all_items = set()
-        for predictions in algorithm_predictions.values():
-            all_items.update(predictions.keys())
+        algorithm_predictions = {}
+        for algorithm_name, predictions in zip(algorithm_names, results):
+            if isinstance(predictions, Exception):
+                logger.warning(f"Algorithm {algorithm_name} failed: {str(predictions)}")
+            elif user_id in predictions:
+                algorithm_predictions[algorithm_name] = predictions[user_id]
         
-        # Calculate weighted average for each item
-        for item_id in all_items:
-            weighted_score = 0.0
-            total_weight = 0.0
-            
-            for algorithm_name, predictions in algorithm_predictions.items():
-                if item_id in predictions:
-                    weight = self.algorithm_weights.get(algorithm_name, 0)
-                    weighted_score += weight * predictions[item_id]
-                    total_weight += weight
-            
-            if total_weight > 0:
-                combined_scores[item_id] = weighted_score / total_weight
-            else:
-                combined_scores[item_id] = 0.0
-        
-        return combined_scores
-    
-    def _apply_contextual_boosting(self, scores: Dict[str, float], context_features: Dict[str, float]) -> Dict[str, float]:
-        """Apply contextual boosting to scores."""
-        boosted_scores = scores.copy()
-        
-        # Time-based boosting
-        if 'is_weekend' in context_features and context_features['is_weekend']:
-            # Boost entertainment and leisure items on weekends
-            for item_id in boosted_scores:
-                if 'entertainment' in item_id or 'leisure' in item_id:
-                    boosted_scores[item_id] *= 1.1
-        
-        # Weather-based boosting
-        if 'is_sunny' in context_features and context_features['is_sunny']:
-            # Boost outdoor activities in sunny weather
-            for item_id in boosted_scores:
-                if 'outdoor' in item_id or 'nature' in item_id:
-                    boosted_scores[item_id] *= 1.15
-        
-        # Budget-based boosting
-        if 'budget_preference' in context_features:
-            budget_pref = context_features['budget_preference']
-            for item_id in boosted_scores:
-                # Mock budget alignment check
-                if 'luxury' in item_id and budget_pref > 0.7:
-                    boosted_scores[item_id] *= 1.2
-                elif 'budget' in item_id and budget_pref < 0.4:
-                    boosted_scores[item_id] *= 1.2
-        
-        return boosted_scores
-    
-    def _apply_diversity_boost(self, scores: Dict[str, float], user_id: str) -> Dict[str, float]:
-        """Apply diversity boosting to avoid filter bubbles."""
-        # Simple diversity implementation - boost items from different categories
-        diverse_scores = scores.copy()
-        
-        # Group items by category (mock implementation)
-        categories = {}
-        for item_id in scores:
-            # Extract category from item_id (mock)
-            category = item_id.split('_')[0] if '_' in item_id else 'unknown'
-            if category not in categories:
-                categories[category] = []
-            categories[category].append(item_id)
-        
-        # Apply diversity boost
-        diversity_factor = 0.1
-        for category, items in categories.items():
-            if len(items) > 1:
-                # Boost the second-best item in each category
-                sorted_items = sorted(items, key=lambda x: scores[x], reverse=True)
-                if len(sorted_items) > 1:
-                    diverse_scores[sorted_items[1]] *= (1 + diversity_factor)
-        
-        return diverse_scores
+        return algorithm_predictions
+    
+    def _combine_algorithm_predictions(self, candidates: CandidateSet,
+                                       algorithm_predictions: Dict[str, Dict[str, float]]) -> np.ndarray:
+        """
+        Combine predictions from multiple algorithms, aligned with the candidates.
+        
+        Each candidate gets the weighted average over the algorithms that
+        scored it; candidates no algorithm scored keep their prior score.
+        """
+        if not algorithm_predictions:
+            return candidates.prior_scores.astype(np.float64)
+        
+        item_ids = candidates.item_ids
+        scores = np.array([
+            np.fromiter((predictions.get(item_id, np.nan) for item_id in item_ids), dtype=np.float64, count=len(item_ids))
+            for predictions in algorithm_predictions.values()
+        ])
+        weights = np.array([self.algorithm_weights.get(name, 0) for name in algorithm_predictions])[:, None]
+        
+        scored = ~np.isnan(scores)
+        total_weight = (weights * scored).sum(axis=0)
+        weighted_score = (weights * np.where(scored, scores, 0.0)).sum(axis=0)
+        
+        return np.where(
+            total_weight > 0,
+            weighted_score / np.maximum(total_weight, 1e-12),
+            candidates.prior_scores
+        )
     
     async def _format_recommendations(self, recommendations: List[Tuple[str, float]], 
                                     rec_type: RecommendationType,
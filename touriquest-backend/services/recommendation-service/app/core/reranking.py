@@ -0,0 +1,180 @@
+"""
+Re-ranking stage of the real-time recommendation engine.
+
+Works on the candidate arrays rather than per-item dicts:
+
+- contextual boosts are masks over the precomputed item attributes
+  (tags, price band, location cell), applied as one multiplier array
+- diversity uses maximal marginal relevance (MMR). Each step keeps the
+  running maximum similarity of every candidate to the items selected so
+  far and updates it with the newest pick only, so choosing k of n
+  candidates costs O(k * n) instead of recomputing pairwise similarities.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.candidate_pools import CandidateSet, ItemAttributes
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ContextBoost:
+    """Multiply the scores of matching items while a context feature holds."""
+    feature: str
+    applies: Callable[[float], bool]
+    factor: float
+    tags: Tuple[str, ...] = ()
+    price_bands: Tuple[str, ...] = ()
+
+    def mask(self, attributes: ItemAttributes, item_index: np.ndarray) -> np.ndarray:
+        mask = np.zeros(len(item_index), dtype=bool)
+        if self.tags:
+            mask |= attributes.tag_mask(item_index, self.tags)
+        if self.price_bands:
+            mask |= attributes.price_band_mask(item_index, self.price_bands)
+        return mask
+
+
+DEFAULT_BOOSTS: List[ContextBoost] = [
+    # Entertainment and leisure on weekends
+    ContextBoost('is_weekend', bool, 1.1, tags=('entertainment', 'leisure')),
+    # Outdoor activities in sunny weather
+    ContextBoost('is_sunny', bool, 1.15, tags=('outdoor', 'nature')),
+    # Price bands matching the budget preference
+    ContextBoost('budget_preference', lambda value: value > 0.7, 1.2, price_bands=('luxury', 'ultra_luxury')),
+    ContextBoost('budget_preference', lambda value: value < 0.4, 1.2, price_bands=('budget',)),
+]
+
+
+def mmr_select(relevance: np.ndarray, k: int, diversity: float,
+               similarity_to: Callable[[int], np.ndarray]) -> np.ndarray:
+    """
+    Pick k positions by maximal marginal relevance.
+
+    Args:
+        relevance: score of every candidate
+        k: number of positions to select
+        diversity: weight of the redundancy penalty, 0 (pure relevance) to 1
+        similarity_to: similarity of every candidate to candidate j, in [0, 1]
+
+    Returns:
+        Selected positions in selection order
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Scale relevance to [0, 1] so the diversity weight means the same for any scorer
+    relevance = np.asarray(relevance, dtype=np.float64)
+    gain = (1.0 - diversity) * relevance / max(float(relevance.max()), 1e-12)
+    max_similarity = np.zeros(n, dtype=np.float64)
+    objective = gain.copy()
+    selected = np.empty(k, dtype=np.int64)
+
+    for step in range(k):
+        chosen = int(np.argmax(objective))
+        selected[step] = chosen
+        if step == k - 1:
+            break
+        np.maximum(max_similarity, similarity_to(chosen), out=max_similarity)
+        np.subtract(gain, diversity * max_similarity, out=objective)
+        objective[selected[:step + 1]] = -np.inf
+
+    return selected
+
+
+class Reranker:
+    """Contextual boosting and MMR diversity over candidate arrays."""
+
+    def __init__(
+        self,
+        boosts: Optional[List[ContextBoost]] = None,
+        proximity_boost: float = 1.1,
+        proximity_cells: int = 1,
+        diversity: float = 0.3,
+        category_similarity: float = 0.5,
+        location_similarity: float = 0.2,
+        content_similarity: float = 0.3,
+    ):
+        self.boosts = DEFAULT_BOOSTS if boosts is None else boosts
+        self.proximity_boost = proximity_boost
+        self.proximity_cells = proximity_cells
+        self.diversity = diversity
+        self.category_similarity = category_similarity
+        self.location_similarity = location_similarity
+        self.content_similarity = content_similarity
+
+    def context_multipliers(self, attributes: ItemAttributes, item_index: np.ndarray,
+                            context_features: Dict[str, float]) -> np.ndarray:
+        """Score multiplier of every candidate under the request context."""
+        multipliers = np.ones(len(item_index), dtype=np.float64)
+        for boost in self.boosts:
+            value = context_features.get(boost.feature)
+            if value is not None and boost.applies(value):
+                multipliers[boost.mask(attributes, item_index)] *= boost.factor
+
+        # Items near where the user is right now
+        if 'current_latitude' in context_features and 'current_longitude' in context_features:
+            near = attributes.near_mask(
+                item_index,
+                context_features['current_latitude'],
+                context_features['current_longitude'],
+                self.proximity_cells
+            )
+            multipliers[near] *= self.proximity_boost
+
+        return multipliers
+
+    def rerank(self, scores: np.ndarray, candidates: CandidateSet, context_features: Dict[str, float],
+               k: int, min_score: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-rank scored candidates.
+
+        Applies the contextual boosts, drops candidates below min_score and
+        picks k of the rest by MMR. Candidates without attributes are
+        ranked by score alone.
+
+        Returns:
+            Positions into the candidate set and their boosted scores
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        attributes = candidates.attributes
+        if attributes is not None and context_features:
+            scores = scores * self.context_multipliers(attributes, candidates.item_index, context_features)
+
+        eligible = np.flatnonzero(scores >= min_score)
+        eligible_scores = scores[eligible]
+
+        if attributes is None or self.diversity <= 0:
+            if k < len(eligible):
+                top = np.argpartition(-eligible_scores, k)[:k]
+            else:
+                top = np.arange(len(eligible))
+            selected = top[np.argsort(-eligible_scores[top], kind='stable')]
+        else:
+            similarity_to = self._similarity(attributes, candidates.item_index[eligible])
+            selected = mmr_select(eligible_scores, k, self.diversity, similarity_to)
+
+        return eligible[selected], eligible_scores[selected]
+
+    def _similarity(self, attributes: ItemAttributes, item_index: np.ndarray) -> Callable[[int], np.ndarray]:
+        """Similarity of every candidate to one of them, from shared category, cell and content."""
+        categories = attributes.categories[item_index]
+        cell_rows = attributes.cell_rows[item_index]
+        cell_cols = attributes.cell_cols[item_index]
+        vectors = attributes.vectors[item_index].astype(np.float32) if attributes.vectors is not None else None
+
+        def similarity_to(j: int) -> np.ndarray:
+            similarity = self.category_similarity * (categories == categories[j])
+            if cell_rows[j] >= 0:
+                similarity += self.location_similarity * ((cell_rows == cell_rows[j]) & (cell_cols == cell_cols[j]))
+            if vectors is not None:
+                similarity += self.content_similarity * np.clip(vectors @ vectors[j], 0.0, 1.0)
+            return similarity
+
+        return similarity_to
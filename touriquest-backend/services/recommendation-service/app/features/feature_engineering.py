@@ -8,6 +8,9 @@ from datetime import datetime, timedelta
 from sklearn.preprocessing import StandardScaler, LabelEncoder, MinMaxScaler
 from sklearn.feature_extraction.text import TfidfVectorizer
 import logging
+import os
+
+from app.features.interaction_matrix import InteractionMatrix, InteractionMatrixBuilder
 
 logger = logging.getLogger(__name__)
 
@@ -522,34 +525,54 @@ class FeatureEngineer:
         else:
             return 'fall'
     
-    def get_user_item_interaction_matrix(self, interactions: pd.DataFrame) -> pd.DataFrame:
-        """Create user-item interaction matrix with enhanced features."""
-        # Create basic interaction matrix
-        interaction_matrix = interactions.pivot_table(
-            index='user_id',
-            columns='item_id',
-            values='rating',
-            fill_value=0
-        )
+    def get_user_item_interaction_matrix(
+        self,
+        interactions,
+        chunk_size: int = 100_000,
+        cache_path: Optional[str] = None,
+        decay_days: float = 30.0,
+        implicit_weight: float = 0.3,
+        as_of: Optional[pd.Timestamp] = None
+    ) -> InteractionMatrix:
+        """
+        Create the sparse user-item interaction matrix.
+        
+        Args:
+            interactions: DataFrame, or an iterable of DataFrame chunks such as
+                pd.read_sql(query, engine, chunksize=n), with columns
+                ['user_id', 'item_id'] and optional 'rating' and 'timestamp'
+            chunk_size: rows per chunk when a single DataFrame is given
+            cache_path: .npz cache of the matrix built so far; when it exists
+                the interactions are appended to it, so pass only new ones,
+                and the cache is rewritten afterwards
+            decay_days: time constant of the recency weights
+            implicit_weight: weight of the recency term next to the mean rating
+            as_of: time recency is measured from, now by default
+        
+        Returns:
+            CSR matrix with the ids of its rows and columns; ids keep their
+            row and column across appends
+        """
+        if cache_path and os.path.exists(cache_path):
+            builder = InteractionMatrixBuilder.load(cache_path)
+            logger.info(f"Appending to cached interaction matrix with {builder.n_interactions} interactions")
+        else:
+            builder = InteractionMatrixBuilder(decay_days=decay_days, implicit_weight=implicit_weight)
         
-        # Add implicit feedback features
-        if 'timestamp' in interactions.columns:
-            # Recency weighting
-            interactions['days_ago'] = (pd.Timestamp.now() - pd.to_datetime(interactions['timestamp'])).dt.days
-            interactions['recency_weight'] = np.exp(-interactions['days_ago'] / 30)  # 30-day decay
-            
-            # Weighted interaction matrix
-            weighted_matrix = interactions.pivot_table(
-                index='user_id',
-                columns='item_id',
-                values='recency_weight',
-                aggfunc='sum',
-                fill_value=0
+        chunks = interactions
+        if isinstance(interactions, pd.DataFrame):
+            chunks = (
+                interactions.iloc[start:start + chunk_size]
+                for start in range(0, len(interactions), chunk_size)
             )
-            
-            # Combine explicit and implicit feedback
-            final_matrix = interaction_matrix + 0.3 * weighted_matrix
-        else:
-            final_matrix = interaction_matrix
+        builder.extend(chunks)
         
-        return final_matrix
\ No newline at end of file
+        if cache_path:
+            builder.save(cache_path)
+        
+        result = builder.build(as_of)
+        logger.info(
+            f"Built {result.shape[0]} x {result.shape[1]} interaction matrix from "
+            f"{builder.n_interactions} interactions ({result.matrix.nnz} pairs)"
+        )
+        return result
@@ -0,0 +1,226 @@
+"""
+Streaming builder for the sparse user-item interaction matrix.
+
+Interactions arrive in chunks (e.g. pd.read_sql(..., chunksize=n) over the
+interactions table) and are folded into scipy.sparse accumulators, so the
+full interaction log is never held in memory and no dense users x items
+matrix is ever allocated. User and item ids keep their row and column for
+the lifetime of the builder; new ids are appended.
+
+The matrix value of a user-item pair matches the previous dense
+implementation: the mean rating of the pair plus implicit_weight times the
+sum of its recency weights exp(-age_days / decay_days). Decayed sums are
+kept relative to the latest timestamp seen and rescaled when newer
+interactions arrive, so appending later chunks never needs a rebuild.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+NANOSECONDS_PER_DAY = 86_400 * 10**9
+
+
+@dataclass
+class InteractionMatrix:
+    """User-item matrix with the ids of its rows and columns."""
+    matrix: sparse.csr_matrix
+    user_ids: np.ndarray
+    item_ids: np.ndarray
+    as_of: pd.Timestamp
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.matrix.shape
+
+
+class InteractionMatrixBuilder:
+    """Incrementally builds a CSR interaction matrix from chunks of interactions."""
+
+    ACCUMULATORS = ('rating_sum', 'rating_count', 'decayed')
+
+    def __init__(self, decay_days: float = 30.0, implicit_weight: float = 0.3,
+                 compact_entries: int = 2_000_000):
+        self.decay_days = decay_days
+        self.implicit_weight = implicit_weight
+        # Buffered entries are folded into the accumulators past this many
+        self.compact_entries = compact_entries
+        self.user_ids: List[str] = []
+        self.item_ids: List[str] = []
+        self.n_interactions = 0
+        # Decayed sums are relative to this time (ns since epoch, UTC)
+        self.decay_as_of: Optional[int] = None
+
+        self._user_index: Dict[str, int] = {}
+        self._item_index: Dict[str, int] = {}
+        self._accumulators: Dict[str, Optional[sparse.csr_matrix]] = dict.fromkeys(self.ACCUMULATORS)
+        self._buffer: List[Tuple[np.ndarray, ...]] = []
+        self._buffered = 0
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        """
+        Add a chunk of interactions.
+
+        Args:
+            chunk: DataFrame with columns ['user_id', 'item_id'] and optional
+                'rating' (1.0 when missing) and 'timestamp'
+        """
+        if chunk.empty:
+            return
+
+        rows = self._codes(chunk['user_id'], self.user_ids, self._user_index)
+        cols = self._codes(chunk['item_id'], self.item_ids, self._item_index)
+        ratings = (
+            chunk['rating'].to_numpy(dtype=np.float32) if 'rating' in chunk.columns
+            else np.ones(len(chunk), dtype=np.float32)
+        )
+        decayed = np.zeros(len(chunk), dtype=np.float32)
+
+        if 'timestamp' in chunk.columns:
+            timestamps = pd.to_datetime(chunk['timestamp'], utc=True).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+            self._advance_decay(int(timestamps.max()))
+            age_days = (self.decay_as_of - timestamps) / NANOSECONDS_PER_DAY
+            decayed = np.exp(-np.maximum(age_days, 0.0) / self.decay_days).astype(np.float32)
+
+        self._buffer.append((rows, cols, ratings, decayed))
+        self._buffered += len(chunk)
+        self.n_interactions += len(chunk)
+        if self._buffered >= self.compact_entries:
+            self._compact()
+
+    def extend(self, chunks: Iterable[pd.DataFrame]) -> 'InteractionMatrixBuilder':
+        """Add every chunk of an iterable, e.g. a chunked database query."""
+        for chunk in chunks:
+            self.append(chunk)
+        return self
+
+    def build(self, as_of: Optional[pd.Timestamp] = None) -> InteractionMatrix:
+        """Combine everything appended so far into one CSR matrix, decayed to as_of (default now)."""
+        self._compact()
+        as_of = pd.Timestamp.now(tz='UTC') if as_of is None else pd.Timestamp(as_of)
+        if as_of.tzinfo is None:
+            as_of = as_of.tz_localize('UTC')
+        shape = (len(self.user_ids), len(self.item_ids))
+
+        if self._accumulators['rating_count'] is None:
+            matrix = sparse.csr_matrix(shape, dtype=np.float32)
+        else:
+            count = self._accumulators['rating_count'].copy()
+            count.data = 1.0 / count.data
+            matrix = self._accumulators['rating_sum'].multiply(count).tocsr()
+            if self.decay_as_of is not None:
+                elapsed_days = max(as_of.value - self.decay_as_of, 0) / NANOSECONDS_PER_DAY
+                scale = self.implicit_weight * np.exp(-elapsed_days / self.decay_days)
+                matrix = matrix + scale * self._accumulators['decayed']
+            matrix = matrix.astype(np.float32).tocsr()
+            matrix.eliminate_zeros()
+
+        return InteractionMatrix(
+            matrix=matrix,
+            user_ids=np.asarray(self.user_ids, dtype=str),
+            item_ids=np.asarray(self.item_ids, dtype=str),
+            as_of=as_of
+        )
+
+    def save(self, path: str) -> None:
+        """Write the builder state as one .npz, replacing any previous file atomically."""
+        self._compact()
+        arrays = {
+            'user_ids': np.asarray(self.user_ids, dtype=str),
+            'item_ids': np.asarray(self.item_ids, dtype=str),
+            'params': np.asarray([self.decay_days, self.implicit_weight], dtype=np.float64),
+            'n_interactions': np.asarray(self.n_interactions),
+            'decay_as_of': np.asarray(-1 if self.decay_as_of is None else self.decay_as_of, dtype=np.int64),
+        }
+        for name, accumulator in self._accumulators.items():
+            if accumulator is not None:
+                arrays[f"{name}_data"] = accumulator.data
+                arrays[f"{name}_indices"] = accumulator.indices
+                arrays[f"{name}_indptr"] = accumulator.indptr
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, compact_entries: int = 2_000_000) -> 'InteractionMatrixBuilder':
+        """Restore a builder written by save(); more chunks can be appended to it."""
+        with np.load(path, allow_pickle=False) as data:
+            decay_days, implicit_weight = data['params'].tolist()
+            builder = cls(decay_days=decay_days, implicit_weight=implicit_weight, compact_entries=compact_entries)
+            builder.user_ids = data['user_ids'].tolist()
+            builder.item_ids = data['item_ids'].tolist()
+            builder._user_index = {user_id: row for row, user_id in enumerate(builder.user_ids)}
+            builder._item_index = {item_id: col for col, item_id in enumerate(builder.item_ids)}
+            builder.n_interactions = int(data['n_interactions'])
+            decay_as_of = int(data['decay_as_of'])
+            builder.decay_as_of = None if decay_as_of < 0 else decay_as_of
+
+            shape = (len(builder.user_ids), len(builder.item_ids))
+            for name in cls.ACCUMULATORS:
+                if f"{name}_data" in data.files:
+                    builder._accumulators[name] = sparse.csr_matrix(
+                        (data[f"{name}_data"], data[f"{name}_indices"], data[f"{name}_indptr"]), shape=shape
+                    )
+        return builder
+
+    @staticmethod
+    def _codes(values: pd.Series, ids: List[str], index: Dict[str, int]) -> np.ndarray:
+        """Stable codes of the ids in a chunk, appending ids never seen before."""
+        codes, uniques = pd.factorize(values.astype(str))
+        mapped = np.empty(len(uniques), dtype=np.int32)
+        for n, id_ in enumerate(uniques.tolist()):
+            code = index.get(id_)
+            if code is None:
+                code = index[id_] = len(ids)
+                ids.append(id_)
+            mapped[n] = code
+        return mapped[codes]
+
+    def _advance_decay(self, latest: int) -> None:
+        """Move the decay reference forward, scaling down every decayed sum so far."""
+        if self.decay_as_of is None:
+            self.decay_as_of = latest
+            return
+        if latest <= self.decay_as_of:
+            return
+
+        scale = np.float32(np.exp(-(latest - self.decay_as_of) / NANOSECONDS_PER_DAY / self.decay_days))
+        if self._accumulators['decayed'] is not None:
+            self._accumulators['decayed'].data *= scale
+        for entry in self._buffer:
+            entry[3][:] *= scale
+        self.decay_as_of = latest
+
+    def _compact(self) -> None:
+        """Fold buffered entries into the sparse accumulators."""
+        if not self._buffer:
+            return
+
+        rows, cols, ratings, decayed = (np.concatenate(parts) for parts in zip(*self._buffer))
+        self._buffer = []
+        self._buffered = 0
+        shape = (len(self.user_ids), len(self.item_ids))
+        values = {
+            'rating_sum': ratings,
+            'rating_count': np.ones(len(rows), dtype=np.float32),
+            'decayed': decayed
+        }
+        for name, data in values.items():
+            part = sparse.csr_matrix((data, (rows, cols)), shape=shape, dtype=np.float32)
+            accumulator = self._accumulators[name]
+            if accumulator is None:
+                self._accumulators[name] = part
+            else:
+                accumulator.resize(shape)
+                self._accumulators[name] = (accumulator + part).tocsr()
@@ -1,14 +1,27 @@
 """
 A/B testing framework for recommendation experiments.
+
+Users are assigned to groups by hashing the experiment and user ids, so the
+decision needs no Redis round trip and is the same on every replica.
+Experiments record the hash scheme in their metadata; experiments created
+before it was recorded keep the previous md5-of-user-id buckets, so users
+already assigned to running experiments stay in their groups.
+Exposures, metric samples and running statistics are buffered in memory and
+written to Redis in one pipelined round trip per flush. Metrics are only
+counted for users with an assignment while the experiment is running.
 """
 import asyncio
+import bisect
 import hashlib
 import json
 import random
+import time
+import uuid
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Set, Tuple
 from enum import Enum
-import redis
+import redis.asyncio as redis
 import pandas as pd
 import numpy as np
 from scipy import stats
@@ -16,7 +29,6 @@ import logging
 
 from app.models.schemas import (
     ABTestExperiment,
-    UserExperimentAssignment,
     ExperimentGroup,
     RecommendationRequest,
     RecommendationResponse
@@ -24,6 +36,16 @@ from app.models.schemas import (
 
 logger = logging.getLogger(__name__)
 
+ASSIGNMENT_TTL = 86400 * 30  # 30 days
+SAMPLE_TTL = 86400 * 7  # 7 days
+HASH_SPACE = float(2 ** 64)
+
+# Experiment metadata field naming the assignment hash scheme
+ASSIGNMENT_HASH_FIELD = 'assignment_hash'
+ASSIGNMENT_HASH = 'blake2b'
+LEGACY_ASSIGNMENT_HASH = 'md5'
+LEGACY_HASH_BUCKETS = 10000
+
 
 class ExperimentStatus(str, Enum):
     """Experiment status values."""
@@ -45,15 +67,188 @@ class MetricType(str, Enum):
     USER_SATISFACTION = "user_satisfaction"
 
 
+@dataclass
+class RunningStats:
+    """Count, mean and sum of squared deviations of a metric, updated one sample at a time (Welford)."""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """Combine with the stats of another set of samples (Chan et al. parallel update)."""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Sample variance."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        variance = max(0.0, self.variance)
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'variance': variance,
+            'std_dev': float(np.sqrt(variance)),
+            'std_error': float(np.sqrt(variance / self.count)) if self.count > 0 else 0.0
+        }
+
+
 class ABTestingFramework:
     """A/B testing framework for recommendation experiments."""
-    
-    def __init__(self, redis_url: str = "redis://localhost:6379/1"):
+
+    def __init__(self, redis_url: str = "redis://localhost:6379/1", flush_interval: float = 1.0,
+                 flush_batch_size: int = 1000, experiment_refresh_interval: float = 30.0,
+                 max_pending_samples: int = 100_000, max_known_assignments: int = 100_000):
         self.redis_client = redis.from_url(redis_url, decode_responses=True)
-        self.experiments = {}
-        self.user_assignments = {}
-        self.experiment_metrics = {}
-        
+        self.flush_interval = flush_interval
+        # Wake the flusher early once this many writes are buffered
+        self.flush_batch_size = flush_batch_size
+        # Experiments changed by other replicas are picked up after this long
+        self.experiment_refresh_interval = experiment_refresh_interval
+        # Raw samples past this many are dropped while Redis is unreachable; stats are kept
+        self.max_pending_samples = max_pending_samples
+        # Every process writes its running stats under its own field, merged on read
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.experiments: Dict[str, ABTestExperiment] = {}
+        self.experiment_metrics: Dict[Tuple[str, str, str], RunningStats] = {}
+        self.dropped_samples = 0
+
+        self._allocations: Dict[str, Tuple[List[float], List[ExperimentGroup], str]] = {}
+        self._experiments_loaded_at: Optional[float] = None
+        self._experiment_loaded_at: Dict[str, float] = {}
+        # Stats written before they were kept per process, read once per experiment
+        self._legacy_metrics: Dict[str, Dict[Tuple[str, str], RunningStats]] = {}
+        # Assignments this process knows to be stored, so metrics need not check Redis
+        self._known_assignments: Set[str] = set()
+        self.max_known_assignments = max_known_assignments
+        self._pending_assignments: Dict[str, Tuple[str, str, str, float]] = {}
+        self._pending_exposures: Dict[Tuple[str, str], int] = {}
+        self._pending_samples: Dict[str, List[str]] = {}
+        self._pending_sample_count = 0
+        self._dirty_metrics: Set[Tuple[str, str, str]] = set()
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Load the experiments and start flushing buffered writes in the background."""
+        try:
+            await self._refresh_experiments()
+        except Exception as e:
+            logger.warning(f"Could not load experiments: {str(e)}")
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run_flusher())
+
+    async def close(self):
+        """Stop the background flusher, write what is still buffered and close the connection."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        await self.redis_client.aclose()
+
+    @property
+    def pending_writes(self) -> int:
+        return (len(self._pending_assignments) + len(self._pending_exposures) +
+                self._pending_sample_count + len(self._dirty_metrics))
+
+    async def flush(self) -> int:
+        """Write buffered assignments, exposures, samples and stats in one pipelined round trip."""
+        async with self._flush_lock:
+            assignments, self._pending_assignments = self._pending_assignments, {}
+            exposures, self._pending_exposures = self._pending_exposures, {}
+            samples, self._pending_samples = self._pending_samples, {}
+            sample_count, self._pending_sample_count = self._pending_sample_count, 0
+            dirty_metrics, self._dirty_metrics = self._dirty_metrics, set()
+            if not (assignments or exposures or samples or dirty_metrics):
+                return 0
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, (user_id, experiment_id, group, assigned_at) in assignments.items():
+                data = json.dumps({
+                    'user_id': user_id,
+                    'experiment_id': experiment_id,
+                    'group': group,
+                    'assigned_at': datetime.fromtimestamp(assigned_at).isoformat()
+                })
+                # The first assignment of a user is kept
+                pipe.set(key, data, ex=ASSIGNMENT_TTL, nx=True)
+            for (experiment_id, group), count in exposures.items():
+                pipe.hincrby(f"exposures:{experiment_id}", group, count)
+            for key, values in samples.items():
+                pipe.rpush(key, *values)
+                pipe.expire(key, SAMPLE_TTL)
+            for experiment_id, group, metric_type in dirty_metrics:
+                running = self.experiment_metrics[(experiment_id, group, metric_type)]
+                pipe.hset(
+                    f"agg_metric:{experiment_id}",
+                    f"{group}:{metric_type}:{self.worker_id}",
+                    json.dumps([running.count, running.mean, running.m2])
+                )
+
+            try:
+                await pipe.execute()
+            except Exception as e:
+                logger.error(f"Error flushing experiment data: {str(e)}")
+                self._requeue(assignments, exposures, samples, sample_count, dirty_metrics)
+                return 0
+
+            self._remember_assignments(assignments)
+
+            return len(assignments) + len(exposures) + sample_count + len(dirty_metrics)
+
+    def _requeue(self, assignments: Dict[str, Tuple[str, str, str, float]], exposures: Dict[Tuple[str, str], int],
+                 samples: Dict[str, List[str]], sample_count: int, dirty_metrics: Set[Tuple[str, str, str]]):
+        """Put the writes of a failed flush back in front of anything buffered since."""
+        self._pending_assignments = {**self._pending_assignments, **assignments}
+        for key, count in exposures.items():
+            self._pending_exposures[key] = self._pending_exposures.get(key, 0) + count
+        for key, values in samples.items():
+            self._pending_samples[key] = values + self._pending_samples.get(key, [])
+        self._pending_sample_count += sample_count
+        self._dirty_metrics |= dirty_metrics
+
+    def _remember_assignments(self, keys):
+        if len(self._known_assignments) + len(keys) > self.max_known_assignments:
+            self._known_assignments.clear()
+        self._known_assignments.update(keys)
+
+    async def _run_flusher(self):
+        """Flush every flush_interval, or as soon as flush_batch_size writes are buffered."""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    def _request_flush_if_full(self):
+        if self.pending_writes >= self.flush_batch_size:
+            self._flush_requested.set()
+
     async def create_experiment(self, experiment_config: Dict[str, Any]) -> str:
         """Create a new A/B test experiment."""
         experiment_id = self._generate_experiment_id(experiment_config['name'])
@@ -66,46 +261,37 @@ class ABTestingFramework:
             end_date=datetime.fromisoformat(experiment_config.get('end_date')) if experiment_config.get('end_date') else None,
             traffic_allocation=experiment_config['traffic_allocation'],
             success_metrics=experiment_config['success_metrics'],
-            metadata=experiment_config.get('metadata', {})
+            metadata={
+                **experiment_config.get('metadata', {}),
+                ASSIGNMENT_HASH_FIELD: ASSIGNMENT_HASH
+            }
         )
         
         # Store experiment configuration
         await self._store_experiment(experiment)
-        
-        # Initialize experiment metrics
-        await self._initialize_experiment_metrics(experiment_id)
-        
+
         logger.info(f"Created experiment: {experiment_id}")
         return experiment_id
     
     async def assign_user_to_experiment(self, user_id: str, experiment_id: str) -> ExperimentGroup:
-        """Assign a user to an experiment group."""
-        # Check if user is already assigned
-        assignment_key = f"assignment:{experiment_id}:{user_id}"
-        existing_assignment = self.redis_client.get(assignment_key)
-        
-        if existing_assignment:
-            return ExperimentGroup(existing_assignment)
-        
-        # Get experiment configuration
+        """Assign a user to an experiment group and record the exposure."""
+        # Get experiment configuration, cached after the first lookup
         experiment = await self._get_experiment(experiment_id)
-        if not experiment or not experiment.is_active:
+        if not experiment or not self._is_running(experiment, datetime.now()):
             return ExperimentGroup.CONTROL
-        
+
         # Assign user to group using consistent hashing
-        group = self._assign_to_group(user_id, experiment.traffic_allocation)
-        
-        # Store assignment
-        assignment = UserExperimentAssignment(
-            user_id=user_id,
-            experiment_id=experiment_id,
-            group=group,
-            assigned_at=datetime.now()
-        )
-        
-        await self._store_user_assignment(assignment)
-        
-        logger.debug(f"Assigned user {user_id} to group {group} in experiment {experiment_id}")
+        group = self._assign_to_group(user_id, experiment)
+
+        # Buffer the assignment and exposure for the next flush
+        assignment_key = f"assignment:{experiment_id}:{user_id}"
+        if assignment_key not in self._pending_assignments:
+            # Serialized at flush time, off the request path
+            self._pending_assignments[assignment_key] = (user_id, experiment_id, group.value, time.time())
+        exposure_key = (experiment_id, group.value)
+        self._pending_exposures[exposure_key] = self._pending_exposures.get(exposure_key, 0) + 1
+        self._request_flush_if_full()
+
         return group
     
     async def get_user_experiments(self, user_id: str) -> List[Dict[str, Any]]:
@@ -126,44 +312,47 @@ class ABTestingFramework:
     async def track_metric(self, user_id: str, experiment_id: str, metric_type: MetricType, value: float, context: Dict[str, Any] = None):
         """Track a metric for an experiment."""
         try:
-            # Get user's experiment group
-            assignment = await self._get_user_assignment(user_id, experiment_id)
-            if not assignment:
+            metric_type = MetricType(metric_type)
+            experiment = await self._get_experiment(experiment_id)
+            if not experiment or not self._is_running(experiment, datetime.now()):
                 return
-            
+
+            # Only users who were shown a group are counted
+            if not await self._has_assignment(user_id, experiment_id):
+                return
+
+            # The user's group is recomputed from the hash, it matches the stored assignment
+            group = self._assign_to_group(user_id, experiment)
+
             # Store metric data
             metric_data = {
                 'user_id': user_id,
                 'experiment_id': experiment_id,
-                'group': assignment.group,
-                'metric_type': metric_type,
+                'group': group.value,
+                'metric_type': metric_type.value,
                 'value': value,
                 'timestamp': datetime.now().isoformat(),
                 'context': context or {}
             }
-            
-            await self._store_metric(metric_data)
-            
+
+            self._store_metric(metric_data)
+
             # Update aggregated metrics
-            await self._update_aggregated_metrics(experiment_id, assignment.group, metric_type, value)
-            
+            self._update_aggregated_metrics(experiment_id, group, metric_type, value)
+            self._request_flush_if_full()
+
         except Exception as e:
             logger.error(f"Error tracking metric: {str(e)}")
-    
+
     async def get_experiment_results(self, experiment_id: str) -> Dict[str, Any]:
         """Get comprehensive results for an experiment."""
         experiment = await self._get_experiment(experiment_id)
         if not experiment:
             raise ValueError(f"Experiment {experiment_id} not found")
-        
-        # Get metrics for all groups
-        group_metrics = {}
-        
-        for group in ExperimentGroup:
-            metrics = await self._get_group_metrics(experiment_id, group)
-            if metrics:
-                group_metrics[group] = metrics
-        
+
+        # Get metrics for all groups from the running statistics of every replica
+        group_metrics = await self._get_group_metrics(experiment_id)
+
         # Calculate statistical significance
         significance_results = await self._calculate_statistical_significance(experiment_id, group_metrics)
         
@@ -198,171 +387,197 @@ class ABTestingFramework:
             logger.error(f"Error stopping experiment: {str(e)}")
             return False
     
+    async def _has_assignment(self, user_id: str, experiment_id: str) -> bool:
+        """Whether the user was assigned to the experiment, checking Redis only when not known locally."""
+        key = f"assignment:{experiment_id}:{user_id}"
+        if key in self._pending_assignments or key in self._known_assignments:
+            return True
+        if await self.redis_client.exists(key):
+            self._remember_assignments([key])
+            return True
+        return False
+
+    @staticmethod
+    def _is_running(experiment: ABTestExperiment, now: datetime) -> bool:
+        """Whether the experiment is active and within its date range."""
+        if not experiment.is_active or experiment.start_date > now:
+            return False
+        return not experiment.end_date or experiment.end_date >= now
+
     def _generate_experiment_id(self, name: str) -> str:
         """Generate unique experiment ID."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         name_hash = hashlib.md5(name.encode()).hexdigest()[:8]
         return f"exp_{timestamp}_{name_hash}"
     
-    def _assign_to_group(self, user_id: str, traffic_allocation: Dict[ExperimentGroup, float]) -> ExperimentGroup:
+    def _assign_to_group(self, user_id: str, experiment: ABTestExperiment) -> ExperimentGroup:
         """Assign user to experiment group using consistent hashing."""
-        # Use hash of user_id for consistent assignment
-        hash_value = int(hashlib.md5(user_id.encode()).hexdigest(), 16) % 10000
-        normalized_hash = hash_value / 10000
-        
-        # Assign based on traffic allocation
-        cumulative_probability = 0.0
-        
-        for group, allocation in traffic_allocation.items():
-            cumulative_probability += allocation
-            if normalized_hash <= cumulative_probability:
-                return group
-        
+        experiment_id = experiment.experiment_id
+        allocation = self._allocations.get(experiment_id)
+        if allocation is None:
+            allocation = self._allocations[experiment_id] = (
+                *self._cumulative_allocation(experiment.traffic_allocation),
+                experiment.metadata.get(ASSIGNMENT_HASH_FIELD, LEGACY_ASSIGNMENT_HASH)
+            )
+        cumulative, groups, hash_scheme = allocation
+
+        if hash_scheme == LEGACY_ASSIGNMENT_HASH:
+            # Buckets of experiments created before the scheme was recorded
+            point = (int(hashlib.md5(user_id.encode()).hexdigest(), 16) % LEGACY_HASH_BUCKETS) / LEGACY_HASH_BUCKETS
+            index = bisect.bisect_left(cumulative, point)
+        else:
+            # Salting with the experiment keeps assignments independent across experiments
+            digest = hashlib.blake2b(f"{experiment_id}:{user_id}".encode(), digest_size=8).digest()
+            point = int.from_bytes(digest, 'big') / HASH_SPACE
+            index = bisect.bisect_right(cumulative, point)
+
+        if index < len(groups):
+            return groups[index]
+
         # Default to control if no group assigned
         return ExperimentGroup.CONTROL
-    
+
+    @staticmethod
+    def _cumulative_allocation(traffic_allocation: Dict[ExperimentGroup, float]) -> Tuple[List[float], List[ExperimentGroup]]:
+        cumulative, groups = [], []
+        total = 0.0
+        for group, allocation in traffic_allocation.items():
+            total += allocation
+            cumulative.append(total)
+            groups.append(ExperimentGroup(group))
+        return cumulative, groups
+
+    def _cache_experiment(self, experiment: ABTestExperiment):
+        self.experiments[experiment.experiment_id] = experiment
+        self._experiment_loaded_at[experiment.experiment_id] = time.monotonic()
+        # The allocation may have changed with the configuration
+        self._allocations.pop(experiment.experiment_id, None)
+
     async def _store_experiment(self, experiment: ABTestExperiment):
         """Store experiment configuration in Redis."""
         key = f"experiment:{experiment.experiment_id}"
         data = experiment.dict()
         data['start_date'] = data['start_date'].isoformat() if data['start_date'] else None
         data['end_date'] = data['end_date'].isoformat() if data['end_date'] else None
-        
-        self.redis_client.set(key, json.dumps(data, default=str))
-    
+
+        await self.redis_client.set(key, json.dumps(data, default=str))
+        self._cache_experiment(experiment)
+
     async def _get_experiment(self, experiment_id: str) -> Optional[ABTestExperiment]:
-        """Get experiment configuration from Redis."""
-        key = f"experiment:{experiment_id}"
-        data = self.redis_client.get(key)
-        
-        if data:
-            experiment_data = json.loads(data)
-            if experiment_data['start_date']:
-                experiment_data['start_date'] = datetime.fromisoformat(experiment_data['start_date'])
-            if experiment_data['end_date']:
-                experiment_data['end_date'] = datetime.fromisoformat(experiment_data['end_date'])
-            
-            return ABTestExperiment(**experiment_data)
-        
-        return None
-    
-    async def _store_user_assignment(self, assignment: UserExperimentAssignment):
-        """Store user assignment in Redis."""
-        key = f"assignment:{assignment.experiment_id}:{assignment.user_id}"
-        data = assignment.dict()
-        data['assigned_at'] = data['assigned_at'].isoformat()
-        
-        # Store with TTL based on experiment duration
-        ttl = 86400 * 30  # 30 days default
-        self.redis_client.setex(key, ttl, json.dumps(data, default=str))
-    
-    async def _get_user_assignment(self, user_id: str, experiment_id: str) -> Optional[UserExperimentAssignment]:
-        """Get user assignment from Redis."""
-        key = f"assignment:{experiment_id}:{user_id}"
-        data = self.redis_client.get(key)
-        
+        """Get experiment configuration, reloaded from Redis once experiment_refresh_interval has passed."""
+        experiment = self.experiments.get(experiment_id)
+        if experiment and (time.monotonic() - self._experiment_loaded_at[experiment_id]
+                           <= self.experiment_refresh_interval):
+            return experiment
+
+        data = await self.redis_client.get(f"experiment:{experiment_id}")
         if data:
-            assignment_data = json.loads(data)
-            assignment_data['assigned_at'] = datetime.fromisoformat(assignment_data['assigned_at'])
-            return UserExperimentAssignment(**assignment_data)
-        
+            experiment = self._parse_experiment(data)
+            self._cache_experiment(experiment)
+            return experiment
+
         return None
-    
+
+    @staticmethod
+    def _parse_experiment(data: str) -> ABTestExperiment:
+        experiment_data = json.loads(data)
+        if experiment_data['start_date']:
+            experiment_data['start_date'] = datetime.fromisoformat(experiment_data['start_date'])
+        if experiment_data['end_date']:
+            experiment_data['end_date'] = datetime.fromisoformat(experiment_data['end_date'])
+
+        return ABTestExperiment(**experiment_data)
+
+    async def _refresh_experiments(self):
+        """Reload every experiment configuration from Redis."""
+        keys = [key async for key in self.redis_client.scan_iter(match="experiment:*")]
+        if keys:
+            for data in await self.redis_client.mget(keys):
+                if data:
+                    self._cache_experiment(self._parse_experiment(data))
+        self._experiments_loaded_at = time.monotonic()
+
     async def _get_active_experiments(self) -> List[ABTestExperiment]:
         """Get all active experiments."""
-        pattern = "experiment:*"
-        keys = self.redis_client.keys(pattern)
-        
-        active_experiments = []
-        
-        for key in keys:
-            experiment = await self._get_experiment(key.split(":")[-1])
-            if experiment and experiment.is_active:
-                # Check if experiment is within date range
-                now = datetime.now()
-                if experiment.start_date <= now:
-                    if not experiment.end_date or experiment.end_date >= now:
-                        active_experiments.append(experiment)
-        
-        return active_experiments
-    
-    async def _store_metric(self, metric_data: Dict[str, Any]):
-        """Store metric data in Redis."""
-        key = f"metric:{metric_data['experiment_id']}:{metric_data['group']}:{metric_data['metric_type']}:{datetime.now().timestamp()}"
-        self.redis_client.setex(key, 86400 * 7, json.dumps(metric_data, default=str))  # Store for 7 days
-    
-    async def _initialize_experiment_metrics(self, experiment_id: str):
-        """Initialize aggregated metrics for an experiment."""
-        for group in ExperimentGroup:
-            for metric_type in MetricType:
-                key = f"agg_metric:{experiment_id}:{group}:{metric_type}"
-                initial_data = {
-                    'count': 0,
-                    'sum': 0.0,
-                    'sum_squares': 0.0,
-                    'mean': 0.0,
-                    'variance': 0.0
-                }
-                self.redis_client.set(key, json.dumps(initial_data))
-    
-    async def _update_aggregated_metrics(self, experiment_id: str, group: ExperimentGroup, metric_type: MetricType, value: float):
-        """Update aggregated metrics incrementally."""
-        key = f"agg_metric:{experiment_id}:{group}:{metric_type}"
-        
-        # Get current aggregated data
-        current_data = self.redis_client.get(key)
-        if current_data:
-            agg_data = json.loads(current_data)
-        else:
-            agg_data = {'count': 0, 'sum': 0.0, 'sum_squares': 0.0, 'mean': 0.0, 'variance': 0.0}
-        
-        # Update aggregated statistics
-        old_count = agg_data['count']
-        new_count = old_count + 1
-        
-        old_mean = agg_data['mean']
-        new_sum = agg_data['sum'] + value
-        new_mean = new_sum / new_count
-        
-        new_sum_squares = agg_data['sum_squares'] + value * value
-        
-        if new_count > 1:
-            new_variance = (new_sum_squares - new_count * new_mean * new_mean) / (new_count - 1)
-        else:
-            new_variance = 0.0
-        
-        # Store updated aggregated data
-        updated_data = {
-            'count': new_count,
-            'sum': new_sum,
-            'sum_squares': new_sum_squares,
-            'mean': new_mean,
-            'variance': max(0.0, new_variance)  # Ensure non-negative variance
-        }
-        
-        self.redis_client.set(key, json.dumps(updated_data))
-    
-    async def _get_group_metrics(self, experiment_id: str, group: ExperimentGroup) -> Dict[str, Dict[str, float]]:
-        """Get aggregated metrics for an experiment group."""
+        if (self._experiments_loaded_at is None or
+                time.monotonic() - self._experiments_loaded_at > self.experiment_refresh_interval):
+            await self._refresh_experiments()
+
+        now = datetime.now()
+        return [experiment for experiment in self.experiments.values() if self._is_running(experiment, now)]
+
+    def _store_metric(self, metric_data: Dict[str, Any]):
+        """Buffer a metric sample for the next flush."""
+        if self._pending_sample_count >= self.max_pending_samples:
+            self.dropped_samples += 1
+            return
+
+        key = f"metric:{metric_data['experiment_id']}:{metric_data['group']}:{metric_data['metric_type']}"
+        self._pending_samples.setdefault(key, []).append(json.dumps(metric_data, default=str))
+        self._pending_sample_count += 1
+
+    def _update_aggregated_metrics(self, experiment_id: str, group: ExperimentGroup, metric_type: MetricType, value: float):
+        """Update the running statistics of this process with one sample."""
+        key = (experiment_id, group.value, metric_type.value)
+        running = self.experiment_metrics.get(key)
+        if running is None:
+            running = self.experiment_metrics[key] = RunningStats()
+        running.update(float(value))
+        self._dirty_metrics.add(key)
+
+    async def _get_group_metrics(self, experiment_id: str) -> Dict[ExperimentGroup, Dict[MetricType, Dict[str, float]]]:
+        """Get aggregated metrics of every experiment group, merging the stats of all processes."""
+        merged: Dict[Tuple[str, str], RunningStats] = {}
+        for key, legacy in (await self._get_legacy_metrics(experiment_id)).items():
+            merged[key] = RunningStats(legacy.count, legacy.mean, legacy.m2)
+
+        # Other processes' stats as of their last flush; this process' own are current in memory
+        fields = await self.redis_client.hgetall(f"agg_metric:{experiment_id}")
+        for field, data in fields.items():
+            group, metric_type, worker_id = field.split(":")
+            if worker_id == self.worker_id:
+                continue
+            count, mean, m2 = json.loads(data)
+            merged.setdefault((group, metric_type), RunningStats()).merge(RunningStats(count, mean, m2))
+
+        for (stats_experiment_id, group, metric_type), running in self.experiment_metrics.items():
+            if stats_experiment_id == experiment_id:
+                merged.setdefault((group, metric_type), RunningStats()).merge(running)
+
         group_metrics = {}
-        
-        for metric_type in MetricType:
-            key = f"agg_metric:{experiment_id}:{group}:{metric_type}"
-            data = self.redis_client.get(key)
-            
-            if data:
-                metric_data = json.loads(data)
-                if metric_data['count'] > 0:
-                    group_metrics[metric_type] = {
-                        'count': metric_data['count'],
-                        'mean': metric_data['mean'],
-                        'variance': metric_data['variance'],
-                        'std_dev': np.sqrt(metric_data['variance']),
-                        'std_error': np.sqrt(metric_data['variance'] / metric_data['count']) if metric_data['count'] > 0 else 0
-                    }
-        
+        for (group, metric_type), running in merged.items():
+            if running.count > 0:
+                group_metrics.setdefault(ExperimentGroup(group), {})[MetricType(metric_type)] = running.summary()
+
         return group_metrics
-    
+
+    async def _get_legacy_metrics(self, experiment_id: str) -> Dict[Tuple[str, str], RunningStats]:
+        """Stats accumulated under the previous per-metric agg_metric keys, which are no longer written."""
+        legacy = self._legacy_metrics.get(experiment_id)
+        if legacy is not None:
+            return legacy
+
+        keys = []
+        for group in ExperimentGroup:
+            for metric_type in MetricType:
+                # Written with the enum values, or the member names on Pythons that format str enums so
+                for group_name, metric_name in {(group.value, metric_type.value), (str(group), str(metric_type))}:
+                    keys.append((group.value, metric_type.value, f"agg_metric:{experiment_id}:{group_name}:{metric_name}"))
+
+        legacy = {}
+        for (group, metric_type, _), data in zip(keys, await self.redis_client.mget([key for *_, key in keys])):
+            if not data:
+                continue
+            agg_data = json.loads(data)
+            count = agg_data['count']
+            if count > 0:
+                mean = agg_data['sum'] / count
+                m2 = max(0.0, agg_data['sum_squares'] - agg_data['sum'] * mean)
+                legacy.setdefault((group, metric_type), RunningStats()).merge(RunningStats(count, mean, m2))
+
+        self._legacy_metrics[experiment_id] = legacy
+        return legacy
+
     async def _calculate_statistical_significance(self, experiment_id: str, group_metrics: Dict[ExperimentGroup, Dict]) -> Dict[str, Dict]:
         """Calculate statistical significance between experiment groups."""
         significance_results = {}
@@ -519,7 +734,15 @@ class RecommendationExperimentManager:
     
     def __init__(self, ab_testing_framework: ABTestingFramework):
         self.ab_framework = ab_testing_framework
-        
+
+    async def initialize(self):
+        """Load experiments and start persisting experiment data in the background."""
+        await self.ab_framework.start()
+
+    async def cleanup(self):
+        """Flush buffered experiment data and close the Redis connection."""
+        await self.ab_framework.close()
+
     async def create_algorithm_comparison_experiment(self, experiment_config: Dict[str, Any]) -> str:
         """Create experiment to compare recommendation algorithms."""
         return await self.ab_framework.create_experiment({
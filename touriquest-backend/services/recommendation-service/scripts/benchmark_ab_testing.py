@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+A/B Assignment Throughput Benchmark
+
+Assigns a stream of distinct users to a three-group experiment and reports
+assignments per second for:
+
+- previous: the earlier implementation, reproduced here; every assignment
+  reads the stored assignment and the experiment from Redis and writes the
+  new assignment, three blocking round trips on the synchronous client
+- decision: ABTestingFramework._assign_to_group alone, the hash-based
+  decision with no I/O
+- request path: ABTestingFramework.assign_user_to_experiment, which
+  buffers the assignment and exposure, followed by one pipelined flush of
+  everything buffered (reported as writes per second)
+- end to end: assign_user_to_experiment with the background flusher
+  persisting assignments and exposures in pipelines as they fill up
+
+Runs against in-process fakeredis by default. fakeredis has no network
+round trip, which flatters the previous implementation, but executes every
+command on the benchmark's own CPU, which weighs on the end-to-end run
+where a real server would not. Pass --redis-url to measure against a real
+server.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models.schemas import ExperimentGroup  # noqa: E402
+from app.utils.ab_testing import ABTestingFramework, MetricType  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+EXPERIMENT = {
+    'name': 'Assignment benchmark',
+    'description': 'Three groups',
+    'start_date': '2025-01-01T00:00:00',
+    'traffic_allocation': {
+        ExperimentGroup.CONTROL: 0.5,
+        ExperimentGroup.VARIANT_A: 0.25,
+        ExperimentGroup.VARIANT_B: 0.25
+    },
+    'success_metrics': [MetricType.CLICK_THROUGH_RATE]
+}
+
+
+def redis_clients(args):
+    """Synchronous and asyncio clients sharing one server (or one fakeredis instance)."""
+    if args.redis_url:
+        import redis
+        import redis.asyncio as aioredis
+        return redis.from_url(args.redis_url, decode_responses=True), aioredis.from_url(args.redis_url, decode_responses=True)
+
+    import fakeredis
+    from fakeredis import aioredis as fake_aioredis
+    server = fakeredis.FakeServer()
+    return (fakeredis.FakeRedis(server=server, decode_responses=True),
+            fake_aioredis.FakeRedis(server=server, decode_responses=True))
+
+
+def previous_assign(client, experiment_id: str, user_id: str) -> str:
+    """The previous assign_user_to_experiment for a user without a stored assignment."""
+    assignment_key = f"assignment:{experiment_id}:{user_id}"
+    if client.get(assignment_key):
+        raise RuntimeError("users are expected to be new")
+
+    experiment = json.loads(client.get(f"experiment:{experiment_id}"))
+    hash_value = int(hashlib.md5(user_id.encode()).hexdigest(), 16) % 10000
+    normalized_hash = hash_value / 10000
+    group = ExperimentGroup.CONTROL.value
+    cumulative_probability = 0.0
+    for candidate, allocation in experiment['traffic_allocation'].items():
+        cumulative_probability += allocation
+        if normalized_hash <= cumulative_probability:
+            group = candidate
+            break
+
+    data = {'user_id': user_id, 'experiment_id': experiment_id, 'group': group, 'assigned_at': datetime.now().isoformat()}
+    client.set(assignment_key, json.dumps(data), ex=86400 * 30)
+    return group
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    sync_client, async_client = redis_clients(args)
+
+    ab = ABTestingFramework(flush_interval=args.flush_interval, flush_batch_size=args.flush_batch_size)
+    ab.redis_client = async_client
+    experiment_id = await ab.create_experiment(EXPERIMENT)
+
+    started = time.perf_counter()
+    for n in range(args.previous_users):
+        previous_assign(sync_client, experiment_id, f"previous_{n}")
+    results['previous'] = args.previous_users / (time.perf_counter() - started)
+
+    experiment = ab.experiments[experiment_id]
+    started = time.perf_counter()
+    for n in range(args.users):
+        ab._assign_to_group(f"decision_{n}", experiment)
+    results['decision'] = args.users / (time.perf_counter() - started)
+
+    # Request path with the flusher stopped, then one flush of everything buffered
+    started = time.perf_counter()
+    for n in range(args.users):
+        await ab.assign_user_to_experiment(f"request_{n}", experiment_id)
+    results['request_path'] = args.users / (time.perf_counter() - started)
+    pending = ab.pending_writes
+    started = time.perf_counter()
+    await ab.flush()
+    results['flush_writes'] = pending / (time.perf_counter() - started)
+
+    await ab.start()
+    started = time.perf_counter()
+    for n in range(args.users):
+        await ab.assign_user_to_experiment(f"user_{n}", experiment_id)
+        if n % 1000 == 0:
+            # Assignments never wait on I/O; yield like request handlers would, so the flusher runs
+            await asyncio.sleep(0)
+    await ab.flush()
+    results['end_to_end'] = args.users / (time.perf_counter() - started)
+
+    exposures = await async_client.hgetall(f"exposures:{experiment_id}")
+    results['exposures'] = {group: int(count) for group, count in exposures.items()}
+    results['stored_assignments'] = sum([1 async for _ in async_client.scan_iter(match=f"assignment:{experiment_id}:user_*", count=10_000)])
+    await ab.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--previous-users", type=int, default=20_000)
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    parser.add_argument("--flush-batch-size", type=int, default=5000)
+    parser.add_argument("--redis-url", default=None, help="Real Redis server instead of fakeredis")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+
+    logger.info(f"previous: {results['previous']:,.0f} assignments/s")
+    logger.info(f"decision only: {results['decision']:,.0f} assignments/s")
+    logger.info(
+        f"request path: {results['request_path']:,.0f} assignments/s "
+        f"({results['request_path'] / results['previous']:.0f}x previous), "
+        f"flushed at {results['flush_writes']:,.0f} writes/s"
+    )
+    logger.info(f"end to end: {results['end_to_end']:,.0f} assignments/s")
+    logger.info(f"stored {results['stored_assignments']} assignments, exposures by group {results['exposures']}")
+
+
+if __name__ == "__main__":
+    main()
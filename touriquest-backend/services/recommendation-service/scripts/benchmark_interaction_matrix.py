@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Interaction Matrix Benchmark
+
+Builds the user-item interaction matrix of a synthetic interaction log
+(ratings and timestamps, power-law item popularity) two ways and reports
+time and peak traced memory of each:
+
+- previous: the whole log as one DataFrame, pivoted into dense rating and
+  recency matrices
+- streaming: InteractionMatrixBuilder fed chunks the way a chunked
+  database query returns them, producing a CSR matrix
+
+Both run on the same dataset, which is kept small enough for the dense
+pivot to fit in memory; --skip-previous runs the streaming builder alone
+on larger logs. The streaming result is checked against the dense one.
+"""
+
+import argparse
+import gc
+import logging
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.features.interaction_matrix import InteractionMatrixBuilder  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+AS_OF = pd.Timestamp('2025-06-30', tz='UTC')
+
+
+def interaction_chunks(args, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """The synthetic log in chunks, generated lazily like rows fetched from the database."""
+    rng = np.random.default_rng(args.seed)
+    popularity = rng.zipf(1.1, args.items).clip(max=100_000).astype(np.float64)
+    popularity /= popularity.sum()
+    for start in range(0, args.interactions, chunk_size):
+        n = min(chunk_size, args.interactions - start)
+        yield pd.DataFrame({
+            'user_id': np.char.add('user_', rng.integers(0, args.users, n).astype(str)),
+            'item_id': np.char.add('item_', rng.choice(args.items, n, p=popularity).astype(str)),
+            'rating': rng.integers(1, 6, n).astype(np.float32),
+            'timestamp': AS_OF - pd.to_timedelta(rng.integers(0, 365, n), unit='D'),
+        })
+
+
+def previous_matrix(args) -> pd.DataFrame:
+    """Previous FeatureEngineer implementation on the whole log."""
+    interactions = pd.concat(list(interaction_chunks(args, args.chunk_size)), ignore_index=True)
+    interaction_matrix = interactions.pivot_table(index='user_id', columns='item_id', values='rating', fill_value=0)
+    interactions['days_ago'] = (AS_OF - pd.to_datetime(interactions['timestamp'])).dt.days
+    interactions['recency_weight'] = np.exp(-interactions['days_ago'] / 30)
+    weighted_matrix = interactions.pivot_table(
+        index='user_id', columns='item_id', values='recency_weight', aggfunc='sum', fill_value=0
+    )
+    return interaction_matrix + 0.3 * weighted_matrix
+
+
+def streaming_matrix(args):
+    builder = InteractionMatrixBuilder(compact_entries=args.compact_entries)
+    builder.extend(interaction_chunks(args, args.chunk_size))
+    return builder.build(AS_OF)
+
+
+def measure(build: Callable[[], Any]) -> Dict[str, Any]:
+    """Time one untraced run, then trace the peak memory of a second one (tracing slows it down)."""
+    gc.collect()
+    started = time.perf_counter()
+    build()
+    seconds = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': seconds, 'peak_mb': peak / 1e6, 'result': result}
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    streaming = measure(lambda: streaming_matrix(args))
+    matrix = streaming.pop('result')
+    streaming['nnz'] = matrix.matrix.nnz
+    streaming['result_mb'] = (matrix.matrix.data.nbytes + matrix.matrix.indices.nbytes + matrix.matrix.indptr.nbytes) / 1e6
+    results['streaming'] = streaming
+    results['shape'] = matrix.shape
+
+    if not args.skip_previous:
+        previous = measure(lambda: previous_matrix(args))
+        dense = previous.pop('result')
+        aligned = pd.DataFrame(matrix.matrix.toarray(), index=matrix.user_ids, columns=matrix.item_ids)
+        aligned = aligned.loc[dense.index, dense.columns]
+        previous['max_abs_difference'] = float(np.abs(aligned.to_numpy() - dense.to_numpy()).max())
+        results['previous'] = previous
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interactions", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--items", type=int, default=5_000)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--compact-entries", type=int, default=2_000_000)
+    parser.add_argument("--skip-previous", action="store_true", help="Only run the streaming builder")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+
+    users, items = results['shape']
+    streaming = results['streaming']
+    logger.info(
+        f"{args.interactions} interactions, {users} x {items} matrix with {streaming['nnz']} pairs "
+        f"({streaming['result_mb']:.1f} MB as CSR)"
+    )
+    logger.info(f"streaming: {streaming['seconds']:.1f}s, peak {streaming['peak_mb']:.0f} MB")
+    if 'previous' in results:
+        previous = results['previous']
+        logger.info(f"previous: {previous['seconds']:.1f}s, peak {previous['peak_mb']:.0f} MB")
+        logger.info(
+            f"Peak memory {previous['peak_mb'] / streaming['peak_mb']:.1f}x lower; "
+            f"max difference {previous['max_abs_difference']:.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
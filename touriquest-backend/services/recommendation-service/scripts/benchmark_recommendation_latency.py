@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Recommendation Latency Benchmark
+
+Builds candidate pools for a synthetic travel catalogue (50k items in 60
+regions, 50k users, ~1M interactions), then times the recommendation path
+(candidate retrieval, algorithm scoring, merging, re-ranking and formatting)
+with three factor models loaded:
+
+- catalogue: every item of the requested type (and region, when filtered),
+  i.e. scoring without a retrieval stage
+- pools: the user's precomputed pool filtered by type and region
+
+It reports build time, pool size on disk, p50/p95/p99 latency against a p95
+target, and how often a held-out interaction of the user is in their pool.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from uuid import UUID
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.candidate_pools import CandidatePoolBuilder, CandidatePools, CandidateSet  # noqa: E402
+from app.core.recommendation_engine import RealtimeRecommendationEngine  # noqa: E402
+from app.models.schemas import RecommendationRequest, RecommendationType  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+ITEM_TYPES = [RecommendationType.PROPERTY, RecommendationType.POI, RecommendationType.EXPERIENCE]
+
+
+class FactorScorer:
+    """Stand-in for a trained model: dot products of user and item factors"""
+
+    def __init__(self, user_ids: List[str], item_ids: List[str], dimension: int, seed: int):
+        rng = np.random.default_rng(seed)
+        self.user_rows = {user_id: row for row, user_id in enumerate(user_ids)}
+        self.item_rows = {item_id: row for row, item_id in enumerate(item_ids)}
+        self.user_factors = rng.standard_normal((len(user_ids), dimension)).astype(np.float32) / np.sqrt(dimension)
+        self.item_factors = rng.standard_normal((len(item_ids), dimension)).astype(np.float32)
+
+    def predict(self, user_id: str, item_ids: List[str]) -> Dict[str, float]:
+        row = self.user_rows.get(user_id)
+        known = [item_id for item_id in item_ids if item_id in self.item_rows]
+        if row is None or not known:
+            return {}
+        columns = [self.item_rows[item_id] for item_id in known]
+        scores = 1 / (1 + np.exp(-self.item_factors[columns] @ self.user_factors[row]))
+        return dict(zip(known, scores.tolist()))
+
+
+def synthetic_data(n_users: int, n_items: int, n_regions: int, per_user: int, seed: int):
+    rng = np.random.default_rng(seed)
+    item_regions = rng.integers(0, n_regions, n_items)
+    item_types = rng.integers(0, len(ITEM_TYPES), n_items)
+    items = pd.DataFrame({
+        'item_id': [f"item_{n}" for n in range(n_items)],
+        'item_type': [ITEM_TYPES[code].value for code in item_types],
+        'region': [f"region_{code}" for code in item_regions],
+    })
+
+    # Content vectors cluster by region and type
+    region_centroids = rng.standard_normal((n_regions, 32))
+    type_centroids = rng.standard_normal((len(ITEM_TYPES), 32))
+    vectors = (
+        region_centroids[item_regions] + 0.5 * type_centroids[item_types]
+        + 0.8 * rng.standard_normal((n_items, 32))
+    ).astype(np.float32)
+
+    # Users travel to a couple of home regions and favour popular items there
+    items_by_region = [np.flatnonzero(item_regions == region) for region in range(n_regions)]
+    appeal = rng.zipf(1.6, n_items).astype(np.float64)
+    counts = rng.poisson(per_user, n_users) + 1
+    user_col, item_col = [], []
+    for user in range(n_users):
+        homes = rng.integers(0, n_regions, 2)
+        pool = np.concatenate([items_by_region[homes[0]], items_by_region[homes[1]]])
+        weights = appeal[pool] / appeal[pool].sum()
+        chosen = rng.choice(pool, size=counts[user], p=weights)
+        user_col.append(np.full(len(chosen), user))
+        item_col.append(chosen)
+    user_col, item_col = np.concatenate(user_col), np.concatenate(item_col)
+
+    interactions = pd.DataFrame({
+        'user_id': [str(UUID(int=int(user))) for user in user_col],
+        'item_id': items['item_id'].to_numpy()[item_col],
+        'rating': rng.integers(3, 6, len(item_col)).astype(np.float32),
+        'timestamp': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365 * 86400, len(item_col)), unit='s'),
+    })
+    return items, vectors, interactions
+
+
+def holdout_last(interactions: pd.DataFrame):
+    ordered = interactions.sort_values('timestamp', kind='stable')
+    last = ordered.groupby('user_id').tail(1)
+    return ordered.drop(last.index), last
+
+
+async def time_requests(engine: RealtimeRecommendationEngine, requests: List[RecommendationRequest]) -> Dict[str, Any]:
+    latencies = []
+    for request in requests:
+        started = time.perf_counter()
+        await engine._generate_recommendations(request)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies = np.array(latencies)
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+    }
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    rng = np.random.default_rng(args.seed)
+    results: Dict[str, Any] = {}
+
+    started = time.perf_counter()
+    items, vectors, interactions = synthetic_data(args.users, args.items, args.regions, args.per_user, args.seed)
+    history, held_out = holdout_last(interactions)
+    logger.info(f"Generated {len(interactions)} interactions in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    pools = CandidatePoolBuilder(pool_size=args.pool_size).build(history, items, vectors)
+    results['build_seconds'] = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "candidate_pools.npz")
+        pools.save(path)
+        results['pool_file_mb'] = os.path.getsize(path) / 1e6
+        started = time.perf_counter()
+        pools = CandidatePools.load(path)
+        results['load_seconds'] = time.perf_counter() - started
+
+    # Share of held-out interactions that the pool would have offered
+    hits = 0
+    sample = held_out.sample(min(5000, len(held_out)), random_state=args.seed)
+    for user_id, item_id in zip(sample['user_id'], sample['item_id']):
+        hits += item_id in set(pools.candidates_for(user_id, limit=args.pool_size).item_ids)
+    results['pool_recall'] = hits / len(sample)
+
+    engine = RealtimeRecommendationEngine()
+    user_ids = sorted(set(interactions['user_id']))
+    item_ids = items['item_id'].tolist()
+    for seed, name in enumerate(['collaborative_filtering', 'content_based', 'matrix_factorization']):
+        engine.model_manager.models[name] = FactorScorer(user_ids, item_ids, 32, seed)
+
+    regions = items['region'].unique()
+    requests = []
+    for _ in range(args.requests):
+        # Roughly one request in ten comes from a user the pools have never seen
+        known = rng.random() > 0.1
+        user_id = UUID(user_ids[rng.integers(len(user_ids))]) if known else UUID(int=int(rng.integers(2**60, 2**61)))
+        filters = {'location': str(rng.choice(regions))} if rng.random() < 0.5 else {}
+        requests.append(RecommendationRequest(
+            user_id=user_id,
+            recommendation_type=ITEM_TYPES[rng.integers(len(ITEM_TYPES))],
+            limit=20,
+            filters=filters
+        ))
+
+    async def whole_catalogue(request: RecommendationRequest) -> CandidateSet:
+        mask = pools.item_types == pools._type_codes[request.recommendation_type.value]
+        if 'location' in request.filters:
+            mask &= pools.item_regions == pools._region_codes[request.filters['location']]
+        index = np.flatnonzero(mask)
+        return CandidateSet(
+            item_ids=pools.item_ids[index].tolist(),
+            item_index=index,
+            prior_scores=np.zeros(len(index), dtype=np.float32),
+            sources=np.zeros(len(index), dtype=np.uint8)
+        )
+
+    engine._get_candidate_items = whole_catalogue
+    results['catalogue'] = await time_requests(engine, requests[:args.requests // 10])
+    del engine._get_candidate_items
+    engine.candidate_pools = pools
+    results['pools'] = await time_requests(engine, requests)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--items", type=int, default=50_000)
+    parser.add_argument("--regions", type=int, default=60)
+    parser.add_argument("--per-user", type=int, default=20, help="Mean interactions per user")
+    parser.add_argument("--pool-size", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--p95-target-ms", type=float, default=25.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+
+    logger.info(
+        f"Pools: built in {results['build_seconds']:.1f}s, {results['pool_file_mb']:.1f} MB on disk, "
+        f"loaded in {results['load_seconds'] * 1000:.0f} ms, held-out recall {results['pool_recall']:.1%}"
+    )
+    for label in ('catalogue', 'pools'):
+        stats = results[label]
+        logger.info(
+            f"{label}: p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms"
+        )
+    verdict = "met" if results['pools']['p95_ms'] <= args.p95_target_ms else "MISSED"
+    logger.info(f"p95 target of {args.p95_target_ms:.0f} ms {verdict}")
+
+
+if __name__ == "__main__":
+    main()
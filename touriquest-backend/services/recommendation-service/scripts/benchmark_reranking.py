@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Re-ranking Benchmark
+
+Re-ranks 5k scored candidates down to k=50 under a sunny weekend context
+with a budget preference, comparing:
+
+- dicts: the previous implementation, substring checks on item ids for the
+  contextual boosts and a per-category "boost the second best" pass over
+  score dicts, then a full sort
+- pairwise MMR: attribute-mask boosts, then MMR over a precomputed n x n
+  similarity matrix
+- arrays: Reranker, attribute-mask boosts and MMR with incremental
+  max-similarity updates (O(k * n))
+
+Reports p50/p95 latency per re-rank and how many distinct categories end up
+in the top k.
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.candidate_pools import CandidateSet, ItemAttributes  # noqa: E402
+from app.core.reranking import Reranker, mmr_select  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ['museum', 'tour', 'hike', 'spa', 'show', 'market', 'beach', 'restaurant', 'riad', 'desert']
+TAGS = ['outdoor', 'nature', 'entertainment', 'leisure', 'cultural', 'family', 'nightlife', 'wellness']
+CONTEXT = {'is_weekend': 1, 'is_sunny': 1, 'budget_preference': 0.25,
+           'current_latitude': 31.63, 'current_longitude': -8.0}
+
+
+def synthetic_candidates(n: int, dimension: int, seed: int) -> Tuple[CandidateSet, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    categories = rng.integers(0, len(CATEGORIES), n)
+    tags = [','.join(rng.choice(TAGS, size=rng.integers(0, 3), replace=False)) for _ in range(n)]
+    items = pd.DataFrame({
+        # Ids carry category and tags so the previous substring checks have something to match
+        'item_id': [f"{CATEGORIES[c]}_{t.replace(',', '_')}_{i}" for i, (c, t) in enumerate(zip(categories, tags))],
+        'item_type': 'experience',
+        'category': [CATEGORIES[c] for c in categories],
+        'latitude': 31.63 + rng.normal(0, 0.1, n),
+        'longitude': -8.0 + rng.normal(0, 0.1, n),
+        'price': rng.lognormal(4, 1, n),
+        'tags': tags,
+    })
+    vectors = rng.standard_normal((len(CATEGORIES), dimension))[categories] + rng.standard_normal((n, dimension))
+    attributes = ItemAttributes.from_frame(items, vectors if dimension else None)
+    candidates = CandidateSet(
+        item_ids=items['item_id'].tolist(),
+        item_index=np.arange(n, dtype=np.int32),
+        prior_scores=np.zeros(n, dtype=np.float32),
+        sources=np.zeros(n, dtype=np.uint8),
+        attributes=attributes,
+    )
+    # Relevance concentrated on a few categories, as a personalised model would produce
+    affinity = rng.random(len(CATEGORIES)) ** 3
+    scores = np.clip(0.3 + 0.5 * affinity[categories] + rng.normal(0, 0.1, n), 0, 1)
+    return candidates, scores
+
+
+def rerank_dicts(item_ids: List[str], scores: np.ndarray, context: Dict[str, float],
+                 k: int, min_score: float) -> List[Tuple[str, float]]:
+    """Previous implementation: dict passes with substring checks, then a full sort."""
+    boosted = dict(zip(item_ids, scores.tolist()))
+    if context.get('is_weekend'):
+        for item_id in boosted:
+            if 'entertainment' in item_id or 'leisure' in item_id:
+                boosted[item_id] *= 1.1
+    if context.get('is_sunny'):
+        for item_id in boosted:
+            if 'outdoor' in item_id or 'nature' in item_id:
+                boosted[item_id] *= 1.15
+    if 'budget_preference' in context:
+        for item_id in boosted:
+            if 'luxury' in item_id and context['budget_preference'] > 0.7:
+                boosted[item_id] *= 1.2
+            elif 'budget' in item_id and context['budget_preference'] < 0.4:
+                boosted[item_id] *= 1.2
+
+    diverse = boosted.copy()
+    categories: Dict[str, List[str]] = {}
+    for item_id in boosted:
+        categories.setdefault(item_id.split('_')[0], []).append(item_id)
+    for members in categories.values():
+        if len(members) > 1:
+            second = sorted(members, key=lambda x: boosted[x], reverse=True)[1]
+            diverse[second] *= 1.1
+
+    kept = {item_id: score for item_id, score in diverse.items() if score >= min_score}
+    return sorted(kept.items(), key=lambda x: x[1], reverse=True)[:k]
+
+
+def rerank_pairwise(reranker: Reranker, candidates: CandidateSet, scores: np.ndarray,
+                    context: Dict[str, float], k: int, min_score: float) -> np.ndarray:
+    """Mask boosts, then MMR over a full similarity matrix."""
+    attributes = candidates.attributes
+    scores = scores * reranker.context_multipliers(attributes, candidates.item_index, context)
+    eligible = np.flatnonzero(scores >= min_score)
+    index = candidates.item_index[eligible]
+    categories = attributes.categories[index]
+    rows, cols = attributes.cell_rows[index], attributes.cell_cols[index]
+    similarity = reranker.category_similarity * (categories[:, None] == categories[None, :])
+    similarity += reranker.location_similarity * ((rows[:, None] == rows[None, :]) & (cols[:, None] == cols[None, :]))
+    if attributes.vectors is not None:
+        vectors = attributes.vectors[index].astype(np.float32)
+        similarity += reranker.content_similarity * np.clip(vectors @ vectors.T, 0.0, 1.0)
+    return eligible[mmr_select(scores[eligible], k, reranker.diversity, lambda j: similarity[j])]
+
+
+def time_calls(call: Callable[[], Any], repeats: int) -> Dict[str, Any]:
+    result = call()
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'result': result,
+    }
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    candidates, scores = synthetic_candidates(args.candidates, args.dimension, args.seed)
+    attributes = candidates.attributes
+    reranker = Reranker()
+    min_score = 0.3
+
+    def categories_of(positions) -> int:
+        return len(set(attributes.categories[candidates.item_index[positions]].tolist()))
+
+    results: Dict[str, Any] = {}
+    dicts = time_calls(
+        lambda: rerank_dicts(candidates.item_ids, scores, CONTEXT, args.k, min_score), args.repeats
+    )
+    positions = {item_id: n for n, item_id in enumerate(candidates.item_ids)}
+    dicts['categories'] = categories_of([positions[item_id] for item_id, _ in dicts.pop('result')])
+    results['dicts'] = dicts
+
+    pairwise = time_calls(
+        lambda: rerank_pairwise(reranker, candidates, scores, CONTEXT, args.k, min_score),
+        max(1, args.repeats // 10)
+    )
+    pairwise_positions = pairwise.pop('result')
+    pairwise['categories'] = categories_of(pairwise_positions)
+    results['pairwise MMR'] = pairwise
+
+    arrays = time_calls(
+        lambda: reranker.rerank(scores, candidates, CONTEXT, k=args.k, min_score=min_score), args.repeats
+    )
+    array_positions, _ = arrays.pop('result')
+    arrays['categories'] = categories_of(array_positions)
+    arrays['matches_pairwise'] = bool(np.array_equal(array_positions, pairwise_positions))
+    results['arrays'] = arrays
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--candidates", type=int, default=5000)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--dimension", type=int, default=32, help="Content vector size, 0 for none")
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+
+    logger.info(f"Re-ranking {args.candidates} candidates to k={args.k}")
+    for label, stats in results.items():
+        logger.info(
+            f"{label}: p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms, "
+            f"{stats['categories']} categories in the top {args.k}"
+        )
+    logger.info(f"Incremental MMR matches pairwise MMR: {results['arrays']['matches_pairwise']}")
+
+
+if __name__ == "__main__":
+    main()
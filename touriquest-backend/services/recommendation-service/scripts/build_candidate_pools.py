@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Build Candidate Pools
+
+Offline refresh job for the recommendation engine's candidate pools. Reads
+interaction and item exports (CSV or Parquet), builds the pools and writes
+them atomically to the path the engine loads at startup
+(models/candidate_pools.npz by default). Run it on a schedule, e.g. nightly.
+
+Inputs:
+- interactions: user_id, item_id and optionally rating, timestamp
+- items: item_id, item_type, region and optionally category, latitude,
+  longitude, price or price_band, tags (re-ranking attributes)
+- item vectors (optional): .npy matrix with one row per row of the items file
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.candidate_pools import CandidatePoolBuilder  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def read_table(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interactions", required=True)
+    parser.add_argument("--items", required=True)
+    parser.add_argument("--item-vectors", help="Optional .npy content feature matrix")
+    parser.add_argument("--output", default="models/candidate_pools.npz")
+    parser.add_argument("--pool-size", type=int, default=300)
+    args = parser.parse_args()
+
+    interactions = read_table(args.interactions)
+    items = read_table(args.items)
+    item_vectors = np.load(args.item_vectors) if args.item_vectors else None
+    logger.info(f"Read {len(interactions)} interactions and {len(items)} items")
+
+    pools = CandidatePoolBuilder(pool_size=args.pool_size).build(interactions, items, item_vectors)
+    pools.save(args.output)
+    logger.info(f"Wrote candidate pools for {len(pools)} users to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Test Suite for the A/B Testing Framework
+
+Checks that hash-based assignment is deterministic and follows the traffic
+allocation without touching Redis, that exposures and metrics are written
+in pipelined flushes (and kept when a flush fails), and that the Welford
+running statistics merged across processes match the raw samples.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+from fakeredis import aioredis as fake_aioredis
+
+from app.models.schemas import ABTestExperiment, ExperimentGroup
+from app.utils.ab_testing import ASSIGNMENT_HASH, ABTestingFramework, MetricType, RunningStats
+
+EXPERIMENT = {
+    'name': 'Riad ranking',
+    'description': 'Ranking variants for riads',
+    'start_date': '2025-01-01T00:00:00',
+    'traffic_allocation': {
+        ExperimentGroup.CONTROL: 0.5,
+        ExperimentGroup.VARIANT_A: 0.3,
+        ExperimentGroup.VARIANT_B: 0.2
+    },
+    'success_metrics': [MetricType.CONVERSION_RATE]
+}
+
+
+class CountingRedis(fake_aioredis.FakeRedis):
+    """fakeredis that counts commands sent outside pipelines and pipeline round trips"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commands = 0
+        self.pipelines = 0
+        self.fail_pipelines = False
+
+    async def execute_command(self, *args, **options):
+        self.commands += 1
+        return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        execute = pipe.execute
+
+        async def counted_execute(raise_on_error=True):
+            self.pipelines += 1
+            if self.fail_pipelines:
+                await pipe.reset()
+                raise ConnectionError("redis unavailable")
+            return await execute(raise_on_error)
+
+        pipe.execute = counted_execute
+        return pipe
+
+
+def previous_group(user_id, traffic_allocation):
+    """Group assigned before the hash scheme was recorded on experiments"""
+    normalized_hash = (int(hashlib.md5(user_id.encode()).hexdigest(), 16) % 10000) / 10000
+    cumulative_probability = 0.0
+    for group, allocation in traffic_allocation.items():
+        cumulative_probability += allocation
+        if normalized_hash <= cumulative_probability:
+            return group
+    return ExperimentGroup.CONTROL
+
+
+def framework(**kwargs):
+    ab = ABTestingFramework(**kwargs)
+    ab.redis_client = CountingRedis(decode_responses=True)
+    return ab
+
+
+class TestAssignment:
+    """Test cases for deterministic hash-based assignment"""
+
+    async def test_assignment_is_deterministic_and_needs_no_redis_round_trip(self):
+        ab = framework()
+        experiment_id = await ab.create_experiment(EXPERIMENT)
+        ab.redis_client.commands = 0
+
+        groups = [await ab.assign_user_to_experiment(f"user_{n}", experiment_id) for n in range(1000)]
+
+        # A second process with its own cache assigns every user identically
+        other = framework()
+        other.redis_client = ab.redis_client
+        assert groups == [await other.assign_user_to_experiment(f"user_{n}", experiment_id) for n in range(1000)]
+        # The first process never read Redis, the second loaded the experiment once
+        assert ab.redis_client.commands == 1
+
+    async def test_assignment_follows_the_traffic_allocation(self):
+        ab = framework()
+        experiment_id = await ab.create_experiment(EXPERIMENT)
+
+        groups = [await ab.assign_user_to_experiment(f"user_{n}", experiment_id) for n in range(20000)]
+
+        for group, share in EXPERIMENT['traffic_allocation'].items():
+            assert abs(groups.count(group) / len(groups) - share) < 0.015
+
+    async def test_experiments_created_before_the_hash_change_keep_their_groups(self):
+        previous = framework()
+        await previous._store_experiment(ABTestExperiment(
+            experiment_id='exp_20240101_000000_legacy',
+            name=EXPERIMENT['name'],
+            description=EXPERIMENT['description'],
+            start_date=datetime(2024, 1, 1),
+            traffic_allocation=EXPERIMENT['traffic_allocation'],
+            success_metrics=EXPERIMENT['success_metrics']
+        ))
+        ab = framework()
+        ab.redis_client = previous.redis_client
+
+        users = [f"user_{n}" for n in range(2000)]
+        groups = [await ab.assign_user_to_experiment(user, 'exp_20240101_000000_legacy') for user in users]
+        assert groups == [previous_group(user, EXPERIMENT['traffic_allocation']) for user in users]
+
+        # Metrics land in the group the user was shown
+        await ab.track_metric(users[0], 'exp_20240101_000000_legacy', MetricType.CONVERSION_RATE, 1.0)
+        assert list(ab.experiment_metrics) == [
+            ('exp_20240101_000000_legacy', groups[0].value, MetricType.CONVERSION_RATE.value)
+        ]
+
+        # New experiments record the current scheme and bucket by experiment and user
+        experiment_id = await ab.create_experiment(EXPERIMENT)
+        assert ab.experiments[experiment_id].metadata['assignment_hash'] == ASSIGNMENT_HASH
+        new_groups = [await ab.assign_user_to_experiment(user, experiment_id) for user in users]
+        assert new_groups != groups
+
+    async def test_unknown_and_stopped_experiments_assign_control(self):
+        ab = framework()
+        experiment_id = await ab.create_experiment(EXPERIMENT)
+        await ab.stop_experiment(experiment_id)
+
+        assert await ab.assign_user_to_experiment('user_1', experiment_id) == ExperimentGroup.CONTROL
+        assert await ab.assign_user_to_experiment('user_1', 'exp_missing') == ExperimentGroup.CONTROL
+
+    async def test_changes_from_other_replicas_are_picked_up_after_the_refresh_interval(self):
+        ab = framework(experiment_refresh_interval=0.0)
+        experiment_id = await ab.create_experiment(EXPERIMENT)
+        other = framework()
+        other.redis_client = ab.redis_client
+        await other.stop_experiment(experiment_id)
+
+        groups = [await ab.assign_user_to_experiment(f"user_{n}", experiment_id) for n in range(20)]
+
+        assert ab.experiments[experiment_id].is_active is False
+        assert set(groups) == {ExperimentGroup.CONTROL}
+
+
+class TestMetricExposure:
+    """Test cases for counting metrics only of users shown a group"""
+
+    async def test_metrics_of_users_never_assigned_are_skipped(self):
+        ab = framework()
+        experiment_id = await ab.create_experiment(EXPERIMENT)
+
+        await ab.track_metric('user_1', experiment_id, MetricType.CONVERSION_RATE, 1.0)
+        assert ab.experiment_metrics == {}
+
+        # An assignment flushed by another replica counts
+        other = framework()
+        other.redis_client = ab.redis_client
+        await other.assign_user_to_experiment('user_1', experiment_id)
+        await other.flush()
+        await ab.track_metric('user_1', experiment_id, MetricType.CONVERSION_RATE, 1.0)
+        assert len(ab.experiment_metrics) == 1
+
+    async def test_metrics_outside_the_experiment_run_are_skipped(self):
+        ab = framework()
+        experiment_id = await ab.create_experiment({
+            **EXPERIMENT, 'end_date': (datetime.now() - timedelta(days=1)).isoformat()
+        })
+        assert await ab.assign_user_to_experiment('user_1', experiment_id) == ExperimentGroup.CONTROL
+
+        await ab.track_metric('user_1', experiment_id, MetricType.CONVERSION_RATE, 1.0)
+        assert ab.experiment_metrics == {}
+
+
+class TestPersistence:
+    """Test cases for pipelined writes of exposures and metrics"""
+
+    async def test_exposures_and_metrics_are_flushed_in_one_pipeline(self):
+        ab = framework()
+        experiment_id = await ab.create_experiment(EXPERIMENT)
+        for n in range(50):
+            group = await ab.assign_user_to_experiment(f"user_{n}", experiment_id)
+            await ab.assign_user_to_experiment(f"user_{n}", experiment_id)
+            await ab.track_metric(f"user_{n}", experiment_id, 'conversion_rate', 1.0)
+
+        assert await ab.redis_client.get(f"assignment:{experiment_id}:user_0") is None
+        await ab.flush()
+
+        assert ab.redis_client.pipelines == 1
+        assert ab.pending_writes == 0
+        exposures = await ab.redis_client.hgetall(f"exposures:{experiment_id}")
+        assert sum(int(count) for count in exposures.values()) == 100
+        assignment = await ab.redis_client.get(f"assignment:{experiment_id}:user_49")
+        assert assignment is not None and group.value in assignment
+        samples = 0
+        for group in ExperimentGroup:
+            samples += await ab.redis_client.llen(f"metric:{experiment_id}:{group.value}:conversion_rate")
+        assert samples == 50
+
+    async def test_failed_flush_keeps_the_writes_for_the_next_one(self):
+        ab = framework()
+        experiment_id = await ab.create_experiment(EXPERIMENT)
+        await ab.assign_user_to_experiment('user_1', experiment_id)
+        await ab.track_metric('user_1', experiment_id, MetricType.ENGAGEMENT_TIME, 12.0)
+
+        ab.redis_client.fail_pipelines = True
+        assert await ab.flush() == 0
+        await ab.assign_user_to_experiment('user_1', experiment_id)
+        ab.redis_client.fail_pipelines = False
+        await ab.flush()
+
+        exposures = await ab.redis_client.hgetall(f"exposures:{experiment_id}")
+        assert sum(int(count) for count in exposures.values()) == 2
+        assert len(await ab.redis_client.hgetall(f"agg_metric:{experiment_id}")) == 1
+
+    async def test_background_flusher_writes_buffered_exposures(self):
+        ab = framework(flush_interval=0.01)
+        experiment_id = await ab.create_experiment(EXPERIMENT)
+        await ab.start()
+
+        await ab.assign_user_to_experiment('user_1', experiment_id)
+        await ab.close()
+
+        assert await ab.redis_client.exists(f"assignment:{experiment_id}:user_1")
+
+
+class TestRunningStatistics:
+    """Test cases for Welford statistics and experiment results"""
+
+    def test_welford_and_merge_match_numpy(self):
+        rng = np.random.default_rng(0)
+        # A large offset is where the previous sum-of-squares variance lost precision
+        values = 1e6 + rng.standard_normal(5000)
+        left, right = RunningStats(), RunningStats()
+        for value in values[:1200]:
+            left.update(value)
+        for value in values[1200:]:
+            right.update(value)
+
+        merged = left.merge(right)
+
+        assert merged.count == len(values)
+        assert np.isclose(merged.mean, values.mean())
+        assert np.isclose(merged.variance, values.var(ddof=1), rtol=1e-6)
+
+    async def test_results_merge_every_process_and_match_the_samples(self):
+        rng = np.random.default_rng(1)
+        redis_client = CountingRedis(decode_responses=True)
+        replicas = [framework(), framework()]
+        for ab in replicas:
+            ab.redis_client = redis_client
+        # A fixed id keeps the hashed groups, and so the sampled means, the same on every run
+        replicas[0]._generate_experiment_id = lambda name: 'exp_20250101_000000_riads'
+        experiment_id = await replicas[0].create_experiment(EXPERIMENT)
+
+        samples = {group: [] for group in ExperimentGroup}
+        for n in range(3000):
+            ab = replicas[n % 2]
+            user_id = f"user_{n}"
+            group = await ab.assign_user_to_experiment(user_id, experiment_id)
+            value = float(rng.normal(5.0 if group == ExperimentGroup.CONTROL else 5.5, 1.0))
+            samples[group].append(value)
+            await ab.track_metric(user_id, experiment_id, MetricType.ENGAGEMENT_TIME, value)
+        await replicas[1].flush()
+
+        results = await replicas[0].get_experiment_results(experiment_id)
+
+        for group, metrics in results['group_metrics'].items():
+            engagement = metrics[MetricType.ENGAGEMENT_TIME]
+            assert engagement['count'] == len(samples[group])
+            assert np.isclose(engagement['mean'], np.mean(samples[group]))
+            assert np.isclose(engagement['variance'], np.var(samples[group], ddof=1))
+        comparison = results['statistical_significance'][ExperimentGroup.VARIANT_A][MetricType.ENGAGEMENT_TIME]
+        assert comparison['is_significant']
+        assert np.isclose(comparison['relative_change'], 10.0, atol=2.0)
+
+    async def test_stats_stored_under_the_previous_keys_are_kept(self):
+        ab = framework()
+        experiment_id = await ab.create_experiment(EXPERIMENT)
+        previous = [2.0, 4.0, 9.0]
+        await ab.redis_client.set(f"agg_metric:{experiment_id}:control:engagement_time", json.dumps({
+            'count': len(previous),
+            'sum': sum(previous),
+            'sum_squares': sum(value * value for value in previous),
+            'mean': float(np.mean(previous)),
+            'variance': float(np.var(previous, ddof=1))
+        }))
+        user_id = 'user_0'
+        while await ab.assign_user_to_experiment(user_id, experiment_id) != ExperimentGroup.CONTROL:
+            user_id += '0'
+        await ab.track_metric(user_id, experiment_id, MetricType.ENGAGEMENT_TIME, 5.0)
+
+        results = await ab.get_experiment_results(experiment_id)
+
+        engagement = results['group_metrics'][ExperimentGroup.CONTROL][MetricType.ENGAGEMENT_TIME]
+        assert engagement['count'] == 4
+        assert np.isclose(engagement['mean'], np.mean(previous + [5.0]))
+        assert np.isclose(engagement['variance'], np.var(previous + [5.0], ddof=1))
@@ -0,0 +1,175 @@
+"""
+Test Suite for Candidate Pools
+
+Checks the offline pool builder (co-visitation, regional popularity and
+content similarity sources), request-time lookups with filters and
+fallbacks, and how the recommendation engine scores the candidates.
+"""
+
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+
+from app.core.candidate_pools import (
+    SOURCE_CONTENT_SIMILARITY,
+    SOURCE_COVISITATION,
+    SOURCE_POPULARITY_FALLBACK,
+    SOURCE_REGIONAL_POPULARITY,
+    CandidatePoolBuilder,
+    CandidatePools,
+    CandidateSet,
+)
+from app.core.recommendation_engine import RealtimeRecommendationEngine
+from app.models.schemas import RecommendationRequest, RecommendationType
+
+
+def catalogue():
+    items = pd.DataFrame({
+        'item_id': [f"item_{n}" for n in range(12)],
+        'item_type': ['property'] * 6 + ['poi'] * 6,
+        'region': ['marrakech', 'marrakech', 'fes', 'fes', 'agadir', 'agadir'] * 2,
+    })
+    # Two content clusters: even and odd items
+    vectors = np.array([[1.0, 0.1] if n % 2 == 0 else [0.1, 1.0] for n in range(12)])
+    return items, vectors
+
+
+def interactions():
+    rows = [
+        # item_0 and item_1 are usually visited together
+        ('u1', 'item_0'), ('u1', 'item_1'),
+        ('u2', 'item_0'), ('u2', 'item_1'),
+        ('u3', 'item_0'), ('u3', 'item_1'), ('u3', 'item_6'),
+        ('u4', 'item_0'),
+        ('u5', 'item_2'), ('u5', 'item_3'),
+        ('u6', 'item_4'),
+    ]
+    frame = pd.DataFrame(rows, columns=['user_id', 'item_id'])
+    frame['rating'] = 4.0
+    return frame
+
+
+class FixedScoreModel:
+    """Model returning preset scores for the items it knows"""
+
+    def __init__(self, scores):
+        self.scores = scores
+
+    def predict(self, user_id, item_ids):
+        return {item_id: self.scores[item_id] for item_id in item_ids if item_id in self.scores}
+
+
+class TestCandidatePoolBuilder:
+    """Test cases for building candidate pools offline"""
+
+    def test_covisited_items_are_proposed_and_seen_items_excluded(self):
+        items, vectors = catalogue()
+        pools = CandidatePoolBuilder().build(interactions(), items, vectors)
+
+        candidates = pools.candidates_for('u4', min_candidates=0)
+
+        assert 'item_0' not in candidates.item_ids
+        assert candidates.item_ids[0] == 'item_1'
+        assert candidates.sources[0] & SOURCE_COVISITATION
+        assert np.all(np.diff(candidates.prior_scores) <= 0)
+
+    def test_regional_popularity_and_content_sources(self):
+        items, vectors = catalogue()
+        pools = CandidatePoolBuilder().build(interactions(), items, vectors)
+
+        candidates = pools.candidates_for('u6', min_candidates=0)
+        flags = dict(zip(candidates.item_ids, candidates.sources))
+
+        # item_10 shares u6's region (agadir) and content cluster (even)
+        assert flags['item_10'] & SOURCE_REGIONAL_POPULARITY
+        assert flags['item_10'] & SOURCE_CONTENT_SIMILARITY
+        assert 'item_4' not in flags
+
+    def test_pools_are_capped_per_user(self):
+        items, vectors = catalogue()
+        pools = CandidatePoolBuilder(pool_size=3).build(interactions(), items, vectors)
+
+        assert np.diff(pools.offsets).max() <= 3
+        assert pools.offsets[-1] == len(pools.items) == len(pools.priors)
+
+
+class TestCandidatePools:
+    """Test cases for request-time candidate lookups"""
+
+    def test_type_and_region_filters(self):
+        items, vectors = catalogue()
+        pools = CandidatePoolBuilder().build(interactions(), items, vectors)
+
+        candidates = pools.candidates_for('u1', item_type=RecommendationType.POI, region='Fes', min_candidates=0)
+
+        assert candidates.item_ids
+        for index in candidates.item_index:
+            assert items.loc[index, 'item_type'] == 'poi'
+            assert items.loc[index, 'region'] == 'fes'
+
+    def test_unknown_users_get_popular_items(self):
+        items, vectors = catalogue()
+        pools = CandidatePoolBuilder().build(interactions(), items, vectors)
+
+        candidates = pools.candidates_for('new-user', item_type='property', min_candidates=3)
+
+        assert candidates.item_ids == ['item_0', 'item_1', 'item_2']
+        assert np.all(candidates.sources == SOURCE_POPULARITY_FALLBACK)
+
+    def test_unknown_type_has_no_candidates(self):
+        items, vectors = catalogue()
+        pools = CandidatePoolBuilder().build(interactions(), items, vectors)
+
+        assert len(pools.candidates_for('u1', item_type=RecommendationType.ITINERARY)) == 0
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        items, vectors = catalogue()
+        pools = CandidatePoolBuilder().build(interactions(), items, vectors)
+        path = str(tmp_path / "pools" / "candidate_pools.npz")
+
+        pools.save(path)
+        loaded = CandidatePools.load(path)
+
+        original = pools.candidates_for('u4', region='marrakech')
+        restored = loaded.candidates_for('u4', region='marrakech')
+        assert restored.item_ids == original.item_ids
+        np.testing.assert_array_equal(restored.prior_scores, original.prior_scores)
+
+
+class TestEngineCandidateScoring:
+    """Test cases for scoring pooled candidates in the recommendation engine"""
+
+    def test_combined_scores_average_available_algorithms(self):
+        engine = RealtimeRecommendationEngine()
+        candidates = CandidateSet(
+            item_ids=['a', 'b', 'c'],
+            item_index=np.arange(3),
+            prior_scores=np.array([0.1, 0.2, 0.3], dtype=np.float32),
+            sources=np.zeros(3, dtype=np.uint8),
+        )
+        predictions = {
+            'collaborative_filtering': {'a': 1.0, 'b': 0.5},
+            'content_based': {'a': 0.0},
+        }
+
+        combined = engine._combine_algorithm_predictions(candidates, predictions)
+
+        np.testing.assert_allclose(combined, [0.4 / 0.7, 0.5, 0.3], rtol=1e-6)
+
+    async def test_recommendations_come_from_the_users_pool(self):
+        items, vectors = catalogue()
+        user_id = uuid4()
+        history = interactions().replace({'user_id': {'u4': str(user_id)}})
+        engine = RealtimeRecommendationEngine()
+        engine.candidate_pools = CandidatePoolBuilder().build(history, items, vectors)
+        engine.model_manager.models['collaborative_filtering'] = FixedScoreModel({'item_2': 0.95, 'item_1': 0.5})
+
+        recommendations = await engine._generate_recommendations(
+            RecommendationRequest(user_id=user_id, recommendation_type=RecommendationType.PROPERTY, limit=2)
+        )
+
+        assert [rec['item_id'] for rec in recommendations] == ['item_2', 'item_1']
+        assert recommendations[0]['algorithm_contributions'] == {'collaborative_filtering': 0.95}
+        # item_0 was already visited, so the pool never offers it
+        assert 'item_0' not in [rec['item_id'] for rec in recommendations]
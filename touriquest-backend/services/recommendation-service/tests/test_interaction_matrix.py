@@ -0,0 +1,134 @@
+"""
+Test Suite for the Interaction Matrix Builder
+
+Checks that the streamed sparse matrix matches the previous dense pivot,
+that chunked and incremental builds agree with a one-shot build, that ids
+keep their rows, and the .npz cache used by FeatureEngineer.
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.features.feature_engineering import FeatureEngineer
+from app.features.interaction_matrix import InteractionMatrixBuilder
+
+AS_OF = pd.Timestamp('2025-06-30', tz='UTC')
+
+
+def interaction_log(n=400, n_users=40, n_items=25, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'user_id': [f"user_{n}" for n in rng.integers(0, n_users, n)],
+        'item_id': [f"item_{n}" for n in rng.integers(0, n_items, n)],
+        'rating': rng.integers(1, 6, n).astype(float),
+        # Whole days, so the previous implementation's integer ages are exact
+        'timestamp': AS_OF - pd.to_timedelta(rng.integers(0, 120, n), unit='D'),
+    })
+
+
+def previous_dense_matrix(interactions, as_of):
+    """The dense pivot implementation this builder replaces, with a fixed clock"""
+    interactions = interactions.copy()
+    rating = interactions.pivot_table(index='user_id', columns='item_id', values='rating', fill_value=0)
+    interactions['recency_weight'] = np.exp(-(as_of - interactions['timestamp']).dt.days / 30)
+    weighted = interactions.pivot_table(
+        index='user_id', columns='item_id', values='recency_weight', aggfunc='sum', fill_value=0
+    )
+    return rating + 0.3 * weighted
+
+
+def as_frame(result):
+    return pd.DataFrame(result.matrix.toarray(), index=result.user_ids, columns=result.item_ids)
+
+
+class TestInteractionMatrixBuilder:
+    """Test cases for streaming the sparse interaction matrix"""
+
+    def test_matches_the_previous_dense_matrix(self):
+        interactions = interaction_log()
+        builder = InteractionMatrixBuilder(compact_entries=90)
+
+        builder.extend(interactions.iloc[start:start + 37] for start in range(0, len(interactions), 37))
+        result = builder.build(AS_OF)
+
+        expected = previous_dense_matrix(interactions, AS_OF)
+        actual = as_frame(result).loc[expected.index, expected.columns]
+        np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-5)
+        assert result.matrix.nnz == int((expected.to_numpy() != 0).sum())
+
+    def test_incremental_appends_in_any_time_order_match_one_build(self):
+        interactions = interaction_log()
+        one_shot = InteractionMatrixBuilder()
+        one_shot.append(interactions)
+
+        newest_first = interactions.sort_values('timestamp', ascending=False)
+        incremental = InteractionMatrixBuilder(compact_entries=50)
+        for start in range(0, len(newest_first), 60):
+            incremental.append(newest_first.iloc[start:start + 60])
+
+        expected = as_frame(one_shot.build(AS_OF))
+        actual = as_frame(incremental.build(AS_OF)).loc[expected.index, expected.columns]
+        np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-5)
+
+    def test_ids_keep_their_rows_as_new_ones_arrive(self):
+        builder = InteractionMatrixBuilder()
+        builder.append(pd.DataFrame({'user_id': ['a', 'b'], 'item_id': ['x', 'y'], 'rating': [4.0, 2.0]}))
+        first = builder.build(AS_OF)
+
+        builder.append(pd.DataFrame({'user_id': ['c', 'a'], 'item_id': ['x', 'z'], 'rating': [5.0, 3.0]}))
+        second = builder.build(AS_OF)
+
+        assert second.user_ids.tolist() == ['a', 'b', 'c']
+        assert second.item_ids.tolist() == ['x', 'y', 'z']
+        np.testing.assert_array_equal(second.matrix[:2, :2].toarray(), first.matrix.toarray())
+        assert second.matrix[0, 2] == 3.0
+
+    def test_older_interactions_decay_over_time(self):
+        builder = InteractionMatrixBuilder(decay_days=10.0, implicit_weight=1.0)
+        builder.append(pd.DataFrame({
+            'user_id': ['a'], 'item_id': ['x'], 'rating': [0.0], 'timestamp': [AS_OF - pd.Timedelta(days=10)]
+        }))
+
+        assert np.isclose(builder.build(AS_OF).matrix[0, 0], np.exp(-1.0))
+        assert np.isclose(builder.build(AS_OF + pd.Timedelta(days=10)).matrix[0, 0], np.exp(-2.0))
+
+    def test_saved_builder_resumes_appending(self, tmp_path):
+        interactions = interaction_log()
+        path = str(tmp_path / 'interactions.npz')
+        builder = InteractionMatrixBuilder()
+        builder.append(interactions.iloc[:250])
+        builder.save(path)
+
+        restored = InteractionMatrixBuilder.load(path)
+        restored.append(interactions.iloc[250:])
+
+        expected = InteractionMatrixBuilder()
+        expected.append(interactions)
+        assert restored.n_interactions == len(interactions)
+        assert restored.user_ids == expected.user_ids
+        assert (restored.build(AS_OF).matrix != expected.build(AS_OF).matrix).nnz == 0
+
+
+class TestFeatureEngineerInteractionMatrix:
+    """Test cases for FeatureEngineer.get_user_item_interaction_matrix"""
+
+    def test_cache_accumulates_across_calls(self, tmp_path):
+        interactions = interaction_log()
+        cache_path = str(tmp_path / 'cache' / 'interactions.npz')
+        engineer = FeatureEngineer()
+
+        engineer.get_user_item_interaction_matrix(interactions.iloc[:300], chunk_size=64, cache_path=cache_path, as_of=AS_OF)
+        result = engineer.get_user_item_interaction_matrix(
+            interactions.iloc[300:], chunk_size=64, cache_path=cache_path, as_of=AS_OF
+        )
+
+        expected = previous_dense_matrix(interactions, AS_OF)
+        actual = as_frame(result).loc[expected.index, expected.columns]
+        np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-5)
+
+    def test_interactions_without_ratings_or_timestamps(self):
+        interactions = pd.DataFrame({'user_id': ['a', 'a', 'b'], 'item_id': ['x', 'x', 'y']})
+
+        result = FeatureEngineer().get_user_item_interaction_matrix(interactions)
+
+        assert result.matrix.toarray().tolist() == [[1.0, 0.0], [0.0, 1.0]]
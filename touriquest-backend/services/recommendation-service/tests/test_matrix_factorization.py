@@ -0,0 +1,153 @@
+"""
+Test Suite for Matrix Factorization
+
+Checks the implicit ALS solver against exact solutions, training on sparse
+interactions, warm starts from previous factors and folding in new users
+and items without retraining.
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.algorithms import implicit_als
+from app.algorithms.ml_algorithms import MatrixFactorizationAlgorithm
+
+
+def clustered_interactions(n_users=600, n_items=200, n_clusters=4, per_user=12, seed=0):
+    """Users only interact with items of their own cluster"""
+    rng = np.random.default_rng(seed)
+    user_clusters = rng.integers(0, n_clusters, n_users)
+    item_clusters = np.arange(n_items) % n_clusters
+    rows, cols = [], []
+    for user in range(n_users):
+        items = rng.choice(np.flatnonzero(item_clusters == user_clusters[user]), per_user, replace=False)
+        rows.extend([user] * per_user)
+        cols.extend(items.tolist())
+    frame = pd.DataFrame({
+        'user_id': [f"user_{row}" for row in rows],
+        'item_id': [f"item_{col}" for col in cols],
+        'rating': rng.integers(1, 6, len(rows)).astype(float),
+    })
+    return frame, user_clusters, item_clusters
+
+
+def cluster_of(item_id, item_clusters):
+    return item_clusters[int(item_id.split('_')[1])]
+
+
+class TestImplicitALS:
+    """Test cases for the conjugate-gradient ALS solver"""
+
+    def test_conjugate_gradient_reaches_the_exact_solution(self):
+        rng = np.random.default_rng(1)
+        confidence = implicit_als.confidence_matrix(
+            rng.integers(0, 30, 300), rng.integers(0, 40, 300), rng.random(300), (30, 40), alpha=5.0
+        )
+        Y = rng.standard_normal((40, 6)).astype(np.float32)
+        X = np.zeros((30, 6), dtype=np.float32)
+
+        implicit_als.least_squares_cg(confidence, X, Y, regularization=0.1, cg_steps=12, chunk_nnz=50)
+
+        for u in range(30):
+            c = confidence[u].toarray().ravel()
+            c[c == 0] = 1.0
+            p = (confidence[u].toarray().ravel() > 0).astype(float)
+            A = Y.T @ (c[:, None] * Y) + 0.1 * np.eye(6)
+            expected = np.linalg.solve(A, Y.T @ (c * p))
+            np.testing.assert_allclose(X[u], expected, rtol=1e-3, atol=1e-4)
+
+    def test_loss_matches_the_dense_definition(self):
+        rng = np.random.default_rng(2)
+        confidence = implicit_als.confidence_matrix(
+            rng.integers(0, 20, 100), rng.integers(0, 15, 100), np.ones(100), (20, 15), alpha=3.0
+        )
+        X = rng.standard_normal((20, 4)).astype(np.float32)
+        Y = rng.standard_normal((15, 4)).astype(np.float32)
+
+        dense = confidence.toarray()
+        weights = np.where(dense > 0, dense, 1.0)
+        expected = (weights * ((dense > 0) - X @ Y.T) ** 2).sum() + 0.5 * ((X ** 2).sum() + (Y ** 2).sum())
+
+        loss = implicit_als.implicit_loss(confidence, X, Y, 0.5, chunk_nnz=7)
+
+        assert np.isclose(loss * confidence.nnz, expected, rtol=1e-4)
+
+
+class TestMatrixFactorization:
+    """Test cases for training, warm starts and fold-in"""
+
+    def test_training_recovers_user_clusters(self):
+        interactions, user_clusters, item_clusters = clustered_interactions()
+        model = MatrixFactorizationAlgorithm(n_factors=8, max_iter=8)
+
+        model.fit(interactions)
+
+        losses = [step['loss'] for step in model.training_history]
+        assert losses == sorted(losses, reverse=True)
+        for user in range(10):
+            recommended = model.recommend(f"user_{user}", 10)
+            assert {cluster_of(item_id, item_clusters) for item_id, _ in recommended} == {user_clusters[user]}
+        assert model.predict('unknown', ['item_0']) == {'item_0': 1.0}
+
+    def test_scores_are_on_the_rating_scale(self):
+        interactions, _, _ = clustered_interactions()
+        model = MatrixFactorizationAlgorithm(n_factors=8, max_iter=8)
+        model.fit(interactions)
+
+        items = model.item_ids
+        preferences = model.item_factors @ model.user_factors[model._user_index['user_0']]
+        predictions = model.predict('user_0', items)
+        np.testing.assert_allclose(list(predictions.values()), 1 + 4 * np.clip(preferences, 0, 1))
+        assert 1.0 <= min(predictions.values()) and max(predictions.values()) <= 5.0
+        # Liked items score towards the top of the scale, not near 1 as raw preferences
+        assert max(predictions.values()) > 4.0
+
+        recommended = model.recommend('user_0', 5)
+        assert [item_id for item_id, _ in recommended] == [items[n] for n in np.argsort(-preferences, kind='stable')[:5]]
+        assert all(predictions[item_id] == score for item_id, score in recommended)
+
+    def test_warm_start_continues_from_previous_factors(self):
+        interactions, _, _ = clustered_interactions()
+        model = MatrixFactorizationAlgorithm(n_factors=8, max_iter=8)
+        model.fit(interactions)
+        trained_loss = model.training_history[-1]['loss']
+
+        cold = MatrixFactorizationAlgorithm(n_factors=8, max_iter=1)
+        cold.fit(interactions)
+        model.fit(interactions, warm_start=True, max_iter=1)
+
+        assert model.training_history[0]['loss'] <= trained_loss
+        assert model.training_history[0]['loss'] < cold.training_history[0]['loss']
+
+    def test_fold_in_adds_users_and_items_without_retraining(self):
+        interactions, user_clusters, item_clusters = clustered_interactions()
+        model = MatrixFactorizationAlgorithm(n_factors=8, max_iter=8)
+        model.fit(interactions)
+        known_factors = model.user_factors.copy()
+        cluster_two = [f"item_{n}" for n in np.flatnonzero(item_clusters == 2)[:6]]
+        fans = [f"user_{n}" for n in np.flatnonzero(user_clusters == 2)[:20]]
+        batch = pd.DataFrame({
+            'user_id': ['newcomer'] * 6 + fans,
+            'item_id': cluster_two + ['new_riad'] * len(fans),
+        })
+
+        assert model.fold_in(batch) == (1, 1)
+
+        np.testing.assert_array_equal(model.user_factors[:len(known_factors)], known_factors)
+        recommended = [item_id for item_id, _ in model.recommend('newcomer', 10) if item_id != 'new_riad']
+        assert {cluster_of(item_id, item_clusters) for item_id in recommended} == {2}
+        # The new item is liked by fans of its cluster and nobody else
+        other = f"user_{np.flatnonzero(user_clusters == 0)[0]}"
+        assert model.predict(fans[-1], ['new_riad'])['new_riad'] > model.predict(other, ['new_riad'])['new_riad']
+
+    def test_artifacts_round_trip_after_fold_in(self):
+        interactions, _, _ = clustered_interactions(n_users=100, n_items=60)
+        model = MatrixFactorizationAlgorithm(n_factors=4, max_iter=2)
+        model.fit(interactions)
+        model.fold_in(pd.DataFrame({'user_id': ['newcomer'], 'item_id': ['item_3']}))
+
+        restored = MatrixFactorizationAlgorithm.from_artifacts(*model.get_artifacts())
+
+        items = ['item_3', 'item_7', 'missing']
+        assert restored.predict('newcomer', items) == model.predict('newcomer', items)
+        assert restored.alpha == model.alpha
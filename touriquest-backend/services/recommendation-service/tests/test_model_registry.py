@@ -0,0 +1,164 @@
+"""
+Test Suite for the Model Registry
+
+Checks publishing and restoring models without pickle, memory-mapped
+factors, warm-up rejection of broken versions, and that hot swaps under
+concurrent prediction load never fail a request or mix versions.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.algorithms.ml_algorithms import (
+    HybridRecommendationAlgorithm,
+    MatrixFactorizationAlgorithm,
+    PopularityBasedAlgorithm
+)
+from app.core.model_registry import ALGORITHMS, ModelRegistry, publish_model, register_algorithm
+from app.core.recommendation_engine import ModelManager
+
+
+def factor_model(score, n_users=50, n_items=2000, n_factors=16):
+    """Trained MF model with preference `score`, rating 1 + 4 * score, for every known user and item"""
+    model = MatrixFactorizationAlgorithm(n_factors=n_factors)
+    model.user_ids = [f"user_{n}" for n in range(n_users)]
+    model.item_ids = [f"item_{n}" for n in range(n_items)]
+    model.user_factors = np.full((n_users, n_factors), 1.0 / n_factors, dtype=np.float32)
+    model.item_factors = np.full((n_items, n_factors), score, dtype=np.float32)
+    model.global_mean = 0.5
+    model.is_trained = True
+    return model
+
+
+class TestModelRegistry:
+    """Test cases for publishing and loading model versions"""
+
+    async def test_published_model_round_trips_with_mapped_factors(self, tmp_path):
+        publish_model(factor_model(0.75), str(tmp_path), 'matrix_factorization', version='v1')
+        registry = ModelRegistry(str(tmp_path), mmap_threshold_bytes=64 * 1024)
+
+        assert await registry.refresh() == ['matrix_factorization']
+
+        model = registry.models['matrix_factorization']
+        assert isinstance(model.item_factors, np.memmap)
+        assert model.predict('user_3', ['item_7', 'unknown']) == {'item_7': 4.0, 'unknown': 3.0}
+        info = registry.get_model_info()['matrix_factorization']
+        assert info['version'] == 'v1'
+        assert info['mapped_bytes'] == 2000 * 16 * 4
+        assert info['memory_bytes'] > 0 and info['load_seconds'] >= 0
+        registry.close()
+
+    async def test_only_newer_complete_versions_are_loaded(self, tmp_path):
+        publish_model(factor_model(0.25), str(tmp_path), 'matrix_factorization', version='v1')
+        registry = ModelRegistry(str(tmp_path))
+        await registry.refresh()
+        first = registry.models['matrix_factorization']
+
+        # A half-written version sits in a hidden staging directory
+        os.makedirs(tmp_path / 'matrix_factorization' / '.v2.tmp')
+        assert await registry.refresh() == []
+        assert registry.models['matrix_factorization'] is first
+
+        publish_model(factor_model(0.75), str(tmp_path), 'matrix_factorization', version='v2')
+        assert await registry.refresh() == ['matrix_factorization']
+        assert registry.versions['matrix_factorization'].version == 'v2'
+        registry.close()
+
+    async def test_version_failing_warm_up_never_goes_live(self, tmp_path):
+        publish_model(factor_model(0.25), str(tmp_path), 'matrix_factorization', version='v1')
+        registry = ModelRegistry(str(tmp_path))
+        await registry.refresh()
+
+        broken = factor_model(0.75)
+        broken.item_factors = broken.item_factors[:, :8]  # factors that do not line up
+        publish_model(broken, str(tmp_path), 'matrix_factorization', version='v2')
+        assert await registry.refresh() == []
+        assert await registry.refresh() == []
+
+        assert registry.versions['matrix_factorization'].version == 'v1'
+        assert registry.rejected_versions == {'matrix_factorization': 'v2'}
+        registry.close()
+
+    async def test_manifest_cannot_name_arbitrary_classes(self, tmp_path):
+        path = publish_model(factor_model(0.25), str(tmp_path), 'matrix_factorization', version='v1')
+        manifest_path = os.path.join(path, 'manifest.json')
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        manifest['algorithm'] = 'os.system'
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+        registry = ModelRegistry(str(tmp_path))
+
+        assert await registry.refresh() == []
+        assert 'matrix_factorization' not in registry.models
+        registry.close()
+
+    def test_algorithms_without_artifacts_are_rejected_at_registration(self, tmp_path):
+        with pytest.raises(TypeError):
+            register_algorithm(HybridRecommendationAlgorithm)
+        assert 'HybridRecommendationAlgorithm' not in ALGORITHMS
+
+        with pytest.raises(TypeError):
+            publish_model(HybridRecommendationAlgorithm([PopularityBasedAlgorithm()], [1.0]), str(tmp_path), 'hybrid', version='v1')
+        assert not os.path.exists(tmp_path / 'hybrid')
+
+    async def test_popularity_model_round_trip(self, tmp_path):
+        model = PopularityBasedAlgorithm()
+        model.fit(pd.DataFrame({'user_id': ['a', 'b', 'b'], 'item_id': ['x', 'x', 'y'], 'rating': [5, 4, 3]}))
+        publish_model(model, str(tmp_path), 'popularity', version='v1')
+        registry = ModelRegistry(str(tmp_path))
+
+        await registry.refresh()
+
+        restored = registry.models['popularity']
+        assert restored.predict('a', ['x', 'y']) == model.predict('a', ['x', 'y'])
+        registry.close()
+
+
+class TestHotSwapUnderLoad:
+    """Test cases for zero-downtime model swaps"""
+
+    async def test_swap_under_load_serves_every_request_from_one_version(self, tmp_path):
+        publish_model(factor_model(0.25), str(tmp_path), 'matrix_factorization', version='v1')
+        manager = ModelManager(str(tmp_path))
+        await manager.initialize()
+        load_version = manager.registry.load_version
+
+        def slow_load_version(*args):
+            time.sleep(0.2)  # a large artifact coming off disk
+            return load_version(*args)
+
+        manager.registry.load_version = slow_load_version
+        item_ids = [f"item_{n}" for n in range(0, 2000, 20)]
+        served = []
+        stop = asyncio.Event()
+
+        async def client(user):
+            while not stop.is_set():
+                predictions = await manager.predict_batch('matrix_factorization', [f"user_{user}"], item_ids)
+                scores = set(predictions[f"user_{user}"].values())
+                served.append(scores)
+
+        clients = [asyncio.create_task(client(user)) for user in range(8)]
+        await asyncio.sleep(0.05)
+        publish_model(factor_model(0.75), str(tmp_path), 'matrix_factorization', version='v2')
+        served_before_swap = len(served)
+        assert await manager.refresh_models() == ['matrix_factorization']
+        served_during_swap = len(served) - served_before_swap
+        await asyncio.sleep(0.05)
+        stop.set()
+        await asyncio.gather(*clients)
+
+        # Every request was answered in full by exactly one version
+        assert all(scores in ({2.0}, {4.0}) for scores in served)
+        assert served_during_swap > 0
+        after_swap = await manager.predict_batch('matrix_factorization', ['user_0'], item_ids)
+        assert set(after_swap['user_0'].values()) == {4.0}
+        assert manager.get_model_info()['matrix_factorization']['version'] == 'v2'
+        manager.close()
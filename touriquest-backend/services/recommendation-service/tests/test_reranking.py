@@ -0,0 +1,192 @@
+"""
+Test Suite for Re-ranking
+
+Checks the precomputed item attribute arrays, contextual boosts applied as
+masks, incremental MMR diversity against a from-scratch reference, and the
+re-ranking stage inside the recommendation engine.
+"""
+
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+
+from app.core.candidate_pools import CandidatePoolBuilder, CandidatePools, CandidateSet, ItemAttributes
+from app.core.recommendation_engine import RealtimeRecommendationEngine
+from app.core.reranking import Reranker, mmr_select
+from app.models.schemas import RecommendationRequest, RecommendationType
+
+
+def attributed_catalogue():
+    return pd.DataFrame({
+        'item_id': [f"item_{n}" for n in range(6)],
+        'item_type': ['experience'] * 6,
+        'region': ['marrakech'] * 6,
+        'category': ['tour', 'tour', 'tour', 'spa', 'show', 'hike'],
+        'latitude': [31.63, 31.63, 31.63, 31.63, 34.03, None],
+        'longitude': [-8.0, -8.0, -8.0, -8.0, -5.0, None],
+        'price': [10.0, 20.0, 30.0, 40.0, 50.0, 1000.0],
+        'tags': ['outdoor, nature', ['leisure'], None, 'wellness', ['entertainment'], 'outdoor'],
+    })
+
+
+def candidates_for(attributes, item_index):
+    return CandidateSet(
+        item_ids=[f"item_{n}" for n in item_index],
+        item_index=np.asarray(item_index),
+        prior_scores=np.zeros(len(item_index), dtype=np.float32),
+        sources=np.zeros(len(item_index), dtype=np.uint8),
+        attributes=attributes,
+    )
+
+
+def reference_mmr(relevance, k, diversity, similarity):
+    """MMR recomputing every candidate's redundancy from scratch at each step"""
+    gain = (1 - diversity) * relevance / relevance.max()
+    selected = []
+    for _ in range(k):
+        best, best_value = None, -np.inf
+        for i in range(len(relevance)):
+            if i in selected:
+                continue
+            redundancy = max((similarity[i, j] for j in selected), default=0.0)
+            value = gain[i] - diversity * redundancy
+            if value > best_value:
+                best, best_value = i, value
+        selected.append(best)
+    return selected
+
+
+class TestItemAttributes:
+    """Test cases for the precomputed item attribute arrays"""
+
+    def test_attributes_are_extracted_from_the_catalogue(self):
+        attributes = ItemAttributes.from_frame(attributed_catalogue())
+
+        assert attributes.category_names[attributes.categories].tolist() == ['tour', 'tour', 'tour', 'spa', 'show', 'hike']
+        assert attributes.cell_rows[0] == attributes.cell_rows[3] != attributes.cell_rows[4]
+        assert attributes.cell_rows[5] == -1
+        # Percentiles within the item type: 1/6 .. 6/6
+        assert attributes.price_bands.tolist() == [0, 0, 1, 1, 2, 3]
+        index = np.arange(6)
+        assert attributes.tag_mask(index, ['outdoor']).tolist() == [True, False, False, False, False, True]
+        assert not attributes.tag_mask(index, ['unknown']).any()
+
+    def test_attributes_travel_with_saved_pools(self, tmp_path):
+        items = attributed_catalogue()
+        history = pd.DataFrame({'user_id': ['u1', 'u1'], 'item_id': ['item_0', 'item_4']})
+        vectors = np.eye(6)
+        pools = CandidatePoolBuilder().build(history, items, vectors)
+        path = str(tmp_path / 'pools.npz')
+        pools.save(path)
+
+        restored = CandidatePools.load(path)
+
+        candidates = restored.candidates_for('u1')
+        assert candidates.attributes is restored.attributes
+        np.testing.assert_array_equal(restored.attributes.price_bands, pools.attributes.price_bands)
+        assert restored.attributes.vectors.dtype == np.float16
+
+
+class TestContextualBoosts:
+    """Test cases for contextual boosts applied as attribute masks"""
+
+    def test_boosts_follow_the_context(self):
+        attributes = ItemAttributes.from_frame(attributed_catalogue())
+        index = np.arange(6)
+        reranker = Reranker()
+
+        sunny_budget = reranker.context_multipliers(attributes, index, {'is_sunny': 1, 'budget_preference': 0.25})
+        np.testing.assert_allclose(sunny_budget, [1.15 * 1.2, 1.2, 1.0, 1.0, 1.0, 1.15])
+
+        weekend_luxury = reranker.context_multipliers(attributes, index, {'is_weekend': 1, 'budget_preference': 0.75})
+        np.testing.assert_allclose(weekend_luxury, [1.0, 1.1, 1.0, 1.0, 1.1 * 1.2, 1.2])
+
+        nearby = reranker.context_multipliers(
+            attributes, index, {'current_latitude': 31.64, 'current_longitude': -8.01}
+        )
+        np.testing.assert_allclose(nearby, [1.1, 1.1, 1.1, 1.1, 1.0, 1.0])
+
+    def test_features_that_do_not_hold_leave_scores_alone(self):
+        attributes = ItemAttributes.from_frame(attributed_catalogue())
+
+        multipliers = Reranker().context_multipliers(
+            attributes, np.arange(6), {'is_weekend': 0, 'is_sunny': 0, 'budget_preference': 0.5}
+        )
+
+        np.testing.assert_array_equal(multipliers, np.ones(6))
+
+
+class TestMMRDiversity:
+    """Test cases for incremental maximal marginal relevance"""
+
+    def test_incremental_updates_match_the_reference(self):
+        rng = np.random.default_rng(3)
+        vectors = rng.standard_normal((300, 8))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        similarity = np.clip(vectors @ vectors.T, 0, 1)
+        relevance = rng.random(300)
+
+        selected = mmr_select(relevance, 20, 0.4, lambda j: similarity[j])
+
+        assert selected.tolist() == reference_mmr(relevance, 20, 0.4, similarity)
+
+    def test_no_diversity_is_plain_ranking(self):
+        relevance = np.array([0.2, 0.9, 0.5, 0.7])
+
+        selected = mmr_select(relevance, 3, 0.0, lambda j: np.ones(4))
+
+        assert selected.tolist() == [1, 3, 2]
+
+    def test_diversity_spreads_categories(self):
+        attributes = ItemAttributes.from_frame(attributed_catalogue())
+        candidates = candidates_for(attributes, [0, 1, 2, 3, 4])
+        scores = np.array([0.9, 0.85, 0.8, 0.6, 0.55])
+
+        plain, _ = Reranker(diversity=0.0).rerank(scores, candidates, {}, k=3)
+        diverse, diverse_scores = Reranker(diversity=0.5).rerank(scores, candidates, {}, k=3)
+
+        assert plain.tolist() == [0, 1, 2]
+        assert diverse.tolist() == [0, 4, 3]
+        np.testing.assert_allclose(diverse_scores, [0.9, 0.55, 0.6])
+
+    def test_candidates_without_attributes_rank_by_score(self):
+        candidates = candidates_for(None, [0, 1, 2, 3])
+        scores = np.array([0.5, 0.1, 0.8, 0.4])
+
+        positions, kept = Reranker().rerank(scores, candidates, {'is_sunny': 1}, k=3, min_score=0.3)
+
+        assert positions.tolist() == [2, 0, 3]
+        np.testing.assert_allclose(kept, [0.8, 0.5, 0.4])
+
+
+class FixedScoreModel:
+    """Model returning preset scores for the items it knows"""
+
+    def __init__(self, scores):
+        self.scores = scores
+
+    def predict(self, user_id, item_ids):
+        return {item_id: self.scores[item_id] for item_id in item_ids if item_id in self.scores}
+
+
+class TestEngineReranking:
+    """Test cases for the re-ranking stage of the recommendation engine"""
+
+    async def test_context_reorders_pooled_candidates(self):
+        user_id = uuid4()
+        history = pd.DataFrame({'user_id': [str(user_id), 'other'], 'item_id': ['item_4', 'item_3']})
+        engine = RealtimeRecommendationEngine()
+        engine.candidate_pools = CandidatePoolBuilder().build(history, attributed_catalogue())
+        engine.model_manager.models['collaborative_filtering'] = FixedScoreModel(
+            {'item_1': 0.8, 'item_5': 0.78, 'item_3': 0.7}
+        )
+        request = RecommendationRequest(user_id=user_id, recommendation_type=RecommendationType.EXPERIENCE, limit=3)
+
+        plain = await engine._generate_recommendations(request)
+        sunny = await engine._generate_recommendations(request, {'weather': {'condition': 'sunny'}})
+
+        assert [rec['item_id'] for rec in plain] == ['item_1', 'item_5', 'item_3']
+        # The outdoor hike overtakes on a sunny day, weekend or not
+        assert [rec['item_id'] for rec in sunny][0] == 'item_5'
+        assert np.isclose(sunny[0]['score'], 0.78 * 1.15)